@@ -5,21 +5,31 @@ build_library_api.py — Scheme B library builder (no rendered_bw, no paths.json
 Outputs (under lib_root):
 lib/
 ├─ indices/
-│  └─ SigLIP2.faiss
+│  ├─ SigLIP2.faiss
+│  └─ SigLIP2_text.faiss      # text features (dual-mode retrieval in search_fused)
 ├─ features/
 │  ├─ features_SigLIP2.npy
 │  ├─ features_text_SigLIP2.npy
 │  └─ items.json              # row-aligned with features
-└─ metadata.json              # optional (toggle via keep_metadata)
+├─ metadata.json              # optional (toggle via keep_metadata)
+├─ build_manifest.json        # SHA-256 per SVG + build settings (for --incremental / --verify)
+└─ .raster_cache/             # rasters by SVG hash (default --raster-cache; --no-raster-cache to skip)
 Notes:
-- Renders SVG → outline (WHITE bg + BLACK strokes) in-memory, no PNG saved.
+- Renders SVG → outline (WHITE bg + BLACK strokes) in a process pool
+  (--raster-workers), overlapping captioning; no rendered_bw is written to the library.
 - Captions via BLIP2 (fallback to filename keywords).
 - Image features: SigLIP2; Text features: SigLIP2 text tower.
 - Single FAISS index for image features only (cosine via IP on normalized vecs).
+- --incremental rebuilds only new/changed SVGs and removes deleted ones;
+  --verify diffs lib_root against a full rebuild without modifying it.
+- --benchmark-raster N reports rasterization throughput in icons/sec.
+- --export-compact OUT writes a compact read-only copy (float16 or int8 features,
+  columnar features/items.npz, scalar-quantized index, features/compact.json)
+  that search_fused.load_lib reads like a float32 library.
 """
 
 from __future__ import annotations
-import io, json, re, math, warnings
+import io, json, re, math, warnings, hashlib, itertools
 import xml.etree.ElementTree as ET
 from pathlib import Path
 from typing import List, Tuple, Optional, Dict, Any
@@ -501,76 +511,196 @@ def _caption_images_multiproc(color_pngs: List[bytes], gpu_ids: List[int], model
     return [o or "" for o in outs]
 
 
-def build_library_inplace(
-    svg_dir: Path,
-    lib_root: Path,
+def raster_svg_to_centered_rgb(png_rgba_bytes: bytes,
+                               target: int, pad_ratio: float,
+                               bg_rgb=(0,0,0),
+                               alpha_thr: int = 1) -> Image.Image:
+    im = Image.open(io.BytesIO(png_rgba_bytes)).convert("RGBA")
+    arr = np.array(im)
+    a = arr[..., 3]
+    ys, xs = np.where(a > alpha_thr)
+    if xs.size == 0 or ys.size == 0:
+        inner = int(round(target * (1 - 2 * pad_ratio)))
+        fit = ImageOps.contain(im, (inner, inner), Image.LANCZOS)
+        canvas = Image.new("RGB", (target, target), bg_rgb)
+        tmp = Image.new("RGB", fit.size, bg_rgb)
+        tmp.paste(fit, mask=fit.split()[-1])
+        off = ((target - fit.width)//2, (target - fit.height)//2)
+        canvas.paste(tmp, off)
+        return canvas
+    x0, x1 = xs.min(), xs.max() + 1
+    y0, y1 = ys.min(), ys.max() + 1
+    x0 = max(0, x0 - 1); y0 = max(0, y0 - 1)
+    x1 = min(im.width,  x1 + 1); y1 = min(im.height, y1 + 1)
+    tight_rgba = im.crop((x0, y0, x1, y1))
+    inner = int(round(target * (1 - 2 * pad_ratio)))
+    fit = ImageOps.contain(tight_rgba, (inner, inner), Image.LANCZOS)
+    fit_rgb = Image.new("RGB", fit.size, bg_rgb)
+    fit_rgb.paste(fit, mask=fit.split()[-1])
+    canvas = Image.new("RGB", (target, target), bg_rgb)
+    off = ((target - fit.width)//2, (target - fit.height)//2)
+    canvas.paste(fit_rgb, off)
+    return canvas
+
+
+# ---------------- rasterization stage ----------------
+RASTER_CHUNK = 32       # SVGs per pool task
+RASTER_PREFETCH = 2     # chunks in flight per worker ahead of the consumer
+
+
+def raster_settings_key() -> str:
+    """Short hash of the settings rasters depend on (names the raster cache subdirectory)."""
+    settings = [TARGET, PAD_RATIO, OVERSCAN_PX, SUPERSAMPLE, SVG_PAD_FRAC, EDGE_THRESH, BORDER_ERODE, EDGE_DILATE]
+    return hashlib.sha256(json.dumps(settings).encode("utf-8")).hexdigest()[:16]
+
+
+def _png_bytes(img: Image.Image) -> bytes:
+    buf = io.BytesIO(); img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def rasterize_svg(svg_path: str) -> Tuple[bytes, bytes]:
+    """Outline (WHITE bg + BLACK strokes) and centered color rasters of one SVG, as lossless PNG bytes."""
+    inner_final = int(round(TARGET * (1.0 - 2 * PAD_RATIO)))
+    raster_w = max(inner_final * SUPERSAMPLE, TARGET)
+    png_bytes = svg_to_png_bytes_padded(Path(svg_path), raster_width_px=raster_w, pad_frac=SVG_PAD_FRAC)
+    bw = to_outline_bw(png_bytes)
+    color_img = raster_svg_to_centered_rgb(png_bytes, target=TARGET, pad_ratio=PAD_RATIO, bg_rgb=(255, 255, 255))
+    return _png_bytes(bw), _png_bytes(color_img)
+
+
+def _rasterize_chunk(svg_paths: List[str]) -> List[Tuple[bytes, bytes]]:
+    return [rasterize_svg(p) for p in svg_paths]
+
+
+class RasterCache:
+    """On-disk rasterize_svg results keyed by SVG SHA-256 (one subdirectory per raster settings)."""
+
+    def __init__(self, cache_dir: Path):
+        self.dir = Path(cache_dir) / raster_settings_key()
+        ensure_dir(self.dir)
+
+    def _paths(self, sha: str) -> Tuple[Path, Path]:
+        return self.dir / f"{sha}.bw.png", self.dir / f"{sha}.color.png"
+
+    def has(self, sha: str) -> bool:
+        return all(p.exists() for p in self._paths(sha))
+
+    def get(self, sha: str) -> Tuple[bytes, bytes]:
+        bw_path, color_path = self._paths(sha)
+        return bw_path.read_bytes(), color_path.read_bytes()
+
+    def put(self, sha: str, rasters: Tuple[bytes, bytes]) -> None:
+        for path, data in zip(self._paths(sha), rasters):
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+
+
+def iter_rasters(
+    svgs: List[Path],
+    shas: List[str],
     *,
-    keep_metadata: bool = True,
-    pattern: str = GLOB,
-    multi_gpu: bool = False,
-    gpu_ids: Optional[List[int]] = None,
-) -> Dict[str, Any]:
-    svg_dir = Path(svg_dir)
-    lib_root = Path(lib_root)
-    feat_dir = lib_root / "features"
-    index_dir = lib_root / "indices"
-    ensure_dir(feat_dir); ensure_dir(index_dir)
+    workers: int = 1,
+    cache: Optional[RasterCache] = None,
+):
+    """
+    Yield (outline, color) PIL images for svgs, in order.
 
-    svgs = list_svgs(svg_dir, pattern=pattern)
+    Cache misses are rasterized in a process pool, RASTER_CHUNK SVGs per
+    task, with at most RASTER_PREFETCH chunks per worker queued ahead of the
+    consumer: rasterization runs while the caller captions/embeds earlier
+    icons, and memory stays bounded on large libraries.
+    """
+    hits = [cache is not None and cache.has(sha) for sha in shas]
+    misses = [str(sp) for sp, hit in zip(svgs, hits) if not hit]
+    chunks = [misses[i:i + RASTER_CHUNK] for i in range(0, len(misses), RASTER_CHUNK)]
+
+    def rendered():
+        if workers <= 1 or len(chunks) <= 1:
+            for chunk in chunks:
+                yield from _rasterize_chunk(chunk)
+            return
+        ctx = mp.get_context("spawn")
+        with ctx.Pool(processes=min(workers, len(chunks))) as pool:
+            queued = iter(chunks)
+            in_flight = [pool.apply_async(_rasterize_chunk, (chunk,))
+                         for chunk in itertools.islice(queued, workers * RASTER_PREFETCH)]
+            while in_flight:
+                results = in_flight.pop(0).get()
+                nxt = next(queued, None)
+                if nxt is not None:
+                    in_flight.append(pool.apply_async(_rasterize_chunk, (nxt,)))
+                yield from results
+
+    fresh = rendered()
+    for sha, hit in zip(shas, hits):
+        if hit:
+            rasters = cache.get(sha)
+        else:
+            rasters = next(fresh)
+            if cache is not None:
+                cache.put(sha, rasters)
+        yield tuple(Image.open(io.BytesIO(b)).convert("RGB") for b in rasters)
+
+
+def benchmark_rasterization(svg_dir: Path, *, pattern: str = GLOB, limit: int = 500, workers: Optional[int] = None) -> Dict[str, float]:
+    """Rasterization throughput (icons/sec) serially, with a process pool, and from a cold/warm raster cache."""
+    import tempfile, time
+
+    svgs = list_svgs(Path(svg_dir), pattern=pattern)[:limit]
     if not svgs:
-        raise SystemExit(f"No SVGs found in {svg_dir} with pattern {GLOB}")
+        raise SystemExit(f"No SVGs found in {svg_dir} with pattern {pattern}")
+    shas = [svg_sha256(sp) for sp in svgs]
+    workers = workers or os.cpu_count() or 1
+
+    def throughput(**kwargs) -> float:
+        start = time.perf_counter()
+        for _ in iter_rasters(svgs, shas, **kwargs):
+            pass
+        return len(svgs) / (time.perf_counter() - start)
+
+    results = {"icons": len(svgs), "workers": workers, "serial": throughput(workers=1)}
+    results["pool"] = throughput(workers=workers)
+    with tempfile.TemporaryDirectory(prefix="raster-cache-bench-") as tmp:
+        cache = RasterCache(Path(tmp))
+        results["pool_cold_cache"] = throughput(workers=workers, cache=cache)
+        results["warm_cache"] = throughput(workers=workers, cache=cache)
+
+    print(f"[bench] rasterize+outline, {len(svgs)} icons, {workers} worker(s):")
+    for name in ("serial", "pool", "pool_cold_cache", "warm_cache"):
+        print(f"  {name:<16} {results[name]:8.1f} icons/sec")
+    return results
 
-    use_multi_proc_caption = bool(multi_gpu and gpu_ids and len(gpu_ids) > 1)
+
+def render_and_caption(
+    svgs: List[Path],
+    svg_dir: Path,
+    *,
+    shas: Optional[List[str]] = None,
+    use_multi_proc_caption: bool = False,
+    gpu_ids: Optional[List[int]] = None,
+    raster_workers: int = 1,
+    raster_cache: Optional[RasterCache] = None,
+) -> Tuple[List[Image.Image], List[Dict[str, Any]]]:
+    """
+    Rasterize, outline and caption SVGs. Returns (outline images, items), aligned with svgs.
+    Rasters come from iter_rasters (process pool + optional cache, keyed by shas).
+    """
     capper = None if use_multi_proc_caption else BLIP2Captioner(CAPTION_MODEL_ID, multi_gpu=False)
     bw_pils: List[Image.Image] = []
-    captions: List[str] = []
     items: List[Dict[str, Any]] = []
-    metadata_full: Dict[str, Any] = {}
     color_pngs: List[bytes] = []
+    if shas is None:
+        shas = [svg_sha256(sp) for sp in svgs]
+    rasters = iter_rasters(svgs, shas, workers=raster_workers, cache=raster_cache)
 
-    for i, sp in enumerate(svgs, 1):
-        rel = sp.relative_to(svg_dir)
-        inner_final = int(round(TARGET * (1.0 - 2 * PAD_RATIO)))
-        raster_w = max(inner_final * SUPERSAMPLE, TARGET)
-        png_bytes = svg_to_png_bytes_padded(sp, raster_width_px=raster_w, pad_frac=SVG_PAD_FRAC)
-        bw = to_outline_bw(png_bytes)
+    for i, (sp, (bw, color_img)) in enumerate(zip(svgs, rasters), 1):
         bw_pils.append(bw)
 
         comp, aliases = filename_to_component_and_aliases(sp, svg_dir)
         colors = parse_svg_colors(sp)
 
-        def raster_svg_to_centered_rgb(png_rgba_bytes: bytes,
-                                       target: int, pad_ratio: float,
-                                       bg_rgb=(0,0,0),
-                                       alpha_thr: int = 1) -> Image.Image:
-            im = Image.open(io.BytesIO(png_rgba_bytes)).convert("RGBA")
-            arr = np.array(im)
-            a = arr[..., 3]
-            ys, xs = np.where(a > alpha_thr)
-            if xs.size == 0 or ys.size == 0:
-                inner = int(round(target * (1 - 2 * pad_ratio)))
-                fit = ImageOps.contain(im, (inner, inner), Image.LANCZOS)
-                canvas = Image.new("RGB", (target, target), bg_rgb)
-                tmp = Image.new("RGB", fit.size, bg_rgb)
-                tmp.paste(fit, mask=fit.split()[-1])
-                off = ((target - fit.width)//2, (target - fit.height)//2)
-                canvas.paste(tmp, off)
-                return canvas
-            x0, x1 = xs.min(), xs.max() + 1
-            y0, y1 = ys.min(), ys.max() + 1
-            x0 = max(0, x0 - 1); y0 = max(0, y0 - 1)
-            x1 = min(im.width,  x1 + 1); y1 = min(im.height, y1 + 1)
-            tight_rgba = im.crop((x0, y0, x1, y1))
-            inner = int(round(target * (1 - 2 * pad_ratio)))
-            fit = ImageOps.contain(tight_rgba, (inner, inner), Image.LANCZOS)
-            fit_rgb = Image.new("RGB", fit.size, bg_rgb)
-            fit_rgb.paste(fit, mask=fit.split()[-1])
-            canvas = Image.new("RGB", (target, target), bg_rgb)
-            off = ((target - fit.width)//2, (target - fit.height)//2)
-            canvas.paste(fit_rgb, off)
-            return canvas
-
-        color_img = raster_svg_to_centered_rgb(png_bytes, target=TARGET, pad_ratio=PAD_RATIO, bg_rgb=(255, 255, 255))
         if use_multi_proc_caption:
             buf = io.BytesIO(); color_img.save(buf, format="PNG"); color_pngs.append(buf.getvalue())
             cap = ""
@@ -590,14 +720,6 @@ def build_library_inplace(
             "colors": colors,
         })
 
-        if keep_metadata:
-            metadata_full[rel_path] = {
-                "component_id": comp,
-                "aliases": aliases,
-                "colors": colors,
-                "caption": cap
-            }
-
         if i % 500 == 0:
             print(f"[render+caption] {i}/{len(svgs)}")
 
@@ -609,30 +731,203 @@ def build_library_inplace(
             if not cap or not cap.strip():
                 cap = build_caption_from_keywords(items[idx]["aliases"]) if idx < len(items) else ""
             items[idx]["caption"] = cap
-            if keep_metadata:
-                sp = Path(items[idx]["src_svg"])
-                metadata_full[str(sp.as_posix())]["caption"] = cap
 
+    return bw_pils, items
+
+
+def embed_library_items(bw_pils: List[Image.Image], items: List[Dict[str, Any]], *, multi_gpu: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """SigLIP2 image features of the outlines and text features of the captions."""
     device = "cuda" if torch.cuda.is_available() else "cpu"
     model, preprocess = load_openclip(device=device, multi_gpu=multi_gpu)
-
     embs_img = embed_images_from_pils(model, preprocess, bw_pils)
-    np.save(feat_dir / "features_SigLIP2.npy", embs_img)
-
     tokenizer = load_openclip_text_tokenizer(MODEL_NAME)
     embs_txt = embed_texts(model, tokenizer, texts=[it["caption"] for it in items])
-    np.save(feat_dir / "features_text_SigLIP2.npy", embs_txt)
+    return embs_img, embs_txt
+
+
+# ---------------- incremental builds ----------------
+BUILD_MANIFEST = "build_manifest.json"
+# Bump when rendering, captioning or embedding changes in a way the settings
+# below do not capture; a mismatch forces a full rebuild
+BUILD_VERSION = 1
+
+
+def build_settings() -> Dict[str, Any]:
+    """Everything a library row depends on besides the SVG bytes and its path."""
+    return {
+        "version": BUILD_VERSION,
+        "target": TARGET, "pad_ratio": PAD_RATIO, "overscan_px": OVERSCAN_PX,
+        "supersample": SUPERSAMPLE, "svg_pad_frac": SVG_PAD_FRAC,
+        "edge_thresh": EDGE_THRESH, "border_erode": BORDER_ERODE, "edge_dilate": EDGE_DILATE,
+        "model": MODEL_NAME, "pretrained": PRETRAINED,
+        "caption_model": CAPTION_MODEL_ID, "max_new_tokens": MAX_NEW_TOKENS, "num_beams": NUM_BEAMS,
+    }
 
+
+def svg_sha256(p: Path) -> str:
+    return hashlib.sha256(p.read_bytes()).hexdigest()
+
+
+def load_library_state(lib_root: Path) -> Optional[Dict[str, Any]]:
+    """
+    Load a library built with a manifest, or None if it cannot be updated incrementally
+    (missing files, other build settings, or rows out of sync with the manifest).
+    """
+    lib_root = Path(lib_root)
+    feat_dir = lib_root / "features"
+    try:
+        manifest = json.loads((lib_root / BUILD_MANIFEST).read_text(encoding="utf-8"))
+        items = json.loads((feat_dir / "items.json").read_text(encoding="utf-8"))
+        embs_img = np.load(feat_dir / "features_SigLIP2.npy").astype("float32")
+        embs_txt = np.load(feat_dir / "features_text_SigLIP2.npy").astype("float32")
+        index = faiss.read_index(str((lib_root / "indices" / "SigLIP2.faiss").as_posix()))
+    except (OSError, ValueError, RuntimeError):
+        return None
+    if manifest.get("settings") != build_settings():
+        return None
+    hashes = manifest.get("hashes", {})
+    if not (len(items) == len(embs_img) == len(embs_txt) == index.ntotal == len(hashes)
+            and {it["src_svg"] for it in items} == set(hashes)):
+        return None
+    return {"items": items, "features": embs_img, "features_text": embs_txt, "index": index, "hashes": hashes}
+
+
+def write_library(
+    lib_root: Path,
+    items: List[Dict[str, Any]],
+    embs_img: np.ndarray,
+    embs_txt: np.ndarray,
+    index: faiss.Index,
+    hashes: Dict[str, str],
+    *,
+    keep_metadata: bool = True,
+) -> None:
+    """Write features, items.json, metadata.json, the FAISS index and, last, the build manifest."""
+    lib_root = Path(lib_root)
+    feat_dir = lib_root / "features"
+    index_dir = lib_root / "indices"
+    ensure_dir(feat_dir); ensure_dir(index_dir)
+    # Invalidate first: an interrupted write then forces a full rebuild next time
+    (lib_root / BUILD_MANIFEST).unlink(missing_ok=True)
+
+    np.save(feat_dir / "features_SigLIP2.npy", embs_img)
+    np.save(feat_dir / "features_text_SigLIP2.npy", embs_txt)
     (feat_dir / "items.json").write_text(json.dumps(items, ensure_ascii=False, indent=2), encoding="utf-8")
 
     if keep_metadata:
+        metadata_full = {
+            it["src_svg"]: {
+                "component_id": it["component_id"],
+                "aliases": it["aliases"],
+                "colors": it["colors"],
+                "caption": it["caption"],
+            }
+            for it in items
+        }
         (lib_root / "metadata.json").write_text(json.dumps(metadata_full, ensure_ascii=False, indent=2), encoding="utf-8")
 
-    index_img = build_faiss_cosine(embs_img)
-    faiss.write_index(index_img, str((index_dir / "SigLIP2.faiss").as_posix()))
+    faiss.write_index(index, str((index_dir / "SigLIP2.faiss").as_posix()))
+    faiss.write_index(build_faiss_cosine(embs_txt), str((index_dir / "SigLIP2_text.faiss").as_posix()))
+
+    manifest = {"settings": build_settings(), "hashes": {it["src_svg"]: hashes[it["src_svg"]] for it in items}}
+    (lib_root / BUILD_MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+
+def build_library_inplace(
+    svg_dir: Path,
+    lib_root: Path,
+    *,
+    keep_metadata: bool = True,
+    pattern: str = GLOB,
+    multi_gpu: bool = False,
+    gpu_ids: Optional[List[int]] = None,
+    incremental: bool = False,
+    raster_workers: int = 1,
+    raster_cache_dir: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """
+    Build the library under lib_root from the SVGs in svg_dir.
+
+    Rasterization runs in raster_workers processes, overlapping captioning;
+    with raster_cache_dir, rasters are reused across builds by SVG hash.
+
+    Every build records the SHA-256 of each SVG in lib_root/build_manifest.json.
+    With incremental=True and a manifest matching the current build settings,
+    only new or changed SVGs are rendered, captioned and embedded: rows of
+    deleted and changed SVGs are removed from the features, items and FAISS
+    index, and the new rows are appended. Rows are therefore no longer sorted
+    by path after an incremental build; items.json stays row-aligned.
+    Otherwise all SVGs are (re)built.
+    """
+    svg_dir = Path(svg_dir)
+    lib_root = Path(lib_root)
+    feat_dir = lib_root / "features"
+    index_dir = lib_root / "indices"
+
+    svgs = list_svgs(svg_dir, pattern=pattern)
+    if not svgs:
+        raise SystemExit(f"No SVGs found in {svg_dir} with pattern {GLOB}")
+    hashes = {sp.relative_to(svg_dir).as_posix(): svg_sha256(sp) for sp in svgs}
+
+    state = load_library_state(lib_root) if incremental else None
+    if incremental and state is None:
+        print("[incremental] No usable build manifest; rebuilding all icons")
+
+    if state is None:
+        pending = svgs
+        removed: List[str] = []
+        items: List[Dict[str, Any]] = []
+        embs_img = np.zeros((0, 0), dtype="float32")
+        embs_txt = np.zeros((0, 0), dtype="float32")
+        index = None
+    else:
+        old_hashes = state["hashes"]
+        pending = [sp for sp in svgs if old_hashes.get(sp.relative_to(svg_dir).as_posix()) != hashes[sp.relative_to(svg_dir).as_posix()]]
+        changed = {sp.relative_to(svg_dir).as_posix() for sp in pending} & set(old_hashes)
+        removed = sorted(set(old_hashes) - set(hashes))
+        stale = changed | set(removed)
+        drop = [row for row, it in enumerate(state["items"]) if it["src_svg"] in stale]
+        print(f"[incremental] {len(pending) - len(changed)} new, {len(changed)} changed, "
+              f"{len(removed)} removed, {len(svgs) - len(pending)} unchanged")
+
+        items = [it for it in state["items"] if it["src_svg"] not in stale]
+        embs_img = np.delete(state["features"], drop, axis=0)
+        embs_txt = np.delete(state["features_text"], drop, axis=0)
+        index = state["index"]
+        if drop:
+            # IndexFlat compacts ids on removal, matching np.delete on the rows
+            index.remove_ids(np.asarray(drop, dtype="int64"))
+
+    if pending:
+        use_multi_proc_caption = bool(multi_gpu and gpu_ids and len(gpu_ids) > 1)
+        bw_pils, new_items = render_and_caption(
+            pending, svg_dir,
+            shas=[hashes[sp.relative_to(svg_dir).as_posix()] for sp in pending],
+            use_multi_proc_caption=use_multi_proc_caption, gpu_ids=gpu_ids,
+            raster_workers=raster_workers,
+            raster_cache=RasterCache(raster_cache_dir) if raster_cache_dir else None,
+        )
+        new_img, new_txt = embed_library_items(bw_pils, new_items, multi_gpu=multi_gpu)
+
+        items += new_items
+        embs_img = np.concatenate([embs_img, new_img]) if len(embs_img) else new_img
+        embs_txt = np.concatenate([embs_txt, new_txt]) if len(embs_txt) else new_txt
+        if index is None:
+            index = build_faiss_cosine(embs_img)
+        else:
+            v = new_img.astype("float32", copy=True)
+            faiss.normalize_L2(v)
+            index.add(v)
+
+    if pending or removed or state is None:
+        write_library(lib_root, items, embs_img, embs_txt, index, hashes, keep_metadata=keep_metadata)
+    else:
+        print("[incremental] Library is up to date")
 
     summary = {
         "svg_count": len(svgs),
+        "built": len(pending),
+        "removed": len(removed),
         "features_image_shape": tuple(embs_img.shape),
         "features_text_shape": tuple(embs_txt.shape),
         "out": {
@@ -640,13 +935,237 @@ def build_library_inplace(
             "features_text_SigLIP2": str((feat_dir / "features_text_SigLIP2.npy").as_posix()),
             "items_json": str((feat_dir / "items.json").as_posix()),
             "faiss_index": str((index_dir / "SigLIP2.faiss").as_posix()),
+            "faiss_text_index": str((index_dir / "SigLIP2_text.faiss").as_posix()),
             "metadata_json": str((lib_root / "metadata.json").as_posix()) if keep_metadata else None,
+            "build_manifest": str((lib_root / BUILD_MANIFEST).as_posix()),
         }
     }
     print("\n[OK] Scheme-B Library built:")
     print(json.dumps(summary, ensure_ascii=False, indent=2))
     return summary
 
+
+def verify_library(
+    svg_dir: Path,
+    lib_root: Path,
+    *,
+    pattern: str = GLOB,
+    multi_gpu: bool = False,
+    gpu_ids: Optional[List[int]] = None,
+    atol: float = 1e-4,
+    raster_workers: int = 1,
+) -> Dict[str, Any]:
+    """
+    Diff the library under lib_root (e.g. after incremental builds) against a
+    full rebuild into a temporary directory. Rows are matched by src_svg, so
+    row order does not matter; features are compared with tolerance atol.
+    The reference build does not use the raster cache.
+    """
+    import tempfile
+
+    lib_root = Path(lib_root)
+    with tempfile.TemporaryDirectory(prefix="icon-lib-verify-") as tmp:
+        build_library_inplace(svg_dir, Path(tmp), keep_metadata=False, pattern=pattern,
+                              multi_gpu=multi_gpu, gpu_ids=gpu_ids, raster_workers=raster_workers)
+        ref = load_library_state(Path(tmp))
+    cur = load_library_state(lib_root)
+    if cur is None:
+        report = {"ok": False, "error": f"{lib_root} has no build manifest matching its rows and the current settings"}
+        print(json.dumps(report, indent=2))
+        return report
+
+    ref_rows = {it["src_svg"]: row for row, it in enumerate(ref["items"])}
+    cur_rows = {it["src_svg"]: row for row, it in enumerate(cur["items"])}
+    missing = sorted(set(ref_rows) - set(cur_rows))
+    extra = sorted(set(cur_rows) - set(ref_rows))
+    common = sorted(set(ref_rows) & set(cur_rows))
+    stale_hashes = [k for k in common if ref["hashes"][k] != cur["hashes"][k]]
+    item_diffs = [k for k in common if ref["items"][ref_rows[k]] != cur["items"][cur_rows[k]]]
+
+    ref_idx = [ref_rows[k] for k in common]
+    cur_idx = [cur_rows[k] for k in common]
+    img_err = float(np.abs(ref["features"][ref_idx] - cur["features"][cur_idx]).max()) if common else 0.0
+    txt_err = float(np.abs(ref["features_text"][ref_idx] - cur["features_text"][cur_idx]).max()) if common else 0.0
+    # The index must hold the (normalized) image features in row order
+    index_vecs = cur["index"].reconstruct_n(0, cur["index"].ntotal)
+    normalized = cur["features"].copy()
+    faiss.normalize_L2(normalized)
+    index_err = float(np.abs(index_vecs - normalized).max()) if len(normalized) else 0.0
+
+    report = {
+        "ok": not (missing or extra or stale_hashes or item_diffs) and max(img_err, txt_err, index_err) <= atol,
+        "rows": len(cur_rows),
+        "missing": missing,
+        "extra": extra,
+        "stale_hashes": stale_hashes,
+        "item_diffs": item_diffs,
+        "max_abs_diff": {"features": img_err, "features_text": txt_err, "index": index_err},
+    }
+    print("\n[verify] " + ("OK: library matches a full rebuild" if report["ok"] else "MISMATCH against a full rebuild"))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return report
+
+# ---------------- compact libraries ----------------
+# Read by perception/icon/search_fused.load_lib; keep the two in sync.
+COMPACT_META = "compact.json"
+COMPACT_VERSION = 1
+COMPACT_DTYPES = ("float16", "int8")
+COMPACT_SUFFIX = {"float16": "f16", "int8": "i8"}
+
+
+def quantize_rows(x: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """float16 cast, or symmetric int8 with a float32 scale per row (x ≈ q * scale[:, None])."""
+    x = np.asarray(x, dtype=np.float32)
+    if dtype == "float16":
+        return x.astype(np.float16), None
+    scale = np.abs(x).max(axis=1) / 127.0 if x.size else np.zeros(len(x), dtype=np.float32)
+    scale = np.where(scale > 0, scale, 1.0).astype(np.float32)
+    q = np.clip(np.rint(x / scale[:, None]), -127, 127).astype(np.int8)
+    return q, scale
+
+
+def dequantize_rows(q: np.ndarray, scale: Optional[np.ndarray]) -> np.ndarray:
+    x = np.asarray(q, dtype=np.float32)
+    return x if scale is None else x * scale[:, None]
+
+
+def save_compact_features(feat_dir: Path, name: str, x: np.ndarray, dtype: str) -> None:
+    q, scale = quantize_rows(x, dtype)
+    np.save(feat_dir / f"{name}.{COMPACT_SUFFIX[dtype]}.npy", q)
+    if scale is not None:
+        np.save(feat_dir / f"{name}.{COMPACT_SUFFIX[dtype]}_scale.npy", scale)
+
+
+def save_item_table(path: Path, items: List[Dict[str, Any]]) -> None:
+    """
+    Columnar items table (.npz): per field, the JSON-encoded values of all rows
+    concatenated into one UTF-8 blob plus int64 row offsets (empty = field absent).
+    Readers load only the columns they touch and decode only the rows they read.
+    """
+    fields: List[str] = []
+    for it in items:
+        fields += [k for k in it if k not in fields]
+    arrays: Dict[str, np.ndarray] = {
+        "fields": np.array(fields, dtype=str),
+        "rows": np.array(len(items), dtype=np.int64),
+    }
+    for f, field in enumerate(fields):
+        encoded = [json.dumps(it[field], ensure_ascii=False).encode("utf-8") if field in it else b"" for it in items]
+        offsets = np.zeros(len(items) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+        arrays[f"c{f}_offsets"] = offsets
+        arrays[f"c{f}_data"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    with open(path, "wb") as fh:
+        np.savez(fh, **arrays)
+
+
+def build_faiss_compact(vecs: np.ndarray, dtype: str) -> faiss.Index:
+    """Cosine index (IP on normalized vecs) storing fp16 or 8-bit scalar-quantized codes."""
+    v = vecs.astype("float32", copy=True)
+    faiss.normalize_L2(v)
+    qtype = faiss.ScalarQuantizer.QT_fp16 if dtype == "float16" else faiss.ScalarQuantizer.QT_8bit
+    index = faiss.IndexScalarQuantizer(v.shape[1], qtype, faiss.METRIC_INNER_PRODUCT)
+    index.train(v)
+    index.add(v)
+    return index
+
+
+def compact_recall(
+    embs_img: np.ndarray,
+    index: faiss.Index,
+    *,
+    k: int = 10,
+    n_queries: int = 1000,
+    noise: float = 0.5,
+    seed: int = 0,
+) -> Dict[str, float]:
+    """
+    Recall of the compact index against exact float32 search. Queries are
+    library image features with Gaussian noise (norm ≈ noise relative to the row),
+    so neighbours are not trivially the query row itself.
+    """
+    n, d = embs_img.shape
+    if n == 0:
+        return {"queries": 0}
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(n, size=min(n_queries, n), replace=False)
+    ref = embs_img.astype("float32", copy=True)
+    faiss.normalize_L2(ref)
+    q = ref[rows] + rng.standard_normal((len(rows), d)).astype("float32") * (noise / math.sqrt(d))
+    faiss.normalize_L2(q)
+    k = min(k, n)
+    exact = np.argsort(-(q @ ref.T), axis=1, kind="stable")[:, :k]
+    _, approx = index.search(q, k)
+    return {
+        "queries": int(len(rows)),
+        "recall@1": float(np.mean(approx[:, 0] == exact[:, 0])),
+        f"recall@{k}": float(np.mean([len(set(a) & set(e)) / k for a, e in zip(approx.tolist(), exact.tolist())])),
+    }
+
+
+def export_compact_library(
+    lib_root: Path,
+    out_root: Path,
+    *,
+    dtype: str = "int8",
+    min_recall: float = 0.0,
+) -> Dict[str, Any]:
+    """
+    Write a compact, read-only copy of the float32 library under lib_root to out_root:
+    float16 or per-row int8 features, a columnar item table and matching
+    scalar-quantized FAISS indexes. The float32 library stays the source for
+    --incremental/--verify; export again after rebuilding it.
+    Fails (SystemExit) if recall@1 against float32 search is below min_recall.
+    """
+    if dtype not in COMPACT_DTYPES:
+        raise ValueError(f"dtype must be one of {COMPACT_DTYPES}, got {dtype!r}")
+    lib_root, out_root = Path(lib_root), Path(out_root)
+    src_feat = lib_root / "features"
+    embs_img = np.load(src_feat / "features_SigLIP2.npy").astype("float32")
+    embs_txt = np.load(src_feat / "features_text_SigLIP2.npy").astype("float32")
+    items = json.loads((src_feat / "items.json").read_text(encoding="utf-8"))
+    if not (len(items) == len(embs_img) == len(embs_txt)):
+        raise SystemExit("Length mismatch among items.json, features_SigLIP2.npy, features_text_SigLIP2.npy")
+
+    feat_dir = out_root / "features"
+    index_dir = out_root / "indices"
+    ensure_dir(feat_dir); ensure_dir(index_dir)
+    # Written last; a reader only treats out_root as compact once it exists
+    (feat_dir / COMPACT_META).unlink(missing_ok=True)
+
+    save_compact_features(feat_dir, "features_SigLIP2", embs_img, dtype)
+    save_compact_features(feat_dir, "features_text_SigLIP2", embs_txt, dtype)
+    save_item_table(feat_dir / "items.npz", items)
+    index = build_faiss_compact(embs_img, dtype)
+    faiss.write_index(index, str((index_dir / "SigLIP2.faiss").as_posix()))
+    faiss.write_index(build_faiss_compact(embs_txt, dtype), str((index_dir / "SigLIP2_text.faiss").as_posix()))
+    if (lib_root / "metadata.json").exists():
+        (out_root / "metadata.json").write_bytes((lib_root / "metadata.json").read_bytes())
+
+    recall = compact_recall(embs_img, index)
+    max_err = {
+        name: float(np.abs(dequantize_rows(*quantize_rows(x, dtype)) - x).max()) if x.size else 0.0
+        for name, x in (("features", embs_img), ("features_text", embs_txt))
+    }
+    meta = {
+        "version": COMPACT_VERSION,
+        "dtype": dtype,
+        "rows": len(items),
+        "dim": int(embs_img.shape[1]) if embs_img.ndim == 2 else 0,
+        "recall_vs_float32": recall,
+        "max_abs_error": max_err,
+    }
+    (feat_dir / COMPACT_META).write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+    size = lambda root: sum(p.stat().st_size for p in root.rglob("*") if p.is_file() and ".raster_cache" not in p.parts)
+    summary = {**meta, "bytes": size(out_root), "bytes_float32": size(lib_root), "out": str(out_root.as_posix())}
+    print("\n[OK] Compact library exported:")
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if recall.get("queries") and recall["recall@1"] < min_recall:
+        raise SystemExit(f"[compact] recall@1 {recall['recall@1']:.3f} is below --compact-min-recall {min_recall}")
+    return summary
+
+
 def main(argv: Optional[List[str]] = None) -> int:
     import argparse
 
@@ -666,7 +1185,8 @@ def main(argv: Optional[List[str]] = None) -> int:
     parser.add_argument(
         "lib_root",
         type=str,
-        help="Output directory for the generated library (will be created).",
+        nargs="?",
+        help="Output directory for the generated library (will be created). Not needed with --benchmark-raster.",
     )
     parser.add_argument(
         "--pattern",
@@ -678,6 +1198,61 @@ def main(argv: Optional[List[str]] = None) -> int:
         action="store_true",
         help="Skip writing metadata.json at the lib root.",
     )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=f"Only build new or changed SVGs and drop deleted ones, using {BUILD_MANIFEST} from a previous build (falls back to a full build).",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Do not modify lib_root; diff it against a full rebuild in a temporary directory and exit 1 on mismatch.",
+    )
+    parser.add_argument(
+        "--raster-workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Processes used to rasterize and outline SVGs while captioning runs (default: CPU count; 1 = in-process).",
+    )
+    parser.add_argument(
+        "--raster-cache",
+        type=str,
+        default=None,
+        help="Directory caching rasters by SVG hash across builds (default: lib_root/.raster_cache).",
+    )
+    parser.add_argument(
+        "--no-raster-cache",
+        action="store_true",
+        help="Do not read or write the raster cache.",
+    )
+    parser.add_argument(
+        "--benchmark-raster",
+        type=int,
+        nargs="?",
+        const=500,
+        default=None,
+        metavar="N",
+        help="Only benchmark rasterization throughput (icons/sec) on the first N SVGs (default: 500) and exit.",
+    )
+    parser.add_argument(
+        "--export-compact",
+        type=str,
+        default=None,
+        metavar="OUT_ROOT",
+        help="Do not build; export the library at lib_root as a compact read-only library under OUT_ROOT.",
+    )
+    parser.add_argument(
+        "--compact-dtype",
+        choices=COMPACT_DTYPES,
+        default="int8",
+        help="Feature storage of --export-compact: float16, or int8 with per-row scales (default: int8).",
+    )
+    parser.add_argument(
+        "--compact-min-recall",
+        type=float,
+        default=0.0,
+        help="Exit 1 if the compact index's recall@1 against float32 search is below this (default: 0, report only).",
+    )
     parser.add_argument(
         "--gpus",
         type=str,
@@ -686,6 +1261,16 @@ def main(argv: Optional[List[str]] = None) -> int:
     )
 
     args = parser.parse_args(argv)
+    if args.benchmark_raster is None and args.lib_root is None:
+        parser.error("lib_root is required unless --benchmark-raster is given")
+
+    if args.benchmark_raster is not None:
+        benchmark_rasterization(Path(args.svg_dir), pattern=args.pattern, limit=args.benchmark_raster, workers=args.raster_workers)
+        return 0
+
+    raster_cache_dir = None
+    if not args.no_raster_cache:
+        raster_cache_dir = Path(args.raster_cache) if args.raster_cache else Path(args.lib_root) / ".raster_cache"
 
     try:
         multi_gpu = False
@@ -707,6 +1292,22 @@ def main(argv: Optional[List[str]] = None) -> int:
             except Exception:
                 multi_gpu = False
 
+        if args.export_compact:
+            export_compact_library(Path(args.lib_root), Path(args.export_compact),
+                                   dtype=args.compact_dtype, min_recall=args.compact_min_recall)
+            return 0
+
+        if args.verify:
+            report = verify_library(
+                Path(args.svg_dir),
+                Path(args.lib_root),
+                pattern=args.pattern,
+                multi_gpu=multi_gpu,
+                gpu_ids=gpu_ids,
+                raster_workers=args.raster_workers,
+            )
+            return 0 if report["ok"] else 1
+
         build_library_inplace(
             Path(args.svg_dir),
             Path(args.lib_root),
@@ -714,10 +1315,16 @@ def main(argv: Optional[List[str]] = None) -> int:
             pattern=args.pattern,
             multi_gpu=multi_gpu,
             gpu_ids=gpu_ids,
+            incremental=args.incremental,
+            raster_workers=args.raster_workers,
+            raster_cache_dir=raster_cache_dir,
         )
         return 0
     except SystemExit as e:
-        return int(e.code) if isinstance(e.code, int) else 1
+        if isinstance(e.code, int):
+            return e.code
+        print(f"[ERROR] {e.code}")
+        return 1
     except Exception as e:
         print(f"[ERROR] {e}")
         return 1
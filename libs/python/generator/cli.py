@@ -77,6 +77,8 @@ Examples:
   generate-widget-batch ./images ./output --concurrency 5
   generate-widget-batch ./images ./output -c 2 --model qwen3-vl-plus
   generate-widget-batch ./images ./output --icon-libs '["lucide"]'
+  generate-widget-batch ./images ./output -c 16 --workers 4
+  generate-widget-batch /shared/images /shared/output --queue /shared/output/queue.sqlite
         """
     )
 
@@ -111,6 +113,26 @@ Examples:
         action='store_true',
         help='Force reprocess all images, even if already generated'
     )
+    parser.add_argument(
+        '--queue',
+        type=str,
+        default=None,
+        help='Path to a shared SQLite work queue; run the same command on several hosts '
+             'sharing the filesystem to split the batch between them'
+    )
+    parser.add_argument(
+        '--lease-seconds',
+        type=float,
+        default=300.0,
+        help='Work-queue lease duration; items of unresponsive workers are re-queued after it (default: 300)'
+    )
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        default=1,
+        help='Number of worker processes; images are sharded across them and '
+             'concurrency/REQUESTS_PER_MINUTE are split per worker (default: 1)'
+    )
 
     args = parser.parse_args()
 
@@ -136,6 +158,9 @@ Examples:
             model=args.model,
             icon_lib_names=args.icon_libs,
             force=args.force,
+            workers=args.workers,
+            queue_path=args.queue,
+            lease_seconds=args.lease_seconds,
         ))
     except KeyboardInterrupt:
         print("\n\nInterrupted by user")
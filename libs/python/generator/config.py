@@ -29,6 +29,10 @@ class GeneratorConfig:
     enable_graph_pipeline: bool = True
     enable_color_pipeline: bool = True
 
+    # Failure recovery
+    degrade_perception_on_timeout: bool = True  # Timed-out icon/applogo/graph stages fall back to empty results
+    enable_stage_checkpoints: bool = True  # Persist completed stage outputs so retries resume after them
+
     # Stage-specific timeouts (in seconds)
     default_timeout: int = 500
     layout_timeout: Optional[int] = None
@@ -314,6 +318,10 @@ class GeneratorConfig:
             enable_graph_pipeline=os.getenv('ENABLE_GRAPH_PIPELINE', 'true').lower() in ('true', '1', 'yes'),
             enable_color_pipeline=os.getenv('ENABLE_COLOR_PIPELINE', 'true').lower() in ('true', '1', 'yes'),
 
+            # Failure recovery
+            degrade_perception_on_timeout=os.getenv('DEGRADE_PERCEPTION_ON_TIMEOUT', 'true').lower() in ('true', '1', 'yes'),
+            enable_stage_checkpoints=os.getenv('ENABLE_STAGE_CHECKPOINTS', 'true').lower() in ('true', '1', 'yes'),
+
             # Timeouts
             default_timeout=int(os.getenv('DEFAULT_TIMEOUT', '500')),
             layout_timeout=get_optional_int('LAYOUT_TIMEOUT'),
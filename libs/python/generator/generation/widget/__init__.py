@@ -7,6 +7,7 @@ from .single import (
     generate_single_widget,
 )
 from .batch import BatchGenerator, batch_generate
+from .work_queue import WorkQueue, WorkItem, SQLiteWorkQueue
 
 __all__ = [
     "generate_widget_text",
@@ -15,4 +16,7 @@ __all__ = [
     "generate_single_widget",
     "BatchGenerator",
     "batch_generate",
+    "WorkQueue",
+    "WorkItem",
+    "SQLiteWorkQueue",
 ]
@@ -6,14 +6,20 @@
 # -----------------------------------------------------------------------------
 
 import asyncio
+import hashlib
+import itertools
 import json
+import math
+import multiprocessing
 import os
+import queue
 import shutil
+import socket
 import threading
 import time
 from pathlib import Path
 from datetime import datetime
-from typing import List, Tuple, Dict, Any, Optional
+from typing import List, Tuple, Dict, Any, Optional, Iterable, Iterator
 from collections import defaultdict
 from tqdm import tqdm
 
@@ -23,6 +29,10 @@ from rich.live import Live
 from rich.box import ROUNDED
 
 from .single import generate_widget_full, generate_single_widget
+from .work_queue import (
+    WorkQueue, WorkItem, SQLiteWorkQueue, commit_artifacts, is_widget_committed,
+    COMMITTED, REPLACED, KEPT_EXISTING, NOTHING_STAGED,
+)
 from ...config import GeneratorConfig
 from ...exceptions import ValidationError, FileSizeError, GenerationError
 from ...utils.logger import setup_logger, log_to_file, log_to_console, separator, Colors
@@ -40,8 +50,114 @@ except Exception:
     WIDGET_FACTORY_VERSION = "unknown"
 
 
+class LatencyHistogram:
+    """
+    Fixed log-bucket latency histogram with O(1) inserts.
+
+    Bucket upper bounds grow geometrically from MIN_MS by GROWTH, so
+    percentiles are accurate to within one bucket (<10%) regardless of how
+    many samples are recorded. The last bucket absorbs everything above range.
+    """
+
+    MIN_MS = 1.0
+    GROWTH = 1.1
+    NUM_BUCKETS = 160  # 1.1^160 ms ~= 1.1 hours
+
+    _LOG_GROWTH = math.log(GROWTH)
+
+    def __init__(self):
+        self.buckets = [0] * self.NUM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = 0.0
+        self.max = 0.0
+
+    def record(self, value_ms: float):
+        """Record one latency sample in milliseconds."""
+        value_ms = max(0.0, value_ms)
+        if value_ms <= self.MIN_MS:
+            idx = 0
+        else:
+            idx = min(int(math.log(value_ms / self.MIN_MS) / self._LOG_GROWTH) + 1, self.NUM_BUCKETS - 1)
+        self.buckets[idx] += 1
+
+        if self.count == 0:
+            self.min = self.max = value_ms
+        else:
+            self.min = min(self.min, value_ms)
+            self.max = max(self.max, value_ms)
+        self.count += 1
+        self.total += value_ms
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Approximate the q-th percentile (0-100), clamped to observed min/max."""
+        if self.count == 0:
+            return 0.0
+        rank = max(1, math.ceil(q / 100.0 * self.count))
+        seen = 0
+        for idx, n in enumerate(self.buckets):
+            if seen + n >= rank:
+                # Interpolate linearly within the bucket
+                upper = self.MIN_MS * (self.GROWTH ** idx)
+                lower = upper / self.GROWTH if idx > 0 else 0.0
+                value = lower + (upper - lower) * (rank - seen) / n
+                return min(max(value, self.min), self.max)
+            seen += n
+        return self.max
+
+    def merge(self, other: 'LatencyHistogram'):
+        """Fold another histogram's samples into this one."""
+        if other.count == 0:
+            return
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        if self.count == 0:
+            self.min, self.max = other.min, other.max
+        else:
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize to a picklable/JSON-friendly dict."""
+        return {"buckets": list(self.buckets), "count": self.count, "total": self.total, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LatencyHistogram':
+        hist = cls()
+        hist.buckets = list(data["buckets"])
+        hist.count = data["count"]
+        hist.total = data["total"]
+        hist.min = data["min"]
+        hist.max = data["max"]
+        return hist
+
+    def summary(self) -> Dict[str, float]:
+        """Return count/mean/min/max and p50/p95/p99 in milliseconds."""
+        return {
+            "count": self.count,
+            "avg": self.mean,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
 class StageTracker:
-    """Thread-safe tracker for image processing stages."""
+    """
+    Thread-safe tracker for image processing stages.
+
+    Counters and latency histograms are updated incrementally on every
+    transition, and an immutable stats snapshot is republished after each
+    update. Readers (e.g. the live display thread) call get_stats() without
+    taking the lock, so refresh cost no longer grows with batch size.
+    """
 
     # Define stage hierarchy with display names and indentation
     STAGES = [
@@ -59,38 +175,105 @@ class StageTracker:
         {"key": "failed", "display": "✗ Failed", "indent": 0}
     ]
 
+    TERMINAL_STAGES = ("done", "failed")
+
+    # Smoothing factor for the completion-interval EWMA (higher = more reactive)
+    THROUGHPUT_EWMA_ALPHA = 0.2
+
     def __init__(self):
         self.lock = threading.Lock()
-        # Current stage for each image: {image_id: stage_name}
+        self._main_keys = [s["key"] for s in self.STAGES if "parent" not in s]
+        self._sub_keys = [s["key"] for s in self.STAGES if "parent" in s]
+
+        # Current stage for each in-flight image: {image_id: stage_name}
         self.current_stages: Dict[str, str] = {}
-        # Sub-stage tracking for parallel stages: {image_id: {substage: [start, end]}}
-        self.substage_times: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
-        # Stage timing: {image_id: {stage_name: [start_time, end_time]}}
-        self.stage_times: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
-        # Overall timing: {image_id: start_time}
-        self.image_start_times: Dict[str, float] = {}
+        # Start time of the open stage / substages per in-flight image
+        self._stage_started: Dict[str, float] = {}
+        self._substage_started: Dict[str, Dict[str, float]] = defaultdict(dict)
+
+        # Incremental counters
+        self._stage_counts = {key: 0 for key in self._main_keys}
+        self._stage_entered_counts = {key: 0 for key in self._main_keys}
+        self._substage_entered_counts = {key: 0 for key in self._sub_keys}
+        self._substage_in_progress_counts = {key: 0 for key in self._sub_keys}
+        self._stage_latency = {key: LatencyHistogram() for key in self._main_keys}
+        self._substage_latency = {key: LatencyHistogram() for key in self._sub_keys}
+        self._image_latency = LatencyHistogram()
+        self._image_start_times: Dict[str, float] = {}
+        self._total_images = 0
+
+        # Time saved by resuming widgets from stage checkpoints
+        self._resumed_images = 0
+        self._time_saved_sec = 0.0
+
+        # Throughput EWMA over completion intervals
+        self._first_completion: Optional[float] = None
+        self._last_completion: Optional[float] = None
+        self._ewma_interval: Optional[float] = None
+
+        self._snapshot: Dict[str, Any] = {}
+        self._publish()
+
+    def _close_stage(self, image_id: str, now: float):
+        """Record the duration of the image's open stage. Caller holds the lock."""
+        old_stage = self.current_stages.get(image_id)
+        started = self._stage_started.pop(image_id, None)
+        if old_stage in self._stage_latency and started is not None:
+            self._stage_latency[old_stage].record((now - started) * 1000)
+
+    def _record_completion(self, image_id: str, now: float):
+        """Update image latency and throughput EWMA. Caller holds the lock."""
+        started = self._image_start_times.pop(image_id, None)
+        if started is not None:
+            self._image_latency.record((now - started) * 1000)
+
+        if self._last_completion is None:
+            self._first_completion = now
+        else:
+            interval = now - self._last_completion
+            if self._ewma_interval is None:
+                self._ewma_interval = interval
+            else:
+                alpha = self.THROUGHPUT_EWMA_ALPHA
+                self._ewma_interval = alpha * interval + (1 - alpha) * self._ewma_interval
+        self._last_completion = now
+
+        # Drop per-image bookkeeping for open substages
+        for substage in self._substage_started.pop(image_id, {}):
+            self._substage_in_progress_counts[substage] -= 1
 
     def set_stage(self, image_id: str, stage: str):
         """Update the current stage for an image."""
         with self.lock:
-            current_time = time.time()
+            now = time.monotonic()
+            old_stage = self.current_stages.get(image_id)
+
+            if old_stage is None:
+                self._total_images += 1
+            elif old_stage in self._stage_counts:
+                self._stage_counts[old_stage] -= 1
 
             # Record end time for previous stage
-            if image_id in self.current_stages:
-                old_stage = self.current_stages[image_id]
-                if old_stage in self.stage_times[image_id] and len(self.stage_times[image_id][old_stage]) == 1:
-                    # Only append end time if we have start time but no end time yet
-                    self.stage_times[image_id][old_stage].append(current_time)
+            if old_stage not in self.TERMINAL_STAGES:
+                self._close_stage(image_id, now)
 
             # Update to new stage
             self.current_stages[image_id] = stage
-
-            # Record start time for new stage
-            if stage not in ["done", "failed"]:
-                self.stage_times[image_id][stage] = [current_time]
+            if stage in self._stage_counts:
+                self._stage_counts[stage] += 1
+                self._stage_entered_counts[stage] += 1
+
+            if stage in self.TERMINAL_STAGES:
+                if old_stage not in self.TERMINAL_STAGES:
+                    # done/failed are instantaneous
+                    self._stage_latency[stage].record(0.0)
+                    self._record_completion(image_id, now)
+                # Finished images live on only in the counters, keeping memory flat
+                del self.current_stages[image_id]
             else:
-                # For done/failed, record both start and end
-                self.stage_times[image_id][stage] = [current_time, current_time]
+                self._stage_started[image_id] = now
+
+            self._publish()
 
     def set_substage(self, image_id: str, substage: str, is_start: bool = True):
         """
@@ -101,133 +284,221 @@ class StageTracker:
             substage: Substage key (e.g., "perception.icon", "perception.graph")
             is_start: True for start, False for end
         """
+        if substage not in self._substage_latency:
+            return
+
         with self.lock:
-            current_time = time.time()
+            now = time.monotonic()
+            open_substages = self._substage_started[image_id]
             if is_start:
-                self.substage_times[image_id][substage] = [current_time]
-            else:
-                if substage in self.substage_times[image_id] and len(self.substage_times[image_id][substage]) == 1:
-                    self.substage_times[image_id][substage].append(current_time)
+                if substage not in open_substages:
+                    self._substage_in_progress_counts[substage] += 1
+                self._substage_entered_counts[substage] += 1
+                open_substages[substage] = now
+            elif substage in open_substages:
+                started = open_substages.pop(substage)
+                self._substage_in_progress_counts[substage] -= 1
+                self._substage_latency[substage].record((now - started) * 1000)
+            self._publish()
 
     def start_image(self, image_id: str):
         """Mark an image as started processing."""
         with self.lock:
-            self.image_start_times[image_id] = time.time()
+            now = time.monotonic()
+            old_stage = self.current_stages.get(image_id)
+            if old_stage is None:
+                self._total_images += 1
+            elif old_stage in self._stage_counts:
+                self._stage_counts[old_stage] -= 1
+            self._stage_started.pop(image_id, None)
+
+            self._image_start_times[image_id] = now
             self.current_stages[image_id] = "waiting"
+            self._stage_counts["waiting"] += 1
+            self._stage_entered_counts["waiting"] += 1
+            self._stage_started[image_id] = now
+            self._publish()
 
-    def get_current_stage(self, image_id: str) -> str:
-        """Get the current stage for an image."""
+    def record_time_saved(self, seconds: float):
+        """Record time saved by resuming a widget from stage checkpoints."""
         with self.lock:
-            return self.current_stages.get(image_id, "unknown")
+            self._resumed_images += 1
+            self._time_saved_sec += seconds
+            self._publish()
+
+    def get_current_stage(self, image_id: str) -> str:
+        """Get the current stage for an in-flight image ("unknown" once finished)."""
+        return self.current_stages.get(image_id, "unknown")
+
+    def _throughput(self) -> Dict[str, float]:
+        """Completion throughput in images/second. Caller holds the lock."""
+        ewma = 1.0 / self._ewma_interval if self._ewma_interval else 0.0
+        overall = 0.0
+        if self._first_completion is not None and self._last_completion > self._first_completion:
+            completions = self._stage_counts["done"] + self._stage_counts["failed"]
+            overall = (completions - 1) / (self._last_completion - self._first_completion)
+        return {"ewma": ewma, "overall": overall}
+
+    def _publish(self):
+        """Build and publish an immutable stats snapshot. Caller holds the lock."""
+        stage_summaries = {key: self._stage_latency[key].summary() for key in self._main_keys}
+        substage_summaries = {key: self._substage_latency[key].summary() for key in self._sub_keys}
+        timed_stages = [key for key in self._main_keys if key not in ("waiting", "failed")]
+
+        completed = self._stage_counts["done"]
+        failed = self._stage_counts["failed"]
+        throughput = self._throughput()
+
+        self._snapshot = {
+            "stage_counts": {**dict(self._stage_counts), **{key: 0 for key in self._sub_keys}},
+            "stage_avg_times": {key: stage_summaries[key]["avg"] for key in timed_stages},
+            "stage_min_times": {key: stage_summaries[key]["min"] for key in timed_stages},
+            "stage_max_times": {key: stage_summaries[key]["max"] for key in timed_stages},
+            "stage_percentiles": {
+                key: {p: stage_summaries[key][p] for p in ("p50", "p95", "p99")} for key in timed_stages
+            },
+            "substage_avg_times": {key: substage_summaries[key]["avg"] for key in self._sub_keys},
+            "substage_min_times": {key: substage_summaries[key]["min"] for key in self._sub_keys},
+            "substage_max_times": {key: substage_summaries[key]["max"] for key in self._sub_keys},
+            "substage_percentiles": {
+                key: {p: substage_summaries[key][p] for p in ("p50", "p95", "p99")} for key in self._sub_keys
+            },
+            "stage_entered_counts": dict(self._stage_entered_counts),
+            "substage_entered_counts": dict(self._substage_entered_counts),
+            "substage_in_progress_counts": dict(self._substage_in_progress_counts),
+            "image_latency": self._image_latency.summary(),
+            "throughput_ewma": throughput["ewma"],
+            "throughput_overall": throughput["overall"],
+            "resumed_images": self._resumed_images,
+            "time_saved_sec": self._time_saved_sec,
+            "total_images": self._total_images,
+            "active_images": self._total_images - completed - failed,
+            "completed": completed,
+            "failed": failed,
+        }
 
     def get_stats(self) -> Dict[str, Any]:
-        """Get current statistics for all stages and substages."""
-        with self.lock:
-            # Count images in each stage
-            stage_counts = {stage["key"]: 0 for stage in self.STAGES}
-            for stage in self.current_stages.values():
-                if stage in stage_counts:
-                    stage_counts[stage] += 1
-
-            # Calculate average times for each stage (in milliseconds)
-            stage_avg_times = {}
-            stage_min_times = {}
-            stage_max_times = {}
-
-            for stage_def in self.STAGES:
-                stage_key = stage_def["key"]
-                if stage_key in ["waiting", "failed"]:
-                    continue
+        """
+        Get current statistics for all stages and substages.
 
-                # Skip substages for main stage timing (they're calculated separately)
-                if "parent" in stage_def:
-                    continue
+        Lock-free: returns the latest published snapshot, which must be
+        treated as read-only.
+        """
+        return self._snapshot
+
+    def export_state(self) -> Dict[str, Any]:
+        """Export counters and histograms so another process can merge them (see from_states)."""
+        with self.lock:
+            return {
+                "stage_counts": dict(self._stage_counts),
+                "stage_entered_counts": dict(self._stage_entered_counts),
+                "substage_entered_counts": dict(self._substage_entered_counts),
+                "substage_in_progress_counts": dict(self._substage_in_progress_counts),
+                "stage_latency": {key: hist.to_dict() for key, hist in self._stage_latency.items()},
+                "substage_latency": {key: hist.to_dict() for key, hist in self._substage_latency.items()},
+                "image_latency": self._image_latency.to_dict(),
+                "total_images": self._total_images,
+                "resumed_images": self._resumed_images,
+                "time_saved_sec": self._time_saved_sec,
+                "first_completion": self._first_completion,
+                "last_completion": self._last_completion,
+                "ewma_interval": self._ewma_interval,
+            }
 
-                all_durations = []
-                for image_id, times_dict in self.stage_times.items():
-                    if stage_key in times_dict and len(times_dict[stage_key]) >= 2:
-                        duration = (times_dict[stage_key][1] - times_dict[stage_key][0]) * 1000  # to ms
-                        all_durations.append(duration)
+    @classmethod
+    def from_states(cls, states: List[Dict[str, Any]]) -> 'StageTracker':
+        """
+        Build a read-only tracker that merges exported states from several workers.
 
-                if all_durations:
-                    stage_avg_times[stage_key] = sum(all_durations) / len(all_durations)
-                    stage_min_times[stage_key] = min(all_durations)
-                    stage_max_times[stage_key] = max(all_durations)
-                else:
-                    stage_avg_times[stage_key] = 0
-                    stage_min_times[stage_key] = 0
-                    stage_max_times[stage_key] = 0
+        Counts and histograms are summed; per-worker EWMA throughputs are added
+        since workers complete images independently.
+        """
+        tracker = cls()
+        ewma_rate = 0.0
+        for state in states:
+            for attr in ("stage_counts", "stage_entered_counts", "substage_entered_counts", "substage_in_progress_counts"):
+                counts = getattr(tracker, f"_{attr}")
+                for key, value in state[attr].items():
+                    counts[key] = counts.get(key, 0) + value
+            for key, data in state["stage_latency"].items():
+                tracker._stage_latency[key].merge(LatencyHistogram.from_dict(data))
+            for key, data in state["substage_latency"].items():
+                tracker._substage_latency[key].merge(LatencyHistogram.from_dict(data))
+            tracker._image_latency.merge(LatencyHistogram.from_dict(state["image_latency"]))
+            tracker._total_images += state["total_images"]
+            tracker._resumed_images += state["resumed_images"]
+            tracker._time_saved_sec += state["time_saved_sec"]
+
+            # time.monotonic() is system-wide, so completion times compare across processes
+            if state["first_completion"] is not None:
+                if tracker._first_completion is None or state["first_completion"] < tracker._first_completion:
+                    tracker._first_completion = state["first_completion"]
+                if tracker._last_completion is None or state["last_completion"] > tracker._last_completion:
+                    tracker._last_completion = state["last_completion"]
+            if state["ewma_interval"]:
+                ewma_rate += 1.0 / state["ewma_interval"]
+
+        tracker._ewma_interval = 1.0 / ewma_rate if ewma_rate else None
+        tracker._publish()
+        return tracker
+
+    def get_report(self) -> Dict[str, Any]:
+        """Get a JSON-serializable report with full latency summaries per stage."""
+        with self.lock:
+            throughput = self._throughput()
+            return {
+                "totalImages": self._total_images,
+                "completed": self._stage_counts["done"],
+                "failed": self._stage_counts["failed"],
+                "throughput": {
+                    "ewmaImagesPerSec": throughput["ewma"],
+                    "overallImagesPerSec": throughput["overall"],
+                    "ewmaAlpha": self.THROUGHPUT_EWMA_ALPHA,
+                },
+                "checkpointResume": {
+                    "resumedImages": self._resumed_images,
+                    "timeSavedSec": self._time_saved_sec,
+                },
+                "imageLatencyMs": self._image_latency.summary(),
+                "stageLatencyMs": {
+                    key: {**self._stage_latency[key].summary(), "entered": self._stage_entered_counts[key]}
+                    for key in self._main_keys
+                    if key not in ("waiting",) + self.TERMINAL_STAGES
+                },
+                "substageLatencyMs": {
+                    key: {**self._substage_latency[key].summary(), "entered": self._substage_entered_counts[key]}
+                    for key in self._sub_keys
+                },
+            }
 
-            # Calculate substage times
-            substage_avg_times = {}
-            substage_min_times = {}
-            substage_max_times = {}
 
-            for stage_def in self.STAGES:
-                if "parent" not in stage_def:
-                    continue
+def shard_for_path(rel_path: Path, num_shards: int) -> int:
+    """Deterministically assign an image (by path relative to input_dir) to a shard."""
+    digest = hashlib.md5(rel_path.as_posix().encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % num_shards
 
-                substage_key = stage_def["key"]
-                all_durations = []
-                for image_id, substage_dict in self.substage_times.items():
-                    if substage_key in substage_dict and len(substage_dict[substage_key]) >= 2:
-                        duration = (substage_dict[substage_key][1] - substage_dict[substage_key][0]) * 1000
-                        all_durations.append(duration)
-
-                if all_durations:
-                    substage_avg_times[substage_key] = sum(all_durations) / len(all_durations)
-                    substage_min_times[substage_key] = min(all_durations)
-                    substage_max_times[substage_key] = max(all_durations)
-                else:
-                    substage_avg_times[substage_key] = 0
-                    substage_min_times[substage_key] = 0
-                    substage_max_times[substage_key] = 0
-
-            # Cumulative "entered" counts for stages (main) and substages
-            # A stage/substage is considered "entered" if we recorded at least a start time.
-            stage_entered_counts = {s["key"]: 0 for s in self.STAGES if "parent" not in s}
-            for image_id, times_dict in self.stage_times.items():
-                for stage_key, times in times_dict.items():
-                    if stage_key in stage_entered_counts and len(times) >= 1:
-                        stage_entered_counts[stage_key] += 1
-
-            substage_entered_counts = {s["key"]: 0 for s in self.STAGES if "parent" in s}
-            for image_id, sub_dict in self.substage_times.items():
-                for sub_key, times in sub_dict.items():
-                    if sub_key in substage_entered_counts and len(times) >= 1:
-                        substage_entered_counts[sub_key] += 1
-
-            # Substage "in-progress" counts: start recorded, end not yet recorded
-            substage_in_progress_counts = {s["key"]: 0 for s in self.STAGES if "parent" in s}
-            for image_id, sub_dict in self.substage_times.items():
-                for sub_key, times in sub_dict.items():
-                    if sub_key in substage_in_progress_counts and len(times) == 1:
-                        substage_in_progress_counts[sub_key] += 1
-
-            total_images = len(self.current_stages)
-            active_images = total_images - stage_counts.get("done", 0) - stage_counts.get("failed", 0)
 
-            return {
-                "stage_counts": stage_counts,
-                "stage_avg_times": stage_avg_times,
-                "stage_min_times": stage_min_times,
-                "stage_max_times": stage_max_times,
-                "substage_avg_times": substage_avg_times,
-                "substage_min_times": substage_min_times,
-                "substage_max_times": substage_max_times,
-                "stage_entered_counts": stage_entered_counts,
-                "substage_entered_counts": substage_entered_counts,
-                "substage_in_progress_counts": substage_in_progress_counts,
-                "total_images": total_images,
-                "active_images": active_images,
-                "completed": stage_counts.get("done", 0),
-                "failed": stage_counts.get("failed", 0),
-            }
+def _run_shard_worker(
+    generator_kwargs: Dict[str, Any],
+    shard_index: int,
+    image_paths: Optional[List[str]],
+    progress_queue,
+):
+    """Entry point for a shard worker process (see BatchGenerator.process_sharded)."""
+    generator = BatchGenerator(**generator_kwargs)
+    images = [Path(p) for p in image_paths] if image_paths is not None else None
+    asyncio.run(generator.run_shard(shard_index, images, progress_queue))
 
 
 class BatchGenerator:
     """Batch generator for processing multiple widget images in parallel."""
 
+    # Tasks kept alive per concurrency slot by the admission loop in process_batch
+    ADMISSION_FACTOR = 2
+
+    # Seconds between stage-state reports from shard workers to the parent
+    SHARD_PROGRESS_INTERVAL = 1.0
+
     def __init__(
         self,
         input_dir: Path,
@@ -237,6 +508,8 @@ class BatchGenerator:
         model: str = None,
         icon_lib_names: str = '["sf", "lucide"]',
         force: bool = False,
+        workers: int = 1,
+        work_queue: Optional[WorkQueue] = None,
     ):
         self.input_dir = input_dir
         self.output_dir = output_dir
@@ -244,13 +517,20 @@ class BatchGenerator:
         self.config = GeneratorConfig.from_env()
         self.icon_lib_names = icon_lib_names
         self.force = force
+        self.workers = max(1, workers)
+
+        # Shared work queue (multi-host mode): images are claimed under leases instead of scanned
+        self.work_queue = work_queue
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self._leased: Dict[str, WorkItem] = {}
+        self._heartbeat_running = False
 
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
         self.total = 0
         self.completed = 0
         self.failed = 0
-        self.results = []
+        self.failures: List[Tuple[Path, bool, str]] = []
         self.pbar = None
 
         # Stage tracking
@@ -279,6 +559,9 @@ class BatchGenerator:
         table.add_column("Avg Time", justify="right", style="blue", width=12)
         table.add_column("Min Time", justify="right", style="dim", width=12)
         table.add_column("Max Time", justify="right", style="dim", width=12)
+        table.add_column("P50", justify="right", style="blue", width=10)
+        table.add_column("P95", justify="right", style="blue", width=10)
+        table.add_column("P99", justify="right", style="blue", width=10)
 
         stage_counts = stats["stage_counts"]
         stage_avg_times = stats["stage_avg_times"]
@@ -287,6 +570,8 @@ class BatchGenerator:
         substage_avg_times = stats["substage_avg_times"]
         substage_min_times = stats["substage_min_times"]
         substage_max_times = stats["substage_max_times"]
+        stage_percentiles = stats.get("stage_percentiles", {})
+        substage_percentiles = stats.get("substage_percentiles", {})
         stage_entered_counts = stats.get("stage_entered_counts", {})
         substage_entered_counts = stats.get("substage_entered_counts", {})
         substage_in_progress_counts = stats.get("substage_in_progress_counts", {})
@@ -322,16 +607,23 @@ class BatchGenerator:
                 avg_time = substage_avg_times.get(stage_key, 0)
                 min_time = substage_min_times.get(stage_key, 0)
                 max_time = substage_max_times.get(stage_key, 0)
+                percentiles = substage_percentiles.get(stage_key, {})
             elif stage_key in ["waiting", "failed"]:
                 avg_time = min_time = max_time = 0
+                percentiles = {}
             else:
                 avg_time = stage_avg_times.get(stage_key, 0)
                 min_time = stage_min_times.get(stage_key, 0)
                 max_time = stage_max_times.get(stage_key, 0)
+                percentiles = stage_percentiles.get(stage_key, {})
 
             avg_time_str = f"{avg_time:.0f}ms" if avg_time > 0 else "-"
             min_time_str = f"{min_time:.0f}ms" if min_time > 0 else "-"
             max_time_str = f"{max_time:.0f}ms" if max_time > 0 else "-"
+            percentile_strs = [
+                f"{percentiles[p]:.0f}ms" if percentiles.get(p, 0) > 0 else "-"
+                for p in ("p50", "p95", "p99")
+            ]
 
             # Color coding for count
             if is_substage:
@@ -355,7 +647,8 @@ class BatchGenerator:
                 f"{percent:.1f}%",
                 avg_time_str,
                 min_time_str,
-                max_time_str
+                max_time_str,
+                *percentile_strs
             )
 
         # Summary row
@@ -383,6 +676,9 @@ class BatchGenerator:
             "",
             "",
             "",
+            "",
+            "",
+            "",
             ""
         )
 
@@ -393,25 +689,39 @@ class BatchGenerator:
             f"[bold red]Failed:[/bold red] {stats['failed']} | "
             f"[bold yellow]Success Rate:[/bold yellow] {success_rate:.1f}%\n"
             f"[bold]Uptime:[/bold] {elapsed_str} | "
-            f"[bold]ETA:[/bold] {eta_str}"
+            f"[bold]ETA:[/bold] {eta_str} | "
+            f"[bold]Throughput:[/bold] {stats.get('throughput_ewma', 0) * 60:.1f} img/min"
         )
+        if stats.get("resumed_images"):
+            summary_text += (
+                f" | [bold]Resumed:[/bold] {stats['resumed_images']} "
+                f"(saved {stats['time_saved_sec']:.0f}s)"
+            )
         table.caption = summary_text
 
         return table
 
     def find_images_to_process(self) -> List[Path]:
         """Find image files that need processing (skip already completed, clean up failed ones)."""
-        extensions = {'.png', '.jpg', '.jpeg', '.webp', '.bmp'}
-        all_images = []
+        return list(self.iter_images_to_process())
 
-        for ext in extensions:
-            # Recursively search for images in subdirectories
-            all_images.extend(self.input_dir.glob(f'**/*{ext}'))
-            all_images.extend(self.input_dir.glob(f'**/*{ext.upper()}'))
+    IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp', '.bmp'}
 
-        images_to_process = []
+    def discover_images(self) -> List[Path]:
+        """List all input images (recursively), sorted."""
+        return sorted(self.iter_input_images())
 
-        for image_path in sorted(all_images):
+    def iter_input_images(self) -> Iterator[Path]:
+        """Lazily walk input_dir (sorted per directory) and yield image files without building a list."""
+        for dirpath, dirnames, filenames in os.walk(self.input_dir):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if os.path.splitext(filename)[1].lower() in self.IMAGE_EXTENSIONS:
+                    yield Path(dirpath) / filename
+
+    def iter_images_to_process(self) -> Iterator[Path]:
+        """Lazily yield images that need processing, running resume checks one image at a time."""
+        for image_path in self.iter_input_images():
             # Get relative path from input_dir to preserve subdirectory structure
             rel_path = image_path.relative_to(self.input_dir)
             # Create widget_dir preserving subdirectory: output_dir/category/widget_id
@@ -430,6 +740,9 @@ class BatchGenerator:
                 should_clean = widget_dir.exists()
                 if should_clean:
                     log_to_file(f"[Force] {image_path.name} - force reprocessing, cleaning up existing artifacts")
+                # Stage checkpoints from earlier attempts must not be reused either
+                checkpoint_file = self.output_dir / ".checkpoints" / rel_path.parent / f"{image_path.stem}.json"
+                checkpoint_file.unlink(missing_ok=True)
             else:
                 should_process = True
                 should_clean = False
@@ -486,29 +799,33 @@ class BatchGenerator:
                     log_to_file(f"[Warning] Failed to clean up {widget_dir}: {str(e)}")
 
             if should_process:
-                images_to_process.append(image_path)
-
-        return images_to_process
+                yield image_path
 
-    async def generate_single(self, image_path: Path) -> Tuple[Path, bool, str]:
+    async def generate_single(self, image_path: Path, output_root: Optional[Path] = None) -> Tuple[Path, bool, str]:
         """
         Generate widget DSL for a single image with complete debug data and visualizations.
 
         This method is a thin wrapper that preserves subdirectory structure and
         delegates all artifact management to generate_single_widget from single.py.
+
+        Args:
+            image_path: Input image under input_dir
+            output_root: Root to write the widget folder under (default: output_dir)
         """
         widget_id = image_path.stem
+        output_root = output_root or self.output_dir
 
         # Preserve subdirectory structure in output
         rel_path = image_path.relative_to(self.input_dir)
         if rel_path.parent != Path('.'):
             # Image is in a subdirectory - create parent dirs
-            output_parent = self.output_dir / rel_path.parent
+            output_parent = output_root / rel_path.parent
             output_parent.mkdir(parents=True, exist_ok=True)
             effective_output_dir = output_parent
         else:
             # Image is in root input_dir
-            effective_output_dir = self.output_dir
+            output_root.mkdir(parents=True, exist_ok=True)
+            effective_output_dir = output_root
 
         # Call the unified single widget generator
         success, widget_dir, error_msg = await generate_single_widget(
@@ -520,6 +837,8 @@ class BatchGenerator:
             stage_tracker=self.stage_tracker,
             run_log_path=self.output_dir / "run.log",
             integrated_render=False,
+            checkpoint_dir=self.output_dir / ".checkpoints" / rel_path.parent,
+            checkpoint_root=self.output_dir / ".checkpoints",
         )
 
         # Update counters
@@ -536,16 +855,321 @@ class BatchGenerator:
 
         return (image_path, success, error_msg or str(widget_dir))
 
-    async def process_batch(self, images: List[Path]):
-        """Process images with controlled concurrency."""
+    def _write_result(self, summary_file, result: Tuple[Path, bool, str]):
+        """Append one finished image to the streaming results summary."""
+        image_path, success, msg = result
+        summary_file.write(json.dumps({
+            "image": str(image_path),
+            "success": success,
+            "message": msg,
+            "finishedAt": datetime.now().isoformat(),
+        }) + "\n")
+        summary_file.flush()
+
+        if not success:
+            self.failures.append(result)
+
+    async def process_batch(self, images: Iterable[Path], handler=None, max_in_flight: Optional[int] = None):
+        """
+        Process images with controlled concurrency.
+
+        Images are admitted lazily from the iterable so that at most
+        max_in_flight tasks exist at any time, and each result is streamed to
+        results.jsonl as soon as it completes. Memory therefore stays flat
+        regardless of batch size.
+
+        Args:
+            images: Iterable of image paths (consumed lazily)
+            handler: Coroutine function processing one image (default: generate_single)
+            max_in_flight: Admission window (default: concurrency * ADMISSION_FACTOR)
+        """
+        handler = handler or self.generate_single
         semaphore = asyncio.Semaphore(self.concurrency)
+        max_in_flight = max(1, max_in_flight or self.concurrency * self.ADMISSION_FACTOR)
+        image_iter = iter(images)
+        pending = set()
 
         async def process_with_semaphore(image_path: Path):
             async with semaphore:
-                return await self.generate_single(image_path)
+                return await handler(image_path)
+
+        with open(self.output_dir / "results.jsonl", 'a') as summary_file:
+            try:
+                while True:
+                    # Top up the in-flight window from the lazy image iterator
+                    while len(pending) < max_in_flight:
+                        image_path = next(image_iter, None)
+                        if image_path is None:
+                            break
+                        pending.add(asyncio.create_task(process_with_semaphore(image_path)))
+
+                    if not pending:
+                        break
+
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        self._write_result(summary_file, task.result())
+            finally:
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    await asyncio.gather(*pending, return_exceptions=True)
+
+    def enqueue_images(self) -> int:
+        """
+        Register every input image with the work queue (idempotent).
+
+        The destructive resume cleanup of iter_images_to_process is skipped
+        since other hosts may be writing outputs. Without force, images whose
+        output is already committed (e.g. by an earlier plain run) are recorded
+        as done so they are never claimed; with force, finished items are
+        re-queued and their committed output is replaced on commit. Both
+        resets apply once per run, so a host joining a running batch late
+        never re-queues work the other hosts already finished.
+
+        Returns:
+            Number of items pending in the queue
+        """
+        rel_paths = [p.relative_to(self.input_dir) for p in self.discover_images()]
+        committed = [] if self.force else [
+            rel.as_posix() for rel in rel_paths
+            if is_widget_committed(self.output_dir / rel.parent / rel.stem)
+        ]
+        if committed:
+            log_to_file(f"[Queue] {len(committed)} images already have committed output, marked done")
+        return self.work_queue.enqueue(
+            [rel.as_posix() for rel in rel_paths], reset_done=self.force, done_ids=committed
+        )
 
-        tasks = [process_with_semaphore(img) for img in images]
-        self.results = await asyncio.gather(*tasks, return_exceptions=False)
+    def iter_claimed_images(self) -> Iterator[Path]:
+        """
+        Lazily claim images from the work queue, one lease per admitted image, until it drains.
+
+        process_queue admits only as many images as there are concurrency
+        slots, so every lease belongs to an image being generated and a
+        crashed worker strands at most `concurrency` leases.
+        """
+        while True:
+            items = self.work_queue.claim(self.worker_id, limit=1)
+            if not items:
+                return
+            item = items[0]
+            self._leased[item.item_id] = item
+            log_to_file(f"[Queue] {item.item_id} - claimed by {self.worker_id} (attempt {item.attempt})")
+            yield self.input_dir / item.item_id
+
+    async def generate_claimed(self, image_path: Path) -> Tuple[Path, bool, str]:
+        """
+        Generate a claimed image into a private staging folder, then commit it.
+
+        Artifacts are moved into output_dir with an atomic rename that never
+        overwrites a successful result (unless force is set), so duplicate work
+        after a lost lease is harmless. The item is released back to the queue
+        if generation is interrupted before completion.
+        """
+        rel_path = image_path.relative_to(self.input_dir)
+        item = self._leased[rel_path.as_posix()]
+        staging_root = self.output_dir / ".staging" / self.worker_id
+
+        try:
+            _, success, msg = await self.generate_single(image_path, output_root=staging_root)
+
+            staged_dir = staging_root / rel_path.parent / image_path.stem
+            final_dir = self.output_dir / rel_path.parent / image_path.stem
+            outcome = commit_artifacts(staged_dir, final_dir, replace=self.force)
+            if outcome == REPLACED:
+                log_to_file(f"[Queue] {item.item_id} - force reprocessing, replaced previously committed result")
+            elif outcome == KEPT_EXISTING:
+                log_to_file(f"[Queue] {item.item_id} - result already committed by another worker, discarded")
+            elif outcome == NOTHING_STAGED:
+                log_to_file(f"[Queue] {item.item_id} - no artifacts were staged, nothing to commit")
+            elif outcome != COMMITTED:
+                log_to_file(f"[Queue] {item.item_id} - lost commit race with a concurrent worker, discarded")
+            if success:
+                msg = str(final_dir)
+
+            if not self.work_queue.complete(item, success, None if success else msg):
+                log_to_file(f"[Queue] {item.item_id} - lease lost before completion, result not recorded in queue")
+            self._leased.pop(item.item_id, None)
+            return (image_path, success, msg)
+        finally:
+            if self._leased.pop(item.item_id, None) is not None:
+                self.work_queue.release(item)
+
+    async def process_queue(self):
+        """Claim and process images from the shared work queue until no item is pending or leased."""
+        shutil.rmtree(self.output_dir / ".staging" / self.worker_id, ignore_errors=True)
+        interval = max(1.0, self.work_queue.lease_seconds / 3)
+
+        def heartbeat():
+            while self._heartbeat_running:
+                time.sleep(interval)
+                try:
+                    lost = self.work_queue.heartbeat(list(self._leased.values()))
+                except Exception as e:
+                    log_to_file(f"[Queue] Heartbeat failed: {e}")
+                    continue
+                for item_id in lost:
+                    log_to_file(f"[Queue] {item_id} - lease lost (expired and re-queued)")
+
+        self._heartbeat_running = True
+        heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+        heartbeat_thread.start()
+        try:
+            while True:
+                # Claim only when a slot is free, so no lease waits on the semaphore
+                await self.process_batch(self.iter_claimed_images(), handler=self.generate_claimed,
+                                         max_in_flight=self.concurrency)
+                # Leases held elsewhere are re-queued if their owner dies, so wait them out
+                if self.work_queue.stats()["leased"] == 0:
+                    break
+                await asyncio.sleep(interval)
+        finally:
+            self._heartbeat_running = False
+
+    async def _process_images(self, images: Optional[List[Path]]):
+        """Dispatch to the in-process, work-queue or multi-process batch driver."""
+        if self.workers > 1:
+            await self.process_sharded(images)
+        elif self.work_queue is not None:
+            await self.process_queue()
+        else:
+            await self.process_batch(images)
+
+    def _worker_budget(self, shard_index: int, total: int) -> int:
+        """Split a global budget across workers, giving the remainder to the first shards."""
+        return total // self.workers + (1 if shard_index < total % self.workers else 0)
+
+    async def process_sharded(self, images: List[Path]):
+        """
+        Process images across worker processes, one deterministic shard each.
+
+        The resume scan has already run in this process, so workers only see
+        images that need processing and share the same output layout and
+        results.jsonl. Concurrency and the LLM rate limit are split evenly
+        across workers, and per-shard stage statistics are streamed back over
+        a queue and merged into this process's StageTracker for display.
+        """
+        shards: List[Optional[List[str]]]
+        if self.work_queue is not None:
+            # Every worker claims from the shared queue instead of owning a fixed shard
+            shards = [None] * self.workers
+        else:
+            shards = [[] for _ in range(self.workers)]
+            for image_path in images:
+                rel_path = image_path.relative_to(self.input_dir)
+                shards[shard_for_path(rel_path, self.workers)].append(str(image_path))
+
+        ctx = multiprocessing.get_context("spawn")
+        progress_queue = ctx.Queue()
+        processes: Dict[int, multiprocessing.process.BaseProcess] = {}
+
+        # Workers read REQUESTS_PER_MINUTE when their rate limiter is created at import time,
+        # so the split budget has to be in the environment when each process is spawned.
+        rpm = self.config.requests_per_minute
+        saved_rpm = os.environ.get('REQUESTS_PER_MINUTE')
+        try:
+            for shard_index, shard_images in enumerate(shards):
+                if shard_images is not None and not shard_images:
+                    continue
+                worker_rpm = max(1, self._worker_budget(shard_index, rpm)) if rpm > 0 else 0
+                os.environ['REQUESTS_PER_MINUTE'] = str(worker_rpm)
+                worker_kwargs = {
+                    "input_dir": self.input_dir,
+                    "output_dir": self.output_dir,
+                    "concurrency": max(1, self._worker_budget(shard_index, self.concurrency)),
+                    "icon_lib_names": self.icon_lib_names,
+                    "force": self.force,
+                    "work_queue": self.work_queue,
+                }
+                process = ctx.Process(
+                    target=_run_shard_worker,
+                    args=(worker_kwargs, shard_index, shard_images, progress_queue),
+                    name=f"widget-batch-shard-{shard_index}",
+                )
+                process.start()
+                processes[shard_index] = process
+                shard_size = len(shard_images) if shard_images is not None else "queue"
+                log_to_file(f"[Shard {shard_index}] started pid={process.pid} images={shard_size}")
+        finally:
+            if saved_rpm is None:
+                os.environ.pop('REQUESTS_PER_MINUTE', None)
+            else:
+                os.environ['REQUESTS_PER_MINUTE'] = saved_rpm
+
+        shard_states: Dict[int, Dict[str, Any]] = {}
+        remaining = set(processes)
+
+        def next_message():
+            try:
+                return progress_queue.get(timeout=1)
+            except queue.Empty:
+                return None
+
+        while remaining:
+            message = await asyncio.to_thread(next_message)
+
+            if message is None:
+                # Detect workers that died without reporting (e.g. OOM kill)
+                for shard_index in list(remaining):
+                    process = processes[shard_index]
+                    if not process.is_alive() and progress_queue.empty():
+                        remaining.discard(shard_index)
+                        last_counts = shard_states.get(shard_index, {}).get("stage_counts", {})
+                        finished = last_counts.get("done", 0) + last_counts.get("failed", 0)
+                        # Queue-mode leases of a dead worker expire and are re-claimed, so nothing is lost
+                        lost = len(shards[shard_index]) - finished if shards[shard_index] is not None else 0
+                        self.completed += last_counts.get("done", 0)
+                        self.failed += last_counts.get("failed", 0) + lost
+                        log_to_console(
+                            f"[Shard {shard_index}] worker exited with code {process.exitcode}, "
+                            f"{lost} image(s) unaccounted for", Colors.BRIGHT_RED
+                        )
+                continue
+
+            kind, shard_index, state = message[:3]
+            shard_states[shard_index] = state
+            self.stage_tracker = StageTracker.from_states(list(shard_states.values()))
+
+            if kind == "done":
+                remaining.discard(shard_index)
+                failures = message[3]
+                self.failures.extend((Path(path), False, msg) for path, msg in failures)
+                self.completed += state["stage_counts"].get("done", 0)
+                self.failed += len(failures)
+
+            if self.pbar:
+                stats = self.stage_tracker.get_stats()
+                self.pbar.n = stats["completed"] + stats["failed"]
+                self.pbar.refresh()
+
+        for process in processes.values():
+            process.join()
+
+    async def run_shard(self, shard_index: int, images: Optional[List[Path]], progress_queue):
+        """Worker-side execution for one shard: process images and stream stage state to the parent."""
+        setup_logger(self.output_dir / "run.log")
+        self.show_stage_table = False
+
+        def report_progress():
+            while self.display_running:
+                progress_queue.put(("progress", shard_index, self.stage_tracker.export_state()))
+                time.sleep(self.SHARD_PROGRESS_INTERVAL)
+
+        self.display_running = True
+        self.display_thread = threading.Thread(target=report_progress, daemon=True)
+        self.display_thread.start()
+
+        try:
+            if images is None:
+                await self.process_queue()
+            else:
+                await self.process_batch(images)
+        finally:
+            self.display_running = False
+            self.display_thread.join(timeout=self.SHARD_PROGRESS_INTERVAL + 1)
+            failures = [(str(path), msg) for path, _, msg in self.failures]
+            progress_queue.put(("done", shard_index, self.stage_tracker.export_state(), failures))
 
     async def run(self):
         """Main execution flow."""
@@ -600,6 +1224,8 @@ class BatchGenerator:
             },
             "processingSettings": {
                 "concurrency": self.concurrency,
+                "workers": self.workers,
+                "workQueue": type(self.work_queue).__name__ if self.work_queue is not None else None,
                 "maxFileSizeMB": self.config.max_file_size_mb
             }
         }
@@ -650,6 +1276,8 @@ class BatchGenerator:
         log_to_console("")
         log_to_console("Processing Settings:", Colors.BRIGHT_YELLOW)
         log_to_console(f"  Concurrency: {self.concurrency}", Colors.BRIGHT_GREEN)
+        if self.workers > 1:
+            log_to_console(f"  Workers: {self.workers} (concurrency and rate limit split per worker)", Colors.BRIGHT_GREEN)
         log_to_console(f"  Max File Size: {self.config.max_file_size_mb}MB")
         log_to_console("")
 
@@ -660,14 +1288,26 @@ class BatchGenerator:
             log_to_console("Error: DEFAULT_API_KEY not found in .env", Colors.BRIGHT_RED)
             raise ValueError("API key not found")
 
-        images = self.find_images_to_process()
-        self.total = len(images)
+        if self.work_queue is not None:
+            # Multi-host mode: register every input image (idempotent) and claim work lazily
+            images = None
+            self.total = self.enqueue_images()
+            log_to_console(f"Work queue: {self.work_queue.stats()}", Colors.DIM)
+        else:
+            # Resume checks run lazily as images are admitted; peek once to detect an empty batch
+            images = self.iter_images_to_process()
+            first_image = next(images, None)
+            images = itertools.chain([first_image], images) if first_image is not None else iter(())
+            self.total = 0 if first_image is None else None
 
         if self.total == 0:
             log_to_console("No images to process", Colors.YELLOW)
             return
 
-        log_to_console(f"Processing {self.total} images", Colors.BRIGHT_GREEN)
+        if self.total is None:
+            log_to_console("Processing images (already generated ones are skipped as they are reached)", Colors.BRIGHT_GREEN)
+        else:
+            log_to_console(f"Processing {self.total} images", Colors.BRIGHT_GREEN)
         log_to_console("")
 
         self.start_time = time.time()
@@ -695,7 +1335,7 @@ class BatchGenerator:
                 self.display_thread.start()
 
                 try:
-                    await self.process_batch(images)
+                    await self._process_images(images)
                 finally:
                     self.display_running = False
                     if self.display_thread:
@@ -711,13 +1351,16 @@ class BatchGenerator:
             )
 
             try:
-                await self.process_batch(images)
+                await self._process_images(images)
             finally:
                 if self.pbar:
                     self.pbar.close()
 
         end_time = datetime.now()
         duration = (end_time - start_time).total_seconds()
+        if self.total is None:
+            # Lazily scanned batch: the total is only known once it has drained
+            self.total = self.completed + self.failed
 
         # Log final summary (show in console)
         log_to_console("")
@@ -730,6 +1373,17 @@ class BatchGenerator:
         log_to_console(f"Results: {self.completed}/{self.total} succeeded, {self.failed} failed", success_color)
         log_to_console(separator(), Colors.CYAN)
 
+        # Save final stage statistics report
+        stats_report = {
+            "widgetFactoryVersion": WIDGET_FACTORY_VERSION,
+            "startTime": start_time.isoformat(),
+            "endTime": end_time.isoformat(),
+            "durationSec": duration,
+            **self.stage_tracker.get_report(),
+        }
+        with open(self.output_dir / "stage_stats.json", 'w') as f:
+            json.dump(stats_report, f, indent=2)
+
         # Write run end marker to log file
         log_to_file("=" * 80)
         log_to_file(f"RUN END: {end_time.isoformat()}")
@@ -740,9 +1394,8 @@ class BatchGenerator:
         if self.failed > 0:
             log_to_console("")
             log_to_console("Failed images:", Colors.BRIGHT_RED)
-            for image_path, success, msg in self.results:
-                if not success:
-                    log_to_console(f"  • {image_path.name} - {msg}", Colors.RED)
+            for image_path, success, msg in self.failures:
+                log_to_console(f"  • {image_path.name} - {msg}", Colors.RED)
 
 
 async def batch_generate(
@@ -753,6 +1406,9 @@ async def batch_generate(
     model: str = None,
     icon_lib_names: str = '["sf", "lucide"]',
     force: bool = False,
+    workers: int = 1,
+    queue_path: Optional[str] = None,
+    lease_seconds: float = 300.0,
 ):
     """
     Batch generate WidgetDSL from multiple images.
@@ -765,6 +1421,10 @@ async def batch_generate(
         model: Model name (ignored, uses DEFAULT_MODEL from .env)
         icon_lib_names: Icon libraries as JSON array string (default: '["sf", "lucide"]')
         force: Force reprocess all images, even if already generated (default: False)
+        workers: Number of worker processes; images are sharded deterministically across them (default: 1)
+        queue_path: Optional SQLite work-queue path on a shared filesystem; hosts pointing at the
+            same queue split the batch between them via leases (default: None)
+        lease_seconds: Work-queue lease duration before an unrenewed item is re-queued (default: 300)
     """
     generator = BatchGenerator(
         input_dir=Path(input_dir),
@@ -774,6 +1434,8 @@ async def batch_generate(
         model=model,
         icon_lib_names=icon_lib_names,
         force=force,
+        workers=workers,
+        work_queue=SQLiteWorkQueue(queue_path, lease_seconds=lease_seconds) if queue_path else None,
     )
 
     await generator.run()
@@ -33,6 +33,7 @@ from ...utils import (
 )
 from ...utils.logger import log_to_file
 from ...utils.artifact_manager import ArtifactManager
+from ...utils.stage_checkpoint import StageCheckpoint
 from ...perception import (
     preprocess_image_for_widget,
     run_icon_detection_pipeline,
@@ -181,12 +182,14 @@ async def generate_widget_full(
     image_id: str = None,
     artifact_mgr: 'ArtifactManager' = None,
     incremental_save: bool = False,
+    checkpoint: 'StageCheckpoint' = None,
 ):
     from pathlib import Path
     from datetime import datetime
     from ...utils.logger import log_to_file
     import tempfile
     import asyncio
+    import time
 
     if image_id is None:
         image_id = Path(image_filename).stem if image_filename else "unknown"
@@ -239,6 +242,14 @@ async def generate_widget_full(
             img_width = width
             img_height = height
 
+            # Resume from a previous attempt's checkpointed layout if available
+            cached_layout = checkpoint.get("layout") if checkpoint is not None else None
+            if cached_layout is not None:
+                attempts = 0
+                layout_raw, layout_pixel, layout_post, img_width, img_height, layout_raw_text = cached_layout
+                log_to_file(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [{image_id}] [Checkpoint] Layout restored from previous attempt")
+            layout_start = time.time()
+
             for attempt in range(attempts):
                 layout_raw, layout_pixel, layout_post, img_width, img_height, layout_raw_text = await asyncio.wait_for(
                     detect_layout(
@@ -267,6 +278,13 @@ async def generate_widget_full(
 
             log_to_file(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [{image_id}] Layout detection completed: {len(layout_post)} elements")
 
+            if checkpoint is not None and cached_layout is None and (layout_raw or layout_post):
+                checkpoint.save(
+                    "layout",
+                    [layout_raw, layout_pixel, layout_post, img_width, img_height, layout_raw_text],
+                    time.time() - layout_start,
+                )
+
             # Incremental save: layout artifacts and icon crops (based on layout)
             if incremental_save and artifact_mgr is not None:
                 try:
@@ -293,7 +311,6 @@ async def generate_widget_full(
             layout_raw_text = ""
 
         # ========== Icon & Graph Extraction (Parallel) ==========
-        import time
         parallel_start = time.time()
 
         # Parse icon library names from JSON array, e.g., '["sf", "lucide"]'
@@ -316,11 +333,73 @@ async def generate_widget_full(
             except json.JSONDecodeError:
                 pass
 
-        # Wrapper functions to track substage timing
-        async def track_icon_substage():
+        # Sub-stages that hit their own deadline: {name: reason}
+        perception_degraded = {}
+
+        async def run_perception_substage(name, make_coro, deadline, fallback, is_complete):
+            """
+            Run one perception sub-stage under its own deadline.
+
+            Outputs for which is_complete(result) holds are checkpointed and reused
+            by a later attempt. The pipelines swallow their own errors (e.g. a
+            captioning backend that is down) and return empty candidates, so such
+            results are used for this attempt only and retried on the next. On
+            timeout the sub-stage degrades to `fallback` (an empty result) so the
+            widget is still generated without it.
+            """
+            substage = f"perception.{name}"
+            if checkpoint is not None:
+                cached = checkpoint.get(substage)
+                if cached is not None:
+                    log_to_file(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [{image_id}] [Checkpoint] {name} restored from previous attempt")
+                    return cached
+
             if stage_tracker:
-                stage_tracker.set_substage(image_id, "perception.icon", is_start=True)
-            result = await run_icon_detection_pipeline(
+                stage_tracker.set_substage(image_id, substage, is_start=True)
+            substage_start = time.time()
+            try:
+                result = await asyncio.wait_for(make_coro(), timeout=deadline)
+            except asyncio.TimeoutError:
+                if not config.degrade_perception_on_timeout:
+                    raise
+                perception_degraded[name] = f"timeout after {deadline}s"
+                log_to_file(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [{image_id}] [Perception:{name}] Warning: timed out after {deadline}s, continuing without {name} results")
+                return fallback
+            finally:
+                if stage_tracker:
+                    stage_tracker.set_substage(image_id, substage, is_start=False)
+
+            if checkpoint is not None:
+                if is_complete(result):
+                    checkpoint.save(substage, result, time.time() - substage_start)
+                else:
+                    log_to_file(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [{image_id}] [Checkpoint] {name} result incomplete, not checkpointed")
+            return result
+
+        # A sub-stage succeeded unless it found targets but produced nothing for them
+        def icon_complete(result):
+            return not (result["icon_count"] > 0 and not result["icon_candidates"])
+
+        def applogo_complete(result):
+            return not (result["applogo_count"] > 0 and not result["applogo_candidates"])
+
+        def graph_complete(result):
+            chart_counts, graph_specs = result
+            return not (sum(chart_counts.values()) > 0 and not graph_specs)
+
+        empty_icon_result = {
+            "per_icon_details": [],
+            "icon_candidates": [],
+            "icon_count": 0
+        }
+        empty_applogo_result = {
+            "per_applogo_details": [],
+            "applogo_candidates": [],
+            "applogo_count": 0
+        }
+
+        async def track_icon_substage():
+            return await run_icon_detection_pipeline(
                 image_bytes=image_bytes,
                 filename=image_filename,
                 model=config.default_model,
@@ -334,15 +413,10 @@ async def generate_widget_full(
                 lib_names=lib_names,
                 timeout=config.get_icon_retrieval_timeout(),
             )
-            if stage_tracker:
-                stage_tracker.set_substage(image_id, "perception.icon", is_start=False)
-            return result
 
         async def track_applogo_substage():
-            if stage_tracker:
-                stage_tracker.set_substage(image_id, "perception.applogo", is_start=True)
             from ...perception.applogo_extraction import run_applogo_detection_pipeline
-            result = await run_applogo_detection_pipeline(
+            return await run_applogo_detection_pipeline(
                 image_bytes=image_bytes,
                 filename=image_filename,
                 model=config.default_model,
@@ -356,14 +430,9 @@ async def generate_widget_full(
                 lib_names=applogo_lib_names_parsed,
                 timeout=config.get_icon_retrieval_timeout(),  # Use same timeout as icon
             )
-            if stage_tracker:
-                stage_tracker.set_substage(image_id, "perception.applogo", is_start=False)
-            return result
 
         async def track_graph_substage():
-            if stage_tracker:
-                stage_tracker.set_substage(image_id, "perception.graph", is_start=True)
-            result = await detect_and_process_graphs_from_layout(
+            return await detect_and_process_graphs_from_layout(
                 image_bytes=image_bytes,
                 filename=image_filename,
                 layout_detections=layout_post,
@@ -374,9 +443,6 @@ async def generate_widget_full(
                 graph_gen_thinking=config.get_graph_gen_thinking(),
                 graph_gen_max_tokens=config.get_graph_gen_max_tokens(),
             )
-            if stage_tracker:
-                stage_tracker.set_substage(image_id, "perception.graph", is_start=False)
-            return result
 
         # Determine which pipelines to run
         # Icon depends on layout (needs layout_detections to filter icons)
@@ -391,7 +457,10 @@ async def generate_widget_full(
         task_names = []
 
         if run_icon:
-            tasks.append(track_icon_substage())
+            tasks.append(run_perception_substage(
+                "icon", track_icon_substage, config.get_icon_retrieval_timeout(), empty_icon_result,
+                icon_complete,
+            ))
             task_names.append("icon")
         elif not enable_icon:
             log_to_file(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [{image_id}] ⊘ SKIPPED: Icon detection (disabled in config)")
@@ -399,7 +468,10 @@ async def generate_widget_full(
             log_to_file(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [{image_id}] ⊘ SKIPPED: Icon detection (layout disabled)")
 
         if run_applogo:
-            tasks.append(track_applogo_substage())
+            tasks.append(run_perception_substage(
+                "applogo", track_applogo_substage, config.get_icon_retrieval_timeout(), empty_applogo_result,
+                applogo_complete,
+            ))
             task_names.append("applogo")
         elif not enable_applogo:
             log_to_file(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [{image_id}] ⊘ SKIPPED: AppLogo detection (disabled in config)")
@@ -407,7 +479,10 @@ async def generate_widget_full(
             log_to_file(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [{image_id}] ⊘ SKIPPED: AppLogo detection (layout disabled)")
 
         if run_graph:
-            tasks.append(track_graph_substage())
+            tasks.append(run_perception_substage(
+                "graph", track_graph_substage, config.get_graph_gen_timeout(), ({}, []),
+                graph_complete,
+            ))
             task_names.append("graph")
         elif not enable_graph:
             log_to_file(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [{image_id}] ⊘ SKIPPED: Graph detection (disabled in config)")
@@ -422,14 +497,14 @@ async def generate_widget_full(
 
             log_to_file(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [{image_id}] [Perception:Parallel] Started ({', '.join(task_names)})")
 
-            # Use the maximum of icon and graph timeouts for parallel execution
-            # Note: graph now only uses graph_gen_timeout (no separate detection phase)
-            parallel_timeout = max(config.get_icon_retrieval_timeout(), config.get_graph_gen_timeout())
-
-            results = await asyncio.wait_for(
-                asyncio.gather(*tasks),
-                timeout=parallel_timeout
-            )
+            # Each sub-stage is bounded by its own deadline; if one raises, cancel its
+            # siblings instead of leaving them running detached
+            gathered = asyncio.gather(*tasks)
+            try:
+                results = await gathered
+            except BaseException:
+                gathered.cancel()
+                raise
 
             # Parse results based on which tasks ran
             result_idx = 0
@@ -438,22 +513,14 @@ async def generate_widget_full(
                 result_idx += 1
             else:
                 # Default empty icon result
-                icon_result = {
-                    "per_icon_details": [],
-                    "icon_candidates": [],
-                    "icon_count": 0
-                }
+                icon_result = empty_icon_result
 
             if run_applogo:
                 applogo_result = results[result_idx]
                 result_idx += 1
             else:
                 # Default empty applogo result
-                applogo_result = {
-                    "per_applogo_details": [],
-                    "applogo_candidates": [],
-                    "applogo_count": 0
-                }
+                applogo_result = empty_applogo_result
 
             if run_graph:
                 chart_counts, graph_specs = results[result_idx]
@@ -470,16 +537,8 @@ async def generate_widget_full(
         else:
             # No perception tasks enabled
             log_to_file(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [{image_id}] [Perception:Parallel] No tasks to run")
-            icon_result = {
-                "per_icon_details": [],
-                "icon_candidates": [],
-                "icon_count": 0
-            }
-            applogo_result = {
-                "per_applogo_details": [],
-                "applogo_candidates": [],
-                "applogo_count": 0
-            }
+            icon_result = empty_icon_result
+            applogo_result = empty_applogo_result
             chart_counts = {}
             graph_specs = []
 
@@ -668,7 +727,6 @@ async def generate_widget_full(
 
         log_to_file(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [{image_id}] [DSL Generation] VLM API call started (model={config.get_dsl_gen_model()}, thinking={config.get_dsl_gen_thinking()})")
 
-        import time
         dsl_start = time.time()
         response = await asyncio.wait_for(
             vision_llm.async_chat(messages),
@@ -781,6 +839,10 @@ async def generate_widget_full(
                     "fullGraphPrompt": inject_graph_specs_to_prompt("", graph_specs) if graph_specs else "",
                 }
             },
+            "recoveryDebugInfo": {
+                "degradedStages": perception_degraded,
+                "checkpoint": checkpoint.summary() if checkpoint is not None else None,
+            },
             "promptDebugInfo": {
                 "stage1_base": base_prompt,
                 "stage2_withLayout": prompt_with_layout,      # NEW
@@ -808,6 +870,27 @@ async def generate_widget_full(
             except:
                 pass
 
+def stage_checkpoint_fingerprint(
+    config: GeneratorConfig,
+    icon_lib_names: str,
+    applogo_lib_names: Optional[str],
+) -> Dict[str, Any]:
+    """Config values that change layout/perception outputs; a checkpoint is only reused if they match."""
+    return {
+        "layoutModel": config.get_layout_model(),
+        "graphGenModel": config.get_graph_gen_model(),
+        "defaultModel": config.default_model,
+        "iconLibs": icon_lib_names,
+        "applogoLibs": applogo_lib_names,
+        "retrieval": [config.retrieval_topk, config.retrieval_topm, config.retrieval_alpha],
+        "pipelines": [
+            config.enable_layout_pipeline,
+            config.enable_icon_pipeline,
+            config.enable_graph_pipeline,
+        ],
+    }
+
+
 async def generate_single_widget(
     image_path: Path | str,
     output_dir: Path | str,
@@ -818,6 +901,8 @@ async def generate_single_widget(
     run_log_path: Optional[Path] = None,
     integrated_render: bool = False,
     incremental_save: bool = True,
+    checkpoint_dir: Optional[Path] = None,
+    checkpoint_root: Optional[Path] = None,
 ) -> Tuple[bool, Optional[Path], Optional[str]]:
     """
     Generate a single widget with complete artifacts and debug information.
@@ -832,6 +917,10 @@ async def generate_single_widget(
         icon_lib_names: Icon library names as JSON array string
         stage_tracker: Optional stage tracker for batch processing
         run_log_path: Optional path to global run.log for log extraction
+        checkpoint_dir: Where stage checkpoints live between attempts
+            (default: output_dir/.checkpoints; ignored if ENABLE_STAGE_CHECKPOINTS is off)
+        checkpoint_root: Top of the checkpoint directory tree, removed with its empty
+            subdirectories once no checkpoint is left (default: the checkpoint directory)
 
     Returns:
         Tuple of (success: bool, widget_dir: Path, error_msg: str)
@@ -873,6 +962,7 @@ async def generate_single_widget(
         stage_tracker.set_stage(widget_id, "preprocessing")
 
     start_time = datetime.now()
+    checkpoint = None
 
     try:
         log_to_file(f"[{start_time.strftime('%Y-%m-%d %H:%M:%S')}] [{widget_id}] 🚀 START")
@@ -881,6 +971,17 @@ async def generate_single_widget(
         with open(image_path, 'rb') as f:
             image_data = f.read()
 
+        # Load stage checkpoints left by a previous failed attempt (kept outside widget_dir,
+        # which batch resume cleans up before retrying)
+        if config.enable_stage_checkpoints:
+            checkpoint_dir = Path(checkpoint_dir or output_dir / ".checkpoints")
+            checkpoint = StageCheckpoint(
+                checkpoint_dir / f"{widget_id}.json",
+                image_data,
+                stage_checkpoint_fingerprint(config, icon_lib_names, applogo_lib_names),
+                root=checkpoint_root or checkpoint_dir,
+            )
+
         # Get image size and dimensions
         image_size = image_path.stat().st_size
         try:
@@ -909,8 +1010,17 @@ async def generate_single_widget(
             image_id=widget_id,
             artifact_mgr=artifact_mgr,
             incremental_save=incremental_save,
+            checkpoint=checkpoint,
         )
 
+        if checkpoint is not None and checkpoint.resumed:
+            log_to_file(
+                f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [{widget_id}] [Checkpoint] Resumed "
+                f"{', '.join(checkpoint.resumed)} - saved {checkpoint.time_saved:.1f}s"
+            )
+            if stage_tracker and hasattr(stage_tracker, "record_time_saved"):
+                stage_tracker.record_time_saved(checkpoint.time_saved)
+
         # Check if generation was successful
         if not result.get('success', True):
             error_msg = result.get('error', 'Unknown error')
@@ -984,6 +1094,10 @@ async def generate_single_widget(
         if run_log_path:
             artifact_mgr.save_widget_log(run_log_path)
 
+        # Completed: checkpoints are no longer needed
+        if checkpoint is not None:
+            checkpoint.clear()
+
         # Mark as done in stage tracker (only when not using integrated rendering)
         if stage_tracker and not integrated_render:
             stage_tracker.set_stage(widget_id, "done")
@@ -1012,6 +1126,12 @@ async def generate_single_widget(
         )
         artifact_mgr.save_debug_json(debug_data)
 
+        if checkpoint is not None and checkpoint.stages:
+            log_to_file(
+                f"[{end_time.strftime('%Y-%m-%d %H:%M:%S')}] [{widget_id}] [Checkpoint] Kept "
+                f"{', '.join(sorted(checkpoint.stages))} for retry"
+            )
+
         # Mark as failed in stage tracker
         if stage_tracker:
             stage_tracker.set_stage(widget_id, "failed")
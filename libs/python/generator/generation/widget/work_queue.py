@@ -0,0 +1,389 @@
+# -----------------------------------------------------------------------------
+# File: work_queue.py
+# Description: Lease-based work queues for distributing batch generation
+#              across processes and hosts that share a filesystem
+# -----------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+
+@dataclass(frozen=True)
+class WorkItem:
+    """A leased unit of work. The lease token fences out stale owners."""
+    item_id: str
+    lease_token: str
+    attempt: int
+
+
+class WorkQueue(ABC):
+    """
+    Interface for work-claiming backends used by BatchGenerator.
+
+    Items are identified by the image path relative to the batch input
+    directory. Workers claim items under a time-limited lease, renew it with
+    heartbeat(), and finish it with complete(). Leases that are not renewed
+    expire and their items become claimable again, so a crashed worker never
+    strands work.
+    """
+
+    # Lease duration in seconds; BatchGenerator heartbeats every third of it
+    lease_seconds: float = 300.0
+
+    @abstractmethod
+    def enqueue(self, item_ids: Iterable[str], reset_done: bool = False, done_ids: Iterable[str] = ()) -> int:
+        """
+        Add items to the queue (idempotent).
+
+        Every host calls this on startup, so resets apply once per run: the
+        first call after the queue has drained (no item pending or leased)
+        starts a new run and resets failed items to pending, so re-running a
+        batch retries them, matching the resume semantics of a plain batch
+        run. With reset_done, finished items are re-queued as well, again once
+        per run: later forced calls leave items finished in the run alone.
+        Items in done_ids (e.g. whose output was already committed by an
+        earlier run) are recorded as done unless currently leased or the run
+        is forced, so they are never claimed.
+
+        Returns:
+            Number of items now pending
+        """
+
+    @abstractmethod
+    def claim(self, owner: str, limit: int = 1) -> List[WorkItem]:
+        """Lease up to `limit` pending items to `owner`."""
+
+    @abstractmethod
+    def heartbeat(self, items: Iterable[WorkItem]) -> List[str]:
+        """
+        Extend the leases of items still held.
+
+        Returns:
+            IDs of items whose lease was lost (expired and re-claimed)
+        """
+
+    @abstractmethod
+    def complete(self, item: WorkItem, success: bool, message: Optional[str] = None) -> bool:
+        """
+        Mark a leased item done or failed.
+
+        Returns:
+            False if the lease was no longer held, in which case the result is ignored
+        """
+
+    @abstractmethod
+    def release(self, item: WorkItem) -> None:
+        """Return a leased item to the queue without counting the attempt."""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """Item counts by status."""
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    Work queue stored in a SQLite database on a shared filesystem.
+
+    Every mutation runs in a BEGIN IMMEDIATE transaction, additionally
+    serialized by an flock on a sibling ".lock" file because SQLite's own
+    byte-range locks are unreliable on some network filesystems. The default
+    rollback journal is kept (WAL requires shared memory and does not work
+    across hosts). Lease expiry uses wall-clock time, so hosts must have
+    reasonably synchronized clocks (well within lease_seconds).
+
+    Example:
+        >>> queue = SQLiteWorkQueue("/shared/run/queue.sqlite")
+        >>> queue.enqueue(["a.png", "sub/b.png"])
+        >>> for item in queue.claim("host-1234"):
+        ...     queue.complete(item, success=True)
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS items (
+            item_id TEXT PRIMARY KEY,
+            status TEXT NOT NULL DEFAULT 'pending',
+            owner TEXT,
+            lease_token TEXT,
+            lease_expires REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            message TEXT,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_items_status ON items (status, item_id);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value REAL NOT NULL
+        );
+    """
+
+    def __init__(self, db_path: Path | str, lease_seconds: float = 300.0, max_attempts: int = 3):
+        """
+        Args:
+            db_path: Path to the SQLite database (created if missing)
+            lease_seconds: Lease duration; workers should heartbeat well within it
+            max_attempts: Claims allowed before an item whose leases keep expiring is marked failed
+        """
+        if lease_seconds <= 0:
+            raise ValueError(f"lease_seconds must be positive, got {lease_seconds}")
+        if max_attempts < 1:
+            raise ValueError(f"max_attempts must be >= 1, got {max_attempts}")
+
+        self.db_path = Path(db_path)
+        self.lock_path = self.db_path.with_name(self.db_path.name + ".lock")
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._file_lock():
+            conn = sqlite3.connect(self.db_path, timeout=60)
+            try:
+                conn.executescript(self.SCHEMA)
+            finally:
+                conn.close()
+
+    def __getstate__(self):
+        # Only configuration is pickled; connections are opened per operation
+        return {
+            "db_path": self.db_path,
+            "lock_path": self.lock_path,
+            "lease_seconds": self.lease_seconds,
+            "max_attempts": self.max_attempts,
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    @contextmanager
+    def _file_lock(self):
+        """Hold an exclusive flock on the sibling lock file for the block."""
+        with open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _transaction(self):
+        """Open a connection and hold an exclusive write transaction for the block."""
+        with self._file_lock():
+            conn = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    yield conn
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+            finally:
+                conn.close()
+
+    def _requeue_expired(self, conn: sqlite3.Connection, now: float) -> None:
+        """Return items with expired leases to pending (or failed after max_attempts)."""
+        conn.execute(
+            """
+            UPDATE items
+            SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                message = CASE WHEN attempts >= ? THEN 'lease expired after max attempts' ELSE message END,
+                owner = NULL, lease_token = NULL, lease_expires = NULL, updated_at = ?
+            WHERE status = 'leased' AND lease_expires < ?
+            """,
+            (self.max_attempts, self.max_attempts, now, now),
+        )
+
+    def enqueue(self, item_ids: Iterable[str], reset_done: bool = False, done_ids: Iterable[str] = ()) -> int:
+        now = time.time()
+        with self._transaction() as conn:
+            self._requeue_expired(conn, now)
+            outstanding = conn.execute(
+                "SELECT COUNT(*) FROM items WHERE status IN ('pending', 'leased')"
+            ).fetchone()[0]
+            if outstanding == 0:
+                # The previous run drained: this call starts a new run and retries its failures
+                conn.execute("DELETE FROM meta WHERE key = 'forced_at'")
+                conn.execute(
+                    "UPDATE items SET status = 'pending', attempts = 0, message = NULL, updated_at = ? "
+                    "WHERE status = 'failed'",
+                    (now,),
+                )
+            forced = conn.execute("SELECT 1 FROM meta WHERE key = 'forced_at'").fetchone() is not None
+            if reset_done and not forced:
+                # Only the first forced call of a run re-queues finished items; later hosts join it
+                conn.execute("INSERT INTO meta (key, value) VALUES ('forced_at', ?)", (now,))
+                conn.execute(
+                    "UPDATE items SET status = 'pending', attempts = 0, message = NULL, updated_at = ? "
+                    "WHERE status IN ('failed', 'done')",
+                    (now,),
+                )
+                forced = True
+            conn.executemany(
+                "INSERT OR IGNORE INTO items (item_id, status, updated_at) VALUES (?, 'pending', ?)",
+                ((item_id, now) for item_id in item_ids),
+            )
+            if not forced:
+                conn.executemany(
+                    "INSERT INTO items (item_id, status, message, updated_at) VALUES (?, 'done', 'already committed', ?) "
+                    "ON CONFLICT (item_id) DO UPDATE SET status = 'done', message = excluded.message, "
+                    "updated_at = excluded.updated_at WHERE status = 'pending'",
+                    ((item_id, now) for item_id in done_ids),
+                )
+            return conn.execute("SELECT COUNT(*) FROM items WHERE status = 'pending'").fetchone()[0]
+
+    def claim(self, owner: str, limit: int = 1) -> List[WorkItem]:
+        now = time.time()
+        claimed = []
+        with self._transaction() as conn:
+            self._requeue_expired(conn, now)
+            rows = conn.execute(
+                "SELECT item_id, attempts FROM items WHERE status = 'pending' ORDER BY item_id LIMIT ?",
+                (limit,),
+            ).fetchall()
+            for item_id, attempts in rows:
+                token = uuid.uuid4().hex
+                conn.execute(
+                    """
+                    UPDATE items
+                    SET status = 'leased', owner = ?, lease_token = ?, lease_expires = ?,
+                        attempts = attempts + 1, updated_at = ?
+                    WHERE item_id = ?
+                    """,
+                    (owner, token, now + self.lease_seconds, now, item_id),
+                )
+                claimed.append(WorkItem(item_id=item_id, lease_token=token, attempt=attempts + 1))
+        return claimed
+
+    def heartbeat(self, items: Iterable[WorkItem]) -> List[str]:
+        now = time.time()
+        lost = []
+        with self._transaction() as conn:
+            for item in items:
+                cursor = conn.execute(
+                    "UPDATE items SET lease_expires = ?, updated_at = ? "
+                    "WHERE item_id = ? AND lease_token = ? AND status = 'leased'",
+                    (now + self.lease_seconds, now, item.item_id, item.lease_token),
+                )
+                if cursor.rowcount == 0:
+                    lost.append(item.item_id)
+        return lost
+
+    def complete(self, item: WorkItem, success: bool, message: Optional[str] = None) -> bool:
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE items
+                SET status = ?, message = ?, owner = NULL, lease_token = NULL, lease_expires = NULL, updated_at = ?
+                WHERE item_id = ? AND lease_token = ?
+                """,
+                ("done" if success else "failed", message, now, item.item_id, item.lease_token),
+            )
+            return cursor.rowcount == 1
+
+    def release(self, item: WorkItem) -> None:
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                UPDATE items
+                SET status = 'pending', attempts = MAX(attempts - 1, 0),
+                    owner = NULL, lease_token = NULL, lease_expires = NULL, updated_at = ?
+                WHERE item_id = ? AND lease_token = ?
+                """,
+                (now, item.item_id, item.lease_token),
+            )
+
+    def stats(self) -> Dict[str, int]:
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        with self._transaction() as conn:
+            self._requeue_expired(conn, time.time())
+            for status, count in conn.execute("SELECT status, COUNT(*) FROM items GROUP BY status"):
+                counts[status] = count
+        return counts
+
+
+def is_widget_committed(widget_dir: Path) -> bool:
+    """Check whether a widget directory holds a successful, complete generation."""
+    debug_file = widget_dir / "log" / "debug.json"
+    dsl_file = widget_dir / "artifacts" / "4-dsl" / "widget.json"
+    try:
+        with open(debug_file, 'r') as f:
+            status = json.load(f).get('execution', {}).get('status', '')
+        return status == 'success' and dsl_file.exists() and dsl_file.stat().st_size > 0
+    except Exception:
+        return False
+
+
+# Outcomes of commit_artifacts
+COMMITTED = "committed"
+REPLACED = "replaced"
+KEPT_EXISTING = "kept_existing"
+NOTHING_STAGED = "nothing_staged"
+LOST_RACE = "lost_race"
+
+
+def commit_artifacts(staging_dir: Path, final_dir: Path, replace: bool = False) -> str:
+    """
+    Idempotently publish a widget generated in a staging directory.
+
+    The staging directory must be on the same filesystem as final_dir so the
+    move is a single atomic rename. If a successful result is already
+    committed (e.g. by another worker after a lease expired mid-generation),
+    the staged copy is discarded and the existing result is kept, unless
+    replace is set (forced regeneration), in which case the old result is
+    swapped out.
+
+    Returns:
+        One of COMMITTED, REPLACED, KEPT_EXISTING, NOTHING_STAGED or LOST_RACE
+    """
+    if not staging_dir.is_dir():
+        return NOTHING_STAGED
+
+    replaced = None
+    if is_widget_committed(final_dir):
+        if not replace:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            return KEPT_EXISTING
+        # Move the old result aside first so final_dir is never half-deleted
+        replaced = final_dir.with_name(f".{final_dir.name}.replaced-{uuid.uuid4().hex[:8]}")
+        try:
+            os.rename(final_dir, replaced)
+        except OSError:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            return LOST_RACE
+    elif final_dir.exists():
+        # Remove leftovers of an earlier failed or partial attempt
+        shutil.rmtree(final_dir, ignore_errors=True)
+    final_dir.parent.mkdir(parents=True, exist_ok=True)
+
+    try:
+        os.rename(staging_dir, final_dir)
+    except OSError:
+        # Lost a race with a concurrent commit of the same item
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        outcome = LOST_RACE
+        if replaced is not None and not final_dir.exists():
+            # Nothing took its place, so put the old result back
+            os.rename(replaced, final_dir)
+            replaced = None
+    else:
+        outcome = REPLACED if replaced is not None else COMMITTED
+    if replaced is not None:
+        shutil.rmtree(replaced, ignore_errors=True)
+    return outcome
@@ -11,9 +11,14 @@ Changes in this version:
 
 from __future__ import annotations
 from typing import Dict, Any, List, Tuple, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
+import hashlib
 import io
+import os
+import threading
 import time
 import numpy as np
 import torch
@@ -39,6 +44,9 @@ EDGE_DILATE = 3
 EDGE_BORDER_SUPPRESS = 4     # suppress Canny responses near ROI borders
 MIN_COMPONENT_AREA_FRAC = 0.0008
 
+OUTLINE_CACHE_SIZE = 1024    # outlines kept by to_outline_bw_batch, keyed by crop hash
+OUTLINE_WORKERS = min(8, os.cpu_count() or 1)
+
 def crop_with_bbox(img: Image.Image, bbox: Tuple[float, float, float, float]) -> Optional[Image.Image]:
     x, y, w, h = bbox
     cx, cy = x + w / 2.0, y + h / 2.0
@@ -145,11 +153,10 @@ def to_outline_bw(
         bin_ = (merged > 0).astype(np.uint8)
         num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(bin_, connectivity=8)
         area_thr = int(MIN_COMPONENT_AREA_FRAC * ((target + 2 * overscan_px) ** 2))
-        keep = np.zeros_like(bin_)
-        for lab in range(1, num_labels):
-            if stats[lab, cv2.CC_STAT_AREA] >= area_thr:
-                keep[labels == lab] = 1
-        merged = (keep * 255).astype(np.uint8)
+        # Per-label keep/drop lookup table, applied in one pass over the label image
+        keep_lut = np.where(stats[:, cv2.CC_STAT_AREA] >= area_thr, 255, 0).astype(np.uint8)
+        keep_lut[0] = 0
+        merged = keep_lut[labels]
 
     # White background, black strokes; then crop away the overscan band
     out_big = np.full_like(sil, 255, np.uint8)
@@ -157,6 +164,46 @@ def to_outline_bw(
     out_valid = out_big[vy0:vy1, vx0:vx1]  # (target, target)
     return Image.fromarray(out_valid, mode="L").convert("RGB")
 
+_outline_cache: "OrderedDict[Tuple, Image.Image]" = OrderedDict()
+_outline_cache_lock = threading.Lock()
+
+
+def _crop_key(crop: Image.Image, params: Tuple) -> Tuple:
+    digest = hashlib.blake2b(crop.tobytes(), digest_size=16).hexdigest()
+    return (digest, crop.mode, crop.size, params)
+
+
+def to_outline_bw_batch(crops: List[Image.Image], **kwargs) -> List[Image.Image]:
+    """
+    to_outline_bw for many crops. Outlines are cached by crop hash (LRU,
+    OUTLINE_CACHE_SIZE entries), identical crops in a batch are outlined
+    once, and misses run on OUTLINE_WORKERS threads (OpenCV releases the GIL).
+    """
+    params = tuple(sorted(kwargs.items()))
+    keys = [_crop_key(c, params) for c in crops]
+    with _outline_cache_lock:
+        found = {k: _outline_cache[k] for k in set(keys) if k in _outline_cache}
+        for k in found:
+            _outline_cache.move_to_end(k)
+
+    todo = {k: c for k, c in zip(keys, crops) if k not in found}
+    if todo:
+        outline = lambda crop: to_outline_bw(crop, **kwargs)
+        if len(todo) > 1 and OUTLINE_WORKERS > 1:
+            with ThreadPoolExecutor(max_workers=min(OUTLINE_WORKERS, len(todo))) as pool:
+                outlines = list(pool.map(outline, todo.values()))
+        else:
+            outlines = [outline(c) for c in todo.values()]
+        fresh = dict(zip(todo, outlines))
+        found.update(fresh)
+        with _outline_cache_lock:
+            _outline_cache.update(fresh)
+            while len(_outline_cache) > OUTLINE_CACHE_SIZE:
+                _outline_cache.popitem(last=False)
+    # Copies: callers own their images, the cache keeps its own
+    return [found[k].copy() for k in keys]
+
+
 async def _encode_images_via_http(outline_pils: List[Image.Image]) -> np.ndarray:
     """
     Encode images to vectors via backend API.
@@ -260,7 +307,7 @@ async def query_from_detections_with_details(
 
     base_img = Image.open(io.BytesIO(image_bytes)).convert("RGBA")
     color_pils: List[Image.Image] = []
-    outline_pils: List[Image.Image] = []
+    crops: List[Image.Image] = []
     icon_detections: List[Dict[str, Any]] = []
 
     for det in detections:
@@ -281,11 +328,12 @@ async def query_from_detections_with_details(
         if crop is None:
             continue
         color_pils.append(crop.convert("RGB"))
-        outline_pils.append(to_outline_bw(crop))
+        crops.append(crop)
         icon_detections.append(det)
 
     if not color_pils:
         return [], []
+    outline_pils = to_outline_bw_batch(crops)
 
     import os
     model_cache_enabled = os.getenv("ENABLE_MODEL_CACHE", "false").lower() == "true"
@@ -8,15 +8,20 @@ Return: List[str] of svg filenames (deduped across queries, order-preserving).
 from __future__ import annotations
 from pathlib import Path
 import re
-from typing import List, Dict, Any, Tuple
+import itertools
+from collections.abc import Iterator, Mapping, Sequence
+from typing import List, Dict, Any, Tuple, Optional
 import json
 import faiss
 import numpy as np
 
 INDEX_NAME = "SigLIP2.faiss"
+TEXT_INDEX_NAME = "SigLIP2_text.faiss"
 TOPK = 50
 TOPM = 1
 ALPHA = 0.8  # fused = ALPHA * sim_img + (1-ALPHA) * sim_txt
+MODES = ("image", "dual")  # candidate pool: image top-K, or image top-K ∪ text top-K
+DUAL_BATCH = 64  # queries per search/matmul batch in dual mode
 
 
 def _to_pascal(s: str) -> str:
@@ -31,23 +36,208 @@ def _normalize_name_from_src(src: str) -> str:
     """
     return Path(Path(src).name).stem
 
-def load_lib(lib_root: Path) -> Tuple[Any, List[Dict[str, Any]], np.ndarray, np.ndarray]:
+# Compact libraries (written by build-embeddings.py --export-compact)
+COMPACT_META = "compact.json"
+COMPACT_SUFFIX = {"float16": "f16", "int8": "i8"}
+
+
+class QuantizedRows:
+    """
+    Read-only (N, D) feature matrix stored as float16, or as int8 with a
+    float32 scale per row. Memory-mapped; indexing returns float32 rows.
+    """
+
+    def __init__(self, data: np.ndarray, scale: Optional[np.ndarray] = None):
+        self.data = data
+        self.scale = scale
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.data.shape
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, key) -> np.ndarray:
+        rows = np.asarray(self.data[key], dtype=np.float32)
+        if self.scale is not None:
+            rows *= np.asarray(self.scale[key], dtype=np.float32)[..., None]
+        return rows
+
+
+class ItemRow(Mapping):
+    """One row of an ItemTable; fields are decoded on access."""
+
+    def __init__(self, table: "ItemTable", row: int):
+        self._table = table
+        self._row = row
+
+    def __getitem__(self, field: str) -> Any:
+        return self._table.value(self._row, field)
+
+    def __iter__(self) -> Iterator[str]:
+        return (f for f in self._table.fields if self._table.has(self._row, f))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"ItemRow({dict(self)!r})"
+
+
+class ItemTable(Sequence):
+    """
+    Columnar items table (features/items.npz): per field, JSON-encoded row
+    values in one UTF-8 blob plus row offsets. Columns are loaded on first
+    use and rows are decoded on access, so loading a library does not parse
+    every item.
+    """
+
+    def __init__(self, path: Path):
+        self._npz = np.load(path)
+        self.fields: List[str] = [str(f) for f in self._npz["fields"]]
+        self._rows = int(self._npz["rows"])
+        self._columns: Dict[str, Tuple[np.ndarray, bytes]] = {}
+
+    def _column(self, field: str) -> Tuple[np.ndarray, bytes]:
+        col = self._columns.get(field)
+        if col is None:
+            c = self.fields.index(field)
+            col = (self._npz[f"c{c}_offsets"], self._npz[f"c{c}_data"].tobytes())
+            self._columns[field] = col
+        return col
+
+    def has(self, row: int, field: str) -> bool:
+        if field not in self.fields:
+            return False
+        offsets, _ = self._column(field)
+        return bool(offsets[row + 1] > offsets[row])
+
+    def value(self, row: int, field: str) -> Any:
+        if not self.has(row, field):
+            raise KeyError(field)
+        offsets, data = self._column(field)
+        return json.loads(data[offsets[row]:offsets[row + 1]].decode("utf-8"))
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def __getitem__(self, row: int) -> ItemRow:
+        if not isinstance(row, (int, np.integer)):
+            raise TypeError("ItemTable indices must be integers")
+        if row < 0:
+            row += self._rows
+        if not 0 <= row < self._rows:
+            raise IndexError("ItemTable index out of range")
+        return ItemRow(self, int(row))
+
+
+def _load_compact_features(feat_dir: Path, name: str, dtype: str) -> QuantizedRows:
+    suffix = COMPACT_SUFFIX[dtype]
+    path = feat_dir / f"{name}.{suffix}.npy"
+    if not path.exists():
+        raise SystemExit(f"Missing {path.name}")
+    scale_path = feat_dir / f"{name}.{suffix}_scale.npy"
+    scale = np.load(scale_path) if dtype == "int8" else None
+    return QuantizedRows(np.load(path, mmap_mode="r"), scale)
+
+
+def load_lib(lib_root: Path) -> Tuple[Any, Sequence[Mapping[str, Any]], Any, Any]:
+    """
+    Load (index, items, lib_img, lib_txt) of a library. Float32 libraries return
+    lists/arrays; compact libraries (features/compact.json) return an ItemTable
+    and QuantizedRows, which index the same way.
+    """
     lib_root = Path(lib_root)
     index = faiss.read_index(str((lib_root / "indices" / INDEX_NAME).as_posix()))
-    lib_img = np.load(lib_root / "features" / "features_SigLIP2.npy").astype("float32")
-    lib_txt_path = lib_root / "features" / "features_text_SigLIP2.npy"
-    if not lib_txt_path.exists():
-        raise SystemExit("Missing features_text_SigLIP2.npy")
-    lib_txt = np.load(lib_txt_path).astype("float32")
-    items_path = lib_root / "features" / "items.json"
-    if not items_path.exists():
-        raise SystemExit("Missing features/items.json (aligned with features rows)")
-    items = json.loads(items_path.read_text(encoding="utf-8"))
+    feat_dir = lib_root / "features"
+    meta_path = feat_dir / COMPACT_META
+    if meta_path.exists():
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        dtype = meta.get("dtype")
+        if dtype not in COMPACT_SUFFIX:
+            raise SystemExit(f"Unsupported compact feature dtype {dtype!r} in {COMPACT_META}")
+        lib_img = _load_compact_features(feat_dir, "features_SigLIP2", dtype)
+        lib_txt = _load_compact_features(feat_dir, "features_text_SigLIP2", dtype)
+        items_path = feat_dir / "items.npz"
+        if not items_path.exists():
+            raise SystemExit("Missing features/items.npz (aligned with features rows)")
+        items = ItemTable(items_path)
+    else:
+        lib_img = np.load(feat_dir / "features_SigLIP2.npy").astype("float32")
+        lib_txt_path = feat_dir / "features_text_SigLIP2.npy"
+        if not lib_txt_path.exists():
+            raise SystemExit("Missing features_text_SigLIP2.npy")
+        lib_txt = np.load(lib_txt_path).astype("float32")
+        items_path = feat_dir / "items.json"
+        if not items_path.exists():
+            raise SystemExit("Missing features/items.json (aligned with features rows)")
+        items = json.loads(items_path.read_text(encoding="utf-8"))
     if len(items) != len(lib_img) or len(items) != len(lib_txt):
-        raise SystemExit("Length mismatch among items.json, features_SigLIP2.npy, features_text_SigLIP2.npy")
+        raise SystemExit("Length mismatch among items, features_SigLIP2, features_text_SigLIP2")
     return index, items, lib_img, lib_txt
 
 
+def load_text_index(lib_root: Path, lib_txt: Any) -> Any:
+    """
+    Cosine index over the library text features, used by dual mode. Read from
+    indices/SigLIP2_text.faiss when the library has one, else built in memory.
+    """
+    path = Path(lib_root) / "indices" / TEXT_INDEX_NAME
+    if path.exists():
+        return faiss.read_index(str(path.as_posix()))
+    v = np.array(lib_txt[:], dtype="float32")
+    faiss.normalize_L2(v)
+    index = faiss.IndexFlatIP(v.shape[1])
+    index.add(v)
+    return index
+
+
+def _dual_candidates(
+    index: Any,
+    text_index: Any,
+    lib_img: Any,
+    lib_txt: Any,
+    q_img_all: np.ndarray,  # (Q, D)
+    q_txt_all: np.ndarray,  # (Q, D)
+    topk: int,
+) -> List[Tuple[List[int], np.ndarray, np.ndarray]]:
+    """
+    Dual-mode candidates per query: its image top-K followed by the text top-K
+    rows not already in it, with sim_img and sim_txt of each. Queries go in
+    batches of DUAL_BATCH: one search per index and one matmul per modality
+    over the batch's distinct candidates.
+    """
+    q_img_all = np.array(q_img_all, dtype="float32")
+    q_txt_all = np.array(q_txt_all, dtype="float32")
+    faiss.normalize_L2(q_img_all)
+    faiss.normalize_L2(q_txt_all)
+    k_img = min(topk, index.ntotal)
+    k_txt = min(topk, text_index.ntotal)
+    empty = np.zeros((0,), dtype=np.float32)
+
+    out: List[Tuple[List[int], np.ndarray, np.ndarray]] = []
+    for start in range(0, len(q_img_all), DUAL_BATCH):
+        q_img = q_img_all[start:start + DUAL_BATCH]
+        q_txt = q_txt_all[start:start + DUAL_BATCH]
+        I_img = index.search(q_img, k_img)[1] if k_img > 0 else np.zeros((len(q_img), 0), dtype=np.int64)
+        I_txt = text_index.search(q_txt, k_txt)[1] if k_txt > 0 else np.zeros((len(q_txt), 0), dtype=np.int64)
+        cands = [list(dict.fromkeys(i for i in a.tolist() + b.tolist() if i != -1)) for a, b in zip(I_img, I_txt)]
+        sizes = [len(c) for c in cands]
+        if not sum(sizes):
+            out += [([], empty, empty) for _ in cands]
+            continue
+
+        flat = np.fromiter(itertools.chain.from_iterable(cands), dtype=np.int64, count=sum(sizes))
+        rows, inverse = np.unique(flat, return_inverse=True)
+        cols = np.repeat(np.arange(len(cands)), sizes)
+        sim_img = (lib_img[rows] @ q_img.T)[inverse, cols]
+        sim_txt = (lib_txt[rows] @ q_txt.T)[inverse, cols]
+        bounds = np.cumsum(sizes)[:-1]
+        out += list(zip(cands, np.split(sim_img, bounds), np.split(sim_txt, bounds)))
+    return out
+
+
 def _rerank_in_K(
     idxs: List[int],
     q_img_vec: np.ndarray,  # (1, D)
@@ -74,19 +264,28 @@ def _process_one_query(
     topk: int,
     topm: int,
     alpha: float,
+    candidates: Optional[Tuple[List[int], np.ndarray, np.ndarray]] = None,
 ):
-    faiss.normalize_L2(q_img_vec)
-    faiss.normalize_L2(q_txt_vec)
-    K = min(topk, index.ntotal)
-    if K <= 0:
-        return []
-
-    D, I = index.search(q_img_vec, K)
-    idxs = [i for i in I[0].tolist() if i != -1]
-    if not idxs:
-        return []
-
-    order, sim_img, sim_txt, fused = _rerank_in_K(idxs, q_img_vec, q_txt_vec, lib_img, lib_txt, alpha)
+    if candidates is not None:
+        # Dual mode: pool and similarities precomputed by _dual_candidates
+        idxs, sim_img, sim_txt = candidates
+        if not idxs:
+            return [], []
+        fused = alpha * sim_img + (1.0 - alpha) * sim_txt
+        order = np.argsort(-fused)
+    else:
+        faiss.normalize_L2(q_img_vec)
+        faiss.normalize_L2(q_txt_vec)
+        K = min(topk, index.ntotal)
+        if K <= 0:
+            return [], []
+
+        D, I = index.search(q_img_vec, K)
+        idxs = [i for i in I[0].tolist() if i != -1]
+        if not idxs:
+            return [], []
+
+        order, sim_img, sim_txt, fused = _rerank_in_K(idxs, q_img_vec, q_txt_vec, lib_img, lib_txt, alpha)
     # Fused (topm)
     m = max(1, min(topm, len(order)))
     hits_fused = []
@@ -104,7 +303,7 @@ def _process_one_query(
             "score_final": float(fused[j]),
         })
 
-    # Image-only top 10 within the same topK pool
+    # Image-only top 10 within the same pool
     order_img = np.argsort(-sim_img)
     m_img = min(10, len(order_img))
     hits_img_only = []
@@ -136,13 +335,24 @@ def retrieve_svg_filenames_with_dual_details(
     topk: int = TOPK,
     topm: int = TOPM,
     alpha: float = ALPHA,
+    mode: str = "image",
 ) -> Tuple[List[str], List[List[Dict[str, Any]]], List[List[Dict[str, Any]]]]:
+    """
+    mode="image" reranks the image top-K; mode="dual" reranks the union of the
+    image top-K and the text top-K (see _dual_candidates).
+    """
     if q_img_all is None or q_txt_all is None:
         raise ValueError("q_img_all and q_txt_all must be provided.")
     if len(q_img_all) != len(q_txt_all) or len(q_img_all) != len(q_ids):
         raise ValueError("Length mismatch: q_ids, q_img_all, q_txt_all must align.")
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
 
     index, items, lib_img, lib_txt = load_lib(Path(lib_root))
+    dual = None
+    if mode == "dual":
+        text_index = load_text_index(Path(lib_root), lib_txt)
+        dual = _dual_candidates(index, text_index, lib_img, lib_txt, q_img_all, q_txt_all, int(topk))
     svg_names: List[str] = []
     fused_hits_all: List[List[Dict[str, Any]]] = []
     img_only_hits_all: List[List[Dict[str, Any]]] = []
@@ -161,6 +371,7 @@ def retrieve_svg_filenames_with_dual_details(
             topk=int(topk),
             topm=int(topm),
             alpha=float(alpha),
+            candidates=dual[i] if dual is not None else None,
         )
 
         hits_with_names = []
@@ -193,11 +404,18 @@ def retrieve_svg_filenames_from_libs_with_dual_details(
     topk: int = TOPK,
     topm: int = TOPM,
     alpha: float = ALPHA,
+    mode: str = "image",
 ) -> Tuple[List[str], List[List[Dict[str, Any]]], List[List[Dict[str, Any]]]]:
+    """
+    mode="image" reranks the image top-K; mode="dual" reranks the union of the
+    image top-K and the text top-K (see _dual_candidates).
+    """
     if q_img_all is None or q_txt_all is None:
         raise ValueError("q_img_all and q_txt_all must be provided.")
     if len(q_img_all) != len(q_txt_all) or len(q_img_all) != len(q_ids):
         raise ValueError("Length mismatch: q_ids, q_img_all, q_txt_all must align.")
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
     roots = [Path(r) for r in lib_roots if r]
     if not roots:
         raise ValueError("lib_roots must be a non-empty list of paths")
@@ -207,6 +425,14 @@ def retrieve_svg_filenames_from_libs_with_dual_details(
         index, items, lib_img, lib_txt = load_lib(r)
         libs.append((r, index, items, lib_img, lib_txt))
 
+    # Dual mode: per-lib candidate pools and similarities for all queries up front
+    dual = None
+    if mode == "dual":
+        dual = [
+            _dual_candidates(index, load_text_index(r, lib_txt), lib_img, lib_txt, q_img_all, q_txt_all, int(topk))
+            for r, index, items, lib_img, lib_txt in libs
+        ]
+
     svg_names: List[str] = []
     fused_hits_all: List[List[Dict[str, Any]]] = []
     img_only_hits_all: List[List[Dict[str, Any]]] = []
@@ -225,6 +451,13 @@ def retrieve_svg_filenames_from_libs_with_dual_details(
         per_lib_sim_txt: List[np.ndarray] = []
 
         for lib_idx, (_root, index, items, lib_img, lib_txt) in enumerate(libs):
+            if dual is not None:
+                idxs, sim_img, sim_txt = dual[lib_idx][i]
+                per_lib_idxs.append(idxs)
+                per_lib_sim_img.append(sim_img)
+                per_lib_sim_txt.append(sim_txt)
+                merged_pairs.extend((lib_idx, j) for j in range(len(idxs)))
+                continue
             K = min(int(topk), index.ntotal)
             if K <= 0:
                 per_lib_idxs.append([])
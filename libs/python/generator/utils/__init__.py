@@ -11,6 +11,7 @@ from .text_processing import clean_json_response, clean_code_response
 from .logger import setup_logger, get_logger, log_to_file, log_to_console, separator, Colors
 from .visualization import draw_grounding_visualization, crop_icon_region, save_retrieval_svgs
 from .image_helpers import prepare_image_content_from_bytes
+from .stage_checkpoint import StageCheckpoint
 
 __all__ = [
     "validate_model",
@@ -34,4 +35,5 @@ __all__ = [
     "crop_icon_region",
     "save_retrieval_svgs",
     "prepare_image_content_from_bytes",
+    "StageCheckpoint",
 ]
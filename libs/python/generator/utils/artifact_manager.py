@@ -491,7 +491,8 @@ class ArtifactManager:
                 "enabled": self.config.enable_color_pipeline,
                 "colorCount": len(color_debug.get('colors') or []) if color_debug else 0
             },
-            "promptConstruction": prompt_debug
+            "promptConstruction": prompt_debug,
+            "recovery": result.get('recoveryDebugInfo') or {}
         }
 
         # Build output section
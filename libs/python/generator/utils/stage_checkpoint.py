@@ -0,0 +1,135 @@
+# -----------------------------------------------------------------------------
+# File: stage_checkpoint.py
+# Description: Per-widget checkpoints of completed pipeline stage outputs
+# -----------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+class StageCheckpoint:
+    """
+    Persist completed stage outputs so a retried widget resumes after them.
+
+    The checkpoint is a small JSON file keyed by the SHA-256 of the input
+    image and a fingerprint of the stage-relevant configuration. A checkpoint
+    written for a different image or configuration is ignored, so stale
+    outputs are never reused. Stage durations are stored alongside outputs to
+    report how much time each resume saved.
+
+    Example:
+        >>> checkpoint = StageCheckpoint(path, image_data, {"layoutModel": "qwen3-vl-plus"})
+        >>> layout = checkpoint.get("layout")
+        >>> if layout is None:
+        ...     layout = await detect_layout(...)
+        ...     checkpoint.save("layout", layout, duration_sec)
+    """
+
+    # 2: perception sub-stages with incomplete results (swallowed errors) are no longer saved
+    VERSION = 2
+
+    def __init__(self, path: Path, image_data: bytes, fingerprint: Dict[str, Any], root: Optional[Path] = None):
+        """
+        Args:
+            path: Checkpoint file path (created on first save)
+            image_data: Raw input image bytes
+            fingerprint: JSON-serializable config values that affect stage outputs
+            root: Top of the checkpoint directory tree; directories left empty by
+                clear() are removed up to and including it (default: path's directory)
+        """
+        self.path = Path(path)
+        self.root = Path(root) if root is not None else self.path.parent
+        self.image_hash = hashlib.sha256(image_data).hexdigest()
+        self.fingerprint = fingerprint
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.resumed: List[str] = []
+        self.time_saved = 0.0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+
+        if (data.get("version") == self.VERSION
+                and data.get("imageHash") == self.image_hash
+                and data.get("fingerprint") == self.fingerprint):
+            self.stages = data.get("stages", {})
+
+    def get(self, stage: str) -> Optional[Any]:
+        """Return a checkpointed stage output (recording the resume), or None."""
+        entry = self.stages.get(stage)
+        if entry is None:
+            return None
+        if stage not in self.resumed:
+            self.resumed.append(stage)
+            self.time_saved += entry.get("durationSec", 0.0)
+        return entry["output"]
+
+    def save(self, stage: str, output: Any, duration_sec: float) -> bool:
+        """
+        Checkpoint a completed stage output.
+
+        The file is rewritten atomically so a crash mid-write never leaves a
+        corrupt checkpoint. Outputs that are not JSON-serializable are skipped.
+
+        Returns:
+            True if the checkpoint was written
+        """
+        self.stages[stage] = {"output": output, "durationSec": duration_sec}
+        data = {
+            "version": self.VERSION,
+            "imageHash": self.image_hash,
+            "fingerprint": self.fingerprint,
+            "stages": self.stages,
+        }
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        try:
+            try:
+                self._write(data, tmp_path)
+            except FileNotFoundError:
+                # Another widget's clear() removed the then-empty directory after our mkdir
+                self._write(data, tmp_path)
+            return True
+        except (OSError, TypeError, ValueError):
+            self.stages.pop(stage, None)
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+            return False
+
+    def _write(self, data: Dict[str, Any], tmp_path: Path):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """Delete the checkpoint (after the widget completed successfully) and prune empty directories."""
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+        directory = self.path.parent
+        while directory == self.root or self.root in directory.parents:
+            try:
+                directory.rmdir()
+            except OSError:
+                # Still holds other widgets' checkpoints (or is already gone)
+                break
+            directory = directory.parent
+
+    def summary(self) -> Dict[str, Any]:
+        """Resume statistics for debug output."""
+        return {
+            "checkpointedStages": sorted(self.stages),
+            "resumedStages": list(self.resumed),
+            "timeSavedSec": round(self.time_saved, 3),
+        }
@@ -5,12 +5,21 @@
 set -e
 
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
-EVAL_SCRIPT="$SCRIPT_DIR/run_evaluation.sh"
+PROJECT_ROOT="$(cd "$SCRIPT_DIR/../.." && pwd)"
+BENCHMARK_TOOL="$PROJECT_ROOT/tools/evaluation/benchmark.py"
+VENV_DIR="$PROJECT_ROOT/tools/evaluation/.venv"
+
+# Load .env if present (GT_DIR)
+if [ -f "$PROJECT_ROOT/.env" ]; then
+  set -a
+  source "$PROJECT_ROOT/.env"
+  set +a
+fi
 
 # Default values
-GT_DIR=""
 WORKERS=10
 USE_CUDA=false
+OUTPUT_DIR="data/benchmarks/.report"
 
 # Parse arguments
 while [[ $# -gt 0 ]]; do
@@ -23,6 +32,10 @@ while [[ $# -gt 0 ]]; do
             WORKERS="$2"
             shift 2
             ;;
+        -o|--output_dir)
+            OUTPUT_DIR="$2"
+            shift 2
+            ;;
         --cuda)
             USE_CUDA=true
             shift
@@ -32,7 +45,8 @@ while [[ $# -gt 0 ]]; do
             echo ""
             echo "Options:"
             echo "  -g, --gt_dir PATH     Path to ground truth directory (optional, uses .env GT_DIR if not set)"
-            echo "  -w, --workers NUM     Number of worker threads (default: 10)"
+            echo "  -w, --workers NUM     Number of worker processes (default: 10)"
+            echo "  -o, --output_dir PATH Directory for the comparative report (default: data/benchmarks/.report)"
             echo "  --cuda                Use CUDA/GPU for computation (default: CPU)"
             echo "  -h, --help            Show this help message"
             echo ""
@@ -48,12 +62,32 @@ while [[ $# -gt 0 ]]; do
     esac
 done
 
-# Check if evaluation script exists
-if [ ! -f "$EVAL_SCRIPT" ]; then
-    echo "Error: Evaluation script not found: $EVAL_SCRIPT"
+if [ -z "$GT_DIR" ]; then
+    echo "Error: Ground truth directory not specified (use -g or set GT_DIR in .env)"
     exit 1
 fi
 
+# Convert to absolute paths and normalize (relative paths are relative to the project root)
+if [[ ! "$GT_DIR" = /* ]]; then
+    GT_DIR="$PROJECT_ROOT/$GT_DIR"
+fi
+GT_DIR="$(realpath -m "$GT_DIR")"
+
+if [[ ! "$OUTPUT_DIR" = /* ]]; then
+    OUTPUT_DIR="$PROJECT_ROOT/$OUTPUT_DIR"
+fi
+OUTPUT_DIR="$(realpath -m "$OUTPUT_DIR")"
+
+if [ ! -f "$BENCHMARK_TOOL" ]; then
+    echo "Error: Benchmark tool not found: $BENCHMARK_TOOL"
+    exit 1
+fi
+
+PYTHON_CMD="python"
+if [ -d "$VENV_DIR" ]; then
+    PYTHON_CMD="$VENV_DIR/bin/python"
+fi
+
 echo "========================================"
 echo "Running evaluation for all benchmarks"
 echo "========================================"
@@ -75,57 +109,29 @@ DATASETS=(
     "data/benchmarks/WebSight-VLM-8B"
     "data/benchmarks/Widget2Code"
 )
+for i in "${!DATASETS[@]}"; do
+    DATASETS[$i]="$(realpath -m "$PROJECT_ROOT/${DATASETS[$i]}")"
+done
 
-# Counter for progress
-TOTAL=${#DATASETS[@]}
-CURRENT=0
-
-# Run evaluation for each dataset
-for DATASET in "${DATASETS[@]}"; do
-    CURRENT=$((CURRENT + 1))
-
-    echo ""
-    echo "========================================"
-    echo "[$CURRENT/$TOTAL] Processing: $DATASET"
-    echo "========================================"
-    echo ""
-
-    # Check if dataset directory exists
-    if [ ! -d "$DATASET" ]; then
-        echo "⚠️  Warning: Directory not found, skipping: $DATASET"
-        continue
-    fi
-
-    # Run evaluation
-    OUTPUT_DIR="$DATASET/.analysis"
-
-    # Build command with optional parameters
-    EVAL_CMD="$EVAL_SCRIPT $DATASET $OUTPUT_DIR"
-
-    if [ -n "$GT_DIR" ]; then
-        EVAL_CMD="$EVAL_CMD -g $GT_DIR"
-    fi
-
-    EVAL_CMD="$EVAL_CMD -w $WORKERS"
+# All datasets are evaluated in one pass: each GT image is decoded and
+# featurized once and scored against every dataset's prediction
+# (missing dataset directories are skipped by the tool)
+CMD=("$PYTHON_CMD" "$BENCHMARK_TOOL" --gt_dir "$GT_DIR" --runs "${DATASETS[@]}"
+     --output_dir "$OUTPUT_DIR" --workers "$WORKERS")
 
-    if [ "$USE_CUDA" = true ]; then
-        EVAL_CMD="$EVAL_CMD --cuda"
-    fi
+if [ "$USE_CUDA" = true ]; then
+    CMD+=(--cuda)
+fi
 
-    if eval "$EVAL_CMD"; then
-        echo "✅ Completed: $DATASET"
-    else
-        echo "❌ Failed: $DATASET"
-        echo "   Continuing with next dataset..."
-    fi
-done
+"${CMD[@]}"
 
 echo ""
 echo "========================================"
 echo "All benchmarks completed!"
 echo "========================================"
 echo ""
-echo "Results are saved in each dataset's .analysis directory:"
+echo "Comparative report: $OUTPUT_DIR/benchmark_report.json (and .xlsx)"
+echo "Per-dataset statistics are saved in each dataset's .analysis directory:"
 for DATASET in "${DATASETS[@]}"; do
     if [ -d "$DATASET/.analysis" ]; then
         echo "  ✓ $DATASET/.analysis"
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Multi-process check of the shared work queue used by generate-widget-batch --queue.
+
+Runs real BatchGenerator queue consumers in separate local processes against
+one SQLite queue. Generation is replaced by a fast fake that writes a
+committed widget folder (debug.json + DSL) and logs every call, so no model
+or API key is involved. Four scenarios are checked:
+
+  killed-lease  4 workers; one is SIGKILLed while holding leases. It may hold
+                no more leases than its concurrency (items are claimed only
+                when a slot is free). Its items must expire, be re-claimed by
+                the survivors and be committed exactly once; nothing may stay
+                pending, leased or failed.
+  resume        Outputs committed by an earlier (non-queue) run are marked
+                done at enqueue time and never regenerated.
+  force         With force, every item is regenerated and its committed
+                output replaced, with no leftovers of the old result.
+  late-force    A second host starts halfway through a forced run and
+                enqueues with force again. Items finished (or failed) earlier
+                in the run must not be re-queued: every item is generated
+                exactly once.
+
+Requires the generator package (pip install -e libs/python).
+
+Usage:
+    python scripts/generation/check_work_queue.py
+    python scripts/generation/check_work_queue.py --images 80 --workers 4 --keep /tmp/queue-check
+"""
+
+import sys
+import os
+import json
+import time
+import signal
+import shutil
+import sqlite3
+import asyncio
+import argparse
+import tempfile
+import multiprocessing
+from pathlib import Path
+from collections import Counter
+
+from generator.generation.widget import BatchGenerator, SQLiteWorkQueue
+from generator.generation.widget.work_queue import is_widget_committed
+
+LEASE_SECONDS = 2.0
+CONCURRENCY = 2
+
+
+def _fake_generate(generator, tag, hang, seconds=0.02, fail_ids=()):
+    """Build a generate_single replacement that commits a minimal widget folder (or fails on fail_ids)."""
+    calls_log = generator.output_dir.parent / "calls.log"
+
+    async def generate_single(image_path, output_root=None):
+        rel = image_path.relative_to(generator.input_dir)
+        with open(calls_log, "a") as f:
+            f.write(f"{rel.as_posix()}\t{generator.worker_id}\n")
+        if hang:
+            # Hold the lease until the parent kills this process
+            await asyncio.sleep(3600)
+        await asyncio.sleep(seconds)
+        if rel.as_posix() in fail_ids:
+            return (image_path, False, "fake failure")
+
+        widget_dir = (output_root or generator.output_dir) / rel.parent / rel.stem
+        (widget_dir / "log").mkdir(parents=True, exist_ok=True)
+        (widget_dir / "artifacts" / "4-dsl").mkdir(parents=True, exist_ok=True)
+        (widget_dir / "artifacts" / "4-dsl" / "widget.json").write_text(json.dumps({"tag": tag}))
+        (widget_dir / "log" / "debug.json").write_text(json.dumps({"execution": {"status": "success"}}))
+        return (image_path, True, str(widget_dir))
+
+    return generate_single
+
+
+def _worker(input_dir, output_dir, queue_path, tag, force, hang, seconds=0.02, fail_ids=(), join_after=None):
+    """
+    Queue consumer process: one BatchGenerator draining the shared queue.
+
+    With join_after, the process acts as a host started late: it waits until
+    that many items are done, then enqueues every image like a fresh
+    generate-widget-batch invocation before consuming.
+    """
+    work_queue = SQLiteWorkQueue(queue_path, lease_seconds=LEASE_SECONDS)
+    generator = BatchGenerator(
+        input_dir=Path(input_dir),
+        output_dir=Path(output_dir),
+        concurrency=CONCURRENCY,
+        force=force,
+        work_queue=work_queue,
+    )
+    generator.generate_single = _fake_generate(generator, tag, hang, seconds, fail_ids)
+    if join_after is not None:
+        while work_queue.stats()["done"] < join_after:
+            time.sleep(0.01)
+        generator.enqueue_images()
+    asyncio.run(generator.process_queue())
+
+
+def _make_inputs(input_dir, n_images):
+    """Create n_images placeholder inputs, half of them in a subdirectory."""
+    for i in range(n_images):
+        path = input_dir / ("sub" if i % 2 else ".") / f"img_{i:04d}.png"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"")
+    return sorted(p.relative_to(input_dir).as_posix() for p in input_dir.glob("**/*.png"))
+
+
+def _enqueue(input_dir, output_dir, queue_path, force):
+    generator = BatchGenerator(
+        input_dir=input_dir, output_dir=output_dir, force=force,
+        work_queue=SQLiteWorkQueue(queue_path, lease_seconds=LEASE_SECONDS),
+    )
+    return generator.enqueue_images()
+
+
+def _read_calls(root):
+    calls_log = root / "calls.log"
+    lines = calls_log.read_text().splitlines() if calls_log.exists() else []
+    calls_log.unlink(missing_ok=True)
+    return [tuple(line.split("\t")) for line in lines]
+
+
+def _committed_tag(output_dir, item_id):
+    rel = Path(item_id)
+    widget_dir = output_dir / rel.parent / rel.stem
+    if not is_widget_committed(widget_dir):
+        return None
+    return json.loads((widget_dir / "artifacts" / "4-dsl" / "widget.json").read_text())["tag"]
+
+
+def _leased_by(queue_path, pid):
+    """Items currently leased by the worker process with this pid."""
+    conn = sqlite3.connect(queue_path, timeout=60)
+    try:
+        return [row[0] for row in conn.execute(
+            "SELECT item_id FROM items WHERE status = 'leased' AND owner LIKE ?", (f"%-{pid}",)
+        )]
+    finally:
+        conn.close()
+
+
+def _run_workers(ctx, args_list, queue_path=None, kill_index=None, timeout=120):
+    """
+    Start one process per argument tuple and wait for all of them.
+
+    With kill_index, that worker is SIGKILLed once it holds leases; returns
+    its pid and the items it had leased, otherwise (None, []).
+    """
+    processes = [ctx.Process(target=_worker, args=a) for a in args_list]
+    for p in processes:
+        p.start()
+
+    killed, victim_pid = [], None
+    if kill_index is not None:
+        victim = processes[kill_index]
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            killed = _leased_by(queue_path, victim.pid)
+            if killed:
+                break
+            time.sleep(0.05)
+        # Let the admission window fill so as many leases as possible are stranded at once
+        time.sleep(0.2)
+        os.kill(victim.pid, signal.SIGKILL)
+        victim.join()
+        killed = _leased_by(queue_path, victim.pid)
+        victim_pid = victim.pid
+
+    for p in processes:
+        p.join(timeout)
+        if p.is_alive():
+            p.kill()
+            raise RuntimeError(f"worker pid={p.pid} did not finish within {timeout}s")
+    return victim_pid, killed
+
+
+def check_killed_lease(root, ctx, n_images, n_workers):
+    input_dir, output_dir, queue_path = root / "input", root / "output", root / "queue.sqlite"
+    item_ids = _make_inputs(input_dir, n_images)
+    assert _enqueue(input_dir, output_dir, queue_path, force=False) == n_images
+
+    args = [(input_dir, output_dir, queue_path, "run1", False, i == 0) for i in range(n_workers)]
+    victim_pid, killed = _run_workers(ctx, args, queue_path=queue_path, kill_index=0)
+    calls = _read_calls(root)
+
+    stats = SQLiteWorkQueue(queue_path).stats()
+    assert killed, "victim was killed before it held any lease"
+    assert len(killed) <= CONCURRENCY, f"victim held {len(killed)} leases with concurrency {CONCURRENCY}"
+    assert stats == {"pending": 0, "leased": 0, "done": n_images, "failed": 0}, stats
+    missing = [i for i in item_ids if _committed_tag(output_dir, i) != "run1"]
+    assert not missing, f"not committed: {missing}"
+
+    # The victim hangs on every item it claims, so survivors must generate each item exactly once
+    survivor_counts = Counter(item_id for item_id, owner in calls if not owner.endswith(f"-{victim_pid}"))
+    wrong = {i: survivor_counts[i] for i in item_ids if survivor_counts[i] != 1}
+    assert not wrong, f"items not generated exactly once by the survivors: {wrong}"
+    return f"{len(killed)} stranded leases re-claimed, {len(calls)} generations for {n_images} items"
+
+
+def check_resume(root, ctx, n_images, n_workers):
+    input_dir, output_dir, queue_path = root / "input", root / "output", root / "queue.sqlite"
+    item_ids = _make_inputs(input_dir, n_images)
+
+    # An earlier plain run committed every other image
+    precommitted = item_ids[::2]
+    for item_id in precommitted:
+        rel = Path(item_id)
+        widget_dir = output_dir / rel.parent / rel.stem
+        (widget_dir / "log").mkdir(parents=True)
+        (widget_dir / "artifacts" / "4-dsl").mkdir(parents=True)
+        (widget_dir / "artifacts" / "4-dsl" / "widget.json").write_text(json.dumps({"tag": "old"}))
+        (widget_dir / "log" / "debug.json").write_text(json.dumps({"execution": {"status": "success"}}))
+
+    pending = _enqueue(input_dir, output_dir, queue_path, force=False)
+    assert pending == n_images - len(precommitted), pending
+
+    _run_workers(ctx, [(input_dir, output_dir, queue_path, "run2", False, False) for _ in range(n_workers)])
+    generated = {item_id for item_id, _ in _read_calls(root)}
+
+    assert not generated & set(precommitted), f"regenerated committed items: {generated & set(precommitted)}"
+    assert all(_committed_tag(output_dir, i) == "old" for i in precommitted)
+    assert all(_committed_tag(output_dir, i) == "run2" for i in item_ids if i not in precommitted)
+    assert SQLiteWorkQueue(queue_path).stats()["done"] == n_images
+    return f"{len(precommitted)} committed items skipped, {len(generated)} generated"
+
+
+def check_force(root, ctx, n_images, n_workers):
+    input_dir, output_dir, queue_path = root / "input", root / "output", root / "queue.sqlite"
+    item_ids = _make_inputs(input_dir, n_images)
+
+    _enqueue(input_dir, output_dir, queue_path, force=False)
+    _run_workers(ctx, [(input_dir, output_dir, queue_path, "old", False, False) for _ in range(n_workers)])
+    _read_calls(root)
+
+    assert _enqueue(input_dir, output_dir, queue_path, force=True) == n_images
+    _run_workers(ctx, [(input_dir, output_dir, queue_path, "forced", True, False) for _ in range(n_workers)])
+    generated = [item_id for item_id, _ in _read_calls(root)]
+
+    assert sorted(generated) == item_ids, "force did not regenerate every item exactly once"
+    stale = [i for i in item_ids if _committed_tag(output_dir, i) != "forced"]
+    assert not stale, f"committed output not replaced: {stale}"
+    leftovers = [p for p in output_dir.glob("**/.*.replaced-*")]
+    assert not leftovers, f"replaced results left on disk: {leftovers}"
+    return f"{len(generated)} items regenerated and replaced"
+
+
+def check_late_force(root, ctx, n_images, n_workers):
+    input_dir, output_dir, queue_path = root / "input", root / "output", root / "queue.sqlite"
+    item_ids = _make_inputs(input_dir, n_images)
+
+    _enqueue(input_dir, output_dir, queue_path, force=False)
+    _run_workers(ctx, [(input_dir, output_dir, queue_path, "old", False, False) for _ in range(n_workers)])
+    _read_calls(root)
+
+    # The first item of the sorted queue fails in the forced run, before the late host joins
+    failing = item_ids[0]
+    assert _enqueue(input_dir, output_dir, queue_path, force=True) == n_images
+    args = [(input_dir, output_dir, queue_path, "forced", True, False, 0.2, (failing,)) for _ in range(n_workers - 1)]
+    args.append((input_dir, output_dir, queue_path, "forced", True, False, 0.2, (failing,), n_images // 2))
+    _run_workers(ctx, args)
+    counts = Counter(item_id for item_id, _ in _read_calls(root))
+
+    wrong = {i: counts[i] for i in item_ids if counts[i] != 1}
+    assert not wrong, f"items not generated exactly once: {wrong}"
+    stats = SQLiteWorkQueue(queue_path).stats()
+    assert stats == {"pending": 0, "leased": 0, "done": n_images - 1, "failed": 1}, stats
+    stale = [i for i in item_ids if i != failing and _committed_tag(output_dir, i) != "forced"]
+    assert not stale, f"committed output not replaced: {stale}"
+    return f"late host joined after {n_images // 2} items, {sum(counts.values())} generations for {n_images} items"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-process check of the generate-widget-batch work queue.")
+    parser.add_argument("--images", type=int, default=40, help="Input images per scenario (default: 40)")
+    parser.add_argument("--workers", type=int, default=4, help="Local worker processes (default: 4)")
+    parser.add_argument("--keep", default=None, help="Keep scenario folders under this directory instead of a temp dir")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    base = Path(args.keep) if args.keep else Path(tempfile.mkdtemp(prefix="queue-check-"))
+    failed = 0
+    try:
+        for name, check in [("killed-lease", check_killed_lease), ("resume", check_resume), ("force", check_force),
+                            ("late-force", check_late_force)]:
+            root = base / name
+            shutil.rmtree(root, ignore_errors=True)
+            root.mkdir(parents=True)
+            start = time.perf_counter()
+            try:
+                detail = check(root, ctx, args.images, args.workers)
+            except AssertionError as e:
+                failed += 1
+                print(f"[ERROR] {name}: {e}")
+            else:
+                print(f"[OK] {name}: {detail} ({time.perf_counter() - start:.1f}s)")
+    finally:
+        if not args.keep:
+            shutil.rmtree(base, ignore_errors=True)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
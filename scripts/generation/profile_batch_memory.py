@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Memory profile of BatchGenerator task admission across batch sizes.
+
+For each batch size, placeholder input images are created (a fraction of
+them with committed output so the resume checks skip them) and the batch is
+driven twice with a fake per-image handler that only touches the
+StageTracker, so no model or API key is involved:
+
+  gather     the previous driver: full resume scan into a list, one
+             coroutine per image, asyncio.gather, results held until the end
+  streaming  what BatchGenerator.run() does now: process_batch() over the
+             lazy iter_images_to_process(), at most
+             concurrency * ADMISSION_FACTOR tasks alive
+
+Peak traced memory (tracemalloc) should grow with the batch size for gather
+and stay flat for streaming, apart from the one directory listing os.walk
+holds at a time. Time to the first started image is reported too, since the
+streaming path no longer scans the whole batch up front.
+
+Requires the generator package (pip install -e libs/python).
+
+Usage:
+    python scripts/generation/profile_batch_memory.py
+    python scripts/generation/profile_batch_memory.py --sizes 1000,10000,50000 --json memory.json
+"""
+
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from generator.generation.widget import BatchGenerator
+
+
+def make_batch(root, n_images, done_fraction):
+    """Create n_images placeholder inputs; every k-th one gets committed output."""
+    input_dir, output_dir = root / "input", root / "output"
+    done_every = int(round(1 / done_fraction)) if done_fraction > 0 else 0
+    for i in range(n_images):
+        rel = Path(f"cat_{i % 10}") / f"img_{i:06d}.png"
+        (input_dir / rel.parent).mkdir(parents=True, exist_ok=True)
+        (input_dir / rel).write_bytes(b"")
+        if done_every and i % done_every == 0:
+            widget_dir = output_dir / rel.parent / rel.stem
+            (widget_dir / "log").mkdir(parents=True)
+            (widget_dir / "artifacts" / "4-dsl").mkdir(parents=True)
+            (widget_dir / "log" / "debug.json").write_text('{"execution": {"status": "success"}}')
+            (widget_dir / "artifacts" / "4-dsl" / "widget.json").write_text('{"widget": {}}')
+    return input_dir, output_dir
+
+
+def make_generator(input_dir, output_dir, concurrency):
+    generator = BatchGenerator(input_dir=input_dir, output_dir=output_dir, concurrency=concurrency)
+    generator.first_start = None
+
+    async def fake_generate(image_path, output_root=None):
+        image_id = image_path.stem
+        if generator.first_start is None:
+            generator.first_start = time.perf_counter()
+        generator.stage_tracker.start_image(image_id)
+        generator.stage_tracker.set_stage(image_id, "layout")
+        await asyncio.sleep(0)
+        generator.stage_tracker.set_stage(image_id, "done")
+        generator.completed += 1
+        return (image_path, True, str(output_root or generator.output_dir))
+
+    generator.generate_single = fake_generate
+    return generator
+
+
+async def drive_gather(generator):
+    """The pre-streaming driver: every image becomes a coroutine before the first one runs."""
+    images = generator.find_images_to_process()
+    semaphore = asyncio.Semaphore(generator.concurrency)
+
+    async def process_with_semaphore(image_path):
+        async with semaphore:
+            return await generator.generate_single(image_path)
+
+    results = await asyncio.gather(*(process_with_semaphore(p) for p in images))
+    with open(generator.output_dir / "results.jsonl", "a") as summary_file:
+        for result in results:
+            generator._write_result(summary_file, result)
+
+
+async def drive_streaming(generator):
+    await generator.process_batch(generator.iter_images_to_process())
+
+
+def profile(mode, input_dir, output_dir, concurrency):
+    """Run one driver under tracemalloc and return its measurements."""
+    (output_dir / "results.jsonl").unlink(missing_ok=True)
+    generator = make_generator(input_dir, output_dir, concurrency)
+    driver = drive_gather if mode == "gather" else drive_streaming
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    asyncio.run(driver(generator))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "processed": generator.completed,
+        "peak_mib": round(peak / 2**20, 2),
+        "first_start_ms": round((generator.first_start - start) * 1000, 1) if generator.first_start else None,
+        "total_s": round(elapsed, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory of BatchGenerator admission across batch sizes.")
+    parser.add_argument("--sizes", default="1000,5000,20000", help="Comma-separated batch sizes (default: 1000,5000,20000)")
+    parser.add_argument("--done-fraction", type=float, default=0.2, help="Fraction of inputs with committed output (default: 0.2)")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="Concurrency (default: 8)")
+    parser.add_argument("--json", default=None, help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = {"concurrency": args.concurrency, "done_fraction": args.done_fraction, "runs": []}
+    print(f"{'images':>8}  {'mode':<10} {'processed':>9} {'peak MiB':>9} {'first task':>11} {'total':>7}")
+    for n_images in (int(n) for n in args.sizes.split(",")):
+        root = Path(tempfile.mkdtemp(prefix="batch-memory-"))
+        try:
+            input_dir, output_dir = make_batch(root, n_images, args.done_fraction)
+            for mode in ("gather", "streaming"):
+                result = profile(mode, input_dir, output_dir, args.concurrency)
+                report["runs"].append({"images": n_images, "mode": mode, **result})
+                print(f"{n_images:>8}  {mode:<10} {result['processed']:>9} {result['peak_mib']:>9.2f} "
+                      f"{result['first_start_ms']:>9.1f}ms {result['total_s']:>6.2f}s")
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+    streaming = [r["peak_mib"] for r in report["runs"] if r["mode"] == "streaming"]
+    if len(streaming) > 1:
+        print(f"[INFO] streaming peak, largest / smallest batch: {streaming[-1] / max(streaming[0], 1e-9):.2f}x")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"[OK] Report written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
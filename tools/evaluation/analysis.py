@@ -4,13 +4,19 @@ Generate metrics statistics from widget evaluation results.
 Creates metrics_stats.json and metrics.xlsx summary files.
 """
 
+import os
 import json
 import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Iterable, Iterator, Optional, Tuple
 import pandas as pd
 import numpy as np
 
+from result_store import ResultStore
+from streaming_stats import MetricSummary
+
 
 # Metric categories (12 metrics)
 METRIC_CATEGORIES = {
@@ -38,36 +44,91 @@ def parse_args():
         required=True,
         help="Path to output directory for statistics files"
     )
+    parser.add_argument(
+        "--results-store",
+        type=str,
+        default=None,
+        help="Read results from this SQLite result store (eval.py --result_store) "
+             "instead of evaluation.json files"
+    )
+    parser.add_argument(
+        "--summary-only",
+        action="store_true",
+        help="Stream results into bounded-memory summaries instead of building a per-image "
+             "table (quantiles are t-digest estimates, exact for small runs)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Threads reading evaluation.json files (default: 8)"
+    )
     return parser.parse_args()
 
 
-def load_evaluation_data(results_dir: Path) -> Dict[str, Dict]:
-    """Load all evaluation.json files from result directories.
+def iter_evaluation_files(results_dir: Path) -> Iterator[Tuple[str, Path]]:
+    """Yield (image_id, evaluation.json path) in image id order.
 
     Supports two directory structures:
       - image_{num}/evaluation.json  (old structure)
       - {num}/evaluation.json        (new structure)
     """
-    evaluation_data = {}
+    with os.scandir(results_dir) as entries:
+        # Check if directory name matches old pattern (image_{num}) or new pattern (just numbers)
+        names = sorted(entry.name for entry in entries
+                       if entry.is_dir() and (entry.name.startswith("image_") or entry.name.isdigit()))
 
-    for image_dir in sorted(results_dir.iterdir()):
-        if not image_dir.is_dir():
-            continue
+    for name in names:
+        eval_file = results_dir / name / "evaluation.json"
+        if eval_file.exists():
+            yield name, eval_file
 
-        # Check if directory name matches old pattern (image_{num}) or new pattern (just numbers)
-        dir_name = image_dir.name
-        if not (dir_name.startswith("image_") or dir_name.isdigit()):
-            continue
 
-        eval_file = image_dir / "evaluation.json"
-        if not eval_file.exists():
-            continue
+def _read_json(path: Path) -> Dict:
+    with open(path, 'r') as f:
+        return json.load(f)
+
 
-        with open(eval_file, 'r') as f:
-            data = json.load(f)
-            evaluation_data[image_dir.name] = data
+def iter_evaluation_data(results_dir: Path, store_path: Optional[Path] = None,
+                         workers: int = 8) -> Iterator[Tuple[str, Dict]]:
+    """Yield (image_id, evaluation result) in image id order.
 
-    print(f"Loaded {len(evaluation_data)} evaluation files")
+    evaluation.json files are read by a pool of threads with a bounded
+    window of in-flight reads, so memory stays constant however many
+    results there are. If store_path is given, results are read from that
+    result store instead.
+    """
+    if store_path is not None:
+        with ResultStore(store_path) as store:
+            yield from store.iter_results()
+        return
+
+    files = iter_evaluation_files(results_dir)
+    if workers <= 1:
+        for image_id, eval_file in files:
+            yield image_id, _read_json(eval_file)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        window = deque()
+        for image_id, eval_file in files:
+            window.append((image_id, pool.submit(_read_json, eval_file)))
+            if len(window) >= workers * 4:
+                image_id, future = window.popleft()
+                yield image_id, future.result()
+        while window:
+            image_id, future = window.popleft()
+            yield image_id, future.result()
+
+
+def load_evaluation_data(results_dir: Path, store_path: Optional[Path] = None,
+                         workers: int = 8) -> Dict[str, Dict]:
+    """Load all evaluation.json files (or result store rows) into a dict keyed by image id."""
+    evaluation_data = dict(iter_evaluation_data(results_dir, store_path, workers))
+    if store_path is not None:
+        print(f"Loaded {len(evaluation_data)} results from {store_path}")
+    else:
+        print(f"Loaded {len(evaluation_data)} evaluation files")
     return evaluation_data
 
 
@@ -97,25 +158,15 @@ def calculate_statistics(evaluation_data: Dict[str, Dict]) -> pd.DataFrame:
     return df
 
 
-def save_statistics_files(df: pd.DataFrame, output_dir: Path):
-    """Save metrics_stats.json and metrics.xlsx files."""
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    print("\n" + "="*80)
-    print("Saving statistics files...")
-    print("="*80)
-
-    # Get all metric names from METRIC_CATEGORIES
-    all_metrics = []
-    for metrics_list in METRIC_CATEGORIES.values():
-        all_metrics.extend(metrics_list)
+def all_metric_names():
+    """All metric names from METRIC_CATEGORIES, in category order."""
+    return [metric for metrics_list in METRIC_CATEGORIES.values() for metric in metrics_list]
 
-    # 1. Save metrics_stats.json
-    stats_file = output_dir / "metrics_stats.json"
 
-    # Calculate quartiles for each metric
+def summarize_dataframe(df: pd.DataFrame) -> Dict[str, Dict[str, float]]:
+    """Exact per-metric quartiles, min/max, mean and std of a per-image table."""
     metric_statistics = {}
-    for metric_name in all_metrics:
+    for metric_name in all_metric_names():
         values = df[metric_name].values
         metric_statistics[metric_name] = {
             "q1": float(np.percentile(values, 25)),
@@ -126,23 +177,46 @@ def save_statistics_files(df: pd.DataFrame, output_dir: Path):
             "mean": float(values.mean()),
             "std": float(values.std()),
         }
+    return metric_statistics
 
-    stats_json = {
-        "total_images": len(df),
-        "metrics": metric_statistics
-    }
 
-    with open(stats_file, 'w') as f:
-        json.dump(stats_json, f, indent=2)
+def summarize_stream(records: Iterable[Tuple[str, Dict]],
+                     chunk_size: int = 1024) -> Tuple[int, Dict[str, Dict[str, float]]]:
+    """
+    Per-metric statistics of (image_id, evaluation result) records in one pass.
 
-    print(f"✓ Saved metrics statistics to: {stats_file}")
+    Values are folded into the summaries in chunks of chunk_size records, so
+    memory is bounded by the chunk and t-digest sizes, not the number of
+    records. Returns (number of records, statistics in the
+    summarize_dataframe format).
+    """
+    metric_names = all_metric_names()
+    summaries = {metric_name: MetricSummary() for metric_name in metric_names}
+    chunk = {metric_name: [] for metric_name in metric_names}
+    total = 0
+
+    def flush():
+        for metric_name, values in chunk.items():
+            summaries[metric_name].add_many(values)
+            values.clear()
+
+    for _, eval_data in records:
+        total += 1
+        for metric_name, value in extract_metrics(eval_data).items():
+            chunk[metric_name].append(value)
+        if total % chunk_size == 0:
+            flush()
+    flush()
+    return total, {metric_name: summary.summary() for metric_name, summary in summaries.items()}
 
-    # 2. Save metrics.xlsx
-    metrics_xlsx = output_dir / "metrics.xlsx"
 
-    # Extract run name from output directory parent
-    run_name = output_dir.parent.name
+def save_statistics_files(df: pd.DataFrame, output_dir: Path):
+    """Save metrics_stats.json and metrics.xlsx files."""
+    save_summary_files(len(df), summarize_dataframe(df), output_dir)
+
 
+def summary_table_rows(run_name: str, metric_statistics: Dict[str, Dict[str, float]]):
+    """Two header rows and one data row (metric means) of the metrics.xlsx table."""
     # Prepare data rows for Excel with two-level header
     header_row1 = [None]  # First column for run name
     header_row2 = [None]  # Sub-headers
@@ -154,7 +228,7 @@ def save_statistics_files(df: pd.DataFrame, output_dir: Path):
     header_row1.extend([None] * (len(layout_metrics) - 1))
     for metric in layout_metrics:
         header_row2.append(metric)
-        data_row.append(round(df[metric].mean(), 3))
+        data_row.append(round(metric_statistics[metric]["mean"], 3))
 
     # LegibilityScore columns (3 metrics)
     legibility_metrics = ["TextJaccard", "ContrastDiff", "ContrastLocalDiff"]
@@ -162,7 +236,7 @@ def save_statistics_files(df: pd.DataFrame, output_dir: Path):
     header_row1.extend([None] * (len(legibility_metrics) - 1))
     for metric in legibility_metrics:
         header_row2.append(metric)
-        data_row.append(round(df[metric].mean(), 3))
+        data_row.append(round(metric_statistics[metric]["mean"], 3))
 
     # StyleScore columns (3 metrics)
     style_metrics = ["PaletteDistance", "Vibrancy", "PolarityConsistency"]
@@ -170,7 +244,7 @@ def save_statistics_files(df: pd.DataFrame, output_dir: Path):
     header_row1.extend([None] * (len(style_metrics) - 1))
     for metric in style_metrics:
         header_row2.append(metric)
-        data_row.append(round(df[metric].mean(), 3))
+        data_row.append(round(metric_statistics[metric]["mean"], 3))
 
     # PerceptualScore columns (2 metrics)
     perceptual_metrics = ["ssim", "lp"]
@@ -178,12 +252,47 @@ def save_statistics_files(df: pd.DataFrame, output_dir: Path):
     header_row1.extend([None] * (len(perceptual_metrics) - 1))
     for metric in perceptual_metrics:
         header_row2.append(metric)
-        data_row.append(round(df[metric].mean(), 3))
+        data_row.append(round(metric_statistics[metric]["mean"], 3))
 
     # Geometry (1 metric)
     header_row1.append('Geometry')
     header_row2.append(None)
-    data_row.append(round(df['geo_score'].mean(), 3))
+    data_row.append(round(metric_statistics['geo_score']['mean'], 3))
+
+    return header_row1, header_row2, data_row
+
+
+def save_summary_files(total_images: int, metric_statistics: Dict[str, Dict[str, float]],
+                       output_dir: Path, quantile_method: Optional[str] = None):
+    """Save metrics_stats.json and metrics.xlsx files from per-metric statistics."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    print("\n" + "="*80)
+    print("Saving statistics files...")
+    print("="*80)
+
+    # 1. Save metrics_stats.json
+    stats_file = output_dir / "metrics_stats.json"
+
+    stats_json = {
+        "total_images": total_images,
+        "metrics": metric_statistics
+    }
+    if quantile_method is not None:
+        stats_json["quantile_method"] = quantile_method
+
+    with open(stats_file, 'w') as f:
+        json.dump(stats_json, f, indent=2)
+
+    print(f"✓ Saved metrics statistics to: {stats_file}")
+
+    # 2. Save metrics.xlsx
+    metrics_xlsx = output_dir / "metrics.xlsx"
+
+    # Extract run name from output directory parent
+    run_name = output_dir.parent.name
+
+    header_row1, header_row2, data_row = summary_table_rows(run_name, metric_statistics)
 
     # Create DataFrame with all three rows
     metrics_df = pd.DataFrame([header_row1, header_row2, data_row])
@@ -209,30 +318,43 @@ def main():
     print("Metrics Statistics Generation")
     print("="*80)
     print(f"Results Directory: {results_dir}")
+    if args.results_store:
+        print(f"Results Store:     {args.results_store}")
     print(f"Output Directory:  {output_dir}")
     print("="*80)
 
     # Load evaluation data
-    evaluation_data = load_evaluation_data(results_dir)
-
-    if not evaluation_data:
-        print("❌ Error: No evaluation.json files found")
+    store_path = Path(args.results_store) if args.results_store else None
+    if store_path is not None and not store_path.exists():
+        print(f"❌ Error: Results store does not exist: {store_path}")
+        return 1
+    if args.summary_only:
+        # Stream results into per-metric summaries; no per-image rows are kept
+        total_images, metric_statistics = summarize_stream(
+            iter_evaluation_data(results_dir, store_path, args.workers))
+        print(f"Summarized {total_images} results (streaming)")
+    else:
+        evaluation_data = load_evaluation_data(results_dir, store_path, args.workers)
+        # Calculate statistics
+        df = calculate_statistics(evaluation_data)
+        total_images, metric_statistics = len(df), summarize_dataframe(df)
+
+    if total_images == 0:
+        print("❌ Error: No evaluation results found")
         return 1
-
-    # Calculate statistics
-    df = calculate_statistics(evaluation_data)
 
     # Save output files
-    save_statistics_files(df, output_dir)
+    save_summary_files(total_images, metric_statistics, output_dir,
+                       quantile_method="tdigest" if args.summary_only else None)
 
     # Print summary
     print("\n📊 Summary Statistics:")
-    print(f"  Total images analyzed: {len(df)}")
+    print(f"  Total images analyzed: {total_images}")
     print(f"\n  Average Metrics:")
     for category, metrics in METRIC_CATEGORIES.items():
         print(f"    {category}:")
         for metric in metrics:
-            mean_val = df[metric].mean()
+            mean_val = metric_statistics[metric]["mean"]
             print(f"      {metric:20s}: {mean_val:6.2f}")
 
     print("\n✅ Statistics generation complete!")
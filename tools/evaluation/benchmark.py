@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Comparative benchmark of several prediction runs against one GT set.
+
+Each GT image is decoded once into a shared-memory block and its GT-side
+features are computed once; a worker scores the predictions of all runs
+for that GT together (OCR and LPIPS batched across the runs), so GT work
+scales with the number of GT images rather than GT images x runs.
+
+Writes each run's evaluation.json files, evaluation.xlsx averages and
+.analysis statistics (as main.py does) plus one comparative report:
+    {output_dir}/benchmark_report.json
+    {output_dir}/benchmark_report.xlsx
+
+Usage:
+    python benchmark.py --gt_dir GT --runs results/run-a results/run-b --workers 8
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from eval import (METRIC_FAMILIES, average_metrics, blas_thread_budget, compute_metrics_for_contexts,
+                  configure_models, convert_to_serializable, extract_gt_features,
+                  find_prediction, finalize_pair, save_average_table)
+from widget_quality.context import EvalContext, ImageContext
+from widget_quality.feature_cache import GTFeatureCache
+from widget_quality.utils import load_image
+from analysis import (METRIC_CATEGORIES, calculate_statistics, save_summary_files,
+                      summarize_dataframe, summary_table_rows)
+
+# Per-process state set up by _init_worker
+_worker_state = {"shm": None, "feature_cache": None}
+
+
+# ==========================================================
+#  Shared GT images
+# ==========================================================
+
+class SharedGTImages:
+    """
+    GT images decoded once into a single shared-memory block.
+
+    Images are stored as uint8 RGB; workers attach to the block by name and
+    read zero-copy views, converting them to the float images load_image
+    returns.
+
+    Example:
+        >>> with SharedGTImages(gt_paths) as gt_images:
+        ...     slot = gt_images.slots[gt_paths[0]]
+        ...     img = view_gt_image(gt_images.shm.buf, slot)
+    """
+
+    def __init__(self, paths):
+        # Header-only opens give the sizes needed to lay out the block
+        shapes = {}
+        for path in paths:
+            with Image.open(path) as img:
+                shapes[path] = (img.height, img.width, 3)
+
+        self.slots = {}
+        offset = 0
+        for path in paths:
+            self.slots[path] = (offset, shapes[path])
+            offset += int(np.prod(shapes[path]))
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for path in paths:
+            with Image.open(path) as img:
+                pixels = np.asarray(img.convert("RGB"))
+            start, shape = self.slots[path]
+            np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf, offset=start)[:] = pixels
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def view_gt_image(buf, slot):
+    """Float RGB image in [0, 1] (as load_image) of a SharedGTImages slot."""
+    offset, shape = slot
+    return np.ndarray(shape, dtype=np.uint8, buffer=buf, offset=offset) / 255.0
+
+
+# ==========================================================
+#  Worker processes
+# ==========================================================
+
+def _init_worker(shm_name, use_cuda, blas_threads, cache_dir, channels_last):
+    """Per-process setup: attach the GT block, thread budget, models and feature cache."""
+    if blas_threads:
+        import cv2
+        import torch
+        cv2.setNumThreads(blas_threads)
+        torch.set_num_threads(blas_threads)
+
+    configure_models(use_cuda, channels_last)
+    _worker_state["shm"] = shared_memory.SharedMemory(name=shm_name)
+    _worker_state["feature_cache"] = GTFeatureCache(cache_dir) if cache_dir else None
+
+
+def _evaluate_gt(task):
+    """
+    Score every run's prediction for one GT image.
+
+    task is (gt_file, gt_path, slot, [(run_index, pred_path), ...]). The GT
+    ImageContext and GT features are shared by all runs' EvalContexts; if
+    the batch fails, runs are retried one by one so the error is attributed
+    to its prediction. Returns (gt_file, [(run_index, raw_metrics, error_message)]).
+    """
+    gt_file, gt_path, slot, preds = task
+    num = gt_file.replace("gt_", "").replace(".png", "")
+
+    start = time.perf_counter()
+    gt = ImageContext(view_gt_image(_worker_state["shm"].buf, slot))
+    gt_load_seconds = time.perf_counter() - start
+
+    try:
+        start = time.perf_counter()
+        gt_features = extract_gt_features(gt_path, gt, METRIC_FAMILIES, _worker_state["feature_cache"])
+        gt_feature_seconds = time.perf_counter() - start
+    except Exception as e:
+        return gt_file, [(run_index, None, f"Error evaluating {num}: {str(e)}") for run_index, _ in preds]
+
+    outcomes = []
+    loaded = []
+    for run_index, pred_path in preds:
+        try:
+            start = time.perf_counter()
+            ctx = EvalContext(gt, load_image(pred_path))
+            ctx.gen  # resize now so it is timed as part of loading
+            ctx.add_time("load", time.perf_counter() - start)
+            loaded.append((run_index, ctx))
+        except Exception as e:
+            outcomes.append((run_index, None, f"Error evaluating {num}: {str(e)}"))
+
+    # GT decoding and featurization happen once; each run is charged its share
+    for _, ctx in loaded:
+        ctx.add_time("load", gt_load_seconds / len(preds))
+        ctx.add_time("gt_features", gt_feature_seconds / len(preds))
+
+    try:
+        raws = compute_metrics_for_contexts([ctx for _, ctx in loaded], METRIC_FAMILIES,
+                                            [gt_features] * len(loaded))
+        outcomes.extend((run_index, raw, None) for (run_index, _), raw in zip(loaded, raws))
+    except Exception:
+        for run_index, ctx in loaded:
+            try:
+                raw = compute_metrics_for_contexts([ctx], METRIC_FAMILIES, [gt_features])[0]
+                outcomes.append((run_index, raw, None))
+            except Exception as e:
+                outcomes.append((run_index, None, f"Error evaluating {num}: {str(e)}"))
+
+    return gt_file, outcomes
+
+
+# ==========================================================
+#  Benchmark
+# ==========================================================
+
+def _run_names(run_dirs):
+    """Folder names of the runs, or full paths if folder names collide."""
+    names = [Path(run_dir).name for run_dir in run_dirs]
+    if len(set(names)) < len(names):
+        names = [str(run_dir) for run_dir in run_dirs]
+    return names
+
+
+def _clean_run(run_dir):
+    """Remove evaluation outputs of an earlier evaluation of a run (as eval.py does)."""
+    excel_path = os.path.join(run_dir, "evaluation.xlsx")
+    if os.path.exists(excel_path):
+        os.remove(excel_path)
+    for item in os.listdir(run_dir):
+        eval_file = os.path.join(run_dir, item, "evaluation.json")
+        if item.startswith("image_") and os.path.exists(eval_file):
+            os.remove(eval_file)
+
+
+def run_benchmark(gt_dir, run_dirs, num_workers=4, feature_cache=None, use_cuda=False,
+                  blas_threads=None, channels_last=False):
+    """
+    Evaluate several prediction runs against one GT set in a single worker pass.
+
+    Args:
+        gt_dir: Path to ground truth directory (GT/gt_{num}.png)
+        run_dirs: Prediction directories, one per run (same layout as eval.py)
+        num_workers: Number of worker processes (default: 4)
+        feature_cache: Optional GTFeatureCache for GT-side features
+        use_cuda: Load models on CUDA in worker processes
+        blas_threads: BLAS/OpenMP threads per worker process
+            (default: CPU count / num_workers)
+        channels_last: Run CPU LPIPS in channels-last memory format
+
+    Returns:
+        {run_dir: {"counts": {...}, "results": {pair_id: evaluation result}}}
+    """
+    gt_files = sorted(f for f in os.listdir(gt_dir) if f.startswith("gt_") and f.endswith(".png"))
+    names = _run_names(run_dirs)
+    runs = {run_dir: {"counts": {"evaluated": 0, "missing_pred": 0, "errors": 0}, "results": {}}
+            for run_dir in run_dirs}
+
+    print("🧹 Cleaning up old evaluation files...")
+    for run_dir in run_dirs:
+        _clean_run(run_dir)
+
+    # --- Resolve predictions of every run for each GT ---
+    tasks = []
+    folders = {}
+    for gt_file in gt_files:
+        num = gt_file.replace("gt_", "").replace(".png", "")
+        preds = []
+        for run_index, run_dir in enumerate(run_dirs):
+            pred_path, image_folder = find_prediction(num, run_dir)
+            if pred_path is None:
+                runs[run_dir]["counts"]["missing_pred"] += 1
+                continue
+            preds.append((run_index, pred_path))
+            folders[(gt_file, run_index)] = image_folder
+        if preds:
+            tasks.append((gt_file, os.path.join(gt_dir, gt_file), preds))
+
+    print(f"📂 Found {len(gt_files)} ground truth images in '{gt_dir}', {len(run_dirs)} runs, "
+          f"{sum(len(preds) for _, _, preds in tasks)} pairs.")
+    if not tasks:
+        return runs
+
+    start = time.perf_counter()
+    gt_images = SharedGTImages([gt_path for _, gt_path, _ in tasks])
+    print(f"🖼️  Decoded {len(tasks)} GT images into shared memory "
+          f"({gt_images.shm.size / 1e6:.1f} MB) in {time.perf_counter() - start:.1f}s")
+
+    blas_threads = blas_threads or max(1, (os.cpu_count() or 1) // num_workers)
+    print(f"🚀 Using {num_workers} worker processes ({blas_threads} BLAS threads each).\n")
+
+    cache_dir = feature_cache.cache_dir if feature_cache is not None else None
+    done = 0
+    try:
+        with blas_thread_budget(blas_threads), ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(gt_images.shm.name, use_cuda, blas_threads, cache_dir, channels_last),
+        ) as pool:
+            futures = [pool.submit(_evaluate_gt, (gt_file, gt_path, gt_images.slots[gt_path], preds))
+                       for gt_file, gt_path, preds in tasks]
+            for future in as_completed(futures):
+                gt_file, outcomes = future.result()
+                num = gt_file.replace("gt_", "").replace(".png", "")
+                done += 1
+                marks = []
+                for run_index, raw, error_msg in sorted(outcomes, key=lambda o: o[0]):
+                    run = runs[run_dirs[run_index]]
+                    image_folder = folders[(gt_file, run_index)]
+                    if error_msg is None:
+                        try:
+                            result = finalize_pair(num, image_folder, raw)
+                        except Exception as e:
+                            error_msg = f"Error evaluating {num}: {str(e)}"
+                    if error_msg is None:
+                        run["counts"]["evaluated"] += 1
+                        run["results"][os.path.basename(image_folder)] = convert_to_serializable(result)
+                        marks.append("✅")
+                    else:
+                        run["counts"]["errors"] += 1
+                        print(f"   ❌ {names[run_index]}: {error_msg}")
+                        marks.append("❌")
+                print(f"[{done}/{len(tasks)}] {num}: {''.join(marks)}")
+    finally:
+        gt_images.close()
+
+    return runs
+
+
+def write_report(gt_dir, run_dirs, runs, output_dir, wall_seconds):
+    """
+    Write per-run evaluation.xlsx averages, .analysis statistics and the comparative report.
+    Returns the report dict.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    names = _run_names(run_dirs)
+
+    report_runs = []
+    table_rows = []
+    header_rows = None
+    for name, run_dir in zip(names, run_dirs):
+        run = runs[run_dir]
+        entry = {"name": name, "pred_dir": str(run_dir), **run["counts"]}
+        if run["results"]:
+            excel_path = save_average_table(run_dir, average_metrics(list(run["results"].values())))
+            print(f"✓ Saved average metrics to: {excel_path}")
+            df = calculate_statistics(run["results"])
+            metric_statistics = summarize_dataframe(df)
+            save_summary_files(len(df), metric_statistics, Path(run_dir) / ".analysis")
+
+            timings = [result.get("Timings", {}) for result in run["results"].values()]
+            stages = sorted({stage for t in timings for stage in t})
+            entry["metrics"] = metric_statistics
+            entry["mean_seconds_per_pair"] = {
+                stage: round(float(np.mean([t.get(stage, 0.0) for t in timings])), 4) for stage in stages
+            }
+
+            header_row1, header_row2, data_row = summary_table_rows(name, metric_statistics)
+            header_rows = header_rows or [header_row1, header_row2]
+            table_rows.append(data_row)
+        report_runs.append(entry)
+
+    report = {
+        "gt_dir": str(gt_dir),
+        "total_gt": len([f for f in os.listdir(gt_dir) if f.startswith("gt_") and f.endswith(".png")]),
+        "wall_seconds": round(wall_seconds, 2),
+        "runs": report_runs,
+    }
+
+    report_json = output_dir / "benchmark_report.json"
+    with open(report_json, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"✓ Saved comparative report to: {report_json}")
+
+    if table_rows:
+        report_xlsx = output_dir / "benchmark_report.xlsx"
+        pd.DataFrame(header_rows + table_rows).to_excel(report_xlsx, index=False, header=False)
+        print(f"✓ Saved comparative table to: {report_xlsx}")
+
+    return report
+
+
+def print_comparison(report):
+    """Print one line of metric means per run."""
+    metric_names = [metric for metrics in METRIC_CATEGORIES.values() for metric in metrics]
+    rows = {}
+    for entry in report["runs"]:
+        if "metrics" in entry:
+            rows[entry["name"]] = {metric: entry["metrics"][metric]["mean"] for metric in metric_names}
+        else:
+            rows[entry["name"]] = {metric: float("nan") for metric in metric_names}
+    table = pd.DataFrame.from_dict(rows, orient="index", columns=metric_names)
+    table.insert(0, "evaluated", [entry["evaluated"] for entry in report["runs"]])
+
+    print("\n📈 Mean metrics per run:")
+    with pd.option_context("display.width", 250, "display.max_columns", None, "display.precision", 3):
+        print(table.to_string())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Evaluate several prediction runs against one GT set and write a comparative report.")
+    parser.add_argument('--gt_dir', type=str, required=True,
+                        help='Path to ground truth directory (required)')
+    parser.add_argument('--runs', type=str, nargs='+', required=True,
+                        help='Prediction directories to compare (missing ones are skipped)')
+    parser.add_argument('--output_dir', type=str, default="benchmark_report",
+                        help='Directory for the comparative report (default: benchmark_report)')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Number of worker processes (default: 4)')
+    parser.add_argument('--blas_threads', type=int, default=None,
+                        help='BLAS/OpenMP threads per worker process (default: CPU count / workers)')
+    parser.add_argument('--cuda', action='store_true',
+                        help='Use CUDA/GPU for computation (default: CPU)')
+    parser.add_argument('--channels_last', action='store_true',
+                        help='Run CPU LPIPS in channels-last memory format (faster on recent x86 CPUs)')
+    parser.add_argument('--feature_cache', type=str, default=None,
+                        help='Directory for cached GT features (default: {gt_dir}/.feature_cache)')
+    parser.add_argument('--no_feature_cache', action='store_true',
+                        help='Compute GT features in memory only (still once per GT)')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.gt_dir):
+        print(f"❌ Error: GT directory does not exist: {args.gt_dir}")
+        sys.exit(1)
+
+    run_dirs = []
+    for run_dir in args.runs:
+        if os.path.isdir(run_dir):
+            run_dirs.append(run_dir)
+        else:
+            print(f"⚠️  Warning: Directory not found, skipping: {run_dir}")
+    if not run_dirs:
+        print("❌ Error: No prediction directories found")
+        sys.exit(1)
+
+    feature_cache = None
+    if not args.no_feature_cache:
+        cache_dir = args.feature_cache or os.path.join(args.gt_dir, ".feature_cache")
+        feature_cache = GTFeatureCache(cache_dir)
+        print(f"🗄️  GT feature cache: {cache_dir}")
+
+    start = time.perf_counter()
+    runs = run_benchmark(args.gt_dir, run_dirs, num_workers=args.workers, feature_cache=feature_cache,
+                         use_cuda=args.cuda, blas_threads=args.blas_threads,
+                         channels_last=args.channels_last)
+    wall_seconds = time.perf_counter() - start
+
+    print("\n📊 Summary:")
+    for name, run_dir in zip(_run_names(run_dirs), run_dirs):
+        counts = runs[run_dir]["counts"]
+        print(f"  {name}: {counts['evaluated']} evaluated, {counts['missing_pred']} missing, "
+              f"{counts['errors']} errors")
+    print(f"  Wall time: {wall_seconds:.1f}s")
+
+    report = write_report(args.gt_dir, run_dirs, runs, Path(args.output_dir), wall_seconds)
+    print_comparison(report)
+    print("\n✅ Benchmark complete!")
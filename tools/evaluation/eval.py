@@ -1,18 +1,52 @@
 import os
 import sys
 import json
+import time
 import argparse
+import multiprocessing as mp
+from contextlib import contextmanager
 import numpy as np
 import pandas as pd
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from threading import Lock
-from widget_quality.utils import load_image, resize_to_match
-from widget_quality.perceptual import compute_perceptual, set_device
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from widget_quality.utils import load_image
+from widget_quality import perceptual, layout, legibility, style, geometry, composite
+from widget_quality.perceptual import compute_perceptual_batch, set_device
 from widget_quality.layout import compute_layout
-from widget_quality.legibility import compute_legibility
+from widget_quality.legibility import compute_legibility_batch, set_ocr_device, ocr_config_key
 from widget_quality.style import compute_style
 from widget_quality.geometry import compute_aspect_dimensionality_fidelity
 from widget_quality.composite import composite_score
+from widget_quality.feature_cache import GTFeatureCache, FEATURE_EXTRACTORS, file_sha256
+from widget_quality.context import EvalContext
+from result_store import ResultStore
+
+# Metric families computed for every pair
+METRIC_FAMILIES = ("geometry", "perceptual", "layout", "legibility", "style")
+
+# Task groups used with split_metrics=True; geometry is cheap and rides along with perceptual
+FAMILY_GROUPS = (("geometry", "perceptual"), ("layout",), ("legibility",), ("style",))
+
+# Thread-count variables honored by OpenBLAS/OpenMP/MKL/numexpr when they load
+BLAS_ENV_VARS = ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+# Version of every metric module; stored results computed with other versions are recomputed
+METRIC_VERSION = ",".join(
+    f"{module.__name__.rsplit('.', 1)[-1]}={module.METRIC_VERSION}"
+    for module in (geometry, perceptual, layout, legibility, style, composite)
+)
+
+
+def run_metric_version(use_cuda=False):
+    """
+    METRIC_VERSION plus the OCR configuration of a run (as set by configure_models).
+    Legibility scores differ between OCR devices, so stored results are only
+    reused by runs with the same configuration.
+    """
+    return f"{METRIC_VERSION},ocr={ocr_config_key(use_cuda=use_cuda, quantize=True)}"
+
+
+# Per-process state set up by _init_worker
+_worker_state = {"feature_cache": None}
 
 
 def convert_to_serializable(obj):
@@ -33,79 +67,395 @@ def convert_to_serializable(obj):
         return obj
 
 
-def evaluate_single_pair(gt_file, gt_dir, pred_dir):
+def find_prediction(num, pred_dir):
+    """
+    Locate the prediction image for GT number `num`.
+    Returns (pred_path, image_folder), or (None, None) if missing.
+    """
+    # Try different prediction file locations in order of priority
+    possible_paths = [
+        # Old structure: image_{num}/output.png
+        (os.path.join(pred_dir, f"image_{num}"), "output.png"),
+        # New structure: {num}/pred.png
+        (os.path.join(pred_dir, num), "pred.png"),
+        # New structure alternative: {num}/output.png
+        (os.path.join(pred_dir, num), "output.png"),
+    ]
+
+    for folder, filename in possible_paths:
+        candidate_path = os.path.join(folder, filename)
+        if os.path.exists(candidate_path):
+            return candidate_path, folder
+
+    return None, None
+
+
+def compute_metrics_batch(items, families=METRIC_FAMILIES, feature_cache=None):
+    """
+    Compute the raw metrics of the given families for a list of
+    (gt_path, pred_path) pairs. OCR and LPIPS run batched across the pairs.
+
+    Each pair gets an EvalContext, so resizing and derived representations
+    (uint8/grayscale conversions, edge maps, masks, HSV) are computed once
+    and shared by all families. Returns one {family: raw_metrics} dict per
+    pair, plus "timings": {stage: seconds}; batched stages are split evenly
+    across the pairs of the batch.
+    """
+    # Load pairs
+    contexts = []
+    for gt_path, pred_path in items:
+        start = time.perf_counter()
+        ctx = EvalContext(load_image(gt_path), load_image(pred_path))
+        ctx.gen  # resize now so it is timed as part of loading
+        ctx.add_time("load", time.perf_counter() - start)
+        contexts.append(ctx)
+
+    # --- GT-side features (cached across runs) ---
+    gt_features = [{} for _ in items]
+    if feature_cache is not None:
+        for i, ((gt_path, _), ctx) in enumerate(zip(items, contexts)):
+            with ctx.timed("gt_features"):
+                gt_features[i] = extract_gt_features(gt_path, ctx.gt, families, feature_cache)
+
+    return compute_metrics_for_contexts(contexts, families, gt_features)
+
+
+def extract_gt_features(gt_path, gt, families=METRIC_FAMILIES, feature_cache=None):
+    """
+    GT-side features of the given families for one GT image (or ImageContext).
+    Read through feature_cache if given, otherwise computed directly.
+    Returns {family: features} for the families that have GT features.
+    """
+    cached_families = [f for f in families if f in FEATURE_EXTRACTORS]
+    if not cached_families:
+        return {}
+    if feature_cache is not None:
+        return feature_cache.get(gt_path, gt, cached_families)
+    return {family: FEATURE_EXTRACTORS[family][1](gt) for family in cached_families}
+
+
+def compute_metrics_for_contexts(contexts, families=METRIC_FAMILIES, gt_features=None):
+    """
+    Compute the raw metrics of the given families for loaded EvalContexts.
+
+    gt_features optionally holds one {family: features} dict per context;
+    GT features that are missing are computed by the metric functions.
+    Returns raw metrics in the compute_metrics_batch format.
+    """
+    if gt_features is None:
+        gt_features = [{} for _ in contexts]
+
+    def timed_batch(stage, fn):
+        start = time.perf_counter()
+        results = fn()
+        share = (time.perf_counter() - start) / len(contexts)
+        for ctx in contexts:
+            ctx.add_time(stage, share)
+        return results
+
+    # --- Compute metrics ---
+    raws = [{} for _ in contexts]
+    if "geometry" in families:
+        for raw, ctx in zip(raws, contexts):
+            with ctx.timed("geometry"):
+                raw["geometry"] = compute_aspect_dimensionality_fidelity(ctx.gt.image, ctx.pred.image)
+    if "perceptual" in families:
+        perceptual.get_lpips()  # one-off model load, not a per-pair cost
+        results = timed_batch("perceptual", lambda: compute_perceptual_batch(
+            [(ctx.gt.image, ctx.gen.image) for ctx in contexts]))
+        for raw, result in zip(raws, results):
+            raw["perceptual"] = result
+    if "layout" in families:
+        for raw, ctx, features in zip(raws, contexts, gt_features):
+            with ctx.timed("layout"):
+                raw["layout"] = compute_layout(ctx.gt, ctx.gen, features.get("layout"))
+    if "legibility" in families:
+        legibility.get_reader()
+        results = timed_batch("legibility", lambda: compute_legibility_batch(
+            [(ctx.gt, ctx.gen) for ctx in contexts], [f.get("legibility") for f in gt_features]))
+        for raw, result in zip(raws, results):
+            raw["legibility"] = result
+    if "style" in families:
+        for raw, ctx, features in zip(raws, contexts, gt_features):
+            with ctx.timed("style"):
+                raw["style"] = compute_style(ctx.gt, ctx.gen, features.get("style"))
+
+    for raw, ctx in zip(raws, contexts):
+        raw["timings"] = ctx.timings
+    return raws
+
+
+def compute_metrics(gt_path, pred_path, families=METRIC_FAMILIES, feature_cache=None):
+    """
+    Compute the raw metrics of the given families for one pair.
+    Returns {family: raw_metrics}.
+    """
+    return compute_metrics_batch([(gt_path, pred_path)], families, feature_cache)[0]
+
+
+def finalize_pair(num, image_folder, raw, write_json=True):
+    """Combine raw metrics into the composite result and save evaluation.json."""
+    result = composite_score(raw["geometry"], raw["perceptual"], raw["layout"],
+                             raw["legibility"], raw["style"])
+    result["id"] = num
+    # Per-stage seconds for this pair, to track evaluation throughput
+    result["Timings"] = {stage: round(seconds, 4) for stage, seconds in raw.get("timings", {}).items()}
+
+    # Save evaluation.json in the image folder
+    if write_json:
+        evaluation_path = os.path.join(image_folder, "evaluation.json")
+        with open(evaluation_path, 'w') as f:
+            json.dump(convert_to_serializable(result), f, indent=2)
+
+    return result
+
+
+def evaluate_single_pair(gt_file, gt_dir, pred_dir, feature_cache=None):
     """
     Evaluate a single GT-prediction pair.
     Supports two directory structures:
       - image_{num}/output.png  (old structure)
       - {num}/pred.png          (new structure)
+    If a GTFeatureCache is given, GT-side layout/legibility/style features
+    are read from it instead of being recomputed.
     Returns (success, result_dict, error_message)
     """
+    num = gt_file.replace("gt_", "").replace(".png", "")
     try:
-        num = gt_file.replace("gt_", "").replace(".png", "")
-        gt_path = os.path.join(gt_dir, gt_file)
-
-        # Try different prediction file locations in order of priority
-        possible_paths = [
-            # Old structure: image_{num}/output.png
-            (os.path.join(pred_dir, f"image_{num}"), "output.png"),
-            # New structure: {num}/pred.png
-            (os.path.join(pred_dir, num), "pred.png"),
-            # New structure alternative: {num}/output.png
-            (os.path.join(pred_dir, num), "output.png"),
-        ]
-
-        pred_path = None
-        image_folder = None
-
-        for folder, filename in possible_paths:
-            candidate_path = os.path.join(folder, filename)
-            if os.path.exists(candidate_path):
-                pred_path = candidate_path
-                image_folder = folder
-                break
-
+        pred_path, image_folder = find_prediction(num, pred_dir)
         if pred_path is None:
             return (False, None, f"Missing prediction for {num}")
 
-        # Load pair
-        gt_img = load_image(gt_path)
-        pred_img = load_image(pred_path)
-        gen = resize_to_match(gt_img, pred_img)
+        raw = compute_metrics(os.path.join(gt_dir, gt_file), pred_path, feature_cache=feature_cache)
+        return (True, finalize_pair(num, image_folder, raw), None)
 
-        # --- Compute metrics ---
-        geo = compute_aspect_dimensionality_fidelity(gt_img, pred_img)
-        perceptual = compute_perceptual(gt_img, gen)
-        layout = compute_layout(gt_img, gen)
-        legibility = compute_legibility(gt_img, gen)
-        style = compute_style(gt_img, gen)
+    except Exception as e:
+        return (False, None, f"Error evaluating {num}: {str(e)}")
 
-        result = composite_score(geo, perceptual, layout, legibility, style)
-        result["id"] = num
 
-        # Save evaluation.json in the image folder
-        evaluation_path = os.path.join(image_folder, "evaluation.json")
-        with open(evaluation_path, 'w') as f:
-            json.dump(convert_to_serializable(result), f, indent=2)
+# ==========================================================
+#  Worker processes
+# ==========================================================
 
-        return (True, result, None)
+def configure_models(use_cuda=False, channels_last=False):
+    """
+    Select devices for the LPIPS and EasyOCR models of this process.
+    On CPU, OCR uses EasyOCR's dynamically quantized models.
 
-    except Exception as e:
+    Args:
+        use_cuda: Run models on CUDA if available
+        channels_last: Run CPU LPIPS in channels-last memory format
+    """
+    set_device(use_cuda=use_cuda, channels_last=channels_last)
+    set_ocr_device(use_cuda=use_cuda)
+
+
+@contextmanager
+def blas_thread_budget(num_threads):
+    """
+    Set the BLAS/OpenMP thread variables for processes spawned in the block.
+
+    Native libraries read these once when loaded, so they must be in the
+    environment before a worker process imports numpy/torch.
+    """
+    saved = {var: os.environ.get(var) for var in BLAS_ENV_VARS}
+    os.environ.update({var: str(num_threads) for var in BLAS_ENV_VARS})
+    try:
+        yield
+    finally:
+        for var, value in saved.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+
+def _init_worker(use_cuda, blas_threads, cache_dir, channels_last):
+    """
+    Per-process setup: thread budget, model devices and the GT feature cache.
+    Models are built on first use, so a worker only loads the models of the
+    metric families it actually computes.
+    """
+    if blas_threads:
+        import cv2
+        import torch
+        cv2.setNumThreads(blas_threads)
+        torch.set_num_threads(blas_threads)
+
+    configure_models(use_cuda, channels_last)
+    _worker_state["feature_cache"] = GTFeatureCache(cache_dir) if cache_dir else None
+
+
+def _evaluate_chunk(tasks):
+    """
+    Compute a chunk of (gt_file, gt_path, pred_path, families) tasks in a worker.
+    Tasks with the same families are computed as one batch; if a batch fails,
+    its tasks are retried one by one so the error is attributed to its pair.
+    Returns (outcomes, cache_hits, cache_misses) with one
+    (gt_file, raw_metrics, error_message) outcome per task.
+    """
+    feature_cache = _worker_state["feature_cache"]
+    hits_before = feature_cache.hits if feature_cache is not None else 0
+    misses_before = feature_cache.misses if feature_cache is not None else 0
+
+    by_families = {}
+    for task in tasks:
+        by_families.setdefault(task[3], []).append(task)
+
+    def error_message(gt_file, e):
         num = gt_file.replace("gt_", "").replace(".png", "")
-        return (False, None, f"Error evaluating {num}: {str(e)}")
+        return f"Error evaluating {num}: {str(e)}"
+
+    outcomes = []
+    for families, group in by_families.items():
+        try:
+            raws = compute_metrics_batch([(gt_path, pred_path) for _, gt_path, pred_path, _ in group],
+                                         families, feature_cache)
+        except Exception as e:
+            if len(group) == 1:
+                outcomes.append((group[0][0], None, error_message(group[0][0], e)))
+                continue
+            raws = None
+
+        if raws is not None:
+            outcomes.extend((task[0], raw, None) for task, raw in zip(group, raws))
+            continue
+
+        for gt_file, gt_path, pred_path, _ in group:
+            try:
+                outcomes.append((gt_file, compute_metrics(gt_path, pred_path, families, feature_cache), None))
+            except Exception as e:
+                outcomes.append((gt_file, None, error_message(gt_file, e)))
+
+    if feature_cache is None:
+        return outcomes, 0, 0
+    return outcomes, feature_cache.hits - hits_before, feature_cache.misses - misses_before
+
+
+def average_metrics(scores):
+    """Average composite results (as returned by finalize_pair) per metric and sub-metric."""
+    keys = ["LayoutScore", "LegibilityScore", "StyleScore", "PerceptualScore", "Geometry"]
+    avg = {}
+
+    for k in keys:
+        # Collect all metric values for this key
+        vals = [s[k] for s in scores if k in s]
+
+        if isinstance(vals[0], dict):  # has sub-metrics
+            sub_keys = vals[0].keys()
+            avg[k] = {}
+            for sk in sub_keys:
+                sub_vals = [v[sk] for v in vals if sk in v]
+                avg[k][sk] = round(np.mean(sub_vals), 3)
+        else:
+            avg[k] = round(np.mean(vals), 3)
+
+    return avg
+
+
+def save_average_table(pred_dir, avg):
+    """Save average metrics as a one-row table with a two-level header to {pred_dir}/evaluation.xlsx."""
+    # Prepare data rows for Excel with two-level header
+    header_row1 = [None]  # First column for run name
+    header_row2 = [None]  # Sub-headers
+    data_row = []  # Data values
+
+    # Extract run folder name
+    run_name = os.path.basename(pred_dir)
+    data_row.append(run_name)
+
+    # LayoutScore columns (only 3 metrics)
+    if 'LayoutScore' in avg and isinstance(avg['LayoutScore'], dict):
+        layout_metrics = ['MarginAsymmetry', 'ContentAspectDiff', 'AreaRatioDiff']
+        header_row1.append('LayoutScore')
+        header_row1.extend([None] * (len(layout_metrics) - 1))
+        for metric in layout_metrics:
+            header_row2.append(metric)
+            data_row.append(round(avg['LayoutScore'].get(metric, 0), 3))
+
+    # LegibilityScore columns (only 3 metrics)
+    if 'LegibilityScore' in avg and isinstance(avg['LegibilityScore'], dict):
+        legibility_metrics = ['TextJaccard', 'ContrastDiff', 'ContrastLocalDiff']
+        header_row1.append('LegibilityScore')
+        header_row1.extend([None] * (len(legibility_metrics) - 1))
+        for metric in legibility_metrics:
+            header_row2.append(metric)
+            data_row.append(round(avg['LegibilityScore'].get(metric, 0), 3))
+
+    # StyleScore columns (only 3 metrics)
+    if 'StyleScore' in avg and isinstance(avg['StyleScore'], dict):
+        style_metrics = ['PaletteDistance', 'Vibrancy', 'PolarityConsistency']
+        header_row1.append('StyleScore')
+        header_row1.extend([None] * (len(style_metrics) - 1))
+        for metric in style_metrics:
+            header_row2.append(metric)
+            data_row.append(round(avg['StyleScore'].get(metric, 0), 3))
+
+    # PerceptualScore columns (only 2 metrics)
+    if 'PerceptualScore' in avg and isinstance(avg['PerceptualScore'], dict):
+        perceptual_metrics = ['ssim', 'lp']
+        header_row1.append('PerceptualScore')
+        header_row1.extend([None] * (len(perceptual_metrics) - 1))
+        for metric in perceptual_metrics:
+            header_row2.append(metric)
+            data_row.append(round(avg['PerceptualScore'].get(metric, 0), 3))
+
+    # Geometry (1 metric)
+    if 'Geometry' in avg and isinstance(avg['Geometry'], dict):
+        header_row1.append('Geometry')
+        header_row2.append(None)
+        data_row.append(round(avg['Geometry']['geo_score'], 3))
+
+    # Create DataFrame with all three rows
+    df = pd.DataFrame([header_row1, header_row2, data_row])
+
+    # Save to Excel without header (since headers are in the data)
+    excel_path = os.path.join(pred_dir, "evaluation.xlsx")
+    df.to_excel(excel_path, index=False, header=False)
 
+    return excel_path
 
-def evaluate_pairs(gt_dir="GT", pred_dir="baseline", num_workers=4):
+
+def _default_chunk_size(num_tasks, num_workers):
+    # About four chunks per worker balances load without per-task IPC overhead
+    return max(1, min(8, num_tasks // (num_workers * 4)))
+
+
+def evaluate_pairs(gt_dir="GT", pred_dir="baseline", num_workers=4, feature_cache=None,
+                   executor="process", use_cuda=False, blas_threads=None, chunk_size=None,
+                   split_metrics=False, channels_last=False, result_store=None):
     """
-    Load and evaluate GT–prediction pairs using multithreading.
+    Load and evaluate GT–prediction pairs in parallel.
     GT images follow: GT/gt_{num}.png
     Prediction images follow: baseline/image_{num}/output.png
 
+    Metric computation is mostly GIL-holding NumPy/skimage code, so by default
+    pairs are evaluated in worker processes that each load their own models.
+    Tasks are dispatched in chunks; results are combined and evaluation.json
+    files are written by the parent.
+
     Args:
         gt_dir: Path to ground truth directory
         pred_dir: Path to prediction directory
-        num_workers: Number of worker threads (default: 4)
+        num_workers: Number of workers (default: 4)
+        feature_cache: Optional GTFeatureCache for GT-side features
+        executor: "process" (default) or "thread" (shares the models loaded in
+            this process, e.g. a single GPU LPIPS instance)
+        use_cuda: Load models on CUDA in worker processes
+        blas_threads: BLAS/OpenMP threads per worker process
+            (default: CPU count / num_workers)
+        chunk_size: Tasks per dispatched chunk (default: based on task count)
+        split_metrics: Schedule metric families of a pair as separate tasks so
+            they run on different workers
+        channels_last: Run CPU LPIPS in channels-last memory format
+        result_store: Optional ResultStore for incremental evaluation. Pairs whose
+            GT/prediction hashes and run_metric_version() match the stored row are
+            not recomputed; results go to the store instead of per-folder
+            evaluation.json files, and rows of pairs no longer present are removed.
     """
+    if executor not in ("process", "thread"):
+        raise ValueError(f"executor must be 'process' or 'thread', got {executor!r}")
+
     # --- Clean up old evaluation files ---
     print("🧹 Cleaning up old evaluation files...")
     cleaned_count = 0
@@ -116,8 +466,9 @@ def evaluate_pairs(gt_dir="GT", pred_dir="baseline", num_workers=4):
         os.remove(excel_path)
         cleaned_count += 1
 
-    # Clean evaluation.json in each image folder
-    for item in os.listdir(pred_dir):
+    # Clean evaluation.json in each image folder (not in incremental mode,
+    # where results live in the result store)
+    for item in (os.listdir(pred_dir) if result_store is None else []):
         item_path = os.path.join(pred_dir, item)
         if os.path.isdir(item_path) and item.startswith("image_"):
             eval_file = os.path.join(item_path, "evaluation.json")
@@ -138,42 +489,131 @@ def evaluate_pairs(gt_dir="GT", pred_dir="baseline", num_workers=4):
         "pred_exists": 0,
         "evaluated": 0,
         "missing_pred": 0,
-        "errors": 0
+        "errors": 0,
+        "reused": 0
     }
 
     all_scores = []
-    lock = Lock()
+    pair_timings = []  # Timings of pairs evaluated in this run
+
+    # --- Resolve predictions and build tasks ---
+    groups = FAMILY_GROUPS if split_metrics else (METRIC_FAMILIES,)
+    metric_version = run_metric_version(use_cuda) if result_store is not None else None
+    pending = {}
+    tasks = []
+    present_pair_ids = []
+    for i, gt_file in enumerate(gt_files, start=1):
+        num = gt_file.replace("gt_", "").replace(".png", "")
+        pred_path, image_folder = find_prediction(num, pred_dir)
+        if pred_path is None:
+            counts["missing_pred"] += 1
+            continue
+        gt_path = os.path.join(gt_dir, gt_file)
+        entry = {"index": i, "num": num, "folder": image_folder,
+                 "remaining": len(groups), "raw": {}, "error": None}
+
+        if result_store is not None:
+            entry["pair_id"] = os.path.basename(image_folder)
+            entry["gt_hash"] = file_sha256(gt_path)
+            entry["pred_hash"] = file_sha256(pred_path)
+            present_pair_ids.append(entry["pair_id"])
+            stored = result_store.get(entry["pair_id"])
+            if (stored is not None and stored["gt_hash"] == entry["gt_hash"]
+                    and stored["pred_hash"] == entry["pred_hash"]
+                    and stored["metric_version"] == metric_version):
+                counts["pred_exists"] += 1
+                counts["evaluated"] += 1
+                counts["reused"] += 1
+                all_scores.append(stored["result"])
+                continue
+
+        pending[gt_file] = entry
+        tasks.extend((gt_file, gt_path, pred_path, families) for families in groups)
+
+    if result_store is not None:
+        # Drop results of pairs whose prediction (or GT) is gone
+        removed = result_store.prune(present_pair_ids)
+        print(f"♻️  Result store {result_store.db_path}: {counts['reused']} unchanged pairs reused, "
+              f"{len(pending)} to evaluate{f', {removed} stale removed' if removed else ''}.")
+
+    chunk_size = chunk_size or _default_chunk_size(len(tasks), num_workers)
+    chunks = [tasks[k:k + chunk_size] for k in range(0, len(tasks), chunk_size)]
 
     print(f"📂 Found {total_gt} ground truth images in '{gt_dir}'.")
-    print(f"🚀 Using {num_workers} worker threads for parallel processing.\n")
-
-    # Process files in parallel
-    with ThreadPoolExecutor(max_workers=num_workers) as executor:
-        # Submit all tasks
-        future_to_file = {
-            executor.submit(evaluate_single_pair, gt_file, gt_dir, pred_dir): (i, gt_file)
-            for i, gt_file in enumerate(gt_files, start=1)
-        }
-
-        # Process completed tasks
-        for future in as_completed(future_to_file):
-            i, gt_file = future_to_file[future]
-            success, result, error_msg = future.result()
-
-            with lock:
-                if success:
-                    counts["pred_exists"] += 1
-                    counts["evaluated"] += 1
-                    all_scores.append(result)
-
-                    print(f"[{i}/{total_gt}] ✅ {result['id']} evaluated → "
-                          f"Geo={result['Geometry']['geo_score']:.2f}")
-                else:
-                    if "Missing prediction" in error_msg:
-                        counts["missing_pred"] += 1
-                    else:
-                        counts["errors"] += 1
-                        print(f"[{i}/{total_gt}] ❌ {error_msg}")
+    if executor == "process":
+        blas_threads = blas_threads or max(1, (os.cpu_count() or 1) // num_workers)
+        print(f"🚀 Using {num_workers} worker processes ({blas_threads} BLAS threads each), "
+              f"{len(tasks)} tasks in chunks of {chunk_size}"
+              f"{', metric families split' if split_metrics else ''}.\n")
+    else:
+        print(f"🚀 Using {num_workers} worker threads for parallel processing.\n")
+
+    def handle_outcome(gt_file, raw, error_msg):
+        entry = pending[gt_file]
+        if error_msg is not None and entry["error"] is None:
+            entry["error"] = error_msg
+        elif raw is not None:
+            # Family groups of a split pair each load the pair; their timings add up
+            timings = dict(entry["raw"].get("timings", {}))
+            for stage, seconds in raw.get("timings", {}).items():
+                timings[stage] = timings.get(stage, 0.0) + seconds
+            entry["raw"].update(raw)
+            entry["raw"]["timings"] = timings
+        entry["remaining"] -= 1
+        if entry["remaining"] > 0:
+            return
+
+        i = entry["index"]
+        if entry["error"] is None:
+            try:
+                result = finalize_pair(entry["num"], entry["folder"], entry["raw"],
+                                       write_json=result_store is None)
+                if result_store is not None:
+                    result = convert_to_serializable(result)
+                    result_store.put(entry["pair_id"], entry["gt_hash"], entry["pred_hash"],
+                                     metric_version, result)
+            except Exception as e:
+                entry["error"] = f"Error evaluating {entry['num']}: {str(e)}"
+        if entry["error"] is None:
+            counts["pred_exists"] += 1
+            counts["evaluated"] += 1
+            all_scores.append(result)
+            pair_timings.append(result.get("Timings", {}))
+            print(f"[{i}/{total_gt}] ✅ {result['id']} evaluated → "
+                  f"Geo={result['Geometry']['geo_score']:.2f}")
+        else:
+            counts["errors"] += 1
+            print(f"[{i}/{total_gt}] ❌ {entry['error']}")
+
+    # Process chunks in parallel
+    if not chunks:
+        pass
+    elif executor == "process":
+        cache_dir = feature_cache.cache_dir if feature_cache is not None else None
+        with blas_thread_budget(blas_threads), ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(use_cuda, blas_threads, cache_dir, channels_last),
+        ) as pool:
+            futures = [pool.submit(_evaluate_chunk, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                outcomes, hits, misses = future.result()
+                if feature_cache is not None:
+                    feature_cache.hits += hits
+                    feature_cache.misses += misses
+                for outcome in outcomes:
+                    handle_outcome(*outcome)
+    else:
+        # Threads share this process's models; cache statistics accrue on feature_cache directly
+        configure_models(use_cuda, channels_last)
+        _worker_state["feature_cache"] = feature_cache
+        with ThreadPoolExecutor(max_workers=num_workers) as pool:
+            futures = [pool.submit(_evaluate_chunk, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                outcomes, _, _ = future.result()
+                for outcome in outcomes:
+                    handle_outcome(*outcome)
 
     # --- Summary ---
     print("\n📊 Summary:")
@@ -182,24 +622,18 @@ def evaluate_pairs(gt_dir="GT", pred_dir="baseline", num_workers=4):
     print(f"  Missing predictions: {counts['missing_pred']}")
     print(f"  Errors during evaluation: {counts['errors']}")
     print(f"  Successfully evaluated: {counts['evaluated']}")
+    if result_store is not None:
+        print(f"  Reused unchanged results: {counts['reused']}")
+    if feature_cache is not None:
+        print(f"  GT feature cache: {feature_cache.hits} hits, {feature_cache.misses} computed")
+    if pair_timings:
+        stages = sorted({stage for timings in pair_timings for stage in timings})
+        print("  Mean seconds per pair: " + ", ".join(
+            f"{stage}={np.mean([t.get(stage, 0.0) for t in pair_timings]):.3f}" for stage in stages))
 
     # --- Compute averages ---
     if all_scores:
-        keys = ["LayoutScore", "LegibilityScore", "StyleScore", "PerceptualScore", "Geometry"]
-        avg = {}
-
-        for k in keys:
-            # Collect all metric values for this key
-            vals = [s[k] for s in all_scores if k in s]
-
-            if isinstance(vals[0], dict):  # has sub-metrics
-                sub_keys = vals[0].keys()
-                avg[k] = {}
-                for sk in sub_keys:
-                    sub_vals = [v[sk] for v in vals if sk in v]
-                    avg[k][sk] = round(np.mean(sub_vals), 3)
-            else:
-                avg[k] = round(np.mean(vals), 3)
+        avg = average_metrics(all_scores)
 
         # --- Print results ---
         print("\n📈 Average metrics across all evaluated pairs:")
@@ -212,64 +646,7 @@ def evaluate_pairs(gt_dir="GT", pred_dir="baseline", num_workers=4):
                 print(f"  {k:18s}: {v:6.3f}")
 
         # --- Save average metrics to Excel in run folder ---
-        # Prepare data rows for Excel with two-level header
-        header_row1 = [None]  # First column for run name
-        header_row2 = [None]  # Sub-headers
-        data_row = []  # Data values
-
-        # Extract run folder name
-        run_name = os.path.basename(pred_dir)
-        data_row.append(run_name)
-
-        # LayoutScore columns (only 3 metrics)
-        if 'LayoutScore' in avg and isinstance(avg['LayoutScore'], dict):
-            layout_metrics = ['MarginAsymmetry', 'ContentAspectDiff', 'AreaRatioDiff']
-            header_row1.append('LayoutScore')
-            header_row1.extend([None] * (len(layout_metrics) - 1))
-            for metric in layout_metrics:
-                header_row2.append(metric)
-                data_row.append(round(avg['LayoutScore'].get(metric, 0), 3))
-
-        # LegibilityScore columns (only 3 metrics)
-        if 'LegibilityScore' in avg and isinstance(avg['LegibilityScore'], dict):
-            legibility_metrics = ['TextJaccard', 'ContrastDiff', 'ContrastLocalDiff']
-            header_row1.append('LegibilityScore')
-            header_row1.extend([None] * (len(legibility_metrics) - 1))
-            for metric in legibility_metrics:
-                header_row2.append(metric)
-                data_row.append(round(avg['LegibilityScore'].get(metric, 0), 3))
-
-        # StyleScore columns (only 3 metrics)
-        if 'StyleScore' in avg and isinstance(avg['StyleScore'], dict):
-            style_metrics = ['PaletteDistance', 'Vibrancy', 'PolarityConsistency']
-            header_row1.append('StyleScore')
-            header_row1.extend([None] * (len(style_metrics) - 1))
-            for metric in style_metrics:
-                header_row2.append(metric)
-                data_row.append(round(avg['StyleScore'].get(metric, 0), 3))
-
-        # PerceptualScore columns (only 2 metrics)
-        if 'PerceptualScore' in avg and isinstance(avg['PerceptualScore'], dict):
-            perceptual_metrics = ['ssim', 'lp']
-            header_row1.append('PerceptualScore')
-            header_row1.extend([None] * (len(perceptual_metrics) - 1))
-            for metric in perceptual_metrics:
-                header_row2.append(metric)
-                data_row.append(round(avg['PerceptualScore'].get(metric, 0), 3))
-
-        # Geometry (1 metric)
-        if 'Geometry' in avg and isinstance(avg['Geometry'], dict):
-            header_row1.append('Geometry')
-            header_row2.append(None)
-            data_row.append(round(avg['Geometry']['geo_score'], 3))
-
-        # Create DataFrame with all three rows
-        df = pd.DataFrame([header_row1, header_row2, data_row])
-
-        # Save to Excel without header (since headers are in the data)
-        excel_path = os.path.join(pred_dir, "evaluation.xlsx")
-        df.to_excel(excel_path, index=False, header=False)
-
+        excel_path = save_average_table(pred_dir, avg)
         print(f"\n💾 Average metrics saved to: {excel_path}")
 
     else:
@@ -279,6 +656,42 @@ def evaluate_pairs(gt_dir="GT", pred_dir="baseline", num_workers=4):
     return all_scores, avg, counts
 
 
+def run_scaling_benchmark(gt_dir, pred_dir, max_workers, **kwargs):
+    """
+    Time evaluate_pairs with 1, 2, 4, ... up to max_workers workers.
+
+    Prints wall time, throughput, speedup and parallel efficiency per worker
+    count. Each run re-evaluates (and rewrites) the full prediction set.
+    Returns a list of {"workers", "seconds", "pairs_per_sec"} rows.
+    """
+    worker_counts = []
+    n = 1
+    while n < max_workers:
+        worker_counts.append(n)
+        n *= 2
+    worker_counts.append(max_workers)
+
+    rows = []
+    for workers in worker_counts:
+        start = time.perf_counter()
+        _, _, counts = evaluate_pairs(gt_dir, pred_dir, num_workers=workers, **kwargs)
+        seconds = time.perf_counter() - start
+        rows.append({
+            "workers": workers,
+            "seconds": seconds,
+            "pairs_per_sec": counts["evaluated"] / seconds if seconds > 0 else 0.0,
+        })
+
+    base = rows[0]["seconds"]
+    print("\n⏱️  Scaling benchmark:")
+    print(f"  {'workers':>7s}  {'seconds':>9s}  {'pairs/s':>8s}  {'speedup':>7s}  {'efficiency':>10s}")
+    for row in rows:
+        speedup = base / row["seconds"] if row["seconds"] > 0 else 0.0
+        print(f"  {row['workers']:7d}  {row['seconds']:9.2f}  {row['pairs_per_sec']:8.2f}  "
+              f"{speedup:7.2f}  {speedup / row['workers']:10.1%}")
+    return rows
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Evaluate widget quality metrics between GT and prediction images.')
     parser.add_argument('--gt_dir', type=str,
@@ -287,15 +700,31 @@ if __name__ == "__main__":
     parser.add_argument('--baseline_dir', type=str, required=True,
                         help='Path to baseline/prediction directory (required)')
     parser.add_argument('--workers', type=int, default=4,
-                        help='Number of worker threads for parallel processing (default: 4)')
+                        help='Number of worker processes for parallel processing (default: 4)')
+    parser.add_argument('--executor', type=str, choices=['process', 'thread'], default='process',
+                        help='Run workers as processes (default) or threads sharing one set of models')
+    parser.add_argument('--blas_threads', type=int, default=None,
+                        help='BLAS/OpenMP threads per worker process (default: CPU count / workers)')
+    parser.add_argument('--chunk_size', type=int, default=None,
+                        help='Tasks per dispatched chunk (default: automatic)')
+    parser.add_argument('--split_metrics', action='store_true',
+                        help='Schedule metric families of each pair as separate tasks')
+    parser.add_argument('--benchmark_scaling', type=int, default=None, metavar='MAX_WORKERS',
+                        help='Time the evaluation with 1, 2, 4, ... MAX_WORKERS workers (feature cache disabled)')
     parser.add_argument('--cuda', action='store_true',
                         help='Use CUDA/GPU for computation (default: CPU)')
+    parser.add_argument('--channels_last', action='store_true',
+                        help='Run CPU LPIPS in channels-last memory format (faster on recent x86 CPUs)')
+    parser.add_argument('--result_store', type=str, default=None,
+                        help='Incremental mode: keep results in this SQLite file (instead of per-folder '
+                             'evaluation.json) and skip pairs whose images and metric versions are unchanged')
+    parser.add_argument('--feature_cache', type=str, default=None,
+                        help='Directory for cached GT features (default: {gt_dir}/.feature_cache)')
+    parser.add_argument('--no_feature_cache', action='store_true',
+                        help='Recompute GT features instead of using the feature cache')
 
     args = parser.parse_args()
 
-    # Set device for perceptual metrics (LPIPS)
-    set_device(use_cuda=args.cuda)
-
     # Check if directories exist
     if not os.path.exists(args.gt_dir):
         print(f"❌ Error: GT directory does not exist: {args.gt_dir}")
@@ -309,5 +738,32 @@ if __name__ == "__main__":
     print(f"📁 Baseline Directory: {args.baseline_dir}")
     print()
 
-    evaluate_pairs(args.gt_dir, args.baseline_dir, num_workers=args.workers)
+    engine_options = dict(
+        executor=args.executor,
+        use_cuda=args.cuda,
+        blas_threads=args.blas_threads,
+        chunk_size=args.chunk_size,
+        split_metrics=args.split_metrics,
+        channels_last=args.channels_last,
+    )
+
+    if args.benchmark_scaling:
+        # Measure full metric computation: cached GT features would make later runs look faster
+        run_scaling_benchmark(args.gt_dir, args.baseline_dir, args.benchmark_scaling, **engine_options)
+        sys.exit(0)
+
+    feature_cache = None
+    if not args.no_feature_cache:
+        cache_dir = args.feature_cache or os.path.join(args.gt_dir, ".feature_cache")
+        feature_cache = GTFeatureCache(cache_dir)
+        print(f"🗄️  GT feature cache: {cache_dir}")
+        print()
+
+    result_store = ResultStore(args.result_store) if args.result_store else None
+    try:
+        evaluate_pairs(args.gt_dir, args.baseline_dir, num_workers=args.workers,
+                       feature_cache=feature_cache, result_store=result_store, **engine_options)
+    finally:
+        if result_store is not None:
+            result_store.close()
     print(f"\n✅ Evaluation complete for: {args.baseline_dir}")
@@ -15,15 +15,20 @@ import subprocess
 from pathlib import Path
 
 
-def run_evaluation(gt_dir: str, pred_dir: str, num_workers: int = 4, use_cuda: bool = False):
+def run_evaluation(gt_dir: str, pred_dir: str, num_workers: int = 4, use_cuda: bool = False,
+                   feature_cache: str = None, no_feature_cache: bool = False,
+                   result_store: str = None):
     """
     Run widget quality evaluation using eval.py
 
     Args:
         gt_dir: Path to ground truth directory
         pred_dir: Path to prediction directory
-        num_workers: Number of worker threads
+        num_workers: Number of worker processes
         use_cuda: Whether to use CUDA/GPU for computation
+        feature_cache: Directory for cached GT features (default: {gt_dir}/.feature_cache)
+        no_feature_cache: Recompute GT features instead of using the cache
+        result_store: SQLite result store for incremental evaluation
     """
     print("=" * 80)
     print("STEP 1: Running Widget Quality Evaluation")
@@ -46,6 +51,14 @@ def run_evaluation(gt_dir: str, pred_dir: str, num_workers: int = 4, use_cuda: b
     if use_cuda:
         cmd.append("--cuda")
 
+    if no_feature_cache:
+        cmd.append("--no_feature_cache")
+    elif feature_cache:
+        cmd.extend(["--feature_cache", feature_cache])
+
+    if result_store:
+        cmd.extend(["--result_store", result_store])
+
     print(f"Running: {' '.join(cmd)}\n")
 
     result = subprocess.run(cmd, capture_output=False, text=True)
@@ -57,13 +70,16 @@ def run_evaluation(gt_dir: str, pred_dir: str, num_workers: int = 4, use_cuda: b
     print("\n✅ Evaluation completed successfully!\n")
 
 
-def run_statistics_generation(pred_dir: str, output_dir: str):
+def run_statistics_generation(pred_dir: str, output_dir: str, result_store: str = None,
+                              summary_only: bool = False):
     """
     Generate metrics statistics using analysis.py
 
     Args:
         pred_dir: Path to prediction directory (contains evaluation.json files)
         output_dir: Path to output directory for statistics files
+        result_store: Read results from this SQLite result store instead
+        summary_only: Stream results into summaries without a per-image table
     """
     print("=" * 80)
     print("STEP 2: Generating Metrics Statistics")
@@ -82,6 +98,12 @@ def run_statistics_generation(pred_dir: str, output_dir: str):
         "--output-dir", output_dir
     ]
 
+    if result_store:
+        cmd.extend(["--results-store", result_store])
+
+    if summary_only:
+        cmd.append("--summary-only")
+
     print(f"Running: {' '.join(cmd)}\n")
 
     result = subprocess.run(cmd, capture_output=False, text=True)
@@ -140,6 +162,9 @@ Examples:
     --output_dir /path/to/stats \\
     --workers 8
 
+  # Incremental: only evaluate new or changed pairs (results in {pred_dir}/evaluation.sqlite)
+  python main.py --gt_dir /path/to/GT --pred_dir /path/to/results --incremental
+
   # Skip evaluation (if evaluation.json already exists)
   python main.py \\
     --gt_dir /path/to/GT \\
@@ -173,7 +198,7 @@ Examples:
         "--workers",
         type=int,
         default=4,
-        help="Number of worker threads for evaluation (default: 4)"
+        help="Number of worker processes for evaluation (default: 4)"
     )
     parser.add_argument(
         "--skip_eval",
@@ -185,6 +210,29 @@ Examples:
         action="store_true",
         help="Use CUDA/GPU for computation (default: CPU)"
     )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only evaluate new or changed pairs; keep results in {pred_dir}/evaluation.sqlite "
+             "instead of per-folder evaluation.json files"
+    )
+    parser.add_argument(
+        "--summary_only",
+        action="store_true",
+        help="Compute statistics in bounded memory without a per-image table "
+             "(approximate quartiles for large runs)"
+    )
+    parser.add_argument(
+        "--feature_cache",
+        type=str,
+        default=None,
+        help="Directory for cached GT features (default: {gt_dir}/.feature_cache)"
+    )
+    parser.add_argument(
+        "--no_feature_cache",
+        action="store_true",
+        help="Recompute GT features instead of using the feature cache"
+    )
 
     args = parser.parse_args()
 
@@ -206,6 +254,9 @@ Examples:
     else:
         output_dir = pred_dir / ".analysis"
 
+    # Incremental mode keeps results in a single SQLite store next to the predictions
+    result_store = str(pred_dir / "evaluation.sqlite") if args.incremental else None
+
     # Print configuration
     print("\n" + "=" * 80)
     print("Widget Quality Evaluation Pipeline")
@@ -215,17 +266,20 @@ Examples:
     print(f"Output Dir:       {output_dir}")
     print(f"Workers:          {args.workers}")
     print(f"CUDA:             {'Enabled' if args.cuda else 'Disabled (CPU)'}")
+    if args.incremental:
+        print(f"Result Store:     {result_store}")
     print("=" * 80)
     print()
 
     # Step 1: Run evaluation
     if not args.skip_eval:
-        run_evaluation(str(gt_dir), str(pred_dir), args.workers, args.cuda)
+        run_evaluation(str(gt_dir), str(pred_dir), args.workers, args.cuda,
+                       args.feature_cache, args.no_feature_cache, result_store)
     else:
         print("⏩ Skipping evaluation step (--skip_eval)\n")
 
     # Step 2: Generate statistics (always run)
-    run_statistics_generation(str(pred_dir), str(output_dir))
+    run_statistics_generation(str(pred_dir), str(output_dir), result_store, args.summary_only)
 
     # Print summary
     print_summary(str(gt_dir), str(pred_dir), str(output_dir))
@@ -0,0 +1,97 @@
+"""
+SQLite store of per-pair evaluation results.
+
+Used by incremental evaluation (eval.py --result_store) in place of
+per-folder evaluation.json files, and read directly by analysis.py.
+"""
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+
+class ResultStore:
+    """
+    Evaluation results keyed by pair id (the prediction folder name).
+
+    Each row records the SHA-256 of the GT and prediction images and the
+    metric version string the result was computed with, so a re-run can
+    skip pairs whose inputs and metrics are unchanged.
+
+    Example:
+        >>> store = ResultStore("results/evaluation.sqlite")
+        >>> row = store.get("image_0001")
+        >>> if row is None or row["pred_hash"] != pred_hash:
+        ...     store.put("image_0001", gt_hash, pred_hash, version, result)
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS results (
+            pair_id TEXT PRIMARY KEY,
+            gt_hash TEXT NOT NULL,
+            pred_hash TEXT NOT NULL,
+            metric_version TEXT NOT NULL,
+            result TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path)
+        with self._conn:
+            self._conn.execute(self.SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, pair_id: str) -> Optional[Dict]:
+        """Return the stored row for a pair (with the result decoded), or None."""
+        row = self._conn.execute(
+            "SELECT gt_hash, pred_hash, metric_version, result FROM results WHERE pair_id = ?",
+            (pair_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "gt_hash": row[0],
+            "pred_hash": row[1],
+            "metric_version": row[2],
+            "result": json.loads(row[3]),
+        }
+
+    def put(self, pair_id: str, gt_hash: str, pred_hash: str, metric_version: str, result: Dict):
+        """Insert or replace a pair's result (committed immediately)."""
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results "
+                "(pair_id, gt_hash, pred_hash, metric_version, result, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (pair_id, gt_hash, pred_hash, metric_version, json.dumps(result), time.time()),
+            )
+
+    def prune(self, keep_ids: Iterable[str]) -> int:
+        """Delete results of pairs not in keep_ids. Returns the number removed."""
+        keep = set(keep_ids)
+        stale = [pair_id for (pair_id,) in self._conn.execute("SELECT pair_id FROM results")
+                 if pair_id not in keep]
+        with self._conn:
+            self._conn.executemany("DELETE FROM results WHERE pair_id = ?", ((p,) for p in stale))
+        return len(stale)
+
+    def iter_results(self) -> Iterator[Tuple[str, Dict]]:
+        """Yield (pair_id, result) for all stored pairs, ordered by pair id."""
+        for pair_id, result in self._conn.execute("SELECT pair_id, result FROM results ORDER BY pair_id"):
+            yield pair_id, json.loads(result)
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
@@ -0,0 +1,199 @@
+"""
+Bounded-memory summary statistics for streams of metric values.
+
+Used by analysis.py --summary-only to summarize large benchmark sweeps
+without holding per-sample rows: each metric keeps a running
+mean/variance (Welford) and a t-digest quantile sketch.
+"""
+
+import math
+from typing import Dict, Iterable
+
+import numpy as np
+
+
+class TDigest:
+    """
+    Merging t-digest (Dunning & Ertl) for streaming quantile estimates.
+
+    Values are buffered and periodically merged into at most about
+    `compression` centroids using the k1 (arcsine) scale function, which
+    keeps centroids near the tails small. While every centroid holds a
+    single value (up to about compression / 2 values), quantiles are exact
+    and match np.percentile's linear interpolation.
+
+    Example:
+        >>> digest = TDigest()
+        >>> for value in values:
+        ...     digest.add(value)
+        >>> digest.quantile(0.5)
+    """
+
+    def __init__(self, compression: float = 200.0, buffer_size: int = None):
+        self.compression = compression
+        self.buffer_size = buffer_size or int(10 * compression)
+        self._means = np.empty(0)
+        self._weights = np.empty(0)
+        self._buffer = []
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        value = float(value)
+        self._buffer.append(value)
+        self.count += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= self.buffer_size:
+            self._compress()
+
+    def add_many(self, values: Iterable[float]):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if len(values) == 0:
+            return
+        self._buffer.extend(values.tolist())
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        if len(self._buffer) >= self.buffer_size:
+            self._compress()
+
+    def merge(self, other: "TDigest"):
+        """Fold another digest into this one (e.g. digests of separate runs)."""
+        other._compress()
+        self._compress()
+        self._means = np.concatenate([self._means, other._means])
+        self._weights = np.concatenate([self._weights, other._weights])
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(force=True)
+
+    def _q_limit(self, q):
+        """Largest cumulative fraction a centroid starting at q may extend to (k1 scale)."""
+        k = self.compression / (2 * math.pi) * math.asin(2 * q - 1) + 1
+        if k >= self.compression / 4:
+            return 1.0
+        return (math.sin(2 * math.pi * k / self.compression) + 1) / 2
+
+    def _compress(self, force: bool = False):
+        if not self._buffer and not force:
+            return
+        means = np.concatenate([self._means, self._buffer])
+        weights = np.concatenate([self._weights, np.ones(len(self._buffer))])
+        self._buffer = []
+        if len(means) == 0:
+            return
+
+        order = np.argsort(means, kind="mergesort")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+
+        merged_means, merged_weights = [], []
+        cur_mean, cur_weight = means[0], weights[0]
+        weight_before = 0.0
+        q_limit = self._q_limit(0.0)
+        for mean, weight in zip(means[1:], weights[1:]):
+            if (weight_before + cur_weight + weight) / total <= q_limit:
+                cur_weight += weight
+                cur_mean += (mean - cur_mean) * weight / cur_weight
+            else:
+                merged_means.append(cur_mean)
+                merged_weights.append(cur_weight)
+                weight_before += cur_weight
+                q_limit = self._q_limit(weight_before / total)
+                cur_mean, cur_weight = mean, weight
+        merged_means.append(cur_mean)
+        merged_weights.append(cur_weight)
+
+        self._means = np.array(merged_means)
+        self._weights = np.array(merged_weights)
+
+    def quantile(self, q: float) -> float:
+        """Estimate the q-quantile (0 <= q <= 1); NaN if empty."""
+        self._compress()
+        if self.count == 0:
+            return math.nan
+        if self.count == 1:
+            return self.min
+
+        # Centroid i covers cumulative weight around its center; the target
+        # position matches np.percentile's (n - 1) * q indexing
+        centers = np.cumsum(self._weights) - self._weights / 2
+        target = q * (self.count - 1) + 0.5
+        positions = np.concatenate([[0.5], centers, [self.count - 0.5]])
+        values = np.concatenate([[self.min], self._means, [self.max]])
+        return float(np.interp(target, positions, values))
+
+    def __len__(self):
+        return self.count
+
+
+class MetricSummary:
+    """
+    Streaming count/mean/std/min/max (Welford) plus a TDigest for quantiles.
+
+    summary() returns the same fields analysis.py writes to
+    metrics_stats.json (std is the population standard deviation, as
+    np.std).
+    """
+
+    def __init__(self, compression: float = 200.0):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.digest = TDigest(compression)
+
+    def add(self, value: float):
+        value = float(value)
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.digest.add(value)
+
+    def add_many(self, values: Iterable[float]):
+        """Add a batch of values (faster than add() per value)."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if len(values) == 0:
+            return
+        mean = float(values.mean())
+        self._merge_moments(len(values), mean, float(((values - mean) ** 2).sum()))
+        self.digest.add_many(values)
+
+    def _merge_moments(self, count, mean, m2):
+        total = self.count + count
+        delta = mean - self.mean
+        self._m2 += m2 + delta * delta * self.count * count / total
+        self.mean += delta * count / total
+        self.count = total
+
+    def merge(self, other: "MetricSummary"):
+        """Fold another summary into this one (Chan et al. parallel update)."""
+        if other.count == 0:
+            return
+        self._merge_moments(other.count, other.mean, other._m2)
+        self.digest.merge(other.digest)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self._m2 / self.count) if self.count else math.nan
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "q1": self.digest.quantile(0.25),
+            "q2": self.digest.quantile(0.50),
+            "q3": self.digest.quantile(0.75),
+            "min": self.digest.min,
+            "max": self.digest.max,
+            "mean": self.mean,
+            "std": self.std,
+        }
+
+
+def summarize_values(values: Iterable[float], compression: float = 200.0) -> Dict[str, float]:
+    """MetricSummary.summary() of an iterable of values."""
+    summary = MetricSummary(compression)
+    summary.add_many(list(values))
+    return summary.summary()
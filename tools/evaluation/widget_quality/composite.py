@@ -1,10 +1,14 @@
 import numpy as np
 
 import os
-os.environ["OPENBLAS_NUM_THREADS"] = "64"
-os.environ["OMP_NUM_THREADS"] = "64"
-os.environ["MKL_NUM_THREADS"] = "64"
-os.environ["NUMEXPR_NUM_THREADS"] = "64"
+# Defaults only: eval.py sets an explicit per-worker budget before spawning workers
+os.environ.setdefault("OPENBLAS_NUM_THREADS", "64")
+os.environ.setdefault("OMP_NUM_THREADS", "64")
+os.environ.setdefault("MKL_NUM_THREADS", "64")
+os.environ.setdefault("NUMEXPR_NUM_THREADS", "64")
+
+# Bump when the score transformations change; this invalidates stored evaluation results
+METRIC_VERSION = 1
 
 def handling_style(style):
     # Keep the same transformation logic (0-1 -> 0-100)
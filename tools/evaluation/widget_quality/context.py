@@ -0,0 +1,110 @@
+import time
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+from skimage.color import rgb2gray
+
+from .utils import resize_to_match
+
+# ==========================================================
+#  Per-image representations (lazy, memoized)
+# ==========================================================
+
+
+class ImageContext:
+    """
+    An image plus lazily computed, memoized derived representations.
+
+    Metric feature extractors accept either a plain image or an
+    ImageContext (see image_context), so handing one context to several
+    metric families computes each shared representation once. Generic
+    representations are properties; metric-specific ones are memoized
+    through memo() under a module-chosen key.
+
+    Example:
+        >>> ctx = ImageContext(load_image("GT/gt_0001.png"))
+        >>> extract_layout_features(ctx)   # computes ctx.edges
+        >>> extract_legibility_features(ctx)   # reuses ctx.rgb_u8
+    """
+
+    def __init__(self, image):
+        self.image = image
+        self._memo = {}
+
+    @property
+    def shape(self):
+        return self.image.shape
+
+    def memo(self, key, compute):
+        """Return the representation stored under key, computing it with compute() once."""
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    @property
+    def rgb_u8(self):
+        """uint8 RGB (OCR input and base of the OpenCV conversions)."""
+        return self.memo("rgb_u8", lambda: (self.image * 255).astype(np.uint8))
+
+    @property
+    def gray_u8(self):
+        """uint8 grayscale, as utils.to_gray."""
+        return self.memo("gray_u8", lambda: cv2.cvtColor(self.rgb_u8, cv2.COLOR_RGB2GRAY))
+
+    @property
+    def edges(self):
+        """Canny edge map, as utils.edge_map."""
+        return self.memo("edges", lambda: cv2.Canny(self.gray_u8, 100, 200))
+
+    @property
+    def luminance(self):
+        """Float luminance in [0, 1], as skimage.color.rgb2gray."""
+        return self.memo("luminance", lambda: rgb2gray(self.image))
+
+
+def image_context(img):
+    """Wrap a plain image in a fresh ImageContext; contexts are returned as is."""
+    return img if isinstance(img, ImageContext) else ImageContext(img)
+
+
+# ==========================================================
+#  Per-pair evaluation context
+# ==========================================================
+
+
+class EvalContext:
+    """
+    Shared preprocessing and timing for one GT–prediction pair.
+
+    Holds ImageContexts for the GT, the raw prediction and the prediction
+    resized to the GT size (resized on first access), and accumulates
+    per-stage wall-clock timings that eval.py writes to evaluation.json.
+    gt_img may be an ImageContext shared by several pairs with the same GT
+    (e.g. one GT scored against several prediction runs).
+    """
+
+    def __init__(self, gt_img, pred_img):
+        self.gt = image_context(gt_img)
+        self.pred = ImageContext(pred_img)
+        self._gen = None
+        self.timings = {}
+
+    @property
+    def gen(self):
+        """The prediction resized to the GT size."""
+        if self._gen is None:
+            self._gen = ImageContext(resize_to_match(self.gt.image, self.pred.image))
+        return self._gen
+
+    def add_time(self, stage, seconds):
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def timed(self, stage):
+        """Add the wall-clock time of the block to timings[stage]."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
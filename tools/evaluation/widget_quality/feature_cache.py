@@ -0,0 +1,144 @@
+import os
+import json
+import hashlib
+import threading
+
+from .layout import extract_layout_features, METRIC_VERSION as LAYOUT_VERSION
+from .legibility import extract_legibility_features, ocr_config_key, METRIC_VERSION as LEGIBILITY_VERSION
+from .style import extract_style_features, METRIC_VERSION as STYLE_VERSION
+from .style import extract_palette, PALETTE_VERSION
+
+# ==========================================================
+#  Ground-truth feature extractors (metric -> (version, fn))
+# ==========================================================
+# Perceptual metrics (SSIM, LPIPS) compare the two images directly and have
+# no GT-only stage worth persisting, so they are not cached.
+FEATURE_EXTRACTORS = {
+    "layout": (LAYOUT_VERSION, extract_layout_features),
+    "legibility": (LEGIBILITY_VERSION, extract_legibility_features),
+    "style": (STYLE_VERSION, extract_style_features),
+    # Not part of compute_style; GT palettes for compute_dominant_palette_match
+    # (cache.get(..., ["palette"]))
+    "palette": (PALETTE_VERSION, extract_palette),
+}
+
+# Metrics whose features also depend on runtime configuration; they are
+# stored per configuration (e.g. "legibility@cuda") so runs with different
+# OCR devices never reuse each other's features
+FEATURE_VARIANTS = {
+    "legibility": ocr_config_key,
+}
+
+
+def storage_key(metric):
+    """Cache entry name of a metric under the current configuration."""
+    variant = FEATURE_VARIANTS.get(metric)
+    return metric if variant is None else f"{metric}@{variant()}"
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """SHA-256 of a file's bytes."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class GTFeatureCache:
+    """
+    Persistent cache of ground-truth-side metric features.
+
+    Features are stored as one JSON file per GT image, named by the SHA-256
+    of the image file, so renamed or copied GT folders reuse the cache and an
+    edited image is recomputed. Each metric's entry records its
+    METRIC_VERSION; bumping the version in the metric module invalidates
+    only that metric's features. Metrics listed in FEATURE_VARIANTS are
+    stored once per configuration (OCR device for legibility). Features are
+    also memoized in memory for the lifetime of the cache object.
+
+    Example:
+        >>> cache = GTFeatureCache("GT/.feature_cache")
+        >>> features = cache.get("GT/gt_0001.png", gt_img)
+        >>> compute_layout(gt_img, gen, features["layout"])
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._memory = {}
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_path(self, image_hash):
+        return os.path.join(self.cache_dir, f"{image_hash}.json")
+
+    def _read(self, image_hash):
+        try:
+            with open(self._entry_path(image_hash), "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("imageHash") != image_hash:
+            return {}
+        return data.get("metrics", {})
+
+    def _write(self, image_hash, metrics):
+        path = self._entry_path(image_hash)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"imageHash": image_hash, "metrics": metrics}, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            # A read-only or full cache dir must not fail the evaluation
+            print(f"⚠️  Could not write GT feature cache {path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def get(self, gt_path, gt_img, metrics=None):
+        """
+        Return {metric: features} for a GT image, computing stale entries.
+
+        Args:
+            gt_path: Path to the GT image file (hashed for the cache key)
+            gt_img: The loaded GT image (used only on a cache miss)
+            metrics: Metrics to return (default: all of FEATURE_EXTRACTORS)
+        """
+        metrics = list(metrics) if metrics is not None else list(FEATURE_EXTRACTORS)
+        keys = {metric: storage_key(metric) for metric in metrics}
+        image_hash = file_sha256(gt_path)
+
+        with self._lock:
+            features = dict(self._memory.get(image_hash, {}))
+
+        missing = [m for m in metrics if keys[m] not in features]
+        computed = False
+        if missing:
+            stored = self._read(image_hash)
+            for metric in missing:
+                key = keys[metric]
+                version, extract = FEATURE_EXTRACTORS[metric]
+                entry = stored.get(key)
+                if entry is not None and entry.get("version") == version:
+                    features[key] = entry["features"]
+                else:
+                    features[key] = extract(gt_img)
+                    stored[key] = {"version": version, "features": features[key]}
+                    computed = True
+
+            # Concurrent writers for the same image may drop each other's
+            # entries; that only costs a recomputation on a later run
+            if computed:
+                self._write(image_hash, stored)
+
+        with self._lock:
+            if computed:
+                self.misses += 1
+            else:
+                self.hits += 1
+            self._memory.setdefault(image_hash, {}).update(features)
+        return {m: features[keys[m]] for m in metrics}
@@ -1,5 +1,8 @@
 import numpy as np
 
+# Bump when the metric changes; this invalidates stored evaluation results
+METRIC_VERSION = 1
+
 def compute_aspect_dimensionality_fidelity(gt_img, gen_img, alpha=0.6, beta=0.4, decay=3.0):
     """
     Measures how well the generated widget preserves the aspect ratio and relative size of the GT.
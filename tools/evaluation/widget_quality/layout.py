@@ -1,24 +1,48 @@
 import cv2
 import numpy as np
-from .utils import edge_map, margin_from_mask, load_image
-import matplotlib
-matplotlib.use("Agg")  # For headless servers
-import matplotlib.pyplot as plt
-from scipy.spatial.distance import cdist
+from .utils import edge_map, load_image
+from .context import image_context
 
 # ==========================================================
 # ----- Outer Layout Metrics -----
 # ==========================================================
 
-def compute_margin_asymmetry(mask_gt, mask_gen):
-    """Variance imbalance of margins (normalized by mean)."""
-    m_gt = margin_from_mask(mask_gt)
-    m_gen = margin_from_mask(mask_gen)
+def _margin_asymmetry(m_gt, m_gen):
     diffs = np.abs(np.array(m_gt) - np.array(m_gen))
     mean = np.mean(diffs)
     return 0.0 if mean < 1e-6 else float(np.std(diffs) / mean)
 
 
+def _content_bbox(mask):
+    """
+    Inclusive (top, bottom, left, right) bounds of the nonzero pixels, or
+    None for an empty mask.
+
+    Uses row/column projections instead of np.where over every content
+    pixel; same bounds as margin_from_mask and the original aspect code.
+    """
+    rows = np.flatnonzero(mask.any(axis=1))
+    if len(rows) == 0:
+        return None
+    cols = np.flatnonzero(mask.any(axis=0))
+    return int(rows[0]), int(rows[-1]), int(cols[0]), int(cols[-1])
+
+
+def _margins(mask, bbox=None):
+    """Content margins (top, right, bottom, left), as utils.margin_from_mask."""
+    bbox = _content_bbox(mask) if bbox is None else bbox
+    h, w = mask.shape
+    if bbox is None:
+        return [h, w, h, w]
+    top, bottom, left, right = bbox
+    return [top, w - right, h - bottom, left]
+
+
+def compute_margin_asymmetry(mask_gt, mask_gen):
+    """Variance imbalance of margins (normalized by mean)."""
+    return _margin_asymmetry(_margins(mask_gt), _margins(mask_gen))
+
+
 def compute_centroid_displacement(mask_gt, mask_gen):
     """Normalized centroid shift between GT and GEN."""
     coords_gt = np.column_stack(np.nonzero(mask_gt))
@@ -33,70 +57,59 @@ def compute_centroid_displacement(mask_gt, mask_gen):
     return float(disp / diag)
 
 
-def compute_content_aspect_diff(mask_gt, mask_gen):
-    """Difference in content bounding-box aspect ratio."""
-    if np.sum(mask_gt) == 0 or np.sum(mask_gen) == 0:
-        return 0.0
+def _content_aspect(mask, bbox=None):
+    """Aspect ratio (w / h) of the content bounding box, or None for an empty mask."""
+    bbox = _content_bbox(mask) if bbox is None else bbox
+    if bbox is None:
+        return None
+    top, bottom, left, right = bbox
+    return float((right - left + 1) / (bottom - top + 1))
 
-    def bbox_ar(mask):
-        ys, xs = np.where(mask > 0)
-        h = ys.max() - ys.min() + 1
-        w = xs.max() - xs.min() + 1
-        return w / h if h > 0 else 1.0
 
-    ar_gt, ar_gen = bbox_ar(mask_gt), bbox_ar(mask_gen)
+def _content_aspect_diff(ar_gt, ar_gen):
+    if ar_gt is None or ar_gen is None:
+        return 0.0
     return float(abs(np.log(ar_gt / ar_gen)))
 
 
+def compute_content_aspect_diff(mask_gt, mask_gen):
+    """Difference in content bounding-box aspect ratio."""
+    return _content_aspect_diff(_content_aspect(mask_gt), _content_aspect(mask_gen))
+
+
 # ==========================================================
 # ----- Inner Layout Metrics -----
 # ==========================================================
 
-def analyze_internal_structure(mask_gt, mask_gen, min_area=10):
+def _component_boxes(mask, min_area=10):
     """
-    Compare internal content structure (connected components).
-    Returns element count difference, area ratio diff, and alignment error.
+    Bounding boxes of connected components larger than min_area, as an
+    (n, 5) int64 array of rows (x, y, w, h, w*h).
     """
-    def get_components(mask):
-        mask_bin = (mask > 0).astype(np.uint8)
-        num, labels, stats, _ = cv2.connectedComponentsWithStats(mask_bin, connectivity=8)
-        stats = stats[1:]  # skip background
-        boxes = [(x, y, w, h, w*h) for x, y, w, h, area in stats if area > min_area]
-        return boxes
+    # Any nonzero pixel is foreground, so the uint8 mask needs no binarization
+    _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    stats = stats[1:]  # skip background
+    boxes = stats[stats[:, cv2.CC_STAT_AREA] > min_area, :4].astype(np.int64)
+    return np.column_stack([boxes, boxes[:, 2] * boxes[:, 3]])
+
 
-    boxes_gt = get_components(mask_gt)
-    boxes_gen = get_components(mask_gen)
+def _area_ratio_diff(areas_gt, areas_gen):
+    areas_gt, areas_gen = np.array(areas_gt), np.array(areas_gen)
+    if len(areas_gt) > 0 and len(areas_gen) > 0:
+        return float(abs((areas_gen.mean() / areas_gen.sum()) - (areas_gt.mean() / areas_gt.sum())))
+    return 0.0
 
-    count_diff = abs(len(boxes_gt) - len(boxes_gen))
+
+def analyze_internal_structure(mask_gt, mask_gen, min_area=10):
+    """
+    Compare internal content structure (connected components).
+    Returns the area ratio diff.
+    """
+    boxes_gt = _component_boxes(mask_gt, min_area)
+    boxes_gen = _component_boxes(mask_gen, min_area)
 
     # Area ratio difference
-    areas_gt = np.array([b[4] for b in boxes_gt])
-    areas_gen = np.array([b[4] for b in boxes_gen])
-    if len(areas_gt) > 0 and len(areas_gen) > 0:
-        area_ratio_diff = abs((areas_gen.mean() / areas_gen.sum()) - (areas_gt.mean() / areas_gt.sum()))
-    else:
-        area_ratio_diff = 0.0
-
-    # Alignment (horizontal centroid alignment)
-    img_h, img_w = mask_gt.shape[:2]
-    gt_centers = np.array([[b[0] + b[2]/2, b[1] + b[3]/2] for b in boxes_gt])
-    gen_centers = np.array([[b[0] + b[2]/2, b[1] + b[3]/2] for b in boxes_gen])
-    if len(gt_centers)==0 or len(gen_centers)==0:
-        align_error = 0.0
-    else:
-        dists = cdist(gen_centers, gt_centers)
-        min_dists = np.min(dists, axis=1)
-        # normalize by diagonal for scale-invariance
-        diag = np.hypot(img_w, img_h)
-        align_error = float(np.mean(min_dists) / diag)
-
-    # print('align error ', align_error)
-    # centers_gt = np.array([b[0] + b[2]/2 for b in boxes_gt])
-    # centers_gen = np.array([b[0] + b[2]/2 for b in boxes_gen])
-    # if len(centers_gt) and len(centers_gen):
-    #     align_error = abs(np.mean(centers_gt - centers_gt.mean()) - np.mean(centers_gen - centers_gen.mean()))
-    # else:
-    #     align_error = 0.0
+    area_ratio_diff = _area_ratio_diff(boxes_gt[:, 4], boxes_gen[:, 4])
 
     # Only return the metric we need (AreaRatioDiff)
     return {
@@ -108,45 +121,115 @@ def analyze_internal_structure(mask_gt, mask_gen, min_area=10):
 # ----- Unified Layout Metric -----
 # ==========================================================
 
-def compute_layout(gt, gen):
+# Bump when the metric or its per-image features change; this invalidates
+# cached ground-truth features (see feature_cache.py)
+METRIC_VERSION = 1
+
+
+def _pyramid_level(shape, max_side):
+    """Number of 2x pyramid reductions that bring max(h, w) to at most max_side."""
+    h, w = shape[:2]
+    level = 0
+    while max_side is not None and max(h, w) > max_side:
+        h, w = (h + 1) // 2, (w + 1) // 2
+        level += 1
+    return level
+
+
+def content_mask(img, level=0):
     """
-    Compute combined outer + inner layout metrics.
-    Returns a dict with all sub-metrics.
+    Dilated edge map used as the content mask by all layout metrics.
+
+    level > 0 computes the mask on the level-th 2x Gaussian pyramid
+    reduction of the grayscale image instead of at full resolution.
     """
-    # --- Edge detection & dilation ---
-    e_gt, e_gen = edge_map(gt), edge_map(gen)
+    ctx = image_context(img)
     kernel = np.ones((3, 3), np.uint8)
-    mask_gt = cv2.dilate(e_gt, kernel)
-    mask_gen = cv2.dilate(e_gen, kernel)
+    if level == 0:
+        return ctx.memo("content_mask", lambda: cv2.dilate(ctx.edges, kernel))
 
-    # print(e_gt.shape, e_gen.shape, mask_gt.shape, mask_gen.shape)
-    # --- Outer metrics ---
-    m_gt, m_gen = margin_from_mask(mask_gt), margin_from_mask(mask_gen)
-    margin_delta = np.mean(np.abs(np.array(m_gt) - np.array(m_gen)))
+    def reduced_mask():
+        gray = ctx.gray_u8
+        for _ in range(level):
+            gray = cv2.pyrDown(gray)
+        return cv2.dilate(cv2.Canny(gray, 100, 200), kernel)
 
-    h, w = e_gen.shape
-    band = int(0.05 * max(h, w))
-    edge_band = np.zeros_like(e_gen)
-    edge_band[:band, :], edge_band[-band:, :] = 1, 1
-    edge_band[:, :band], edge_band[:, -band:] = 1, 1
-    crowd_rate = np.sum((mask_gen > 0) & (edge_band > 0)) / (np.sum(mask_gen > 0) + 1e-6)
+    return ctx.memo(f"content_mask_{level}", reduced_mask)
 
-    margin_asym = compute_margin_asymmetry(mask_gt, mask_gen)
-    centroid_disp = compute_centroid_displacement(mask_gt, mask_gen)
-    aspect_diff = compute_content_aspect_diff(mask_gt, mask_gen)
+
+def extract_layout_features(img, min_area=10, max_side=None):
+    """
+    Compute the per-image inputs of compute_layout (img may be an ImageContext).
+
+    The result is JSON-serializable so ground-truth features can be cached:
+        - margins: content margins (top, right, bottom, left)
+        - content_aspect: content bounding-box aspect ratio, or None if empty
+        - component_areas: box areas of connected components above min_area
+
+    By default the mask is analysed at full resolution. With max_side set,
+    images larger than max_side are analysed on a Gaussian pyramid level
+    no larger than max_side (min_area is scaled down accordingly, margins
+    and areas are scaled back to full-resolution pixels). This is faster on
+    large renders but not bit-identical to the full-resolution scores.
+    Features are memoized on the ImageContext, so a GT context shared by
+    several pairs is analysed once.
+    """
+    ctx = image_context(img)
+
+    def extract():
+        level = _pyramid_level(ctx.shape, max_side)
+        scale = 2 ** level
+        mask = content_mask(ctx, level)
+        bbox = _content_bbox(mask)
+        margins = _margins(mask, bbox)
+        if level:
+            # Full-resolution extents, so margins stay in original pixels
+            h, w = ctx.shape[:2]
+            margins = [min(m * scale, h if i % 2 == 0 else w) for i, m in enumerate(margins)]
+        return {
+            "margins": [int(m) for m in margins],
+            "content_aspect": _content_aspect(mask, bbox),
+            "component_areas": (_component_boxes(mask, min_area / scale ** 2)[:, 4] * scale ** 2).tolist(),
+        }
+
+    return ctx.memo(f"layout_features_{min_area}_{max_side}", extract)
+
+
+def compute_layout(gt, gen, gt_features=None, max_side=None):
+    """
+    Compute combined outer + inner layout metrics.
+
+    Args:
+        gt: Ground truth image
+        gen: Generated image (resized to GT)
+        gt_features: Optional precomputed extract_layout_features(gt),
+            computed with the same max_side
+        max_side: Optional pyramid size limit (see extract_layout_features)
+
+    Returns a dict with all sub-metrics.
+    """
+    # --- Edge detection, dilation & components ---
+    if gt_features is None:
+        gt_features = extract_layout_features(gt, max_side=max_side)
+    gen_features = extract_layout_features(gen, max_side=max_side)
+
+    # --- Outer metrics ---
+    margin_asym = _margin_asymmetry(gt_features["margins"], gen_features["margins"])
+    aspect_diff = _content_aspect_diff(gt_features["content_aspect"], gen_features["content_aspect"])
 
     # --- Inner metrics ---
-    inner = analyze_internal_structure(mask_gt, mask_gen)
+    area_ratio_diff = _area_ratio_diff(gt_features["component_areas"], gen_features["component_areas"])
 
     # Return only the 3 metrics we need: MarginAsymmetry, ContentAspectDiff, AreaRatioDiff
     return {
         "MarginAsymmetry": float(margin_asym),
         "ContentAspectDiff": float(aspect_diff),
-        "AreaRatioDiff": inner["AreaRatioDiff"]
+        "AreaRatioDiff": area_ratio_diff
     }
 
 
 
+# Visualization helpers (need: import matplotlib; matplotlib.use("Agg"); import matplotlib.pyplot as plt)
 # def visualize_bbox_comparison(gt, gen, mask_gt, mask_gen, save_path="bbox_compare.png", figsize=(10,5)):
 #     fig, axes = plt.subplots(1, 2, figsize=figsize)
 #     for ax, img, mask, title in zip(
@@ -1,13 +1,69 @@
+import time
+import threading
 import numpy as np
-import easyocr
 import cv2
-import matplotlib.pyplot as plt
-import numpy as np
+from .context import image_context
 
 # ==========================================================
-#  Initialize EasyOCR
+#  EasyOCR reader (lazy, one per process)
 # ==========================================================
-_reader = easyocr.Reader(["en"], gpu=True)
+# easyocr (and torch) are imported on first use: importing and building the
+# reader costs seconds and hundreds of MB, which processes that never run
+# OCR should not pay.
+_use_gpu = False
+_quantize = True
+_reader = None
+_reader_lock = threading.Lock()
+
+
+def set_ocr_device(use_cuda=False, quantize=True):
+    """
+    Select the device for EasyOCR. The reader is built lazily on first use.
+
+    Args:
+        use_cuda: Run OCR on the GPU (falls back to CPU if CUDA is unavailable)
+        quantize: Use dynamically quantized models on CPU (EasyOCR default)
+    """
+    global _use_gpu, _quantize, _reader
+
+    with _reader_lock:
+        if (use_cuda, quantize) != (_use_gpu, _quantize):
+            _reader = None
+        _use_gpu = use_cuda
+        _quantize = quantize
+
+
+def ocr_config_key(use_cuda=None, quantize=None):
+    """
+    Name the OCR configuration that legibility results depend on:
+    "cuda", "cpu-quantized" or "cpu".
+
+    Defaults to the settings of set_ocr_device. A CUDA request on a machine
+    without CUDA resolves to the CPU configuration EasyOCR falls back to.
+    """
+    use_cuda = _use_gpu if use_cuda is None else use_cuda
+    quantize = _quantize if quantize is None else quantize
+    if use_cuda:
+        import torch
+        use_cuda = torch.cuda.is_available()
+    if use_cuda:
+        return "cuda"
+    return "cpu-quantized" if quantize else "cpu"
+
+
+def get_reader():
+    """Return the per-process EasyOCR reader, building it on first call."""
+    global _reader
+
+    with _reader_lock:
+        if _reader is None:
+            import easyocr
+
+            start = time.perf_counter()
+            _reader = easyocr.Reader(["en"], gpu=_use_gpu, quantize=_quantize, verbose=False)
+            print(f"✓ EasyOCR reader loaded on {_reader.device} in {time.perf_counter() - start:.1f}s")
+
+    return _reader
 
 
 # ==========================================================
@@ -38,13 +94,41 @@ def contrast_ratio(img):
 
 def ocr_text_easyocr(img, conf_thresh=0.5):
     """Extract visible text using EasyOCR (confidence threshold)."""
-    
-    img_u8 = np.clip((img * 255).astype(np.uint8), 0, 255)
-    results = _reader.readtext(img_u8)
+    img_u8 = image_context(img).rgb_u8
+    results = get_reader().readtext(img_u8)
     words = [t for (_, t, conf) in results if conf >= conf_thresh and t.strip()]
     return " ".join(words), results
 
 
+def ocr_text_easyocr_batch(imgs, conf_thresh=0.5, max_batch=8):
+    """
+    Batched ocr_text_easyocr: returns one (text, results) tuple per image.
+
+    EasyOCR batches detection only over images of identical size (padding
+    would change the detector's canvas and hence the boxes), so images are
+    bucketed by shape and each bucket runs in detector batches of up to
+    max_batch. A GT image and its resized prediction always share a shape.
+    """
+    imgs_u8 = [image_context(img).rgb_u8 for img in imgs]
+    buckets = {}
+    for idx, img_u8 in enumerate(imgs_u8):
+        buckets.setdefault(img_u8.shape, []).append(idx)
+
+    reader = get_reader()
+    outputs = [None] * len(imgs)
+    for indices in buckets.values():
+        for k in range(0, len(indices), max_batch):
+            batch = indices[k:k + max_batch]
+            if len(batch) == 1:
+                batch_results = [reader.readtext(imgs_u8[batch[0]])]
+            else:
+                batch_results = reader.readtext_batched([imgs_u8[i] for i in batch])
+            for i, results in zip(batch, batch_results):
+                words = [t for (_, t, conf) in results if conf >= conf_thresh and t.strip()]
+                outputs[i] = (" ".join(words), results)
+    return outputs
+
+
 def local_contrast_from_text_regions(img, ocr_results, min_area=20):
     """
     Compute average contrast ratio within OCR-detected text regions.
@@ -79,31 +163,53 @@ def local_contrast_from_text_regions(img, ocr_results, min_area=20):
 #  Main Legibility Metric
 # ==========================================================
 
-def compute_legibility(gt, gen):
+# Bump when the metric or its per-image features change; this invalidates
+# cached ground-truth features (see feature_cache.py)
+METRIC_VERSION = 1
+
+
+def _legibility_features(ctx, text, ocr_results):
+    # Both contrast measures start from the same grayscale (to_gray is idempotent on it)
+    gray = ctx.memo("legibility_gray", lambda: to_gray(ctx.image))
+    return {
+        "text": text,
+        "contrast": float(np.nan_to_num(contrast_ratio(gray))),
+        "contrast_local": local_contrast_from_text_regions(gray, ocr_results),
+    }
+
+
+def extract_legibility_features(img):
     """
-    Compute legibility metrics between ground truth and generated widget.
+    Compute the per-image inputs of compute_legibility (img may be an ImageContext).
 
-    Returns a dictionary:
-        - TextJaccard: OCR word overlap (semantic legibility)
-        - ContrastDiff: absolute difference in global contrast (visual legibility)
-        - ContrastLocalDiff: difference in text-region contrast between GT and GEN
+    The result is JSON-serializable so ground-truth features can be cached:
+        - text: space-joined OCR words above the confidence threshold
+        - contrast: global contrast ratio
+        - contrast_local: mean text-region contrast, or None if no text
     """
-    # --- OCR and text extraction ---
-    txt_gt, results_gt = ocr_text_easyocr(gt)
-    txt_gen, results_gen = ocr_text_easyocr(gen)
+    ctx = image_context(img)
+    text, ocr_results = ocr_text_easyocr(ctx)
+    return _legibility_features(ctx, text, ocr_results)
 
+
+def extract_legibility_features_batch(imgs):
+    """extract_legibility_features for a list of images with batched OCR."""
+    ctxs = [image_context(img) for img in imgs]
+    ocr_outputs = ocr_text_easyocr_batch(ctxs)
+    return [_legibility_features(ctx, text, results) for ctx, (text, results) in zip(ctxs, ocr_outputs)]
+
+
+def _compare_legibility(gt_features, gen_features):
     # --- Text similarity ---
-    s_gt, s_gen = set(txt_gt.split()), set(txt_gen.split())
+    s_gt, s_gen = set(gt_features["text"].split()), set(gen_features["text"].split())
     jaccard = len(s_gt & s_gen) / (len(s_gt | s_gen) + 1e-6)
 
     # --- Global contrast ---
-    contrast_gt = np.nan_to_num(contrast_ratio(gt))
-    contrast_gen = np.nan_to_num(contrast_ratio(gen))
-    contrast_diff = float(np.clip(abs(contrast_gt - contrast_gen), 0, 5))
+    contrast_diff = float(np.clip(abs(gt_features["contrast"] - gen_features["contrast"]), 0, 5))
 
     # --- Local (text-region) contrast ---
-    contrast_local_gt = local_contrast_from_text_regions(gt, results_gt)
-    contrast_local_gen = local_contrast_from_text_regions(gen, results_gen)
+    contrast_local_gt = gt_features["contrast_local"]
+    contrast_local_gen = gen_features["contrast_local"]
 
     MAX_DIFF = 5.0  # tunable threshold
     if contrast_local_gt is not None and contrast_local_gen is not None:
@@ -124,6 +230,55 @@ def compute_legibility(gt, gen):
     }
 
 
+def compute_legibility(gt, gen, gt_features=None):
+    """
+    Compute legibility metrics between ground truth and generated widget.
+
+    Args:
+        gt: Ground truth image
+        gen: Generated image (resized to GT)
+        gt_features: Optional precomputed extract_legibility_features(gt)
+
+    Returns a dictionary:
+        - TextJaccard: OCR word overlap (semantic legibility)
+        - ContrastDiff: absolute difference in global contrast (visual legibility)
+        - ContrastLocalDiff: difference in text-region contrast between GT and GEN
+    """
+    if gt_features is None:
+        gt_features = extract_legibility_features(gt)
+    return _compare_legibility(gt_features, extract_legibility_features(gen))
+
+
+def compute_legibility_batch(pairs, gt_features_list=None):
+    """
+    Batched compute_legibility over a list of (gt, gen) pairs.
+
+    OCR for all generated images (and GT images without precomputed
+    features) runs through ocr_text_easyocr_batch; results match the
+    per-pair path.
+
+    Args:
+        pairs: List of (gt, gen) images, gen resized to gt
+        gt_features_list: Optional per-pair precomputed GT features (entries may be None)
+
+    Returns:
+        List of compute_legibility result dicts, one per pair
+    """
+    if gt_features_list is None:
+        gt_features_list = [None] * len(pairs)
+
+    missing_gt = [i for i, features in enumerate(gt_features_list) if features is None]
+    images = [gen for _, gen in pairs] + [pairs[i][0] for i in missing_gt]
+    features = extract_legibility_features_batch(images)
+
+    gen_features = features[:len(pairs)]
+    gt_features_list = list(gt_features_list)
+    for i, gt_features in zip(missing_gt, features[len(pairs):]):
+        gt_features_list[i] = gt_features
+
+    return [_compare_legibility(gt_f, gen_f) for gt_f, gen_f in zip(gt_features_list, gen_features)]
+
+
 def visualize_ocr_boxes(img, results, figsize=(10, 10), save_path=None):
     """
     Visualize and optionally save EasyOCR text boxes and labels on an image.
@@ -134,6 +289,8 @@ def visualize_ocr_boxes(img, results, figsize=(10, 10), save_path=None):
         figsize (tuple): Size of the displayed figure.
         save_path (str): Optional. If provided, saves the visualization to this path.
     """
+    import matplotlib.pyplot as plt
+
     # Convert to uint8 for OpenCV drawing
     img_u8 = (img * 255).astype(np.uint8) if img.max() <= 1 else img.copy()
 
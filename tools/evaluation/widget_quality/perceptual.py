@@ -28,56 +28,83 @@
 #     }
 
 
-import torch
-from lpips import LPIPS
+import time
+import threading
 from skimage.metrics import structural_similarity as ssim
 from skimage.feature import canny
 from scipy.ndimage import distance_transform_edt
 import numpy as np
 import cv2
 
-# Default to CPU (can be changed with set_device)
-device = torch.device("cpu")
-lpips_vgg = None
-_initialized = False
+# Bump when the metric changes; this invalidates stored evaluation results
+METRIC_VERSION = 1
 
-def set_device(use_cuda=False):
-    """Set the device for LPIPS computation. Call this before running evaluation.
+# torch and lpips are imported on first use: importing them costs seconds,
+# and processes that never compute LPIPS should not pay for it.
+_use_cuda = False
+_channels_last = False
+_lpips_vgg = None
+_model_lock = threading.Lock()
+device = None  # torch.device of the loaded model, set on first use
+
+
+def set_device(use_cuda=False, channels_last=False):
+    """Select the device for LPIPS computation. Call this before running evaluation.
+
+    The model itself is built lazily on first use (once per process), so this
+    is cheap and safe to call from worker initializers.
 
     Args:
         use_cuda: If True, use CUDA if available. If False, use CPU.
+        channels_last: Run the CPU model in channels-last memory format
+            (faster convolutions on recent x86 CPUs; results within float tolerance)
     """
-    global device, lpips_vgg, _initialized
+    global _use_cuda, _channels_last, _lpips_vgg, device
 
-    if use_cuda and torch.cuda.is_available():
-        device = torch.device("cuda")
-    else:
-        device = torch.device("cpu")
+    with _model_lock:
+        if (use_cuda, channels_last) != (_use_cuda, _channels_last):
+            _lpips_vgg = None
+            device = None
+        _use_cuda = use_cuda
+        _channels_last = channels_last
 
-    # Initialize LPIPS model on the correct device
-    lpips_vgg = LPIPS(net="vgg").to(device)
 
-    # Only print when explicitly called (not during module init)
-    if _initialized:
-        print(f"✓ Perceptual metrics device: {device}")
+def get_lpips():
+    """Return the per-process LPIPS-VGG model, building it on first call."""
+    global _lpips_vgg, device
 
-    _initialized = True
+    with _model_lock:
+        if _lpips_vgg is None:
+            import torch
+            from lpips import LPIPS
 
-# Initialize with CPU by default (silent)
-set_device(use_cuda=False)
+            start = time.perf_counter()
+            device = torch.device("cuda" if _use_cuda and torch.cuda.is_available() else "cpu")
+            model = LPIPS(net="vgg", verbose=False).to(device).eval()
+            if _channels_last and device.type == "cpu":
+                model = model.to(memory_format=torch.channels_last)
+            _lpips_vgg = model
+            print(f"✓ LPIPS (vgg) loaded on {device} in {time.perf_counter() - start:.1f}s")
 
+    return _lpips_vgg
 
 
 def compute_perceptual(gt, gen):
     """Compute perceptual metrics efficiently with GPU LPIPS."""
+    import torch
+
     # SSIM
     ssim_val = ssim(gt, gen, channel_axis=2, data_range=1.0)
 
     # LPIPS (GPU)
+    model = get_lpips()
     gt_t = torch.tensor(gt).permute(2,0,1).unsqueeze(0).float().to(device)
     gen_t = torch.tensor(gen).permute(2,0,1).unsqueeze(0).float().to(device)
-    with torch.no_grad():
-        lp = float(lpips_vgg(gt_t, gen_t).item())
+    if _channels_last and device.type == "cpu":
+        gt_t = gt_t.contiguous(memory_format=torch.channels_last)
+        gen_t = gen_t.contiguous(memory_format=torch.channels_last)
+    with torch.inference_mode():
+        lp = float(model(gt_t, gen_t).item())
         # lp = 0.5
 
     # Only return SSIM and LPIPS (EdgeF1 removed)
@@ -85,3 +112,42 @@ def compute_perceptual(gt, gen):
         "SSIM": ssim_val,
         "LPIPS": lp
     }
+
+
+def compute_perceptual_batch(pairs, max_batch=8):
+    """
+    Batched compute_perceptual over a list of (gt, gen) pairs.
+
+    LPIPS runs one forward pass per group of up to max_batch pairs with the
+    same image size. Pairs are not padded to a common size because LPIPS
+    averages over the whole spatial extent, so padding would change scores.
+
+    Returns:
+        List of compute_perceptual result dicts, one per pair
+    """
+    import torch
+
+    model = get_lpips()
+    lpips_values = [None] * len(pairs)
+
+    buckets = {}
+    for idx, (gt, _) in enumerate(pairs):
+        buckets.setdefault(gt.shape, []).append(idx)
+
+    for indices in buckets.values():
+        for k in range(0, len(indices), max_batch):
+            batch = indices[k:k + max_batch]
+            gt_t = torch.from_numpy(np.stack([pairs[i][0] for i in batch])).permute(0,3,1,2).float().to(device)
+            gen_t = torch.from_numpy(np.stack([pairs[i][1] for i in batch])).permute(0,3,1,2).float().to(device)
+            if _channels_last and device.type == "cpu":
+                gt_t = gt_t.contiguous(memory_format=torch.channels_last)
+                gen_t = gen_t.contiguous(memory_format=torch.channels_last)
+            with torch.inference_mode():
+                values = model(gt_t, gen_t).flatten().tolist()
+            for i, lp in zip(batch, values):
+                lpips_values[i] = lp
+
+    return [
+        {"SSIM": ssim(gt, gen, channel_axis=2, data_range=1.0), "LPIPS": lp}
+        for (gt, gen), lp in zip(pairs, lpips_values)
+    ]
@@ -1,44 +1,155 @@
 import numpy as np, cv2
-from skimage.color import rgb2hsv, rgb2lab
-from scipy.stats import wasserstein_distance
+from skimage.color import rgb2lab
 from scipy.optimize import linear_sum_assignment
-from skimage.color import rgb2gray
+from .context import image_context
 
 # ==========================================================
 #  1) Palette Distance (hue histogram EMD)
 # ==========================================================
-def compute_palette_distance(gt, gen, bins=36):
-    hsv_gt, hsv_gen = rgb2hsv(gt), rgb2hsv(gen)
-    h_gt, h_gen = hsv_gt[..., 0].ravel(), hsv_gen[..., 0].ravel()
-
-    hist_gt, _ = np.histogram(h_gt, bins=bins, range=(0, 1), density=True)
-    hist_gen, _ = np.histogram(h_gen, bins=bins, range=(0, 1), density=True)
-
-    # Earth-Mover’s distance (1D Wasserstein)
-    emd = wasserstein_distance(
-        np.arange(bins), np.arange(bins),
-        hist_gt / (hist_gt.sum() + 1e-6),
-        hist_gen / (hist_gen.sum() + 1e-6)
-    )
-    score = float(np.exp(-emd / (bins * 0.08)))  # normalized, smooth decay
+PALETTE_BINS = 36
+VIBRANCY_BINS = 30
+
+
+def _hue_saturation(img):
+    """
+    Hue and saturation channels of an RGB image in [0, 1].
+
+    Matches skimage.color.rgb2hsv bit for bit (including its red < green <
+    blue precedence on ties) but skips the value channel and the extra
+    copies, so all style sub-metrics share one cheap conversion.
+    """
+    r, g, b = img[..., 0], img[..., 1], img[..., 2]
+    v = np.maximum(np.maximum(r, g), b)
+    delta = v - np.minimum(np.minimum(r, g), b)
+    flat = delta == 0
+    delta[flat] = 1.0  # gray pixels: hue and saturation are 0 below
+    s = delta / np.where(flat, 1.0, v)
+    s[flat] = 0.0
+    h = np.where(b == v, 4.0 + (r - g) / delta,
+                 np.where(g == v, 2.0 + (b - r) / delta, (g - b) / delta))
+    h /= 6.0
+    h %= 1.0
+    h[flat] = 0.0
+    return h, s
+
+
+def _channel_hist(channel, bins):
+    """Normalized histogram of an HSV channel in [0, 1]."""
+    hist, _ = np.histogram(channel.ravel(), bins=bins, range=(0, 1), density=True)
+    return hist / (hist.sum() + 1e-6)
+
+
+def _hist_emd_score(hist_gt, hist_gen, scale):
+    bins = len(hist_gt)
+    # Earth-Mover’s distance (1D Wasserstein) over unit-spaced bins: the L1
+    # distance between the two CDFs (same value as scipy's wasserstein_distance)
+    cdf_gt = np.cumsum(hist_gt / hist_gt.sum())
+    cdf_gen = np.cumsum(hist_gen / hist_gen.sum())
+    emd = np.abs(cdf_gt - cdf_gen)[:-1].sum()
+    score = float(np.exp(-emd / (bins * scale)))  # normalized, smooth decay
     return np.clip(score, 0, 1)
 
+
+def compute_palette_distance(gt, gen, bins=PALETTE_BINS):
+    hue_gt, hue_gen = _hue_saturation(gt)[0], _hue_saturation(gen)[0]
+    return _hist_emd_score(_channel_hist(hue_gt, bins), _channel_hist(hue_gen, bins), 0.08)
+
 # ==========================================================
 #  2) Dominant Palette Matching (k-means + ΔE + weights)
 # ==========================================================
-def compute_dominant_palette_match(gt, gen, k=4):
-    from sklearn.cluster import KMeans
-    lab_gt, lab_gen = rgb2lab(gt), rgb2lab(gen)
+PALETTE_K = 4
+PALETTE_MAX_PIXELS = 20000
+PALETTE_SEED = 0
+PALETTE_CELL = 2.0  # LAB units per histogram cell
+# Bump when extract_palette changes; invalidates cached GT palettes
+PALETTE_VERSION = 1
+
+
+def _weighted_kmeans(X, w, k, rng, n_init=3, max_iter=50, tol=1e-4):
+    """
+    Lloyd k-means on weighted points with k-means++ seeding.
+
+    Returns (centers, labels) of the best of n_init runs by inertia.
+    """
+    p = w / w.sum()
+    best = None
+    for _ in range(n_init):
+        centers = [X[rng.choice(len(X), p=p)]]
+        d2 = ((X - centers[0]) ** 2).sum(axis=1)
+        for _ in range(1, k):
+            mass = w * d2
+            if mass.sum() <= 0:
+                break  # fewer distinct colors than clusters
+            centers.append(X[rng.choice(len(X), p=mass / mass.sum())])
+            d2 = np.minimum(d2, ((X - centers[-1]) ** 2).sum(axis=1))
+        C = np.array(centers)
+
+        for _ in range(max_iter):
+            dist = ((X[:, None, :] - C[None, :, :]) ** 2).sum(axis=-1)
+            labels = dist.argmin(axis=1)
+            mass = np.bincount(labels, weights=w, minlength=len(C))
+            sums = np.stack([np.bincount(labels, weights=w * X[:, c], minlength=len(C)) for c in range(3)], axis=1)
+            filled = mass > 0
+            new_C = C.copy()
+            new_C[filled] = sums[filled] / mass[filled, None]
+            shift = np.abs(new_C - C).max()
+            C = new_C
+            if shift < tol:
+                break
+
+        dist = ((X[:, None, :] - C[None, :, :]) ** 2).sum(axis=-1)
+        labels = dist.argmin(axis=1)
+        inertia = float((w * dist[np.arange(len(X)), labels]).sum())
+        if best is None or inertia < best[0]:
+            best = (inertia, C, labels)
+    return best[1], best[2]
+
+
+def extract_palette(img, k=PALETTE_K, max_pixels=PALETTE_MAX_PIXELS, seed=PALETTE_SEED):
+    """
+    Dominant LAB colors of an image and their pixel shares.
+
+    A fixed-seed subsample of at most max_pixels pixels is converted to LAB
+    and binned on a PALETTE_CELL grid; k-means then runs on the occupied
+    cells (mean color, weighted by pixel count) instead of every pixel.
+
+    Returns:
+        {"centers": k x 3 LAB centers, "weights": k shares summing to 1},
+        JSON-serializable so GT palettes can be cached
+    """
+    rng = np.random.default_rng(seed)
+    pixels = image_context(img).image.reshape(-1, 3)
+    if len(pixels) > max_pixels:
+        pixels = pixels[rng.choice(len(pixels), max_pixels, replace=False)]
+    lab = rgb2lab(pixels[None, :, :])[0]
 
-    def cluster_colors(lab, k):
-        X = lab.reshape(-1, 3)
-        km = KMeans(n_clusters=k, n_init=3, random_state=0).fit(X)
-        centers = km.cluster_centers_
-        weights = np.bincount(km.labels_) / len(km.labels_)
-        return centers, weights
+    cells = np.round(lab / PALETTE_CELL).astype(np.int64)
+    cells -= cells.min(axis=0)
+    dims = cells.max(axis=0) + 1
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    inverse = inverse.ravel()
+    X = np.stack([np.bincount(inverse, weights=lab[:, c]) for c in range(3)], axis=1) / counts[:, None]
+    w = counts.astype(np.float64)
 
-    c_gt, w_gt = cluster_colors(lab_gt, k)
-    c_gen, w_gen = cluster_colors(lab_gen, k)
+    centers, labels = _weighted_kmeans(X, w, k, rng)
+    weights = np.bincount(labels, weights=w, minlength=len(centers)) / w.sum()
+    return {"centers": centers.tolist(), "weights": weights.tolist()}
+
+
+def compute_dominant_palette_match(gt, gen, k=PALETTE_K, gt_palette=None):
+    """
+    Args:
+        gt: Ground truth image
+        gen: Generated image (resized to GT)
+        k: Number of dominant colors
+        gt_palette: Optional precomputed extract_palette(gt, k)
+    """
+    if gt_palette is None:
+        gt_palette = extract_palette(gt, k)
+    gen_palette = extract_palette(gen, k)
+    c_gt, w_gt = np.asarray(gt_palette["centers"]), np.asarray(gt_palette["weights"])
+    c_gen, w_gen = np.asarray(gen_palette["centers"]), np.asarray(gen_palette["weights"])
 
     # ΔE(CIE76) matrix between cluster centers
     dist = np.linalg.norm(c_gt[:, None, :] - c_gen[None, :, :], axis=-1)
@@ -54,33 +165,28 @@ def compute_dominant_palette_match(gt, gen, k=4):
 # ==========================================================
 #  3) Vibrancy / Vividness Consistency
 # ==========================================================
-def compute_vibrancy_consistency(gt, gen, bins=30):
-    hsv_gt, hsv_gen = rgb2hsv(gt), rgb2hsv(gen)
-    s_gt, s_gen = hsv_gt[..., 1].ravel(), hsv_gen[..., 1].ravel()
-    hist_gt, _ = np.histogram(s_gt, bins=bins, range=(0, 1), density=True)
-    hist_gen, _ = np.histogram(s_gen, bins=bins, range=(0, 1), density=True)
-    emd = wasserstein_distance(
-        np.arange(bins), np.arange(bins),
-        hist_gt / (hist_gt.sum() + 1e-6),
-        hist_gen / (hist_gen.sum() + 1e-6)
-    )
-    score = float(np.exp(-emd / (bins * 0.05)))
-    return np.clip(score, 0, 1)
+def compute_vibrancy_consistency(gt, gen, bins=VIBRANCY_BINS):
+    sat_gt, sat_gen = _hue_saturation(gt)[1], _hue_saturation(gen)[1]
+    return _hist_emd_score(_channel_hist(sat_gt, bins), _channel_hist(sat_gen, bins), 0.05)
 
 # ==========================================================
 #  4) Background Type Match (solid / gradient / photo)
 # ==========================================================
 
 
-def compute_polarity_consistency(gt, gen):
-    L_gt = rgb2gray(gt)
-    L_gen = rgb2gray(gen)
+def _luminance_polarity(img):
+    """(background, foreground) luminance estimates of an image (or ImageContext)."""
+    L = image_context(img).luminance
     # Approx background = mode region luminance
-    bg_gt = np.median(L_gt)
-    bg_gen = np.median(L_gen)
+    bg = np.median(L)
     # Approx foreground = mean of top 10% brightest or darkest pixels (edges/text)
-    fg_gt = np.mean(np.sort(L_gt.ravel())[:int(0.1*L_gt.size)])
-    fg_gen = np.mean(np.sort(L_gen.ravel())[:int(0.1*L_gen.size)])
+    fg = np.mean(np.sort(L.ravel())[:int(0.1*L.size)])
+    return float(bg), float(fg)
+
+
+def _polarity_score(polarity_gt, polarity_gen):
+    bg_gt, fg_gt = polarity_gt
+    bg_gen, fg_gen = polarity_gen
     pol_gt = np.sign(bg_gt - fg_gt)
     pol_gen = np.sign(bg_gen - fg_gen)
     score = 1.0 if pol_gt == pol_gen else 0.0
@@ -90,13 +196,49 @@ def compute_polarity_consistency(gt, gen):
     return float(np.clip(score, 0, 1))
 
 
+def compute_polarity_consistency(gt, gen):
+    return _polarity_score(_luminance_polarity(gt), _luminance_polarity(gen))
+
+
 # ==========================================================
 #  5) Composite Style Fidelity 
 # ==========================================================
-def compute_style(gt, gen):
-    p_dist = compute_palette_distance(gt, gen)
-    vib     = compute_vibrancy_consistency(gt, gen)
-    polarity = compute_polarity_consistency(gt, gen)
+# Bump when the metric or its per-image features change; this invalidates
+# cached ground-truth features (see feature_cache.py)
+METRIC_VERSION = 1
+
+
+def extract_style_features(img):
+    """
+    Compute the per-image inputs of compute_style (img may be an ImageContext).
+
+    The result is JSON-serializable so ground-truth features can be cached:
+        - hue_hist / saturation_hist: normalized HSV channel histograms
+        - polarity: (background, foreground) luminance estimates
+    """
+    ctx = image_context(img)
+    hue, saturation = ctx.memo("hue_saturation", lambda: _hue_saturation(ctx.image))
+    return {
+        "hue_hist": _channel_hist(hue, PALETTE_BINS).tolist(),
+        "saturation_hist": _channel_hist(saturation, VIBRANCY_BINS).tolist(),
+        "polarity": list(_luminance_polarity(ctx)),
+    }
+
+
+def compute_style(gt, gen, gt_features=None):
+    """
+    Args:
+        gt: Ground truth image
+        gen: Generated image (resized to GT)
+        gt_features: Optional precomputed extract_style_features(gt)
+    """
+    if gt_features is None:
+        gt_features = extract_style_features(gt)
+    gen_features = extract_style_features(gen)
+
+    p_dist = _hist_emd_score(np.asarray(gt_features["hue_hist"]), np.asarray(gen_features["hue_hist"]), 0.08)
+    vib = _hist_emd_score(np.asarray(gt_features["saturation_hist"]), np.asarray(gen_features["saturation_hist"]), 0.05)
+    polarity = _polarity_score(gt_features["polarity"], gen_features["polarity"])
     return {
         "PaletteDistance": p_dist,
         "Vibrancy": vib,
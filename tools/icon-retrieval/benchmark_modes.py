@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Recall@k / latency benchmark of the fused icon retrieval modes on existing
+icon libraries (search_fused mode="image" vs mode="dual").
+
+Queries are library rows perturbed in feature space: the image and text
+features of a sampled row, each with Gaussian noise of relative norm
+--img-noise / --txt-noise, stand in for a crop embedding and its caption
+embedding; the row itself is the ground truth. A high --img-noise models
+crops whose image embedding misses the right icon, which is where the text
+side of the dual pool helps.
+
+Retrieval runs through the public multi-library API, as query_caption does.
+Library loading is timed separately and reported apart from search time.
+
+Usage:
+    python benchmark_modes.py                          # all libs under libs/js/icons/embeddings
+    python benchmark_modes.py LIB_ROOT [LIB_ROOT ...] --queries 500 --img-noise 1.0 --json report.json
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from icon_bench.targets import EMBEDDINGS_DIR, find_libraries, load_search_fused
+
+
+def _perturb(x, noise, rng):
+    """Unit rows of x plus Gaussian noise of norm ≈ noise, renormalized."""
+    x = x / np.linalg.norm(x, axis=1, keepdims=True).clip(1e-12)
+    x = x + rng.standard_normal(x.shape).astype(np.float32) * (noise / np.sqrt(x.shape[1]))
+    return (x / np.linalg.norm(x, axis=1, keepdims=True).clip(1e-12)).astype(np.float32)
+
+
+def make_queries(sf, lib_roots, n_queries, img_noise, txt_noise, seed=0):
+    """
+    Sample n_queries rows per library and perturb their features.
+
+    Returns:
+        (q_img, q_txt, truth): query matrices and, per query, the src_svg
+        it should retrieve.
+    """
+    rng = np.random.default_rng(seed)
+    q_img, q_txt, truth = [], [], []
+    for root in lib_roots:
+        _index, items, lib_img, lib_txt = sf.load_lib(root)
+        rows = np.sort(rng.choice(len(items), size=min(n_queries, len(items)), replace=False))
+        q_img.append(_perturb(np.asarray(lib_img[rows], dtype=np.float32), img_noise, rng))
+        q_txt.append(_perturb(np.asarray(lib_txt[rows], dtype=np.float32), txt_noise, rng))
+        truth += [items[int(r)]["src_svg"] for r in rows]
+    return np.concatenate(q_img), np.concatenate(q_txt), truth
+
+
+def run_mode(sf, lib_roots, q_img, q_txt, truth, *, mode, topk, alpha, ks):
+    """
+    Retrieve all queries in one call and score the fused ranking.
+
+    Returns:
+        dict: recall@k, MRR over the top max(ks), and load/search timings.
+    """
+    start = time.perf_counter()
+    for root in lib_roots:
+        sf.load_lib(root)
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _names, fused_hits, _img_hits = sf.retrieve_svg_filenames_from_libs_with_dual_details(
+        lib_roots=lib_roots,
+        q_ids=[f"q{i:05d}" for i in range(len(truth))],
+        q_img_all=q_img,
+        q_txt_all=q_txt,
+        topk=topk,
+        topm=max(ks),
+        alpha=alpha,
+        mode=mode,
+    )
+    call_s = time.perf_counter() - start
+    # The API loads the libraries itself; report search time without it
+    search_s = max(call_s - load_s, 0.0)
+
+    # src_svg carries the library prefix (e.g. "ai/AiFillAccountBook.svg"), so it is unique across libraries
+    ranks = [next((h["rank"] for h in hits if h.get("src_svg") == src), None)
+             for src, hits in zip(truth, fused_hits)]
+    n = max(len(ranks), 1)
+    result = {f"recall@{k}": sum(1 for r in ranks if r is not None and r <= k) / n for k in ks}
+    result["mrr"] = sum(1.0 / r for r in ranks if r is not None) / n
+    result.update({
+        "queries": len(ranks),
+        "load_ms": round(load_s * 1000, 2),
+        "search_ms": round(search_s * 1000, 2),
+        "search_ms_per_query": round(search_s * 1000 / n, 4),
+    })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall/latency of search_fused retrieval modes on icon libraries.")
+    parser.add_argument("lib_roots", nargs="*", help=f"Library roots (default: every library under {EMBEDDINGS_DIR})")
+    parser.add_argument("--modes", default="image,dual", help="Comma-separated search_fused modes (default: image,dual)")
+    parser.add_argument("--queries", type=int, default=200, help="Queries sampled per library (default: 200)")
+    parser.add_argument("--img-noise", type=float, default=0.8, help="Relative noise on query image features (default: 0.8)")
+    parser.add_argument("--txt-noise", type=float, default=0.8, help="Relative noise on query text features (default: 0.8)")
+    parser.add_argument("--topk", type=int, default=None, help="Candidate pool size per index (default: search_fused.TOPK)")
+    parser.add_argument("--alpha", type=float, default=None, help="Image weight of the fused score (default: search_fused.ALPHA)")
+    parser.add_argument("--ks", default="1,5,10", help="Recall cutoffs (default: 1,5,10)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    sf = load_search_fused()
+    lib_roots = [Path(r) for r in args.lib_roots] or find_libraries(EMBEDDINGS_DIR, sf.INDEX_NAME)
+    if not lib_roots:
+        print("[ERROR] No icon libraries found")
+        return 1
+    ks = sorted({int(k) for k in args.ks.split(",")})
+    topk = args.topk or sf.TOPK
+    alpha = sf.ALPHA if args.alpha is None else args.alpha
+
+    q_img, q_txt, truth = make_queries(sf, lib_roots, args.queries, args.img_noise, args.txt_noise, args.seed)
+    print(f"[INFO] {len(truth)} queries over {len(lib_roots)} libraries "
+          f"(img_noise={args.img_noise}, txt_noise={args.txt_noise}, topk={topk}, alpha={alpha})")
+
+    report = {
+        "config": {
+            "lib_roots": [str(r) for r in lib_roots], "queries_per_lib": args.queries,
+            "img_noise": args.img_noise, "txt_noise": args.txt_noise,
+            "topk": topk, "alpha": alpha, "ks": ks, "seed": args.seed,
+        },
+        "modes": {},
+    }
+    for mode in args.modes.split(","):
+        report["modes"][mode] = result = run_mode(sf, lib_roots, q_img, q_txt, truth,
+                                                  mode=mode, topk=topk, alpha=alpha, ks=ks)
+        recalls = "  ".join(f"R@{k}={result[f'recall@{k}']:.3f}" for k in ks)
+        print(f"  {mode:<6} {recalls}  MRR={result['mrr']:.3f}  "
+              f"search={result['search_ms']:.1f}ms ({result['search_ms_per_query']:.3f}ms/query)  "
+              f"load={result['load_ms']:.1f}ms")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"[OK] Report written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Round-trip and retrieval check of compact icon libraries (build-embeddings.py
+--export-compact) against the float32 libraries they are exported from.
+
+Two synthetic float32 libraries (tightly clustered image features, correlated
+text features, items with unicode aliases and an optional field) are written with
+build-embeddings' write_library and exported as float16 and int8 with
+export_compact_library. For each compact format:
+
+  load        search_fused.load_lib returns the same items, row for row, and
+              features within the storage contract: float16 rows equal the
+              float16 cast, int8 rows are within half a quantization step
+  retrieval   fused results of the public multi-library API for the same
+              queries (noisy library rows, as in benchmark_modes.py) agree with
+              float32: top-1 agreement and top-k overlap above the bounds,
+              recall@1/@k against the ground-truth row no more than
+              --max-recall-drop below float32
+
+Everything runs on CPU with synthetic features; no model is loaded.
+Requires the generator package's dependencies (pip install -e libs/python).
+
+Usage:
+    python check_compact_library.py
+    python check_compact_library.py --rows 20000 --dim 1152 --json compact.json
+
+Exits with status 1 if any check fails.
+"""
+
+import io
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+
+import numpy as np
+
+from benchmark_modes import make_queries
+from icon_bench.library import library_bytes
+from icon_bench.targets import load_build_embeddings, load_search_fused
+
+DTYPES = ("float16", "int8")
+
+
+def synthetic_library(be, root, name, n_rows, dim, spread, rng):
+    """
+    Write a float32 library of n_rows items: image features around n_rows // 8
+    cluster centers with relative spread (so near neighbours compete), text
+    features a noisy linear image of them.
+    """
+    centers = rng.standard_normal((max(1, n_rows // 8), dim)).astype(np.float32)
+    labels = rng.integers(0, len(centers), n_rows)
+    embs_img = centers[labels] + spread * rng.standard_normal((n_rows, dim)).astype(np.float32)
+    mix = rng.standard_normal((dim, dim)).astype(np.float32) / np.sqrt(dim)
+    embs_txt = (embs_img @ mix + spread * rng.standard_normal((n_rows, dim))).astype(np.float32)
+
+    items = []
+    for i in range(n_rows):
+        item = {
+            "src_svg": f"{name}/Icon{i:05d}.svg",
+            "component_id": f"{name.capitalize()}Icon{i:05d}",
+            "aliases": [f"icon{i}", "flèche" if i % 7 == 0 else "arrow", "箭头"][: 1 + i % 3],
+            "caption": f"icon {i} of cluster {int(labels[i])}",
+            "colors": ["#000000"] if i % 2 else [],
+        }
+        if i % 5 == 0:
+            item["variant"] = {"stroke": i % 3, "filled": bool(i % 2)}
+        items.append(item)
+
+    hashes = {it["src_svg"]: f"{i:064x}" for i, it in enumerate(items)}
+    be.write_library(Path(root), items, embs_img, embs_txt, be.build_faiss_cosine(embs_img), hashes)
+    return items, embs_img, embs_txt
+
+
+def check_load(sf, be, root, dtype, items, embs_img, embs_txt):
+    """Items and features read back through load_lib match the float32 source."""
+    _index, c_items, c_img, c_txt = sf.load_lib(root)
+    assert len(c_items) == len(items) == len(c_img) == len(c_txt), "row count differs"
+    bad = [i for i, it in enumerate(items) if dict(c_items[i]) != it]
+    assert not bad, f"{len(bad)} items differ, first row {bad[0]}"
+    for name, x, c in (("image", embs_img, c_img), ("text", embs_txt, c_txt)):
+        rows = c[:]
+        if dtype == "float16":
+            ok = np.array_equal(rows, x.astype(np.float16).astype(np.float32))
+        else:
+            _q, scale = be.quantize_rows(x, dtype)
+            ok = bool(np.all(np.abs(rows - x) <= scale[:, None] * (0.5 + 1e-4)))
+        assert ok, f"{name} features outside the {dtype} storage contract"
+
+
+def retrieve(sf, roots, q_img, q_txt, mode, topk, topm):
+    """src_svg of the fused top-topm hits per query, through the public multi-library API."""
+    _names, fused_hits, _img_hits = sf.retrieve_svg_filenames_from_libs_with_dual_details(
+        lib_roots=roots,
+        q_ids=[f"q{i:05d}" for i in range(len(q_img))],
+        q_img_all=q_img,
+        q_txt_all=q_txt,
+        topk=topk,
+        topm=topm,
+        mode=mode,
+    )
+    return [[h["src_svg"] for h in hits] for hits in fused_hits]
+
+
+def recall(ranked, truth, k):
+    return float(np.mean([src in hits[:k] for src, hits in zip(truth, ranked)]))
+
+
+def compare(reference, ranked, truth, k):
+    """Agreement of a compact library's rankings with float32 and their ground-truth recalls."""
+    return {
+        "top1_agreement": float(np.mean([bool(a) and bool(b) and a[0] == b[0] for a, b in zip(reference, ranked)])),
+        f"overlap@{k}": float(np.mean([len(set(a[:k]) & set(b[:k])) / max(1, min(k, len(a))) for a, b in zip(reference, ranked)])),
+        "recall@1": recall(ranked, truth, 1),
+        f"recall@{k}": recall(ranked, truth, k),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Round-trip and retrieval check of compact (float16/int8) icon libraries.")
+    parser.add_argument("--rows", type=int, default=3000, help="Items per synthetic library (default: 3000)")
+    parser.add_argument("--dim", type=int, default=768, help="Feature dimension (default: 768)")
+    parser.add_argument("--spread", type=float, default=0.15, help="Relative spread of rows around their cluster center (default: 0.15)")
+    parser.add_argument("--libs", type=int, default=2, help="Synthetic libraries searched together (default: 2)")
+    parser.add_argument("--queries", type=int, default=200, help="Queries sampled per library (default: 200)")
+    parser.add_argument("--img-noise", type=float, default=0.8, help="Relative noise on query image features (default: 0.8)")
+    parser.add_argument("--txt-noise", type=float, default=0.8, help="Relative noise on query text features (default: 0.8)")
+    parser.add_argument("--modes", default="image,dual", help="Comma-separated search_fused modes (default: image,dual)")
+    parser.add_argument("-k", type=int, default=10, help="Fused hits compared per query (default: 10)")
+    parser.add_argument("--min-agreement-float16", type=float, default=0.99, help="Min top-1 agreement with float32 (default: 0.99)")
+    parser.add_argument("--min-agreement-int8", type=float, default=0.95, help="Min top-1 agreement with float32 (default: 0.95)")
+    parser.add_argument("--min-overlap", type=float, default=0.9, help="Min top-k overlap with float32 (default: 0.9)")
+    parser.add_argument("--max-recall-drop", type=float, default=0.02, help="Max recall@1/@k drop vs float32 (default: 0.02)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", default=None, help="Write the libraries under this directory and keep them")
+    parser.add_argument("--json", default=None, help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    be, sf = load_build_embeddings(), load_search_fused()
+    rng = np.random.default_rng(args.seed)
+    work = Path(args.keep) if args.keep else Path(tempfile.mkdtemp(prefix="compact-check-"))
+    report = {"config": {k: v for k, v in vars(args).items() if k not in ("keep", "json")}, "formats": {}}
+    failures = []
+    try:
+        roots = {"float32": [work / "float32" / f"lib{i}" for i in range(args.libs)]}
+        sources = [synthetic_library(be, root, root.name, args.rows, args.dim, args.spread, rng) for root in roots["float32"]]
+        for dtype in DTYPES:
+            roots[dtype] = [work / dtype / root.name for root in roots["float32"]]
+            for src, out in zip(roots["float32"], roots[dtype]):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    be.export_compact_library(src, out, dtype=dtype)
+
+        for dtype in DTYPES:
+            try:
+                for root, source in zip(roots[dtype], sources):
+                    check_load(sf, be, root, dtype, *source)
+            except AssertionError as e:
+                failures.append(f"{dtype} load: {e}")
+                print(f"[ERROR] {dtype} load: {e}")
+            else:
+                print(f"[OK] {dtype} load: items and features match the float32 source")
+
+        q_img, q_txt, truth = make_queries(sf, roots["float32"], args.queries, args.img_noise, args.txt_noise, args.seed)
+        print(f"[INFO] {len(truth)} queries over {args.libs} libraries of {args.rows}x{args.dim} "
+              f"(img_noise={args.img_noise}, txt_noise={args.txt_noise}, topk={sf.TOPK}, alpha={sf.ALPHA})")
+
+        k = args.k
+        for fmt, fmt_roots in roots.items():
+            start = time.perf_counter()
+            for root in fmt_roots:
+                sf.load_lib(root)
+            report["formats"][fmt] = {
+                "bytes": sum(library_bytes(r) for r in fmt_roots),
+                "load_ms": round((time.perf_counter() - start) * 1000, 2),
+                "modes": {},
+            }
+
+        print(f"  {'format':<8} {'mode':<6} {'top1 agree':>10} {f'overlap@{k}':>10} {'R@1':>6} {f'R@{k}':>6} {'MiB':>7}")
+        for mode in args.modes.split(","):
+            reference = retrieve(sf, roots["float32"], q_img, q_txt, mode, sf.TOPK, k)
+            base = compare(reference, reference, truth, k)
+            for fmt in ("float32",) + DTYPES:
+                result = base if fmt == "float32" else compare(reference, retrieve(sf, roots[fmt], q_img, q_txt, mode, sf.TOPK, k), truth, k)
+                report["formats"][fmt]["modes"][mode] = result
+                problems = []
+                if fmt != "float32":
+                    min_agreement = getattr(args, f"min_agreement_{fmt}")
+                    if result["top1_agreement"] < min_agreement:
+                        problems.append(f"top-1 agreement {result['top1_agreement']:.3f} < {min_agreement}")
+                    if result[f"overlap@{k}"] < args.min_overlap:
+                        problems.append(f"overlap@{k} {result[f'overlap@{k}']:.3f} < {args.min_overlap}")
+                    for key in ("recall@1", f"recall@{k}"):
+                        if base[key] - result[key] > args.max_recall_drop:
+                            problems.append(f"{key} {result[key]:.3f} vs float32 {base[key]:.3f}")
+                failures += [f"{fmt} {mode}: {p}" for p in problems]
+                print(f"  {fmt:<8} {mode:<6} {result['top1_agreement']:>10.3f} {result[f'overlap@{k}']:>10.3f} "
+                      f"{result['recall@1']:>6.3f} {result[f'recall@{k}']:>6.3f} "
+                      f"{report['formats'][fmt]['bytes'] / 2**20:>7.1f}{'  FAIL' if problems else ''}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(work, ignore_errors=True)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"[OK] Report written to {args.json}")
+    if failures:
+        for failure in failures:
+            print(f"[ERROR] {failure}")
+        return 1
+    print("[OK] Compact libraries match float32 retrieval within bounds")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
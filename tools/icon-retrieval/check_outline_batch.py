@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Equivalence check and timings of the query outline path in
+query_embedding: to_outline_bw (lookup-table small-component filtering) and
+to_outline_bw_batch (hash-keyed LRU cache, in-batch dedup, worker threads).
+
+reference_to_outline_bw below is the previous implementation with the
+per-label component loop, kept verbatim as the oracle; module constants are
+read from query_embedding so both sides use the same defaults. Crops are
+generated synthetically (random noise, speckle, alpha icons, JPEG line
+drawings) at varied sizes and aspect ratios, a quarter of them with
+non-default outline parameters. Checks:
+
+  outline     to_outline_bw is byte-identical to the reference on every crop
+  batch       to_outline_bw_batch on the crops plus duplicates matches
+              to_outline_bw per crop; each unique crop is outlined once
+  cache       a repeated batch is served from the cache without outlining,
+              returned images are copies, parameters are part of the key
+  workers     OUTLINE_WORKERS=1 and the threaded path give the same outlines
+  eviction    the cache never exceeds OUTLINE_CACHE_SIZE
+
+Requires the generator package's dependencies (pip install -e libs/python).
+
+Usage:
+    python check_outline_batch.py
+    python check_outline_batch.py --crops 240 --seed 1 --json outlines.json
+
+Exits with status 1 if any check fails.
+"""
+
+import io
+import sys
+import json
+import time
+import argparse
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw
+
+from icon_bench.targets import load_query_embedding
+
+# Non-default outline parameters exercised on part of the crops
+PARAM_VARIANTS = [
+    {},
+    {"edge_thresh": 30, "edge_dilate": 1},
+    {"target": 128, "border_erode": 5},
+    {"alpha_thr": 64, "edge_border_suppress": 0, "overscan_px": 4},
+]
+
+
+# ==========================================================
+#  Reference implementation (pre lookup-table filtering)
+# ==========================================================
+
+def reference_to_outline_bw(qe, crop, **kwargs):
+    params = {
+        "target": qe.TARGET, "pad_ratio": qe.PAD_RATIO, "edge_thresh": qe.EDGE_THRESH,
+        "border_erode": qe.BORDER_ERODE, "edge_dilate": qe.EDGE_DILATE,
+        "edge_border_suppress": qe.EDGE_BORDER_SUPPRESS, "overscan_px": qe.OVERSCAN_PX,
+        "alpha_thr": qe.ALPHA_THR,
+    }
+    params.update(kwargs)
+    return _reference_to_outline_bw(qe, crop, **params)
+
+
+def _reference_to_outline_bw(qe, crop, target, pad_ratio, edge_thresh, border_erode,
+                             edge_dilate, edge_border_suppress, overscan_px, alpha_thr):
+    canvas_rgba, (fx0, fy0, fx1, fy1), (vx0, vy0, vx1, vy1) = qe._fit_center_rgba_with_overscan(
+        crop.convert("RGBA"), target=target, pad_ratio=pad_ratio, overscan_px=overscan_px
+    )
+    rgba = np.array(canvas_rgba)
+    a = rgba[..., 3]
+    rgb = rgba[..., :3]
+    bgr = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+
+    sil = (a >= alpha_thr).astype(np.uint8) * 255
+    alpha_roi = a[fy0:fy1, fx0:fx1]
+    has_alpha_structure = (
+        alpha_roi.size > 0
+        and (alpha_roi.min() < alpha_thr)
+        and (alpha_roi.max() >= alpha_thr)
+        and np.any((alpha_roi > 0) & (alpha_roi < 255))
+    )
+    if has_alpha_structure:
+        k_border = cv2.getStructuringElement(
+            cv2.MORPH_RECT, (max(1, border_erode), max(1, border_erode))
+        )
+        alpha_edge = cv2.morphologyEx(sil, cv2.MORPH_GRADIENT, k_border)
+        r = int(edge_border_suppress)
+        if r > 0:
+            alpha_edge[:fy0 + r, :] = 0
+            alpha_edge[fy1 - r:, :] = 0
+            alpha_edge[:, :fx0 + r] = 0
+            alpha_edge[:, fx1 - r:] = 0
+    else:
+        alpha_edge = np.zeros_like(sil, dtype=np.uint8)
+
+    # Canny on ROI with reflect padding
+    gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+    roi = gray[fy0:fy1, fx0:fx1]
+    if roi.size == 0:
+        out = np.full((target, target), 255, np.uint8)
+        return Image.fromarray(out, mode="L").convert("RGB")
+
+    roi_pad = cv2.copyMakeBorder(roi, 1, 1, 1, 1, borderType=cv2.BORDER_REFLECT_101)
+    low = max(5, int(edge_thresh))
+    high = max(low + 10, int(low * 3))
+    edges = cv2.Canny(roi_pad, low, high, L2gradient=True)
+    edges = edges[1:-1, 1:-1]
+
+    # Suppress responses near ROI border
+    r = int(edge_border_suppress)
+    if r > 0 and edges.size:
+        edges[:r, :] = 0
+        edges[-r:, :] = 0
+        edges[:, :r] = 0
+        edges[:, -r:] = 0
+
+    if edge_dilate > 1:
+        k_edge = cv2.getStructuringElement(cv2.MORPH_RECT, (edge_dilate, edge_dilate))
+        edges = cv2.dilate(edges, k_edge, iterations=1)
+
+    # Merge alpha boundary and Canny edges back to the big canvas
+    edge_full = np.zeros_like(sil, dtype=np.uint8)
+    edge_full[fy0:fy1, fx0:fx1] = edges
+    merged = cv2.add(edge_full, alpha_edge)
+
+    # Optional small-component removal (robust for real screenshots)
+    if qe.MIN_COMPONENT_AREA_FRAC > 0:
+        bin_ = (merged > 0).astype(np.uint8)
+        num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(bin_, connectivity=8)
+        area_thr = int(qe.MIN_COMPONENT_AREA_FRAC * ((target + 2 * overscan_px) ** 2))
+        keep = np.zeros_like(bin_)
+        for lab in range(1, num_labels):
+            if stats[lab, cv2.CC_STAT_AREA] >= area_thr:
+                keep[labels == lab] = 1
+        merged = (keep * 255).astype(np.uint8)
+
+    # White background, black strokes; then crop away the overscan band
+    out_big = np.full_like(sil, 255, np.uint8)
+    out_big[merged > 0] = 0
+    out_valid = out_big[vy0:vy1, vx0:vx1]  # (target, target)
+    return Image.fromarray(out_valid, mode="L").convert("RGB")
+
+
+# ==========================================================
+#  Crops
+# ==========================================================
+
+def _size(rng):
+    w = int(rng.integers(12, 160))
+    return w, max(8, int(w * rng.uniform(0.5, 2.0)))
+
+
+def noise_crop(rng):
+    w, h = _size(rng)
+    return Image.fromarray(rng.integers(0, 256, (h, w, 3), dtype=np.uint8), "RGB")
+
+
+def speckle_crop(rng):
+    """Sparse dots and short strokes: many small components to filter out."""
+    w, h = _size(rng)
+    img = np.full((h, w, 3), rng.integers(180, 256, 3), np.uint8)
+    for _ in range(int(rng.integers(20, 200))):
+        y, x = int(rng.integers(0, h)), int(rng.integers(0, w))
+        img[y:y + int(rng.integers(1, 4)), x:x + int(rng.integers(1, 4))] = rng.integers(0, 80, 3)
+    return Image.fromarray(img, "RGB")
+
+
+def alpha_icon_crop(rng):
+    """RGBA glyph with antialiased alpha on a transparent background."""
+    w, h = _size(rng)
+    scale = 4
+    big = Image.new("L", (w * scale, h * scale), 0)
+    draw = ImageDraw.Draw(big)
+    for _ in range(int(rng.integers(1, 5))):
+        x0, y0 = int(rng.integers(0, w * scale // 2)), int(rng.integers(0, h * scale // 2))
+        x1, y1 = x0 + int(rng.integers(w * scale // 4, w * scale // 2 + 1)), y0 + int(rng.integers(h * scale // 4, h * scale // 2 + 1))
+        if rng.random() < 0.5:
+            draw.ellipse((x0, y0, x1, y1), fill=255)
+        else:
+            draw.rectangle((x0, y0, x1, y1), outline=255, width=int(rng.integers(scale, 4 * scale)))
+    alpha = big.resize((w, h), Image.LANCZOS)
+    icon = Image.new("RGBA", (w, h), tuple(int(c) for c in rng.integers(0, 256, 3)) + (255,))
+    icon.putalpha(alpha)
+    return icon
+
+
+def jpeg_line_crop(rng):
+    """Line drawing on a coloured background, JPEG-compressed like a screenshot."""
+    w, h = _size(rng)
+    img = Image.new("RGB", (w, h), tuple(int(c) for c in rng.integers(0, 256, 3)))
+    draw = ImageDraw.Draw(img)
+    fg = tuple(int(c) for c in rng.integers(0, 256, 3))
+    for _ in range(int(rng.integers(2, 8))):
+        points = [(int(rng.integers(0, w)), int(rng.integers(0, h))) for _ in range(2)]
+        draw.line(points, fill=fg, width=int(rng.integers(1, 4)))
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=int(rng.integers(30, 90)))
+    return Image.open(io.BytesIO(buf.getvalue())).convert("RGB")
+
+
+CROP_KINDS = [("noise", noise_crop), ("speckle", speckle_crop),
+              ("alpha-icon", alpha_icon_crop), ("jpeg-lines", jpeg_line_crop)]
+
+
+def make_crops(n, seed):
+    """n (kind, crop, params) cases, cycling crop kinds; every fourth uses non-default parameters."""
+    rng = np.random.default_rng(seed)
+    cases = []
+    for i in range(n):
+        kind, make = CROP_KINDS[i % len(CROP_KINDS)]
+        params = PARAM_VARIANTS[(i // len(CROP_KINDS)) % len(PARAM_VARIANTS)] if i % 4 == 3 else {}
+        cases.append((kind, make(rng), params))
+    return cases
+
+
+# ==========================================================
+#  Checks
+# ==========================================================
+
+def same(a, b):
+    return a.mode == b.mode and a.size == b.size and a.tobytes() == b.tobytes()
+
+
+class CountingOutline:
+    """Stands in for qe.to_outline_bw to count the outlines to_outline_bw_batch computes."""
+
+    def __init__(self, qe):
+        self.qe, self.original, self.calls = qe, qe.to_outline_bw, 0
+
+    def __enter__(self):
+        def counted(crop, **kwargs):
+            self.calls += 1
+            return self.original(crop, **kwargs)
+        self.qe.to_outline_bw = counted
+        return self
+
+    def __exit__(self, *exc):
+        self.qe.to_outline_bw = self.original
+
+
+def check_outline(qe, cases):
+    mismatches, ref_total, new_total, slowest = [], 0.0, 0.0, None
+    for i, (kind, crop, params) in enumerate(cases):
+        start = time.perf_counter()
+        expected = reference_to_outline_bw(qe, crop, **params)
+        ref_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        actual = qe.to_outline_bw(crop, **params)
+        new_ms = (time.perf_counter() - start) * 1000
+        ref_total, new_total = ref_total + ref_ms, new_total + new_ms
+        if slowest is None or ref_ms > slowest[1]:
+            slowest = (f"{i}:{kind}", ref_ms, new_ms)
+        if not same(expected, actual):
+            mismatches.append(f"{i}:{kind}{params or ''}")
+    assert not mismatches, f"differs from the reference: {mismatches}"
+
+    # The crops must exercise the filter: some outlines have to lose components
+    saved = qe.MIN_COMPONENT_AREA_FRAC
+    try:
+        qe.MIN_COMPONENT_AREA_FRAC = 0
+        unfiltered = [qe.to_outline_bw(crop, **params) for _, crop, params in cases]
+    finally:
+        qe.MIN_COMPONENT_AREA_FRAC = saved
+    filtered = sum(not same(qe.to_outline_bw(crop, **params), raw)
+                   for (_, crop, params), raw in zip(cases, unfiltered))
+    assert filtered, "no crop has components small enough to be filtered"
+    return (f"{len(cases)} crops byte-identical ({filtered} with components filtered), "
+            f"{ref_total:.0f} ms -> {new_total:.0f} ms; "
+            f"slowest reference crop {slowest[0]} {slowest[1]:.1f} ms -> {slowest[2]:.1f} ms")
+
+
+def check_batch(qe, cases):
+    # One batch per parameter set, as query_from_detections_with_details calls it
+    groups = {}
+    for kind, crop, params in cases:
+        groups.setdefault(tuple(sorted(params.items())), []).append(crop)
+
+    qe._outline_cache.clear()
+    unique = 0
+    with CountingOutline(qe) as counter:
+        for key, crops in groups.items():
+            batch = crops + crops[: max(1, len(crops) // 4)]  # duplicates within the batch
+            outlines = qe.to_outline_bw_batch(batch, **dict(key))
+            expected = [counter.original(c, **dict(key)) for c in batch]
+            assert all(same(a, b) for a, b in zip(outlines, expected)), f"batch differs for params {dict(key)}"
+            unique += len(crops)
+        calls = counter.calls
+    assert calls == unique, f"{calls} outlines computed for {unique} unique crops"
+    return f"{len(groups)} batches, {unique} unique crops outlined once each"
+
+
+def check_cache(qe, cases):
+    crops = [crop for _, crop, params in cases if not params]
+    qe._outline_cache.clear()
+
+    start = time.perf_counter()
+    cold = qe.to_outline_bw_batch(crops)
+    cold_ms = (time.perf_counter() - start) * 1000
+    with CountingOutline(qe) as counter:
+        start = time.perf_counter()
+        warm = qe.to_outline_bw_batch(crops)
+        warm_ms = (time.perf_counter() - start) * 1000
+    assert counter.calls == 0, f"warm batch computed {counter.calls} outlines"
+    assert all(same(a, b) for a, b in zip(cold, warm)), "warm batch differs from cold batch"
+
+    # Callers own their images: modifying one must not reach the cache
+    warm[0].paste((0, 0, 0), (0, 0) + warm[0].size)
+    assert same(qe.to_outline_bw_batch(crops[:1])[0], cold[0]), "cached outline was modified through a returned image"
+
+    # Same pixels, other parameters: a separate entry with its own outline
+    variant = PARAM_VARIANTS[1]
+    assert same(qe.to_outline_bw_batch(crops[:1], **variant)[0], qe.to_outline_bw(crops[0], **variant)), \
+        "parameters are not part of the cache key"
+    return f"{len(crops)} crops: cold {cold_ms:.0f} ms, warm {warm_ms:.1f} ms"
+
+
+def check_workers(qe, cases):
+    crops = [crop for _, crop, params in cases if not params]
+    saved = qe.OUTLINE_WORKERS
+    try:
+        results = {}
+        for workers in sorted({1, max(2, saved)}):
+            qe.OUTLINE_WORKERS = workers
+            qe._outline_cache.clear()
+            start = time.perf_counter()
+            outlines = qe.to_outline_bw_batch(crops)
+            results[workers] = (outlines, (time.perf_counter() - start) * 1000)
+    finally:
+        qe.OUTLINE_WORKERS = saved
+    (serial, serial_ms), (threaded, threaded_ms) = results.values()
+    assert all(same(a, b) for a, b in zip(serial, threaded)), "threaded outlines differ from serial ones"
+    return f"1 worker {serial_ms:.0f} ms, {max(results)} workers {threaded_ms:.0f} ms"
+
+
+def check_eviction(qe, cases):
+    crops = [crop for _, crop, params in cases if not params]
+    saved = qe.OUTLINE_CACHE_SIZE
+    try:
+        qe.OUTLINE_CACHE_SIZE = max(1, len(crops) // 3)
+        qe._outline_cache.clear()
+        outlines = qe.to_outline_bw_batch(crops)
+        size = len(qe._outline_cache)
+        assert size <= qe.OUTLINE_CACHE_SIZE, f"cache holds {size} > {qe.OUTLINE_CACHE_SIZE} entries"
+        assert all(same(o, qe.to_outline_bw(c)) for o, c in zip(outlines, crops)), "outlines wrong under eviction"
+        limit = qe.OUTLINE_CACHE_SIZE
+    finally:
+        qe.OUTLINE_CACHE_SIZE = saved
+        qe._outline_cache.clear()
+    return f"{len(crops)} crops through a {limit}-entry cache, {size} kept"
+
+
+CHECKS = [("outline", check_outline), ("batch", check_batch), ("cache", check_cache),
+          ("workers", check_workers), ("eviction", check_eviction)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Equivalence check of to_outline_bw and to_outline_bw_batch.")
+    parser.add_argument("--crops", type=int, default=120, help="Synthetic crops (default: 120)")
+    parser.add_argument("--seed", type=int, default=0, help="Crop generation seed (default: 0)")
+    parser.add_argument("--json", default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    qe = load_query_embedding()
+    cases = make_crops(args.crops, args.seed)
+
+    results, failed = [], 0
+    for name, check in CHECKS:
+        try:
+            detail = check(qe, cases)
+        except AssertionError as e:
+            failed += 1
+            results.append({"check": name, "ok": False, "detail": str(e)})
+            print(f"[ERROR] {name}: {e}")
+        else:
+            results.append({"check": name, "ok": True, "detail": detail})
+            print(f"[OK] {name}: {detail}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"crops": args.crops, "seed": args.seed, "results": results}, f, indent=2)
+        print(f"[OK] Results written to {args.json}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
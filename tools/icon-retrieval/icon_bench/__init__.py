@@ -0,0 +1,31 @@
+"""
+Icon retrieval benchmark.
+
+Renders library SVGs as augmented screenshot crops (scale, color, blur,
+JPEG), queries them back through query_embedding and search_fused, and
+reports recall@k/MRR per library plus latency and memory per configuration
+(library format, search mode, TOPK, ALPHA, library set) as JSON. Models are
+CPU stubs (see models.py), so it runs without GPUs or model downloads.
+
+Usage:
+    python -m icon_bench SVG_ROOT --formats float32,int8 --modes image,dual --out report.json
+"""
+
+from .library import FORMATS, BenchLibrary
+from .models import HashingTextEncoder, KeywordCaptioner, PixelProjectionEncoder
+from .queries import AugmentSpec, Query
+from .runner import REPORT_SCHEMA, RunConfig, compare_reports, run_benchmark
+
+__all__ = [
+    "FORMATS",
+    "BenchLibrary",
+    "HashingTextEncoder",
+    "KeywordCaptioner",
+    "PixelProjectionEncoder",
+    "AugmentSpec",
+    "Query",
+    "REPORT_SCHEMA",
+    "RunConfig",
+    "compare_reports",
+    "run_benchmark",
+]
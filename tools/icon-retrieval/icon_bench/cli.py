@@ -0,0 +1,95 @@
+"""
+Command line entry point: python -m icon_bench SVG_ROOT [options]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from .library import FORMATS
+from .queries import AugmentSpec
+from .runner import compare_reports, run_benchmark
+
+
+def _csv(cast):
+    return lambda text: [cast(v) for v in text.split(",") if v.strip()]
+
+
+def _range(cast):
+    def parse(text):
+        lo, hi = (cast(v) for v in text.split(","))
+        return lo, hi
+    return parse
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m icon_bench",
+        description="Icon retrieval benchmark: recall@k/MRR per library and latency/memory per configuration, "
+                    "on synthetic queries rendered from library SVGs, with CPU stub models.",
+    )
+    parser.add_argument("svg_root", help="Directory with one SVG subdirectory per library (e.g. the all-svg-exports "
+                                         "output of libs/js/icons/src/export-all-icons.js)")
+    parser.add_argument("--libs", type=_csv(str), default=None, help="Libraries to use, comma-separated (default: all)")
+    parser.add_argument("--max-icons", type=int, default=500, help="Icons per library, first N sorted (default: 500)")
+    parser.add_argument("--queries", type=int, default=50, help="Synthetic queries per library (default: 50)")
+    parser.add_argument("--formats", type=_csv(str), default=["float32"], help=f"Library formats to sweep, from {FORMATS} (default: float32)")
+    parser.add_argument("--modes", type=_csv(str), default=["image"], help="search_fused modes to sweep (default: image)")
+    parser.add_argument("--topk", type=_csv(int), default=None, help="TOPK values to sweep (default: search_fused.TOPK)")
+    parser.add_argument("--alpha", type=_csv(float), default=None, help="ALPHA values to sweep (default: search_fused.ALPHA)")
+    parser.add_argument("--lib-sets", default=None, help="Library sets searched together, ';'-separated comma lists "
+                                                         "(e.g. 'ai,fa;ai'; default: all libraries together)")
+    parser.add_argument("--batch", type=int, default=8, help="Queries per retrieval call (default: 8)")
+    parser.add_argument("--ks", type=_csv(int), default=[1, 5, 10], help="Recall cutoffs (default: 1,5,10)")
+    parser.add_argument("--size", type=_range(int), default=AugmentSpec.size, help="Rendered icon width range, 'lo,hi' px")
+    parser.add_argument("--blur", type=_range(float), default=AugmentSpec.blur, help="Gaussian blur radius range, 'lo,hi' px")
+    parser.add_argument("--jpeg", type=_range(int), default=AugmentSpec.jpeg, help="JPEG quality range, 'lo,hi'")
+    parser.add_argument("--no-recolor", action="store_true", help="Render black icons on white instead of random colors")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", default=None, help="Keep the benchmark libraries here (default: temporary)")
+    parser.add_argument("--out", default=None, help="Write the JSON report here")
+    parser.add_argument("--baseline", default=None, help="Earlier JSON report; exit 1 on quality regressions against it")
+    parser.add_argument("--tolerance", type=float, default=0.02, help="Allowed recall/MRR drop against --baseline (default: 0.02)")
+    args = parser.parse_args(argv)
+
+    lib_sets = [s.split(",") for s in args.lib_sets.split(";")] if args.lib_sets else None
+    spec = AugmentSpec(size=args.size, blur=args.blur, jpeg=args.jpeg, recolor=not args.no_recolor)
+    report = run_benchmark(
+        args.svg_root,
+        libs=args.libs,
+        max_icons=args.max_icons,
+        queries_per_library=args.queries,
+        formats=args.formats,
+        modes=args.modes,
+        topks=args.topk,
+        alphas=args.alpha,
+        lib_sets=lib_sets,
+        batch=args.batch,
+        ks=args.ks,
+        spec=spec,
+        seed=args.seed,
+        work_dir=args.work_dir,
+    )
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"[OK] Report written to {args.out}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        try:
+            regressions = compare_reports(report, baseline, args.tolerance)
+        except ValueError as e:
+            print(f"[ERROR] {e}")
+            return 2
+        for r in regressions:
+            print(f"[REGRESSION] {r['key']}: {r['metric']} {r['baseline']:.4f} -> {r['current']:.4f}")
+        if regressions:
+            return 1
+        print(f"[OK] No quality regressions against {args.baseline} (tolerance {args.tolerance})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
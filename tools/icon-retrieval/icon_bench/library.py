@@ -0,0 +1,114 @@
+"""
+Benchmark icon libraries: SVG sets embedded with the benchmark's encoders
+and written in the production library layout by build-embeddings.py, so
+search_fused.load_lib reads them like the shipped libraries.
+"""
+
+import contextlib
+import io
+import shutil
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+import faiss
+
+FORMATS = ("float32", "float16", "int8", "hnsw")
+HNSW_M = 32
+HNSW_EF_SEARCH = 128
+
+
+@dataclass
+class BenchLibrary:
+    """One SVG set and its library roots, per storage format."""
+    name: str
+    svgs: List[Path]
+    items: List[dict]
+    roots: Dict[str, Path] = field(default_factory=dict)
+
+
+def discover_libraries(be, svg_root, names=None):
+    """
+    Library names under svg_root: its subdirectories containing SVGs
+    (as laid out by export-all-icons.js), optionally restricted to names.
+    """
+    found = sorted(p.name for p in Path(svg_root).iterdir() if p.is_dir() and be.list_svgs(p))
+    if names:
+        missing = sorted(set(names) - set(found))
+        if missing:
+            raise ValueError(f"No SVGs for libraries {missing} under {svg_root}")
+        found = [n for n in found if n in names]
+    return found
+
+
+def build_library(be, svg_root, name, work_dir, image_encoder, text_encoder, max_icons=None):
+    """
+    Render, caption (from filename keywords) and embed one SVG set.
+
+    Rasterization runs in this process: build-embeddings.py is loaded from
+    its file, so spawned pool workers could not import its functions.
+
+    Args:
+        be: The build-embeddings module.
+        svg_root (Path): Directory holding one subdirectory per library.
+        name (str): The library subdirectory.
+        work_dir (Path): Benchmark working directory; the float32 library is
+            written to work_dir/float32/name.
+        image_encoder, text_encoder: The benchmark encoders.
+        max_icons (int, optional): Use only the first max_icons SVGs (sorted).
+
+    Returns:
+        BenchLibrary: The library, with its float32 root.
+    """
+    svg_root = Path(svg_root)
+    svgs = be.list_svgs(svg_root / name)[:max_icons]
+    shas = [be.svg_sha256(sp) for sp in svgs]
+    outlines = [bw for bw, _color in be.iter_rasters(svgs, shas)]
+    items = []
+    for sp in svgs:
+        comp, aliases = be.filename_to_component_and_aliases(sp, svg_root)
+        items.append({
+            "src_svg": sp.relative_to(svg_root).as_posix(),
+            "component_id": comp,
+            "aliases": aliases,
+            "caption": be.build_caption_from_keywords(aliases),
+            "colors": [],
+        })
+
+    embs_img = image_encoder.encode_images(outlines)
+    embs_txt = text_encoder.encode_texts([it["caption"] for it in items])
+    root = Path(work_dir) / "float32" / name
+    hashes = {it["src_svg"]: sha for it, sha in zip(items, shas)}
+    be.write_library(root, items, embs_img, embs_txt, be.build_faiss_cosine(embs_img), hashes, keep_metadata=False)
+    return BenchLibrary(name, svgs, items, {"float32": root})
+
+
+def ensure_format(be, lib, fmt, work_dir):
+    """
+    The root of lib in storage format fmt, derived from the float32 library
+    on first use: compact float16/int8 libraries via export_compact_library,
+    or a float32 library whose image index is HNSW.
+    """
+    if fmt in lib.roots:
+        return lib.roots[fmt]
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown library format {fmt!r}; expected one of {FORMATS}")
+    src = lib.roots["float32"]
+    root = Path(work_dir) / fmt / lib.name
+    if fmt in ("float16", "int8"):
+        with contextlib.redirect_stdout(io.StringIO()):
+            be.export_compact_library(src, root, dtype=fmt)
+    else:
+        shutil.copytree(src, root, dirs_exist_ok=True)
+        flat = faiss.read_index(str(root / "indices" / "SigLIP2.faiss"))
+        hnsw = faiss.IndexHNSWFlat(flat.d, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        hnsw.hnsw.efSearch = HNSW_EF_SEARCH
+        hnsw.add(flat.reconstruct_n(0, flat.ntotal))
+        faiss.write_index(hnsw, str(root / "indices" / "SigLIP2.faiss"))
+    lib.roots[fmt] = root
+    return root
+
+
+def library_bytes(root):
+    """On-disk size of a library root."""
+    return sum(p.stat().st_size for p in Path(root).rglob("*") if p.is_file())
@@ -0,0 +1,36 @@
+"""
+Retrieval quality and latency statistics.
+"""
+
+import numpy as np
+
+
+def rank_metrics(ranks, ks):
+    """
+    Recall@k and MRR from the 1-based rank of the correct icon per query
+    (None when it is not among the returned hits).
+
+    Returns:
+        dict: {"queries", "recall@k" for each k, "mrr"}
+    """
+    n = len(ranks)
+    found = np.array([r for r in ranks if r is not None], dtype=np.float64)
+    result = {"queries": n}
+    for k in ks:
+        result[f"recall@{k}"] = round(float((found <= k).sum()) / n, 4) if n else 0.0
+    result["mrr"] = round(float((1.0 / found).sum()) / n, 4) if n else 0.0
+    return result
+
+
+def latency_summary(samples_ms):
+    """p50/p99/mean/max of latency samples in milliseconds."""
+    if not len(samples_ms):
+        return {"n": 0}
+    x = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        "n": int(x.size),
+        "p50": round(float(np.percentile(x, 50)), 3),
+        "p99": round(float(np.percentile(x, 99)), 3),
+        "mean": round(float(x.mean()), 3),
+        "max": round(float(x.max()), 3),
+    }
@@ -0,0 +1,87 @@
+"""
+CPU stand-ins for the SigLIP2 encoders and the BLIP2 captioner.
+
+Libraries and queries are embedded with the same stub models, so the
+benchmark measures the retrieval pipeline (outlines, candidate pools, fusion,
+index formats) rather than model quality. Any object with the same
+encode_images / encode_texts methods can be passed to the runner instead.
+"""
+
+import re
+import zlib
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+
+def _normalize_rows(x):
+    return (x / np.linalg.norm(x, axis=1, keepdims=True).clip(1e-12)).astype(np.float32)
+
+
+class PixelProjectionEncoder:
+    """
+    Stub image encoder: the ink of a (blurred, downsampled) outline image,
+    mean-centered and mapped through a fixed Gaussian random projection.
+
+    Example:
+        >>> encoder = PixelProjectionEncoder(dim=256)
+        >>> z = encoder.encode_images(outline_pils)   # (N, 256), unit rows
+    """
+
+    def __init__(self, dim=256, side=32, blur=1.5, seed=0):
+        self.dim = dim
+        self.side = side
+        self.blur = blur
+        rng = np.random.default_rng(seed)
+        self.projection = (rng.standard_normal((side * side, dim)) / np.sqrt(dim)).astype(np.float32)
+
+    def _ink(self, image):
+        gray = image.convert("L")
+        if self.blur:
+            # Strokes are a few pixels wide; blur so small shifts still overlap
+            gray = gray.filter(ImageFilter.GaussianBlur(self.blur * gray.width / 64))
+        gray = gray.resize((self.side, self.side), Image.BILINEAR)
+        ink = 1.0 - np.asarray(gray, dtype=np.float32) / 255.0
+        return (ink - ink.mean()).ravel()
+
+    def encode_images(self, images):
+        if not images:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return _normalize_rows(np.stack([self._ink(im) for im in images]) @ self.projection)
+
+
+class HashingTextEncoder:
+    """
+    Stub text encoder: signed feature hashing of word unigrams and bigrams.
+    """
+
+    def __init__(self, dim=256):
+        self.dim = dim
+
+    def _features(self, text):
+        words = re.findall(r"[a-z0-9]+", text.lower())
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for token in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            h = zlib.crc32(token.encode("utf-8"))
+            vec[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return vec
+
+    def encode_texts(self, texts):
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return _normalize_rows(np.stack([self._features(t) for t in texts]))
+
+
+class KeywordCaptioner:
+    """
+    Stub captioner for query crops: the icon's keywords with random word
+    dropout and shuffling, standing in for an imperfect BLIP2 caption.
+    """
+
+    def __init__(self, dropout=0.3):
+        self.dropout = dropout
+
+    def caption(self, keywords, rng):
+        kept = [w for w in keywords if rng.random() >= self.dropout]
+        rng.shuffle(kept)
+        return " ".join(kept + ["icon"])
@@ -0,0 +1,138 @@
+"""
+Synthetic retrieval queries: library SVGs rendered as screenshot-like icon
+crops with random scale, color, blur and JPEG compression.
+
+Each query goes through the production query path (crop_with_bbox and
+to_outline_bw from query_embedding) before it is embedded.
+"""
+
+import io
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+
+@dataclass
+class AugmentSpec:
+    """Ranges the query augmentations are drawn from (inclusive)."""
+    size: Tuple[int, int] = (24, 96)      # rendered icon width in pixels
+    blur: Tuple[float, float] = (0.0, 1.0)  # Gaussian blur radius in pixels
+    jpeg: Tuple[int, int] = (40, 95)      # JPEG quality
+    recolor: bool = True                  # random icon and background colors
+    bbox_jitter: float = 0.1              # detector box error, fraction of the icon size
+
+    def to_dict(self):
+        return asdict(self)
+
+
+@dataclass
+class Query:
+    """One synthetic query and the library row it should retrieve."""
+    library: str
+    src_svg: str
+    crop: Image.Image
+    caption: str
+
+
+def _random_colors(rng, recolor):
+    """Icon and background colors with enough luminance contrast."""
+    if not recolor:
+        return (0, 0, 0), (255, 255, 255)
+    while True:
+        fg, bg = rng.integers(0, 256, size=(2, 3))
+        luma = (fg - bg) @ np.array([0.299, 0.587, 0.114])
+        if abs(luma) >= 80:
+            return tuple(int(c) for c in fg), tuple(int(c) for c in bg)
+
+
+def render_query_crop(be, qe, svg_path, rng, spec):
+    """
+    Render one SVG as it might appear in a screenshot and crop it with a
+    jittered detector box.
+
+    Args:
+        be: The build-embeddings module (SVG rasterization).
+        qe: The query_embedding module (crop_with_bbox).
+        svg_path (Path): The source SVG.
+        rng (np.random.Generator): Augmentation randomness.
+        spec (AugmentSpec): Augmentation ranges.
+
+    Returns:
+        PIL.Image.Image: The RGBA crop, or None if the crop is empty.
+    """
+    size = int(rng.integers(spec.size[0], spec.size[1] + 1))
+    png = be.svg_to_png_bytes_padded(Path(svg_path), raster_width_px=size, pad_frac=0.0)
+    icon = Image.open(io.BytesIO(png)).convert("RGBA")
+    fg, bg = _random_colors(rng, spec.recolor)
+    colored = Image.new("RGBA", icon.size, fg + (255,))
+    colored.putalpha(icon.getchannel("A"))
+
+    margin = 2 * max(icon.size)
+    canvas = Image.new("RGBA", (icon.width + 2 * margin, icon.height + 2 * margin), bg + (255,))
+    canvas.alpha_composite(colored, (margin, margin))
+
+    radius = float(rng.uniform(*spec.blur))
+    if radius > 0:
+        canvas = canvas.filter(ImageFilter.GaussianBlur(radius))
+    buf = io.BytesIO()
+    canvas.convert("RGB").save(buf, format="JPEG", quality=int(rng.integers(spec.jpeg[0], spec.jpeg[1] + 1)))
+    screenshot = Image.open(io.BytesIO(buf.getvalue())).convert("RGBA")
+
+    jitter = rng.uniform(-spec.bbox_jitter, spec.bbox_jitter, size=4) * max(icon.size)
+    bbox = (margin + jitter[0], margin + jitter[1],
+            max(1.0, icon.width + jitter[2]), max(1.0, icon.height + jitter[3]))
+    return qe.crop_with_bbox(screenshot, bbox)
+
+
+def make_queries(be, qe, libraries, per_library, spec, captioner, seed=0):
+    """
+    Sample and render queries for each library.
+
+    Args:
+        be: The build-embeddings module.
+        qe: The query_embedding module.
+        libraries (dict): {library name: BenchLibrary} (see library.py).
+        per_library (int): Queries per library.
+        spec (AugmentSpec): Augmentation ranges.
+        captioner: Object with caption(keywords, rng) -> str.
+        seed (int): Seed of the query sample and augmentations.
+
+    Returns:
+        list: Query objects, grouped by library.
+    """
+    rng = np.random.default_rng(seed)
+    queries: List[Query] = []
+    for name, lib in libraries.items():
+        rows = rng.choice(len(lib.items), size=min(per_library, len(lib.items)), replace=False)
+        for row in sorted(rows.tolist()):
+            item = lib.items[row]
+            crop = render_query_crop(be, qe, lib.svgs[row], rng, spec)
+            if crop is None:
+                continue
+            queries.append(Query(name, item["src_svg"], crop, captioner.caption(item["aliases"], rng)))
+    return queries
+
+
+def embed_queries(qe, queries, image_encoder, text_encoder):
+    """
+    Outline and embed queries as the production query path does.
+
+    Returns:
+        (q_img, q_txt, outline_ms, embed_ms): embeddings, per-query
+        to_outline_bw milliseconds, and batched embedding milliseconds per query.
+    """
+    outlines, outline_ms = [], []
+    for q in queries:
+        start = time.perf_counter()
+        outlines.append(qe.to_outline_bw(q.crop))
+        outline_ms.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    q_img = image_encoder.encode_images(outlines)
+    q_txt = text_encoder.encode_texts([q.caption for q in queries])
+    embed_ms = (time.perf_counter() - start) * 1000 / max(len(queries), 1)
+    return q_img, q_txt, outline_ms, embed_ms
@@ -0,0 +1,250 @@
+"""
+Runs retrieval configurations over the synthetic queries and assembles the
+machine-readable report.
+"""
+
+import itertools
+import json
+import resource
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Tuple
+
+
+from .library import build_library, discover_libraries, ensure_format, library_bytes
+from .metrics import latency_summary, rank_metrics
+from .models import HashingTextEncoder, KeywordCaptioner, PixelProjectionEncoder
+from .queries import AugmentSpec, embed_queries, make_queries
+from .targets import load_build_embeddings, load_query_embedding, load_search_fused
+
+REPORT_SCHEMA = "icon-retrieval-benchmark/1"
+# Settings that must match for two reports' quality numbers to be comparable
+QUERY_SETTINGS = ("libraries", "queries_per_library", "seed", "augment", "encoders")
+
+
+@dataclass(frozen=True)
+class RunConfig:
+    """One retrieval configuration of the sweep."""
+    fmt: str
+    mode: str
+    topk: int
+    alpha: float
+    libs: Tuple[str, ...]
+
+    @property
+    def key(self):
+        """Stable identifier used to match results across reports."""
+        return f"fmt={self.fmt}|mode={self.mode}|topk={self.topk}|alpha={self.alpha:g}|libs={'+'.join(self.libs)}"
+
+
+def sweep(formats, modes, topks, alphas, lib_sets):
+    """All combinations of the swept settings."""
+    return [RunConfig(fmt, mode, int(topk), float(alpha), tuple(libs))
+            for libs, fmt, mode, topk, alpha in itertools.product(lib_sets, formats, modes, topks, alphas)]
+
+
+def run_config(sf, be, libraries, cfg, queries, q_img, q_txt, *, batch, ks, work_dir):
+    """
+    Retrieve every query of cfg's libraries through the multi-library API,
+    batch queries per call (one call per screenshot in production).
+
+    Returns:
+        dict: Quality overall and per library, latency and memory of cfg.
+    """
+    roots = [ensure_format(be, libraries[name], cfg.fmt, work_dir) for name in cfg.libs]
+    selected = [i for i, q in enumerate(queries) if q.library in cfg.libs]
+
+    def retrieve(rows):
+        _names, fused_hits, _img_hits = sf.retrieve_svg_filenames_from_libs_with_dual_details(
+            lib_roots=roots,
+            q_ids=[f"q{i:05d}" for i in rows],
+            q_img_all=q_img[rows],
+            q_txt_all=q_txt[rows],
+            topk=cfg.topk,
+            topm=max(ks),
+            alpha=cfg.alpha,
+            mode=cfg.mode,
+        )
+        return fused_hits
+
+    ranks, request_ms = {}, []
+    for start in range(0, len(selected), batch):
+        rows = selected[start:start + batch]
+        t0 = time.perf_counter()
+        fused_hits = retrieve(rows)
+        request_ms.append((time.perf_counter() - t0) * 1000)
+        for i, hits in zip(rows, fused_hits):
+            ranks[i] = next((h["rank"] for h in hits if h.get("src_svg") == queries[i].src_svg), None)
+
+    # Separate pass: tracemalloc slows allocation-heavy code down
+    peak = 0
+    if selected:
+        tracemalloc.start()
+        retrieve(selected[:batch])
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    per_library = {
+        name: rank_metrics([ranks[i] for i in selected if queries[i].library == name], ks)
+        for name in cfg.libs
+    }
+    return {
+        "key": cfg.key,
+        "config": asdict(cfg),
+        "overall": rank_metrics([ranks[i] for i in selected], ks),
+        "per_library": per_library,
+        "latency_ms": {
+            "per_request": latency_summary(request_ms),
+            "per_query_mean": round(sum(request_ms) / max(len(selected), 1), 4),
+        },
+        "memory": {
+            "retrieval_peak_mb": round(peak / 2**20, 3),
+            "library_mb": round(sum(library_bytes(r) for r in roots) / 2**20, 3),
+        },
+    }
+
+
+def run_benchmark(
+    svg_root,
+    *,
+    libs=None,
+    max_icons=None,
+    queries_per_library=50,
+    formats=("float32",),
+    modes=("image",),
+    topks=None,
+    alphas=None,
+    lib_sets=None,
+    batch=8,
+    ks=(1, 5, 10),
+    spec=None,
+    seed=0,
+    work_dir=None,
+    image_encoder=None,
+    text_encoder=None,
+    captioner=None,
+):
+    """
+    Build the benchmark libraries, render and embed the queries, and run
+    every configuration of the sweep.
+
+    Args:
+        svg_root (str | Path): Directory with one SVG subdirectory per library.
+        libs (list, optional): Library names to use (default: all).
+        max_icons (int, optional): Icons per library (first N, sorted).
+        queries_per_library (int): Synthetic queries per library.
+        formats, modes, topks, alphas: Swept search settings
+            (topks/alphas default to search_fused.TOPK/ALPHA).
+        lib_sets (list, optional): Library subsets searched together
+            (default: all libraries in one set).
+        batch (int): Queries per retrieval call.
+        ks (tuple): Recall cutoffs.
+        spec (AugmentSpec, optional): Query augmentation ranges.
+        seed (int): Seed of the query sample and augmentations.
+        work_dir (str | Path, optional): Where libraries are written
+            (default: a temporary directory).
+        image_encoder, text_encoder, captioner: Model stand-ins (default: stubs).
+
+    Returns:
+        dict: The report (see REPORT_SCHEMA).
+    """
+    sf, be, qe = load_search_fused(), load_build_embeddings(), load_query_embedding()
+    spec = spec or AugmentSpec()
+    image_encoder = image_encoder or PixelProjectionEncoder()
+    text_encoder = text_encoder or HashingTextEncoder()
+    captioner = captioner or KeywordCaptioner()
+    topks = topks or (sf.TOPK,)
+    alphas = alphas or (sf.ALPHA,)
+    ks = tuple(sorted(ks))
+
+    with tempfile.TemporaryDirectory(prefix="icon-bench-") as tmp:
+        work_dir = Path(work_dir or tmp)
+        names = discover_libraries(be, svg_root, libs)
+        lib_sets = [tuple(s) for s in (lib_sets or [names])]
+        unknown = sorted({n for s in lib_sets for n in s} - set(names))
+        if unknown:
+            raise ValueError(f"Library sets name unknown libraries {unknown}")
+
+        t0 = time.perf_counter()
+        libraries = {
+            name: build_library(be, svg_root, name, work_dir, image_encoder, text_encoder,
+                                max_icons=max_icons)
+            for name in names
+        }
+        build_s = time.perf_counter() - t0
+        print(f"[INFO] Built {len(libraries)} libraries "
+              f"({sum(len(lib.items) for lib in libraries.values())} icons) in {build_s:.1f}s")
+
+        queries = make_queries(be, qe, libraries, queries_per_library, spec, captioner, seed)
+        q_img, q_txt, outline_ms, embed_ms = embed_queries(qe, queries, image_encoder, text_encoder)
+        print(f"[INFO] {len(queries)} queries rendered and embedded")
+
+        results = []
+        for cfg in sweep(formats, modes, topks, alphas, lib_sets):
+            result = run_config(sf, be, libraries, cfg, queries, q_img, q_txt,
+                                batch=batch, ks=ks, work_dir=work_dir)
+            results.append(result)
+            overall, latency = result["overall"], result["latency_ms"]["per_request"]
+            print(f"  {cfg.key:<60} R@1={overall.get('recall@1', 0):.3f} MRR={overall['mrr']:.3f} "
+                  f"p50={latency.get('p50', 0):.1f}ms p99={latency.get('p99', 0):.1f}ms")
+
+    return {
+        "schema": REPORT_SCHEMA,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "settings": {
+            "svg_root": str(svg_root),
+            "libraries": {name: len(lib.items) for name, lib in libraries.items()},
+            "queries_per_library": queries_per_library,
+            "batch": batch,
+            "ks": list(ks),
+            "seed": seed,
+            "augment": spec.to_dict(),
+            "encoders": {
+                "image": type(image_encoder).__name__,
+                "text": type(text_encoder).__name__,
+                "captioner": type(captioner).__name__,
+            },
+        },
+        "query_stages_ms": {
+            "outline": latency_summary(outline_ms),
+            "embed_per_query": round(embed_ms, 4),
+        },
+        "library_build_s": round(build_s, 3),
+        "results": results,
+        # ru_maxrss is KiB on Linux
+        "process_max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def compare_reports(current, baseline, tolerance=0.02):
+    """
+    Quality regressions of current against baseline: configurations present
+    in both whose recall/MRR dropped by more than tolerance.
+
+    Returns:
+        list: {"key", "metric", "baseline", "current"} per regression.
+
+    Raises:
+        ValueError: If the reports were run on different queries.
+    """
+    # Round-trip so tuples compare equal to the lists of a loaded report
+    settings = json.loads(json.dumps(current["settings"]))
+    differing = [k for k in QUERY_SETTINGS if settings.get(k) != baseline.get("settings", {}).get(k)]
+    if differing:
+        raise ValueError(f"Reports are not comparable; query settings differ: {', '.join(differing)}")
+    base = {r["key"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for result in current["results"]:
+        old = base.get(result["key"])
+        if old is None:
+            continue
+        for metric, value in result["overall"].items():
+            if (metric.startswith("recall@") or metric == "mrr") and metric in old["overall"]:
+                if old["overall"][metric] - value > tolerance:
+                    regressions.append({"key": result["key"], "metric": metric,
+                                        "baseline": old["overall"][metric], "current": value})
+    return regressions
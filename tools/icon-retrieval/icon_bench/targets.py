@@ -0,0 +1,57 @@
+"""
+Locating and importing the retrieval code under test.
+
+search_fused.py has no package-relative imports and is loaded from its file,
+so tools that only search existing libraries do not need the generator
+package's dependencies. query_embedding.py is imported through the generator
+package (libs/python, added to sys.path when the package is not installed).
+build-embeddings.py is a script with a hyphenated name and is loaded from
+its file.
+"""
+
+import sys
+import importlib
+import importlib.util
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+EMBEDDINGS_DIR = REPO_ROOT / "libs" / "js" / "icons" / "embeddings"
+GENERATOR_ROOT = REPO_ROOT / "libs" / "python"
+SEARCH_FUSED_PATH = GENERATOR_ROOT / "generator" / "perception" / "icon" / "search_fused.py"
+BUILD_EMBEDDINGS_PATH = REPO_ROOT / "libs" / "js" / "icons" / "src" / "build-embeddings.py"
+
+
+def _load_from_file(name, path):
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_search_fused():
+    """The search_fused module (fused image+text retrieval over libraries)."""
+    return _load_from_file("search_fused", SEARCH_FUSED_PATH)
+
+
+def load_build_embeddings():
+    """The library builder script (rasterization, outlines, library writers)."""
+    return _load_from_file("build_embeddings", BUILD_EMBEDDINGS_PATH)
+
+
+def load_query_embedding():
+    """generator.perception.icon.query_embedding (query crops and outlines)."""
+    try:
+        return importlib.import_module("generator.perception.icon.query_embedding")
+    except ModuleNotFoundError as e:
+        if e.name not in ("generator", "generator.perception", "generator.perception.icon"):
+            raise
+    sys.path.insert(0, str(GENERATOR_ROOT))
+    return importlib.import_module("generator.perception.icon.query_embedding")
+
+
+def find_libraries(embeddings_dir=EMBEDDINGS_DIR, index_name="SigLIP2.faiss"):
+    """Library roots (directories with indices/<index_name>) under embeddings_dir."""
+    return sorted(p for p in Path(embeddings_dir).iterdir() if (p / "indices" / index_name).exists())
@@ -4,6 +4,9 @@ import os
 import csv
 import json
 import shutil
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 class WidgetExtractor:
     """
@@ -45,6 +48,9 @@ class WidgetExtractor:
     # Extract only final widget images (for production)
     extractor.extract_formal('output_formal_dir')
 
+    # Extract a large corpus with 4 worker processes, skipping images finished by an interrupted run
+    extractor.extract_formal('output_formal_dir', workers=4, resume=True)
+
     # Test single image
     extractor.extract_single_image('screenshot.png', 'test_output')
 
@@ -68,6 +74,9 @@ class WidgetExtractor:
     - Fast processing mode: Quick extraction with basic edge detection
     - Template matching optimized for common UI widget shapes and sizes
     - Automatic overlap removal prevents duplicate widget extraction
+    - extract_dev/extract_formal accept workers=N for a process pool and resume=True to skip
+      images recorded in the output directory's extraction_manifest.json; both print and
+      return per-stage timings
 
     Dependencies:
     - OpenCV (cv2)
@@ -88,13 +97,20 @@ class WidgetExtractor:
         self.max_width, self.max_height = 2000, 2000  # Increased for very large widgets
         self.padding = 2
         self.match_threshold = 0.02
+        self.template_shortlist_size = 8  # Templates re-scored with cv2.matchShapes per contour
         self.min_area = 8000  # Minimum area in pixels
         self.max_area = 2500000  # Increased to 2.5M pixels for large widgets
         self.enable_advanced_processing = enable_advanced_processing
 
+        # Per-stage wall-clock seconds of the last _process_image call
+        self.stage_timings = {}
+        self._current_stage = None
+        self._stage_start = 0.0
+
         # Performance optimization: cache common templates
         self._template_cache = {}
         self.templates = self._generate_templates()
+        self._template_signatures, self._template_valid = self._build_template_index(self.templates)
 
     def _generate_templates(self):
         """
@@ -170,6 +186,77 @@ class WidgetExtractor:
 
         return templates
 
+    def _begin_stage(self, stage):
+        """
+        Ends the current timing stage of _process_image and starts a new one.
+
+        Args:
+            stage (str or None): The stage to start; None only ends the current stage.
+        """
+        now = time.perf_counter()
+        if self._current_stage is not None:
+            elapsed = now - self._stage_start
+            self.stage_timings[self._current_stage] = self.stage_timings.get(self._current_stage, 0.0) + elapsed
+        self._current_stage, self._stage_start = stage, now
+
+    @staticmethod
+    def _hu_signature(contour):
+        """
+        Computes the per-moment terms cv2.matchShapes (CONTOURS_MATCH_I1) compares.
+
+        Args:
+            contour (np.ndarray): An OpenCV contour.
+
+        Returns:
+            tuple: (1 / (sign(h) * log10|h|) for the 7 Hu moments h, mask of moments
+                   with |h| > 1e-5, which are the only ones matchShapes uses)
+        """
+        hu = cv2.HuMoments(cv2.moments(contour)).ravel()
+        magnitude = np.abs(hu)
+        valid = magnitude > 1e-5
+        signature = np.zeros(7)
+        signature[valid] = 1.0 / (np.sign(hu[valid]) * np.log10(magnitude[valid]))
+        return signature, valid
+
+    def _build_template_index(self, templates):
+        """
+        Precomputes Hu-moment signatures of all templates.
+
+        Args:
+            templates (list): Template contours from _generate_templates.
+
+        Returns:
+            tuple: (N x 7 signature matrix, N x 7 validity mask)
+        """
+        signatures = [self._hu_signature(tmpl) for tmpl in templates]
+        return (np.array([sig for sig, _ in signatures]).reshape(-1, 7),
+                np.array([valid for _, valid in signatures]).reshape(-1, 7))
+
+    def _match_templates(self, contour):
+        """
+        Finds the template that best matches a contour under cv2.matchShapes (I1).
+
+        The I1 distance of the contour to every template is evaluated at once
+        from the precomputed Hu signatures; only the closest
+        template_shortlist_size templates are re-scored with cv2.matchShapes,
+        so the result matches a brute-force scan over all templates.
+
+        Args:
+            contour (np.ndarray): The candidate contour.
+
+        Returns:
+            tuple: (best matchShapes score, index of the best template)
+        """
+        signature, valid = self._hu_signature(contour)
+        both_valid = self._template_valid & valid
+        distances = np.where(both_valid, np.abs(self._template_signatures - signature), 0.0).sum(axis=1)
+
+        k = min(self.template_shortlist_size, len(distances))
+        shortlist = np.sort(np.argpartition(distances, k - 1)[:k])
+        scores = [cv2.matchShapes(contour, self.templates[i], cv2.CONTOURS_MATCH_I1, 0.0) for i in shortlist]
+        best = int(np.argmin(scores))  # First minimum, i.e. the lowest template index on ties
+        return scores[best], int(shortlist[best])
+
     def _advanced_edge_refinement(self, roi, cnt_shifted):
         """
         Simple and reliable edge refinement for clean widget extraction.
@@ -334,24 +421,13 @@ class WidgetExtractor:
             # Apply gaussian blur to the entire alpha
             alpha_blurred = cv2.GaussianBlur(alpha, (5, 5), 1.0)
 
-            # Create smooth blend using distance information
-            edge_y, edge_x = np.where(edge_mask)
+            # Blend based on distance from edge (0-2 pixels): closer to edge = more blur
+            dist = distance_transform[edge_mask]
+            blend_ratio = np.where(dist <= 1.0, 0.4, 0.2)
 
-            for y, x in zip(edge_y, edge_x):
-                if 0 <= x < w and 0 <= y < h:
-                    # Get distance from edge (0-2 pixels)
-                    dist = distance_transform[y, x]
-
-                    # Blend based on distance: closer to edge = more blur
-                    if dist <= 1.0:
-                        # Very close to edge: more blur
-                        blend_ratio = 0.4
-                    else:
-                        # Slightly from edge: less blur
-                        blend_ratio = 0.2
-
-                    # Apply weighted blend
-                    alpha_smooth[y, x] = int((1 - blend_ratio) * alpha[y, x] + blend_ratio * alpha_blurred[y, x])
+            # Apply weighted blend (truncated to uint8)
+            alpha_smooth[edge_mask] = ((1 - blend_ratio) * alpha[edge_mask] +
+                                       blend_ratio * alpha_blurred[edge_mask]).astype(np.uint8)
 
             # Apply slight morphological smoothing to reduce pixelation
             kernel_small = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
@@ -383,40 +459,34 @@ class WidgetExtractor:
         edge_pixels = np.where(edges > 0)
 
         if len(edge_pixels[0]) > 0:
-            # Sample background colors outside the widget
-            background_colors = []
-
-            # Sample pixels just outside the edge
-            for y, x in zip(edge_pixels[0], edge_pixels[1]):
-                for dy in [-2, -1, 1, 2]:
-                    for dx in [-2, -1, 1, 2]:
-                        ny, nx = y + dy, x + dx
-                        if 0 <= ny < h and 0 <= nx < w and alpha[ny, nx] < 50:
-                            # This is likely background
-                            background_colors.append(widget_image[ny, nx, :3])
-                            if len(background_colors) >= 100:  # Sample limit
-                                break
-                    if len(background_colors) >= 100:
-                        break
-                if len(background_colors) >= 100:
-                    break
+            # Sample pixels just outside the edge: neighbours at offsets of
+            # -2..2 (excluding 0) in each axis, in edge-pixel order
+            steps = np.array([-2, -1, 1, 2])
+            dy, dx = np.repeat(steps, 4), np.tile(steps, 4)
+            ny = (edge_pixels[0][:, None] + dy).ravel()
+            nx = (edge_pixels[1][:, None] + dx).ravel()
+            in_bounds = (ny >= 0) & (ny < h) & (nx >= 0) & (nx < w)
+            ny, nx = ny[in_bounds], nx[in_bounds]
+
+            # Nearly transparent neighbours are likely background
+            is_background = alpha[ny, nx] < 50
+            background_colors = widget_image[ny[is_background][:100], nx[is_background][:100], :3]  # Sample limit
 
             # If we found background colors, remove them from edge pixels
             if len(background_colors) > 10:
-                background_colors = np.array(background_colors)
                 avg_background = np.mean(background_colors, axis=0)
 
                 # Create cleaned image
                 cleaned_image = widget_image.copy()
 
-                for y, x in zip(edge_pixels[0], edge_pixels[1]):
-                    if alpha[y, x] > 200:  # Only affect opaque pixels
-                        pixel_color = widget_image[y, x, :3]
-                        color_diff = np.linalg.norm(pixel_color - avg_background)
+                # Only affect opaque pixels
+                opaque = alpha[edge_pixels] > 200
+                ys, xs = edge_pixels[0][opaque], edge_pixels[1][opaque]
+                color_diff = np.linalg.norm(widget_image[ys, xs, :3] - avg_background, axis=1)
 
-                        # If pixel is similar to background, make it transparent
-                        if color_diff < 30:  # Threshold for background similarity
-                            cleaned_image[y, x, 3] = 0  # Make transparent
+                # If pixel is similar to background, make it transparent
+                similar = color_diff < 30  # Threshold for background similarity
+                cleaned_image[ys[similar], xs[similar], 3] = 0
 
                 return cleaned_image
 
@@ -458,51 +528,39 @@ class WidgetExtractor:
         # For edge regions, adjust based on gradient direction and strength
         edge_y, edge_x = np.where(edge_regions)
 
-        for y, x in zip(edge_y, edge_x):
-            if 0 <= x < w and 0 <= y < h:
-                # Get gradient direction
-                gx = grad_x[y, x]
-                gy = grad_y[y, x]
-
-                # Normalize gradient direction
-                grad_norm = np.sqrt(gx**2 + gy**2)
-                if grad_norm > 0:
-                    gx, gy = gx/grad_norm, gy/grad_norm
-
-                    # Sample along gradient direction to find precise edge
-                    step_size = 0.5  # Subpixel stepping
-                    max_steps = 3
-
-                    best_pos = None
-                    best_gradient = 0
-
-                    for step in range(-max_steps, max_steps + 1):
-                        sample_x = x + gx * step * step_size
-                        sample_y = y + gy * step * step_size
-
-                        if (0 <= sample_x < w and 0 <= sample_y < h):
-                            sample_x_int = int(sample_x)
-                            sample_y_int = int(sample_y)
-
-                            # Bilinear interpolation for subpixel accuracy
-                            if (sample_x_int + 1 < w and sample_y_int + 1 < h):
-                                dx = sample_x - sample_x_int
-                                dy = sample_y - sample_y_int
-
-                                grad_val = (
-                                    (1-dx) * (1-dy) * gradient_magnitude[sample_y_int, sample_x_int] +
-                                    dx * (1-dy) * gradient_magnitude[sample_y_int, sample_x_int + 1] +
-                                    (1-dx) * dy * gradient_magnitude[sample_y_int + 1, sample_x_int] +
-                                    dx * dy * gradient_magnitude[sample_y_int + 1, sample_x_int + 1]
-                                )
-
-                                if grad_val > best_gradient:
-                                    best_gradient = grad_val
-                                    best_pos = (sample_x, sample_y)
-
-                    # Update refined mask with subpixel precision
-                    if best_pos:
-                        refined_mask[y, x] = 255
+        # Normalized gradient direction (non-zero on edge regions)
+        gx, gy = grad_x[edge_y, edge_x], grad_y[edge_y, edge_x]
+        grad_norm = np.sqrt(gx**2 + gy**2)
+        gx, gy = gx/grad_norm, gy/grad_norm
+
+        # Sample along gradient direction to find precise edge, all edge
+        # pixels and steps at once (one column per step)
+        step_size = 0.5  # Subpixel stepping
+        max_steps = 3
+        steps = np.arange(-max_steps, max_steps + 1)
+        sample_x = edge_x[:, None] + gx[:, None] * steps * step_size
+        sample_y = edge_y[:, None] + gy[:, None] * steps * step_size
+
+        # Bilinear interpolation for subpixel accuracy, where the 2x2
+        # neighbourhood is inside the image
+        in_bounds = (sample_x >= 0) & (sample_x < w) & (sample_y >= 0) & (sample_y < h)
+        sample_x_int = np.where(in_bounds, sample_x, 0).astype(np.int64)
+        sample_y_int = np.where(in_bounds, sample_y, 0).astype(np.int64)
+        valid = in_bounds & (sample_x_int + 1 < w) & (sample_y_int + 1 < h)
+        x0, y0 = np.where(valid, sample_x_int, 0), np.where(valid, sample_y_int, 0)
+        x1, y1 = np.minimum(x0 + 1, w - 1), np.minimum(y0 + 1, h - 1)
+        dx, dy = sample_x - x0, sample_y - y0
+
+        grad_val = (
+            (1-dx) * (1-dy) * gradient_magnitude[y0, x0] +
+            dx * (1-dy) * gradient_magnitude[y0, x1] +
+            (1-dx) * dy * gradient_magnitude[y1, x0] +
+            dx * dy * gradient_magnitude[y1, x1]
+        )
+
+        # Update refined mask where a sample found a positive gradient
+        found_edge = np.any(valid & (grad_val > 0), axis=1)
+        refined_mask[edge_y[found_edge], edge_x[found_edge]] = 255
 
         # Convert back to uint8
         refined_mask = refined_mask.astype(np.uint8)
@@ -636,10 +694,54 @@ class WidgetExtractor:
             # Final fallback: return original contour
             return contour
 
+    def _overlapping_pairs(self, boxes):
+        """
+        Finds all pairs of bounding boxes that overlap significantly.
+
+        Boxes are sorted by left edge and swept once: a box can only intersect
+        the boxes that start before its right edge, found with a binary
+        search, so only x-overlapping pairs are tested. Intersections of all
+        candidate pairs are then evaluated at once.
+
+        Args:
+            boxes (np.ndarray): N x 4 array of (x, y, w, h) bounding boxes.
+
+        Returns:
+            tuple: (i, j) index arrays with i < j, sorted by i then j, of pairs where
+                   the intersection covers more than 30% of either box
+        """
+        x, y, w, h = boxes.T
+        order = np.argsort(x, kind="stable")
+        x_sorted = x[order]
+
+        # For the box at sorted position p, candidates are the boxes at
+        # sorted positions p+1 .. end[p]-1 (left edge before p's right edge)
+        ends = np.searchsorted(x_sorted, x_sorted + w[order], side="left")
+        counts = np.maximum(ends - np.arange(len(boxes)) - 1, 0)
+        first = np.repeat(np.arange(len(boxes)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        a, b = order[first], order[first + 1 + offsets]
+
+        # Calculate intersection rectangles
+        w_intersection = np.minimum(x[a] + w[a], x[b] + w[b]) - np.maximum(x[a], x[b])
+        h_intersection = np.minimum(y[a] + h[a], y[b] + h[b]) - np.maximum(y[a], y[b])
+        overlap_area = w_intersection * h_intersection
+        # Consider it significant overlap if more than 30% of either widget is overlapped
+        significant = ((w_intersection > 0) & (h_intersection > 0) &
+                       ((overlap_area / (w[a] * h[a]) > 0.3) | (overlap_area / (w[b] * h[b]) > 0.3)))
+
+        i, j = np.minimum(a, b)[significant], np.maximum(a, b)[significant]
+        pair_order = np.lexsort((j, i))
+        return i[pair_order], j[pair_order]
+
     def _remove_overlapping_widgets(self, contours):
         """
         Detect and resolve overlapping widgets by keeping only the largest one.
 
+        Contours are visited in order; each one removes the later, smaller
+        contours it significantly overlaps, and is itself dropped at the
+        first later, not yet removed contour that is at least as large.
+
         Args:
             contours: List of contours to check for overlaps
 
@@ -649,6 +751,15 @@ class WidgetExtractor:
         if len(contours) <= 1:
             return contours
 
+        # Bounding boxes and areas, computed once per contour
+        boxes = np.array([cv2.boundingRect(cnt) for cnt in contours], dtype=np.int64)
+        areas = [cv2.contourArea(cnt) for cnt in contours]
+
+        # Later contours each contour significantly overlaps, in index order
+        pair_i, pair_j = self._overlapping_pairs(boxes)
+        split_at = np.searchsorted(pair_i, np.arange(1, len(contours)))
+        overlaps = np.split(pair_j, split_at)
+
         filtered_contours = []
         removed_indices = set()
 
@@ -656,43 +767,17 @@ class WidgetExtractor:
             if i in removed_indices:
                 continue
 
-            x1, y1, w1, h1 = cv2.boundingRect(cnt1)
-            area1 = cv2.contourArea(cnt1)
-
-            # Check overlap with other contours
-            has_overlap = False
             overlap_with_larger = False
-
-            for j, cnt2 in enumerate(contours):
-                if i >= j or j in removed_indices:
+            for j in overlaps[i].tolist():
+                if j in removed_indices:
                     continue
 
-                x2, y2, w2, h2 = cv2.boundingRect(cnt2)
-                area2 = cv2.contourArea(cnt2)
-
-                # Calculate intersection rectangle
-                x_intersection = max(x1, x2)
-                y_intersection = max(y1, y2)
-                w_intersection = min(x1 + w1, x2 + w2) - x_intersection
-                h_intersection = min(y1 + h1, y2 + h2) - y_intersection
-
-                if w_intersection > 0 and h_intersection > 0:
-                    # There is overlap
-                    overlap_area = w_intersection * h_intersection
-                    overlap_ratio1 = overlap_area / (w1 * h1)
-                    overlap_ratio2 = overlap_area / (w2 * h2)
-
-                    # Consider it significant overlap if more than 30% of either widget is overlapped
-                    if overlap_ratio1 > 0.3 or overlap_ratio2 > 0.3:
-                        has_overlap = True
-
-                        # Keep the larger widget, remove the smaller one
-                        if area1 > area2:
-                            removed_indices.add(j)
-                            # print(f"[INFO] Removing overlapping widget {j} (area: {area2:.0f}) in favor of {i} (area: {area1:.0f})")
-                        else:
-                            overlap_with_larger = True
-                            break
+                # Keep the larger widget, remove the smaller one
+                if areas[i] > areas[j]:
+                    removed_indices.add(j)
+                else:
+                    overlap_with_larger = True
+                    break
 
             if not overlap_with_larger:
                 filtered_contours.append(cnt1)
@@ -719,16 +804,10 @@ class WidgetExtractor:
         edges = cv2.Canny(alpha, 50, 150)
         edge_pixels = np.where(edges > 0)
         if len(edge_pixels[0]) > 0:
-            edge_gradients = []
-            for i in range(1, len(edge_pixels[0])):
-                prev_idx = (edge_pixels[0][i-1], edge_pixels[1][i-1])
-                curr_idx = (edge_pixels[0][i], edge_pixels[1][i])
-                if 0 <= curr_idx[0] < h and 0 <= curr_idx[1] < w:
-                    if 0 <= prev_idx[0] < h and 0 <= prev_idx[1] < w:
-                        gradient_diff = abs(int(alpha[curr_idx]) - int(alpha[prev_idx]))
-                        edge_gradients.append(gradient_diff)
-
-            edge_smoothness = 1.0 - (np.mean(edge_gradients) / 255.0) if edge_gradients else 0.5
+            # Alpha differences between consecutive edge pixels (row-major order)
+            edge_gradients = np.abs(np.diff(alpha[edge_pixels].astype(np.int64)))
+
+            edge_smoothness = 1.0 - (np.mean(edge_gradients) / 255.0) if len(edge_gradients) else 0.5
         else:
             edge_smoothness = 0.5
 
@@ -827,11 +906,20 @@ class WidgetExtractor:
         Returns:
             int: The number of widgets saved.
         """
+        # Reset OpenCV's RNG (used by GrabCut) to its initial state so an image's
+        # widgets do not depend on which images were processed before it
+        cv2.setRNGSeed(0)
+
+        self.stage_timings = {}
+        self._begin_stage("load")
         image = cv2.imread(image_path)
         if image is None:
             print(f"[WARNING] Could not read {image_path}")
+            self._begin_stage(None)
             return 0
 
+        self._begin_stage("edge_detection")
+
         overlay = image.copy() if output_subdir else None
 
         # Visualization images for different stages
@@ -910,6 +998,7 @@ class WidgetExtractor:
         contours_list = list(find_contours_result[0]) if len(find_contours_result) == 2 else list(find_contours_result)
 
         # Additional detection for large, subtle widgets using multiple approaches
+        self._begin_stage("candidate_detection")
         height, width = image.shape[:2]
 
         additional_contours = []
@@ -1106,6 +1195,7 @@ class WidgetExtractor:
                                 cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
 
         if output_subdir:
+            self._begin_stage("debug_output")
             os.makedirs(output_subdir, exist_ok=True)
             cv2.imwrite(os.path.join(output_subdir, "01_gray.png"), gray)
             cv2.imwrite(os.path.join(output_subdir, "02_bilateral.png"), bilateral)
@@ -1131,6 +1221,7 @@ class WidgetExtractor:
         original_filename = os.path.splitext(os.path.basename(image_path))[0]
 
         for cnt in contours:
+            self._begin_stage("template_matching")
             x, y, w, h = cv2.boundingRect(cnt)
             area = cv2.contourArea(cnt)
             aspect_ratio = float(w) / h
@@ -1169,9 +1260,7 @@ class WidgetExtractor:
                 if solidity < 0.5:
                     continue
 
-            scores = [cv2.matchShapes(cnt, tmpl, cv2.CONTOURS_MATCH_I1, 0.0) for tmpl in self.templates]
-            best_score = min(scores)
-            best_template_idx = scores.index(best_score)
+            best_score, best_template_idx = self._match_templates(cnt)
 
             # More permissive matching for large widgets
             threshold = self.match_threshold
@@ -1194,6 +1283,7 @@ class WidgetExtractor:
                                 cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
 
             if best_score < threshold:
+                self._begin_stage("refinement")
                 # Minimal padding for edge processing - just enough to work with
                 padding_expanded = 3  # Much smaller padding
                 x_start = max(x - padding_expanded, 0)
@@ -1334,6 +1424,7 @@ class WidgetExtractor:
                     if widget_cropped.shape[0] < 10 or widget_cropped.shape[1] < 10:
                         continue  # Skip too small widgets
 
+                self._begin_stage("save")
                 if output_subdir:
                     save_path = os.path.join(output_subdir, f"widget_{widget_count}.png")
                     cv2.imwrite(save_path, widget_cropped)
@@ -1349,48 +1440,300 @@ class WidgetExtractor:
                 widget_count += 1
 
         if output_subdir:
+            self._begin_stage("debug_output")
             cv2.imwrite(os.path.join(output_subdir, "preview.png"), overlay)
             cv2.imwrite(os.path.join(output_subdir, "stage3_template_matching.png"), template_match_viz)
             csv_file.close()
 
+        self._begin_stage(None)
         return widget_count
 
-    def extract_dev(self, output_dir):
+    MANIFEST_NAME = "extraction_manifest.json"
+    # The manifest is rewritten after this many newly finished images or seconds, whichever comes first
+    MANIFEST_SAVE_EVERY = 50
+    MANIFEST_SAVE_SECONDS = 30.0
+
+    def _input_images(self):
         """
-        Extracts widgets and saves all intermediate and debug files.
+        Lists the input images in a deterministic (sorted) order.
+
+        Returns:
+            list: Image filenames in input_dir.
+        """
+        return sorted(f for f in os.listdir(self.input_dir)
+                      if f.lower().endswith((".png", ".jpg", ".jpeg")))
+
+    def _image_signature(self, filename):
+        """
+        Identifies the current version of an input image for the resume manifest.
 
         Args:
-            output_dir (str): The name of the output directory for all results.
+            filename (str): Image filename in input_dir.
+
+        Returns:
+            dict: File size and modification time.
+        """
+        stat = os.stat(os.path.join(self.input_dir, filename))
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def _load_manifest(self, manifest_path, mode):
+        """
+        Loads the finished-image entries of a previous extraction into the same directory.
+
+        Entries written in another mode or with another processing setting are ignored.
+
+        Args:
+            manifest_path (str): Path to the manifest JSON file.
+            mode (str): "dev" or "formal".
+
+        Returns:
+            dict: {filename: entry} for finished images.
+        """
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if (manifest.get("mode") != mode or
+                manifest.get("enable_advanced_processing") != self.enable_advanced_processing):
+            return {}
+        return manifest.get("images", {})
+
+    def _write_manifest(self, manifest_path, mode, images, summary=None):
+        """
+        Atomically writes the resume manifest.
+
+        Args:
+            manifest_path (str): Path to the manifest JSON file.
+            mode (str): "dev" or "formal".
+            images (dict): {filename: entry} for finished images.
+            summary (dict, optional): Run summary from _summarize_extraction.
+        """
+        manifest = {
+            "mode": mode,
+            "enable_advanced_processing": self.enable_advanced_processing,
+            "images": images,
+        }
+        if summary is not None:
+            manifest["summary"] = summary
+        tmp_path = manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, manifest_path)
+
+    def _extract_one(self, filename, output_dir, mode):
+        """
+        Runs _process_image for one input image of an extraction run.
+
+        Args:
+            filename (str): Image filename in input_dir.
+            output_dir (str): The run's output directory.
+            mode (str): "dev" (per-image debug subdirectory) or "formal".
+
+        Returns:
+            tuple: (filename, widget count, stage timings, error message or None)
+        """
+        image_path = os.path.join(self.input_dir, filename)
+        start = time.perf_counter()
+        try:
+            if mode == "dev":
+                subdir = os.path.join(output_dir, os.path.splitext(filename)[0])
+                count = self._process_image(image_path, output_subdir=subdir)
+            else:
+                count = self._process_image(image_path, formal_output_dir=output_dir)
+        except Exception as e:
+            self._begin_stage(None)
+            return filename, 0, {}, str(e)
+        timings = dict(self.stage_timings)
+        timings["total"] = time.perf_counter() - start
+        return filename, count, timings, None
+
+    def _record_results(self, results, output_dir, mode, manifest_path, finished, processed):
+        """
+        Reports per-image results in input order and records them in the manifest.
+
+        The manifest is rewritten at most every MANIFEST_SAVE_EVERY images or
+        MANIFEST_SAVE_SECONDS seconds (and once more if the run is interrupted);
+        _run_extraction writes the final version.
+
+        Args:
+            results (iterable): _extract_one results, in input order.
+            output_dir (str): The output directory.
+            mode (str): "dev" or "formal".
+            manifest_path (str): Path to the manifest JSON file.
+            finished (dict): Manifest entries, updated in place.
+            processed (dict): Entries of images processed in this run, updated in place.
+        """
+        unsaved, last_save = 0, time.monotonic()
+        try:
+            for filename, count, timings, error in results:
+                if error is not None:
+                    # Not recorded, so a resumed run retries the image
+                    print(f"[ERROR] {filename}: extraction failed: {error}")
+                    continue
+                if mode == "dev":
+                    subdir = os.path.join(output_dir, os.path.splitext(filename)[0])
+                    print(f"[OK] {filename}: saved {count} widgets -> {subdir}")
+                else:
+                    print(f"[OK] {filename}: extracted {count} widgets.")
+                entry = {
+                    "signature": self._image_signature(filename),
+                    "widgets": count,
+                    "timings": {stage: round(seconds, 4) for stage, seconds in timings.items()},
+                }
+                finished[filename] = processed[filename] = entry
+                unsaved += 1
+                if (unsaved >= self.MANIFEST_SAVE_EVERY or
+                        time.monotonic() - last_save >= self.MANIFEST_SAVE_SECONDS):
+                    self._write_manifest(manifest_path, mode, finished)
+                    unsaved, last_save = 0, time.monotonic()
+        except BaseException:
+            # Keep what finished so far for a resumed run
+            if unsaved:
+                self._write_manifest(manifest_path, mode, finished)
+            raise
+
+    def _summarize_extraction(self, finished, processed, wall_time, workers):
+        """
+        Aggregates the results of a run.
+
+        Totals cover every finished image, including those skipped by a resumed
+        run; counts and per-stage timings of this run are kept under "run".
+
+        Args:
+            finished (dict): {filename: manifest entry} of all finished images.
+            processed (dict): {filename: manifest entry} of the images processed in the run.
+            wall_time (float): Wall-clock seconds of the run.
+            workers (int): Number of worker processes.
+
+        Returns:
+            dict: Total image and widget counts, and the run's image and widget
+                counts, resumed image count, wall time and per-stage total/mean seconds.
+        """
+        stage_totals = {}
+        for entry in processed.values():
+            for stage, seconds in entry["timings"].items():
+                stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+        n = max(len(processed), 1)
+        return {
+            "images": len(finished),
+            "widgets": sum(entry["widgets"] for entry in finished.values()),
+            "run": {
+                "images": len(processed),
+                "widgets": sum(entry["widgets"] for entry in processed.values()),
+                "resumed": len(finished) - len(processed),
+                "workers": workers,
+                "wall_time": round(wall_time, 3),
+                "stages": {stage: {"total": round(total, 3), "mean": round(total / n, 4)}
+                           for stage, total in sorted(stage_totals.items(), key=lambda item: -item[1])},
+            },
+        }
+
+    def _print_timing_summary(self, summary):
+        """
+        Prints the per-stage timing summary of a run.
+
+        Args:
+            summary (dict): The run summary from _summarize_extraction.
+        """
+        run = summary["run"]
+        if not run["images"]:
+            return
+        print(f"[TIMING] {run['images']} images in {run['wall_time']:.1f}s "
+              f"with {run['workers']} worker(s); seconds per stage (total / mean per image):")
+        for stage, seconds in run["stages"].items():
+            print(f"    {stage:<20} {seconds['total']:>9.2f} / {seconds['mean']:.3f}")
+
+    def _run_extraction(self, output_dir, mode, workers=1, resume=False):
+        """
+        Extracts widgets from every input image, optionally in parallel.
+
+        Images are processed and reported in sorted filename order. Output
+        names depend only on the image filename and widget index, so they do
+        not depend on scheduling. Each worker process builds its own
+        WidgetExtractor (and template index) once. Finished images are
+        recorded in a manifest in output_dir, so a run restarted with
+        resume=True skips images that are unchanged since they were extracted.
+
+        Args:
+            output_dir (str): The output directory.
+            mode (str): "dev" or "formal".
+            workers (int): Number of worker processes (1 = in this process).
+            resume (bool): Skip images already recorded in the manifest.
+
+        Returns:
+            dict: The run summary (see _summarize_extraction).
         """
         os.makedirs(output_dir, exist_ok=True)
-        for filename in os.listdir(self.input_dir):
-            if not filename.lower().endswith((".png", ".jpg", ".jpeg")):
-                continue
+        manifest_path = os.path.join(output_dir, self.MANIFEST_NAME)
+        previous = self._load_manifest(manifest_path, mode) if resume else {}
+
+        finished, pending = {}, []
+        for filename in self._input_images():
+            entry = previous.get(filename)
+            if entry is not None and entry.get("signature") == self._image_signature(filename):
+                finished[filename] = entry
+            else:
+                pending.append(filename)
+        if finished:
+            print(f"[INFO] Resuming: skipping {len(finished)} finished images, {len(pending)} to process")
+
+        start = time.perf_counter()
+        processed = {}
+        if workers > 1 and len(pending) > 1:
+            # spawn: OpenCV's thread pools are not fork-safe
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending)), mp_context=context,
+                                     initializer=_init_extraction_worker,
+                                     initargs=(self.input_dir, self.enable_advanced_processing)) as pool:
+                results = pool.map(_extract_in_worker, [(f, output_dir, mode) for f in pending])
+                self._record_results(results, output_dir, mode, manifest_path, finished, processed)
+        else:
+            results = (self._extract_one(f, output_dir, mode) for f in pending)
+            self._record_results(results, output_dir, mode, manifest_path, finished, processed)
+
+        summary = self._summarize_extraction(finished, processed, time.perf_counter() - start, workers)
+        self._write_manifest(manifest_path, mode, finished, summary)
+        return summary
+
+    def extract_dev(self, output_dir, workers=1, resume=False):
+        """
+        Extracts widgets and saves all intermediate and debug files.
 
-            image_path = os.path.join(self.input_dir, filename)
-            subdir = os.path.join(output_dir, os.path.splitext(filename)[0])
-            count = self._process_image(image_path, output_subdir=subdir)
-            print(f"[OK] {filename}: saved {count} widgets -> {subdir}")
+        Args:
+            output_dir (str): The name of the output directory for all results.
+            workers (int): Number of worker processes.
+            resume (bool): Skip images finished by a previous run into output_dir.
 
-    def extract_formal(self, output_dir):
+        Returns:
+            dict: The run summary, including aggregated per-stage timings.
+        """
+        summary = self._run_extraction(output_dir, "dev", workers, resume)
+        self._print_timing_summary(summary)
+        return summary
+
+    def extract_formal(self, output_dir, workers=1, resume=False):
         """
         Extracts widgets and saves only the final widget images.
 
         Args:
             output_dir (str): The name of the output directory for final widget images.
+            workers (int): Number of worker processes.
+            resume (bool): Skip images finished by a previous run into output_dir.
+
+        Returns:
+            dict: The run summary, including aggregated per-stage timings.
         """
-        os.makedirs(output_dir, exist_ok=True)
-        total_widgets = 0
-        for filename in os.listdir(self.input_dir):
-            if not filename.lower().endswith((".png", ".jpg", ".jpeg")):
-                continue
+        summary = self._run_extraction(output_dir, "formal", workers, resume)
+        run = summary["run"]
+        print(f"\n[COMPLETE] Extraction complete. Total widgets saved: {summary['widgets']} "
+              f"from {summary['images']} images in {output_dir}")
+        if run["resumed"]:
+            print(f"[INFO] This run: {run['widgets']} widgets from {run['images']} images; "
+                  f"{run['resumed']} images finished by earlier runs")
+        self._print_timing_summary(summary)
+        return summary
 
-            image_path = os.path.join(self.input_dir, filename)
-            count = self._process_image(image_path, formal_output_dir=output_dir)
-            total_widgets += count
-            print(f"[OK] {filename}: extracted {count} widgets.")
-        print(f"\n[COMPLETE] Extraction complete. Total widgets saved: {total_widgets} in {output_dir}")
-    
     def extract_single_image(self, image_filename, output_dir):
         """
         Extract widgets from a single image for testing and debugging.
@@ -1494,6 +1837,24 @@ class WidgetExtractor:
             except Exception as e:
                 print(f"Error copying {source_path}: {e}")
 
+
+# Per-process extractor for parallel extract_dev/extract_formal runs,
+# built once per worker so the template index is not rebuilt per image
+_worker_extractor = None
+
+
+def _init_extraction_worker(input_dir, enable_advanced_processing):
+    global _worker_extractor
+    # One OpenCV thread per worker; parallelism comes from the pool
+    cv2.setNumThreads(1)
+    _worker_extractor = WidgetExtractor(input_dir, enable_advanced_processing)
+
+
+def _extract_in_worker(task):
+    filename, output_dir, mode = task
+    return _worker_extractor._extract_one(filename, output_dir, mode)
+
+
 # Example Usage:
 # if __name__ == "__main__":
 #     input_dir = r"tools\widget-extraction\sample_widget_images"
@@ -0,0 +1,429 @@
+"""
+Reproducible comparison of WidgetExtractor's indexed fast paths against the
+brute-force code they replaced.
+
+Template matching (_match_templates): the Hu-signature shortlist is compared
+with cv2.matchShapes over every template (reference_match_templates, the
+previous loop kept verbatim) on the candidate contours extract_dev produces
+for sample_widget_images and on random contours: rounded rectangles,
+ellipses, polygons, noisy outlines and exact copies of templates (many
+templates share a Hu signature, so these are the tie cases). The best score
+must equal the brute-force minimum for the extractor's
+template_shortlist_size; the template index may differ only where another
+template ties at exactly that score, since the vectorized I1 distance and
+cv2.matchShapes can order equal shapes differently in the last bits.
+Smaller shortlist sizes are reported for comparison.
+
+Overlap removal (_overlapping_pairs, _remove_overlapping_widgets): the
+sweep over x-sorted boxes is compared with an all-pairs scan, and the
+filtered contours with the previous O(n^2) loop (kept verbatim), on random
+contour sets that include identical, nested and edge-touching boxes and
+equal areas. Pairs and kept contours must be identical.
+
+extract_dev: the sample images are extracted with the fast paths and once
+more per brute-force reference patched in, and every output file must be
+byte-identical (the manifest, which holds timings, is skipped).
+
+Usage:
+    python check_bruteforce_equivalence.py
+    python check_bruteforce_equivalence.py --contours 500 --shortlists 1,2,4,8,16 --json equivalence.json
+    python check_bruteforce_equivalence.py --contour-sets 1000 --timing-size 3000
+
+Exits with status 1 if any comparison fails.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+from collections import Counter
+
+import cv2
+import numpy as np
+
+from WidgetExtractor import WidgetExtractor
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_widget_images")
+
+
+# ==========================================================
+#  Reference implementations (pre-index brute force)
+# ==========================================================
+
+def reference_match_templates(extractor, cnt):
+    scores = [cv2.matchShapes(cnt, tmpl, cv2.CONTOURS_MATCH_I1, 0.0) for tmpl in extractor.templates]
+    best_score = min(scores)
+    best_template_idx = scores.index(best_score)
+    return best_score, best_template_idx, scores
+
+
+def reference_overlapping_pairs(boxes):
+    """All-pairs scan with the overlap test of the previous loop; (i, j) with i < j in order."""
+    pairs = []
+    for i, (x1, y1, w1, h1) in enumerate(boxes.tolist()):
+        for j in range(i + 1, len(boxes)):
+            x2, y2, w2, h2 = boxes[j].tolist()
+            w_intersection = min(x1 + w1, x2 + w2) - max(x1, x2)
+            h_intersection = min(y1 + h1, y2 + h2) - max(y1, y2)
+            if w_intersection > 0 and h_intersection > 0:
+                overlap_area = w_intersection * h_intersection
+                if overlap_area / (w1 * h1) > 0.3 or overlap_area / (w2 * h2) > 0.3:
+                    pairs.append((i, j))
+    return pairs
+
+
+def reference_remove_overlapping_widgets(contours):
+    if len(contours) <= 1:
+        return contours
+
+    filtered_contours = []
+    removed_indices = set()
+
+    for i, cnt1 in enumerate(contours):
+        if i in removed_indices:
+            continue
+
+        x1, y1, w1, h1 = cv2.boundingRect(cnt1)
+        area1 = cv2.contourArea(cnt1)
+
+        # Check overlap with other contours
+        has_overlap = False
+        overlap_with_larger = False
+
+        for j, cnt2 in enumerate(contours):
+            if i >= j or j in removed_indices:
+                continue
+
+            x2, y2, w2, h2 = cv2.boundingRect(cnt2)
+            area2 = cv2.contourArea(cnt2)
+
+            # Calculate intersection rectangle
+            x_intersection = max(x1, x2)
+            y_intersection = max(y1, y2)
+            w_intersection = min(x1 + w1, x2 + w2) - x_intersection
+            h_intersection = min(y1 + h1, y2 + h2) - y_intersection
+
+            if w_intersection > 0 and h_intersection > 0:
+                # There is overlap
+                overlap_area = w_intersection * h_intersection
+                overlap_ratio1 = overlap_area / (w1 * h1)
+                overlap_ratio2 = overlap_area / (w2 * h2)
+
+                # Consider it significant overlap if more than 30% of either widget is overlapped
+                if overlap_ratio1 > 0.3 or overlap_ratio2 > 0.3:
+                    has_overlap = True
+
+                    # Keep the larger widget, remove the smaller one
+                    if area1 > area2:
+                        removed_indices.add(j)
+                    else:
+                        overlap_with_larger = True
+                        break
+
+        if not overlap_with_larger:
+            filtered_contours.append(cnt1)
+
+    return filtered_contours
+
+
+# ==========================================================
+#  Contours
+# ==========================================================
+
+def _polygon(points):
+    return np.round(points).astype(np.int32).reshape(-1, 1, 2)
+
+
+def random_contours(extractor, n, seed):
+    """n (kind, contour) pairs cycling through the synthetic contour kinds."""
+    rng = np.random.default_rng(seed)
+    contours = []
+    for i in range(n):
+        kind = ("rounded-rect", "ellipse", "polygon", "noisy-rect", "template")[i % 5]
+        w, h = int(rng.integers(60, 900)), int(rng.integers(60, 900))
+        if kind == "rounded-rect":
+            cnt = extractor._rounded_rectangle_contour(w, h, int(rng.integers(0, min(w, h) // 2)))
+        elif kind == "ellipse":
+            t = np.linspace(0, 2 * np.pi, int(rng.integers(16, 200)), endpoint=False)
+            cnt = _polygon(np.stack([w / 2 * (1 + np.cos(t)), h / 2 * (1 + np.sin(t))], axis=1))
+        elif kind == "polygon":
+            k = int(rng.integers(3, 12))
+            t = np.sort(rng.uniform(0, 2 * np.pi, k))
+            r = rng.uniform(0.4, 1.0, k)
+            cnt = _polygon(np.stack([w / 2 * (1 + r * np.cos(t)), h / 2 * (1 + r * np.sin(t))], axis=1))
+        elif kind == "noisy-rect":
+            base = extractor._rounded_rectangle_contour(w, h, int(rng.integers(0, min(w, h) // 3))).reshape(-1, 2)
+            cnt = _polygon(base + rng.normal(0, rng.uniform(0.5, 4.0), base.shape))
+        else:
+            cnt = extractor.templates[int(rng.integers(0, len(extractor.templates)))].copy()
+        contours.append((kind, cnt))
+    return contours
+
+
+def _box_contour(x, y, w, h, rng):
+    """A rectangle, or an ellipse inscribed in it (smaller area, same bounding box)."""
+    if rng.random() < 0.7:
+        return _polygon([(x, y), (x + w - 1, y), (x + w - 1, y + h - 1), (x, y + h - 1)])
+    t = np.linspace(0, 2 * np.pi, 64, endpoint=False)
+    return _polygon(np.stack([x + (w - 1) / 2 * (1 + np.cos(t)), y + (h - 1) / 2 * (1 + np.sin(t))], axis=1))
+
+
+def random_contour_sets(n_sets, seed, max_size=80, size=None, canvas=None):
+    """
+    Random contour lists for overlap removal, of up to max_size contours
+    (exactly size if given) on a canvas of random or given extent. Besides
+    free boxes, a contour may copy, nest inside, shift or touch the edge of
+    an earlier box, so identical boxes, equal areas and zero-width
+    intersections all occur.
+    """
+    rng = np.random.default_rng(seed)
+    sets = []
+    for _ in range(n_sets):
+        extent = canvas or int(rng.choice([1000, 3000, 8000]))
+        boxes, contours = [], []
+        for _ in range(size if size is not None else int(rng.integers(0, max_size + 1))):
+            kind = rng.choice(["free", "copy", "nested", "shifted", "touching"], p=[0.5, 0.1, 0.15, 0.15, 0.1])
+            if not boxes or kind == "free":
+                w, h = int(rng.integers(20, 600)), int(rng.integers(20, 600))
+                x, y = int(rng.integers(0, extent)), int(rng.integers(0, extent))
+            else:
+                x, y, w, h = boxes[int(rng.integers(0, len(boxes)))]
+                if kind == "nested":
+                    dx, dy = int(rng.integers(0, w // 2 + 1)), int(rng.integers(0, h // 2 + 1))
+                    x, y, w, h = x + dx, y + dy, max(2, w // 2), max(2, h // 2)
+                elif kind == "shifted":
+                    x, y = x + int(rng.integers(-w // 2, w // 2 + 1)), y + int(rng.integers(-h // 2, h // 2 + 1))
+                elif kind == "touching":
+                    x, w = x + w, int(rng.integers(20, 600))
+            boxes.append((x, y, w, h))
+            contours.append(_box_contour(x, y, w, h, rng))
+        sets.append(contours)
+    return sets
+
+
+@contextlib.contextmanager
+def patched(extractor, name, replacement):
+    """Temporarily replace a method on one extractor instance."""
+    setattr(extractor, name, replacement)
+    try:
+        yield
+    finally:
+        delattr(extractor, name)
+
+
+def sample_candidates(extractor, work_dir):
+    """Contours that reach _match_templates while extracting the sample images."""
+    recorded, match = [], extractor._match_templates
+
+    def recording(contour):
+        recorded.append(("sample", contour.copy()))
+        return match(contour)
+
+    with patched(extractor, "_match_templates", recording), contextlib.redirect_stdout(io.StringIO()):
+        extractor.extract_dev(os.path.join(work_dir, "record"))
+    return recorded
+
+
+# ==========================================================
+#  Comparisons
+# ==========================================================
+
+def compare_template_matching(extractor, contours, shortlists):
+    """
+    Fast vs brute-force matching per shortlist size.
+
+    Returns:
+        dict: {size: {"same_index", "tie", "mismatch", "max_score_diff", "ms"}}
+        and the brute-force time in milliseconds.
+    """
+    start = time.perf_counter()
+    reference = [reference_match_templates(extractor, cnt) for _, cnt in contours]
+    brute_ms = (time.perf_counter() - start) * 1000
+
+    saved = extractor.template_shortlist_size
+    results = {}
+    try:
+        for size in shortlists:
+            extractor.template_shortlist_size = size
+            counts = {"same_index": 0, "tie": 0, "mismatch": 0, "max_score_diff": 0.0}
+            start = time.perf_counter()
+            matches = [extractor._match_templates(cnt) for _, cnt in contours]
+            counts["ms"] = round((time.perf_counter() - start) * 1000, 1)
+            for (score, idx), (ref_score, ref_idx, ref_scores) in zip(matches, reference):
+                if score == ref_score and idx == ref_idx:
+                    counts["same_index"] += 1
+                elif score == ref_score and ref_scores[idx] == ref_score:
+                    counts["tie"] += 1
+                else:
+                    counts["mismatch"] += 1
+                    counts["max_score_diff"] = max(counts["max_score_diff"], abs(score - ref_score))
+            results[size] = counts
+    finally:
+        extractor.template_shortlist_size = saved
+    return results, brute_ms
+
+
+def compare_overlap_removal(extractor, contour_sets, timing_size, seed):
+    """
+    Sweep vs all-pairs overlapping pairs and fast vs reference filtering per set.
+
+    Returns:
+        dict: set/pair counts, mismatching set indices, and timings of both
+        implementations on one set of timing_size contours.
+    """
+    pair_mismatches, filter_mismatches, n_pairs, n_removed = [], [], 0, 0
+    for s, contours in enumerate(contour_sets):
+        if contours:
+            boxes = np.array([cv2.boundingRect(cnt) for cnt in contours], dtype=np.int64)
+            pair_i, pair_j = extractor._overlapping_pairs(boxes)
+            expected = reference_overlapping_pairs(boxes)
+            n_pairs += len(expected)
+            if list(zip(pair_i.tolist(), pair_j.tolist())) != expected:
+                pair_mismatches.append(s)
+        kept = [id(cnt) for cnt in extractor._remove_overlapping_widgets(contours)]
+        expected_kept = [id(cnt) for cnt in reference_remove_overlapping_widgets(contours)]
+        n_removed += len(contours) - len(expected_kept)
+        if kept != expected_kept:
+            filter_mismatches.append(s)
+
+    # A large screenshot-sized set with few overlaps, where the old loop visits every pair
+    big = random_contour_sets(1, seed + 1, size=timing_size, canvas=40000)[0]
+    start = time.perf_counter()
+    extractor._remove_overlapping_widgets(big)
+    fast_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    reference_remove_overlapping_widgets(big)
+    reference_ms = (time.perf_counter() - start) * 1000
+    return {
+        "sets": len(contour_sets), "contours": sum(len(c) for c in contour_sets),
+        "pairs": n_pairs, "removed": n_removed,
+        "pair_mismatches": pair_mismatches, "filter_mismatches": filter_mismatches,
+        "timing_contours": len(big), "fast_ms": round(fast_ms, 1), "reference_ms": round(reference_ms, 1),
+    }
+
+
+def output_files(root):
+    """Relative paths of the files extract_dev wrote, without the manifest."""
+    return sorted(os.path.relpath(os.path.join(d, f), root)
+                  for d, _, files in os.walk(root) for f in files
+                  if f != WidgetExtractor.MANIFEST_NAME)
+
+
+def compare_trees(a, b):
+    """Files missing on either side, and files whose bytes differ."""
+    files_a, files_b = output_files(a), output_files(b)
+    missing = sorted(set(files_a) ^ set(files_b))
+    differing = []
+    for rel in sorted(set(files_a) & set(files_b)):
+        with open(os.path.join(a, rel), "rb") as fa, open(os.path.join(b, rel), "rb") as fb:
+            if fa.read() != fb.read():
+                differing.append(rel)
+    return len(files_a), missing, differing
+
+
+def run_extract_dev(extractor, output_dir, patches=()):
+    """extract_dev with the given (method name, replacement) patches; returns wall time in seconds."""
+    with contextlib.ExitStack() as stack:
+        for name, replacement in patches:
+            stack.enter_context(patched(extractor, name, replacement))
+        stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+        start = time.perf_counter()
+        extractor.extract_dev(output_dir)
+        return time.perf_counter() - start
+
+
+def check_extract_dev(extractor, fast_dir, brute_dir, patches):
+    """extract_dev with the brute-force patches must write the same files as the fast run in fast_dir."""
+    brute_s = run_extract_dev(extractor, brute_dir, patches)
+    n_files, missing, differing = compare_trees(fast_dir, brute_dir)
+    return {"files": n_files, "missing": missing, "differing": differing, "brute_s": round(brute_s, 2)}
+
+
+def parse_ints(text):
+    return [int(v) for v in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare WidgetExtractor's indexed fast paths with brute force.")
+    parser.add_argument("--contours", type=int, default=200, help="Random contours for template matching (default: 200)")
+    parser.add_argument("--shortlists", default="1,2,4,8", help="template_shortlist_size values compared (default: 1,2,4,8)")
+    parser.add_argument("--contour-sets", type=int, default=300, help="Random contour sets for overlap removal (default: 300)")
+    parser.add_argument("--timing-size", type=int, default=1500, help="Contours in the overlap removal timing set (default: 1500)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", default=None, help="Write extract_dev outputs under this directory and keep them")
+    parser.add_argument("--json", default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    extractor = WidgetExtractor(SAMPLE_DIR, enable_advanced_processing=True)
+    default_size = extractor.template_shortlist_size
+    shortlists = sorted(set(parse_ints(args.shortlists)) | {default_size})
+    work_dir = args.keep or tempfile.mkdtemp(prefix="bruteforce-check-")
+    report, failures = {"templates": len(extractor.templates)}, []
+    try:
+        # Template matching: shortlist vs matchShapes over every template
+        contours = sample_candidates(extractor, work_dir) + random_contours(extractor, args.contours, args.seed)
+        kinds = dict(Counter(kind for kind, _ in contours))
+        results, brute_ms = compare_template_matching(extractor, contours, shortlists)
+        report["template_matching"] = {"contours": kinds, "brute_force_ms": round(brute_ms, 1),
+                                       "shortlists": results}
+        print(f"[INFO] {len(contours)} contours {kinds} against {len(extractor.templates)} templates "
+              f"(brute force {brute_ms:.0f} ms)")
+        print(f"  {'shortlist':>9} {'same idx':>9} {'tie':>5} {'mismatch':>9} {'max diff':>9} {'ms':>8}")
+        for size, counts in results.items():
+            print(f"  {size:>9} {counts['same_index']:>9} {counts['tie']:>5} {counts['mismatch']:>9} "
+                  f"{counts['max_score_diff']:>9.2e} {counts['ms']:>8.1f}{'  (default)' if size == default_size else ''}")
+        if results[default_size]["mismatch"]:
+            failures.append(f"template matching: {results[default_size]['mismatch']} contours differ "
+                            f"from brute force at shortlist size {default_size}")
+
+        # Overlap removal: sweep vs all pairs, fast vs reference filtering
+        result = compare_overlap_removal(extractor, random_contour_sets(args.contour_sets, args.seed),
+                                         args.timing_size, args.seed)
+        report["overlap_removal"] = result
+        print(f"[INFO] {result['sets']} contour sets ({result['contours']} contours, {result['pairs']} overlapping "
+              f"pairs, {result['removed']} removed): {len(result['pair_mismatches'])} pair and "
+              f"{len(result['filter_mismatches'])} filter mismatches; {result['timing_contours']} contours "
+              f"{result['reference_ms']:.0f} ms -> {result['fast_ms']:.0f} ms")
+        if result["pair_mismatches"] or result["filter_mismatches"]:
+            failures.append(f"overlap removal differs from brute force in sets "
+                            f"{sorted(set(result['pair_mismatches'] + result['filter_mismatches']))}")
+
+        # extract_dev: fast paths vs each brute-force reference
+        fast_dir = os.path.join(work_dir, "fast")
+        fast_s = run_extract_dev(extractor, fast_dir)
+        report["extract_dev"] = {"fast_s": round(fast_s, 2)}
+        references = {
+            "_match_templates": lambda cnt: reference_match_templates(extractor, cnt)[:2],
+            "_remove_overlapping_widgets": reference_remove_overlapping_widgets,
+        }
+        for name, reference in references.items():
+            result = check_extract_dev(extractor, fast_dir, os.path.join(work_dir, f"brute{name}"), [(name, reference)])
+            report["extract_dev"][name] = result
+            print(f"[INFO] extract_dev, {name}: {result['files']} files, "
+                  f"fast {fast_s:.1f}s vs brute force {result['brute_s']:.1f}s")
+            if result["missing"] or result["differing"]:
+                failures.append(f"extract_dev with brute-force {name}: missing {result['missing']}, "
+                                f"differing {result['differing']}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[OK] Results written to {args.json}")
+    if failures:
+        for failure in failures:
+            print(f"[ERROR] {failure}")
+        return 1
+    print("[OK] Fast paths match brute force")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,378 @@
+"""
+Golden-output check and timing benchmark for the vectorized edge
+post-processing methods of WidgetExtractor:
+
+    _add_antialiasing, _remove_background_artifacts,
+    _subpixel_edge_refinement, _calculate_edge_quality_score
+
+The reference_* functions below are the original per-pixel loop
+implementations, kept verbatim as the golden oracle. Every method is run on
+synthetic widgets of several sizes and on crops of sample_widget_images;
+output images must not differ from the reference by more than
+--max-pixel-diff (default 0) and quality scores by more than
+--max-score-diff. The fixtures are built so every reference output differs
+from its input (a hard alpha step with background-coloured opaque edge
+pixels gives _remove_background_artifacts something to clear). Per-method
+reference/vectorized timings are printed.
+
+Usage:
+    python check_edge_postprocessing.py
+    python check_edge_postprocessing.py --sizes 300x500,1200x1800 --repeats 5 --json timings.json
+
+Exits with status 1 if any output exceeds the bounds or leaves its input unchanged.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import cv2
+import numpy as np
+
+from WidgetExtractor import WidgetExtractor
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_widget_images")
+
+
+# ==========================================================
+#  Reference implementations (pre-vectorization loops)
+# ==========================================================
+
+def reference_add_antialiasing(widget_with_alpha, contour):
+    h, w = widget_with_alpha.shape[:2]
+    alpha = widget_with_alpha[:, :, 3].copy()
+    alpha_binary = (alpha > 128).astype(np.uint8) * 255
+    distance_transform = cv2.distanceTransform(alpha_binary, cv2.DIST_L2, 5)
+    edge_mask = (distance_transform > 0) & (distance_transform <= 2.0)
+    alpha_smooth = alpha.copy()
+
+    if np.any(edge_mask):
+        alpha_blurred = cv2.GaussianBlur(alpha, (5, 5), 1.0)
+        edge_y, edge_x = np.where(edge_mask)
+        for y, x in zip(edge_y, edge_x):
+            if 0 <= x < w and 0 <= y < h:
+                dist = distance_transform[y, x]
+                if dist <= 1.0:
+                    blend_ratio = 0.4
+                else:
+                    blend_ratio = 0.2
+                alpha_smooth[y, x] = int((1 - blend_ratio) * alpha[y, x] + blend_ratio * alpha_blurred[y, x])
+
+        kernel_small = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+        alpha_smooth = cv2.morphologyEx(alpha_smooth, cv2.MORPH_CLOSE, kernel_small, iterations=1)
+
+    result = widget_with_alpha.copy()
+    result[:, :, 3] = alpha_smooth
+    return result
+
+
+def reference_remove_background_artifacts(widget_image):
+    if widget_image is None:
+        return widget_image
+
+    h, w = widget_image.shape[:2]
+    alpha = widget_image[:, :, 3]
+    edges = cv2.Canny(alpha, 50, 150)
+    edge_pixels = np.where(edges > 0)
+
+    if len(edge_pixels[0]) > 0:
+        background_colors = []
+        for y, x in zip(edge_pixels[0], edge_pixels[1]):
+            for dy in [-2, -1, 1, 2]:
+                for dx in [-2, -1, 1, 2]:
+                    ny, nx = y + dy, x + dx
+                    if 0 <= ny < h and 0 <= nx < w and alpha[ny, nx] < 50:
+                        background_colors.append(widget_image[ny, nx, :3])
+                        if len(background_colors) >= 100:
+                            break
+                if len(background_colors) >= 100:
+                    break
+            if len(background_colors) >= 100:
+                break
+
+        if len(background_colors) > 10:
+            background_colors = np.array(background_colors)
+            avg_background = np.mean(background_colors, axis=0)
+            cleaned_image = widget_image.copy()
+            for y, x in zip(edge_pixels[0], edge_pixels[1]):
+                if alpha[y, x] > 200:
+                    pixel_color = widget_image[y, x, :3]
+                    color_diff = np.linalg.norm(pixel_color - avg_background)
+                    if color_diff < 30:
+                        cleaned_image[y, x, 3] = 0
+            return cleaned_image
+
+    return widget_image
+
+
+def reference_subpixel_edge_refinement(roi, mask):
+    h, w = mask.shape
+    roi_gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+    grad_x = cv2.Sobel(roi_gray, cv2.CV_64F, 1, 0, ksize=3)
+    grad_y = cv2.Sobel(roi_gray, cv2.CV_64F, 0, 1, ksize=3)
+    gradient_magnitude = np.sqrt(grad_x**2 + grad_y**2)
+    if gradient_magnitude.max() > 0:
+        gradient_magnitude = gradient_magnitude / gradient_magnitude.max()
+
+    edge_threshold = 0.1
+    edge_regions = gradient_magnitude > edge_threshold
+    refined_mask = mask.copy().astype(np.float32)
+    edge_y, edge_x = np.where(edge_regions)
+
+    for y, x in zip(edge_y, edge_x):
+        if 0 <= x < w and 0 <= y < h:
+            gx = grad_x[y, x]
+            gy = grad_y[y, x]
+            grad_norm = np.sqrt(gx**2 + gy**2)
+            if grad_norm > 0:
+                gx, gy = gx/grad_norm, gy/grad_norm
+                step_size = 0.5
+                max_steps = 3
+                best_pos = None
+                best_gradient = 0
+                for step in range(-max_steps, max_steps + 1):
+                    sample_x = x + gx * step * step_size
+                    sample_y = y + gy * step * step_size
+                    if (0 <= sample_x < w and 0 <= sample_y < h):
+                        sample_x_int = int(sample_x)
+                        sample_y_int = int(sample_y)
+                        if (sample_x_int + 1 < w and sample_y_int + 1 < h):
+                            dx = sample_x - sample_x_int
+                            dy = sample_y - sample_y_int
+                            grad_val = (
+                                (1-dx) * (1-dy) * gradient_magnitude[sample_y_int, sample_x_int] +
+                                dx * (1-dy) * gradient_magnitude[sample_y_int, sample_x_int + 1] +
+                                (1-dx) * dy * gradient_magnitude[sample_y_int + 1, sample_x_int] +
+                                dx * dy * gradient_magnitude[sample_y_int + 1, sample_x_int + 1]
+                            )
+                            if grad_val > best_gradient:
+                                best_gradient = grad_val
+                                best_pos = (sample_x, sample_y)
+                if best_pos:
+                    refined_mask[y, x] = 255
+
+    refined_mask = refined_mask.astype(np.uint8)
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+    refined_mask = cv2.morphologyEx(refined_mask, cv2.MORPH_CLOSE, kernel, iterations=1)
+    return refined_mask
+
+
+def reference_calculate_edge_quality_score(widget_image):
+    if widget_image is None or widget_image.size == 0:
+        return {"overall_score": 0, "edge_smoothness": 0, "alpha_quality": 0, "content_ratio": 0}
+
+    h, w = widget_image.shape[:2]
+    alpha = widget_image[:, :, 3]
+    edges = cv2.Canny(alpha, 50, 150)
+    edge_pixels = np.where(edges > 0)
+    if len(edge_pixels[0]) > 0:
+        edge_gradients = []
+        for i in range(1, len(edge_pixels[0])):
+            prev_idx = (edge_pixels[0][i-1], edge_pixels[1][i-1])
+            curr_idx = (edge_pixels[0][i], edge_pixels[1][i])
+            if 0 <= curr_idx[0] < h and 0 <= curr_idx[1] < w:
+                if 0 <= prev_idx[0] < h and 0 <= prev_idx[1] < w:
+                    gradient_diff = abs(int(alpha[curr_idx]) - int(alpha[prev_idx]))
+                    edge_gradients.append(gradient_diff)
+        edge_smoothness = 1.0 - (np.mean(edge_gradients) / 255.0) if edge_gradients else 0.5
+    else:
+        edge_smoothness = 0.5
+
+    alpha_hist = cv2.calcHist([alpha], [0], None, [256], [0, 256])
+    alpha_quality = (alpha_hist[255] + alpha_hist[254] + alpha_hist[253]) / alpha.sum()
+    content_pixels = np.sum(alpha > 200)
+    content_ratio = content_pixels / (h * w)
+    overall_score = (edge_smoothness * 0.4 + alpha_quality * 0.3 + content_ratio * 0.3)
+
+    return {
+        "overall_score": overall_score,
+        "edge_smoothness": edge_smoothness,
+        "alpha_quality": alpha_quality,
+        "content_ratio": content_ratio,
+        "edge_pixels": len(edge_pixels[0])
+    }
+
+
+# ==========================================================
+#  Fixtures
+# ==========================================================
+
+def make_fixture(roi, seed=0):
+    """
+    Build method inputs from a BGR region: a rounded-rectangle widget mask
+    inset from the borders, its contour, and an RGBA widget with soft alpha
+    edges and a background-coloured band along the right inner edge (the case
+    _remove_background_artifacts clears).
+    """
+    rng = np.random.default_rng(seed)
+    h, w = roi.shape[:2]
+    inset = max(6, min(h, w) // 12)
+    radius = max(4, min(h, w) // 10)
+
+    mask = np.zeros((h, w), np.uint8)
+    x0, y0, x1, y1 = inset, inset, w - inset - 1, h - inset - 1
+    cv2.rectangle(mask, (x0 + radius, y0), (x1 - radius, y1), 255, -1)
+    cv2.rectangle(mask, (x0, y0 + radius), (x1, y1 - radius), 255, -1)
+    for cx, cy in ((x0 + radius, y0 + radius), (x1 - radius, y0 + radius),
+                   (x0 + radius, y1 - radius), (x1 - radius, y1 - radius)):
+        cv2.circle(mask, (cx, cy), radius, 255, -1)
+    contour = max(cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)[0], key=cv2.contourArea)
+
+    rgba = cv2.cvtColor(roi, cv2.COLOR_BGR2BGRA)
+    rgba[:, :, 3] = cv2.GaussianBlur(mask, (5, 5), 1.2)
+    # Hard alpha step on the right side, whose opaque edge pixels carry background colour.
+    # Canny keeps the left pixel of a tied step, which here is the opaque one.
+    background = np.median(roi[mask == 0].reshape(-1, 3), axis=0)
+    rgba[mask == 0, :3] = background.astype(np.uint8)
+    rows, cols = slice(y0 + radius, y1 - radius), slice(x1 - 4, w)
+    rgba[rows, cols, 3] = mask[rows, cols]
+    rgba[rows, x1 - 2:x1 + 1, :3] = np.clip(background + rng.integers(-6, 7, 3), 0, 255).astype(np.uint8)
+    return {"roi": roi, "mask": mask, "contour": contour, "rgba": rgba}
+
+
+def synthetic_roi(h, w, seed=0):
+    """A widget-like BGR screenshot region: gradient background, card, text strokes, noise."""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:h, 0:w]
+    roi = np.stack([40 + 60 * xx / w, 50 + 40 * yy / h, 70 + 30 * (xx + yy) / (w + h)], axis=-1)
+    inset = max(6, min(h, w) // 12)
+    roi[inset:h - inset, inset:w - inset] = rng.integers(150, 240, 3)
+    for _ in range(max(3, h // 40)):
+        y = int(rng.integers(inset + 10, max(inset + 11, h - inset - 10)))
+        x_start = int(rng.integers(inset + 10, max(inset + 11, w // 2)))
+        roi[y:y + 4, x_start:min(w - inset - 10, x_start + int(rng.integers(20, w // 2)))] = rng.integers(0, 80, 3)
+    roi += rng.normal(0, 4, roi.shape)
+    return np.clip(roi, 0, 255).astype(np.uint8)
+
+
+def load_fixtures(sizes, sample_crop):
+    fixtures = []
+    for i, (h, w) in enumerate(sizes):
+        fixtures.append((f"synthetic {h}x{w}", make_fixture(synthetic_roi(h, w, seed=i), seed=i)))
+    if os.path.isdir(SAMPLE_DIR):
+        ch, cw = sample_crop
+        for name in sorted(os.listdir(SAMPLE_DIR)):
+            image = cv2.imread(os.path.join(SAMPLE_DIR, name))
+            if image is None or image.shape[0] < ch or image.shape[1] < cw:
+                continue
+            y, x = (image.shape[0] - ch) // 3, (image.shape[1] - cw) // 2
+            fixtures.append((f"{name} crop {ch}x{cw}", make_fixture(image[y:y + ch, x:x + cw].copy())))
+    return fixtures
+
+
+# ==========================================================
+#  Comparison
+# ==========================================================
+
+def image_diff(a, b):
+    """Largest absolute per-pixel difference between two images."""
+    if a.shape != b.shape:
+        return float("inf")
+    return int(np.max(np.abs(a.astype(np.int16) - b.astype(np.int16)))) if a.size else 0
+
+
+def score_diff(a, b):
+    """Largest absolute difference over the keys of two quality-score dicts."""
+    if a.keys() != b.keys():
+        return float("inf")
+    return max(float(np.max(np.abs(np.asarray(a[k], dtype=np.float64) - np.asarray(b[k], dtype=np.float64))))
+               for k in a)
+
+
+def method_cases(extractor, fx):
+    """
+    (name, reference call, vectorized call, diff function, input) per method.
+
+    input is the image the method modifies, so the number of pixels the
+    reference changed can be reported; None for the scoring method.
+    """
+    return [
+        ("_add_antialiasing",
+         lambda: reference_add_antialiasing(fx["rgba"], fx["contour"]),
+         lambda: extractor._add_antialiasing(fx["rgba"], fx["contour"]), image_diff, fx["rgba"]),
+        ("_remove_background_artifacts",
+         lambda: reference_remove_background_artifacts(fx["rgba"]),
+         lambda: extractor._remove_background_artifacts(fx["rgba"]), image_diff, fx["rgba"]),
+        ("_subpixel_edge_refinement",
+         lambda: reference_subpixel_edge_refinement(fx["roi"], fx["mask"]),
+         lambda: extractor._subpixel_edge_refinement(fx["roi"], fx["mask"]), image_diff, fx["mask"]),
+        ("_calculate_edge_quality_score",
+         lambda: reference_calculate_edge_quality_score(fx["rgba"]),
+         lambda: extractor._calculate_edge_quality_score(fx["rgba"]), score_diff, None),
+    ]
+
+
+def changed_pixels(before, after):
+    """Pixels whose value differs between a method's input and its reference output."""
+    if before is None or before.shape != after.shape:
+        return None
+    changed = before != after
+    return int((changed.any(axis=-1) if changed.ndim == 3 else changed).sum())
+
+
+def timed(fn, repeats):
+    """Result of fn and its median wall time in milliseconds."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return result, float(np.median(times))
+
+
+def parse_sizes(text):
+    return [tuple(int(v) for v in size.split("x")) for size in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Golden-output check and timings of WidgetExtractor edge post-processing.")
+    parser.add_argument("--sizes", default="300x500,1200x1800", help="Synthetic widget sizes HxW (default: 300x500,1200x1800)")
+    parser.add_argument("--sample-crop", default="600x900", help="Crop size HxW taken from sample_widget_images (default: 600x900)")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per method, median reported (default: 3)")
+    parser.add_argument("--max-pixel-diff", type=int, default=0, help="Allowed max per-pixel difference (default: 0)")
+    parser.add_argument("--max-score-diff", type=float, default=1e-9, help="Allowed quality-score difference (default: 1e-9)")
+    parser.add_argument("--json", default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    extractor = WidgetExtractor(SAMPLE_DIR, enable_advanced_processing=True)
+    fixtures = load_fixtures(parse_sizes(args.sizes), parse_sizes(args.sample_crop)[0])
+
+    rows, failures, unexercised = [], 0, 0
+    print(f"{'fixture':<32} {'method':<31} {'ref ms':>9} {'new ms':>8} {'speedup':>8} {'max diff':>9} {'changed':>8}")
+    for fixture_name, fx in fixtures:
+        for method, reference, vectorized, diff, method_input in method_cases(extractor, fx):
+            expected, ref_ms = timed(reference, args.repeats)
+            actual, new_ms = timed(vectorized, args.repeats)
+            delta = diff(expected, actual)
+            bound = args.max_score_diff if diff is score_diff else args.max_pixel_diff
+            ok = delta <= bound
+            failures += not ok
+            # A golden output equal to its input would not test the method at all
+            changed = changed_pixels(method_input, expected)
+            unexercised += changed == 0
+            rows.append({"fixture": fixture_name, "method": method, "reference_ms": round(ref_ms, 2),
+                         "vectorized_ms": round(new_ms, 2), "max_diff": delta, "changed_pixels": changed, "ok": ok})
+            print(f"{fixture_name:<32} {method:<31} {ref_ms:>9.1f} {new_ms:>8.1f} "
+                  f"{ref_ms / max(new_ms, 1e-9):>7.1f}x {delta:>9.3g} {'-' if changed is None else changed:>8}"
+                  f"{'' if ok else '  FAIL'}{'  UNCHANGED' if changed == 0 else ''}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"[OK] Results written to {args.json}")
+
+    if failures:
+        print(f"[ERROR] {failures} method outputs exceed the difference bounds")
+        return 1
+    if unexercised:
+        print(f"[ERROR] {unexercised} reference outputs equal their input; the fixtures do not exercise them")
+        return 1
+    print(f"[OK] All {len(rows)} method outputs within bounds "
+          f"(pixels <= {args.max_pixel_diff}, scores <= {args.max_score_diff:g})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())